@@ -4,7 +4,7 @@
 # @File : Executor.py 
 # @Software: PyCharm
 import asyncio
-from typing import Union
+from typing import AsyncIterator, Union
 from .Recorder import LogRecorder
 from .ui.TradeUI import TradeUI
 
@@ -12,6 +12,8 @@ from .ui.TradeUI import TradeUI
 class Executor:
     # todo: important!!!!!!!!!!!!!!!!!! 当前由于策略识别号的逻辑，应该无法使用同一个api接口使用多个executor
     NAME = 'api接口'
+    # 上报理由分发表 {token: 是否附带额外信息}，值为 None 的理由不上报，表中没有的理由视为错误定义
+    REPORT_DISPATCH: dict[str, Union[bool, None]] = {}
 
     # noinspection PyTypeChecker
     def __init__(self) -> None:
@@ -26,6 +28,9 @@ class Executor:
         self._running_strategies: dict = {}
         # 已失效的策略
         self._disabled_strategies: dict = {}
+        # 合约 -> 该合约的运行策略，行情按合约直接分发，由 add_strategy, disable_strategy, delete_strategy 维护
+        self._symbol_routes: dict[str, tuple] = {}
+        self._symbol_routes_dirty = False
 
         # 存在的策略序列号，使用专门的函数维护，回收利用
         self._using_stg_num = []
@@ -91,6 +96,22 @@ class Executor:
         # todo: 是否将两个统一起来
         pass
 
+    def get_cached_position(self, symbol_name: str) -> Union[int, float, None]:
+        """
+        本地维护的合约仓位，不需要网络请求，不支持或尚未同步时返回 None，此时使用 get_symbol_position
+        :param symbol_name:
+        :return:
+        """
+        return None
+
+    def get_partial_orders(self, symbol_name: str) -> dict[str, Union[int, float]]:
+        """
+        本地记录的部分成交挂单，不支持时返回空字典
+        :param symbol_name:
+        :return: {策略订单 id: 已成交数量}，数量为绝对值
+        """
+        return {}
+
     async def get_current_asset_qty(self, symbol_name: str) -> float:
         pass
 
@@ -106,6 +127,18 @@ class Executor:
     def get_open_orders_with_io(self, symbol_name: str) -> tuple[list[str], list[str]]:
         pass
 
+    async def iter_open_orders(self, symbol_name: str, page_size: int = None) -> AsyncIterator[list[dict]]:
+        """
+        分页获取挂单，默认一次性返回全部挂单作为一页，支持分页的接口需要重写
+        :param symbol_name:
+        :param page_size:
+        :return: 每页为 get_open_orders_beta 格式的 list
+        """
+        yield await self.get_open_orders_beta(symbol_name)
+
+    def get_server_id(self, symbol_name: str, stg_id: str) -> Union[int, None]:
+        pass
+
     # ## ==================================== all streams ==================================== ## #
     def start_single_contract_order_subscription(self, contract_name: str) -> None:
         pass
@@ -190,6 +223,7 @@ class Executor:
         """
         new_stg_code = self._gen_stg_num()
         self._running_strategies[new_stg_code] = stg_analyzer
+        self._rebuild_symbol_routes()
         return new_stg_code
 
     def disable_strategy(self, stg_code: str):
@@ -205,6 +239,7 @@ class Executor:
 
         disabled_analyzer = self._running_strategies.pop(stg_code)
         self._disabled_strategies[stg_code] = disabled_analyzer
+        self._rebuild_symbol_routes()
         self._disable_stg_num(stg_code)
 
     def delete_strategy(self, stg_code: str):
@@ -219,6 +254,7 @@ class Executor:
             raise KeyError
 
         self._disabled_strategies.pop(stg_code)
+        self._rebuild_symbol_routes()
         self._remove_stg_num(stg_code)
 
     def strategy_stopped(self, stg_num: str):
@@ -231,6 +267,58 @@ class Executor:
         self._bound_UI.transfer_column(stg_num)
 
     # tool methods
+    def _rebuild_symbol_routes(self) -> None:
+        """
+        根据运行中的策略重建合约路由表，只在策略增减时调用
+        :return:
+        """
+        symbol_routes: dict[str, list] = {}
+        routes_dirty = False
+        for each_analyzer in self._running_strategies.values():
+            if each_analyzer.symbol_name is None:
+                # 合约名尚未设置，收到下一条行情时再重建
+                routes_dirty = True
+                continue
+            symbol_routes.setdefault(each_analyzer.symbol_name, []).append(each_analyzer)
+        self._symbol_routes = {each_symbol: tuple(each_list) for each_symbol, each_list in symbol_routes.items()}
+        self._symbol_routes_dirty = routes_dirty
+
+    def _symbol_subscribers(self, symbol_name: str) -> tuple:
+        """
+        返回运行该合约的所有策略，耗时与运行策略总数无关
+        返回 tuple，分发过程中策略增减不影响本次分发
+        :param symbol_name:
+        :return:
+        """
+        if self._symbol_routes_dirty:
+            self._rebuild_symbol_routes()
+        return self._symbol_routes.get(symbol_name, ())
+
+    async def _dispatch_report(self, reporting_analyzer, report_data: dict, token: str, appending_info: str = None) -> None:
+        """
+        根据上报理由分发表将订单信息交给策略，代替逐个比较上报理由
+        :param reporting_analyzer:
+        :param report_data:
+        :param token:
+        :param appending_info:
+        :return:
+        """
+        try:
+            with_append_info = self.REPORT_DISPATCH[token]
+        except KeyError:
+            if token is None:
+                print('未定义上报理由，不上报')
+            else:
+                print('错误定义上报理由，不上报')
+            return
+
+        if with_append_info is None:
+            return
+        elif with_append_info:
+            await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
+        else:
+            await reporting_analyzer.report_receiver(recv_data_dict=report_data)
+
     def _gen_stg_num(self) -> str:
         """
         根据策略序列维护规则，生成一个策略代号
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/22 10:20
+# @Author :
+# @File : GateConnection.py
+# @Software: PyCharm
+import json
+import time
+import asyncio
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Coroutine, Union
+
+import websockets
+from gate_ws.client import Connection, WebSocketRequest, WebSocketChannelRequest, WebSocketApiRequest, WebSocketChannelResponse, \
+    WebSocketApiResponse, GateWebsocketChannelError
+
+from LightQuant.tools.dispatch_queue import DispatchQueue
+from LightQuant.tools.subscription_registry import SubscriptionRegistry
+
+# 可选的 json 解析库，安装后自动使用，解析速度比标准库快数倍
+try:
+    import orjson
+    json_loads: Callable[[Union[str, bytes]], Any] = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson
+        json_loads = ujson.loads
+        JSON_BACKEND = 'ujson'
+    except ImportError:
+        json_loads = json.loads
+        JSON_BACKEND = 'json'
+
+# 使用标准库 json 时，预先查找通道名的开销大于少解析 pong 节省的时间，解析后再按通道丢弃没有回调的信息
+PEEK_CHANNEL = JSON_BACKEND != 'json'
+
+_CHANNEL_KEY = '"channel":"'
+# gate 的通道推送中 channel 是前三个字段之一，只在开头查找
+_PEEK_LENGTH = 64
+
+
+def peek_channel(body: Union[str, bytes]) -> Union[str, None]:
+    """
+    不解析 json，直接从原始文本的开头找出顶层的 channel 字段，开销很小
+    channel 字段之前出现嵌套对象时(如下单接口返回的 header)，无法确定是顶层字段，返回 None
+    :param body: 服务器返回的原始文本
+    :return: 通道名，无法确定时返回 None，由完整解析处理
+    """
+    if body.__class__ is not str:
+        return None
+    # 字符串中的引号会被转义，找到的一定是字段名
+    key_index = body.find(_CHANNEL_KEY, 1, _PEEK_LENGTH)
+    if key_index < 0 or body.find('{', 1, key_index) >= 0:
+        return None
+    value_start = key_index + len(_CHANNEL_KEY)
+    value_end = body.find('"', value_start)
+    if value_end < 0:
+        return None
+    return body[value_start:value_end]
+
+
+class ChannelFrame(WebSocketChannelResponse):
+    """
+    通道推送的轻量解析结果，属性与 WebSocketChannelResponse 相同
+    channel 已由 peek_channel 得到时不再从字典中读取，其他字段在使用时才从字典中读取，没有报错时不创建错误对象
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, msg: dict, channel: str) -> None:
+        self.msg = msg
+        self.channel = channel
+        error = msg.get('error')
+        self.error = GateWebsocketChannelError(error.get('code'), error.get('message')) if error else None
+
+    @property
+    def timestamp(self) -> Union[int, None]:
+        return self.msg.get('time')
+
+    @property
+    def event(self) -> Union[str, None]:
+        return self.msg.get('event')
+
+    @property
+    def result(self) -> Any:
+        return self.msg.get('result')
+
+
+def decode_frame(body: Union[str, bytes], channel: str = None) -> Union[ChannelFrame, WebSocketApiResponse]:
+    """
+    解析一条服务器返回，与 WebSocketResponse.parse 结果相同
+    :param body: 原始文本
+    :param channel: peek_channel 得到的通道名
+    :return:
+    """
+    msg = json_loads(body)
+    if channel is None:
+        if 'header' in msg:
+            return WebSocketApiResponse(msg)
+        channel = msg.get('channel')
+        if not channel:
+            raise ValueError(f"no channel found from response message: {msg}")
+    return ChannelFrame(msg, channel)
+
+
+def ticker_key(response: ChannelFrame) -> Union[str, None]:
+    """
+    ticker 推送按合约合并，订阅回复等其他事件不合并
+    合约 ticker 的 result 为只有一个合约的列表，现货 ticker 的 result 为字典
+    """
+    result = response.result
+    if response.event != 'update' or response.error or not result:
+        return None
+    if result.__class__ is list:
+        return result[0].get('contract') if len(result) == 1 else None
+    return result.get('currency_pair') or result.get('contract')
+
+
+def book_ticker_key(response: ChannelFrame) -> Union[str, None]:
+    result = response.result
+    if response.event != 'update' or response.error or not result:
+        return None
+    return result.get('s')
+
+
+class GateConnection(Connection):
+    """
+    替换 Connection 的读取流程:
+    1. 没有回调的通道(如 pong)直接丢弃，不创建对象，使用 orjson 或 ujson 时在解析 json 之前从原始文本中找出通道名，不解析
+    2. 通道推送使用轻量的 ChannelFrame，按通道名直接找到回调，不再逐条判断返回类型
+    3. 安装 orjson 或 ujson 时使用更快的 json 解析
+    4. 每个通道一个有界分发队列，由一个消费协程按顺序执行回调，不再为每条信息创建任务
+       ticker 和最佳买卖价按合约只保留最新一条，公有成交队列满时丢弃最早的信息，
+       订单、成交和下单返回严格按顺序全部交付，队列满时暂停读取
+    订阅回复与通道推送使用相同的通道名，仍然交给通道回调，用于确认订阅状态
+
+    发送的订阅和取消订阅请求记录在 SubscriptionRegistry 中，不再保存全部历史请求，
+    断线重连后只重新发送仍然有效的订阅，公共行情通道的合约合并为一个请求，并记录收到全部订阅回复的耗时
+    全部订阅恢复后调用 resync_callback，由使用者补查断线期间的订单和成交
+
+    只订阅公共行情的连接设置 login_required=False，断线重连时不发送登录请求
+    """
+    # 通道分发模式 {通道名: (模式, 合并 key)}，其他通道使用 ORDERED
+    DISPATCH_MODES = {
+        'futures.tickers': (DispatchQueue.CONFLATE, ticker_key),
+        'futures.book_ticker': (DispatchQueue.CONFLATE, book_ticker_key),
+        'futures.trades': (DispatchQueue.DROP_OLDEST, None),
+        'spot.tickers': (DispatchQueue.CONFLATE, ticker_key),
+        'spot.book_ticker': (DispatchQueue.CONFLATE, book_ticker_key),
+        'spot.trades': (DispatchQueue.DROP_OLDEST, None),
+    }
+    # 下单返回使用的队列名
+    API_QUEUE_NAME = 'api'
+    # payload 为合约列表的公共通道，重新订阅时合并
+    BATCHABLE_CHANNELS = ('futures.tickers', 'futures.trades', 'futures.book_ticker', 'spot.tickers', 'spot.trades', 'spot.book_ticker')
+
+    def __init__(self, *args, login_required: bool = True, dispatch_queue_size: int = 10000,
+                 resync_callback: Callable[[], Coroutine] = None, **kwargs) -> None:
+        """
+        :param login_required: 是否需要登录下单 api，断线重连后自动重新登录
+        :param dispatch_queue_size: 每个通道分发队列的最大排队数量
+        :param resync_callback: 断线重连并恢复全部订阅后调用的协程函数，没有参数
+        """
+        super(GateConnection, self).__init__(*args, **kwargs)
+        self.login_required = login_required
+        self.resync_callback = resync_callback
+        self.dispatch_queue_size = dispatch_queue_size
+        self._dispatch_queues: dict[str, DispatchQueue] = {}
+        # 回调函数是否为协程函数，避免每条信息都调用 iscoroutinefunction
+        self._coroutine_callbacks: dict[Callable, bool] = {}
+        # 统计信息，未解析直接丢弃的信息数量
+        self.skipped_frames = 0
+
+        self.subscriptions = SubscriptionRegistry(self.BATCHABLE_CHANNELS)
+        self.reconnect_count = 0
+        self._has_connected = False
+        # 重新订阅时等待的订阅回复数量和开始时间，最近若干次重连到全部订阅恢复的耗时，秒
+        self._resync_pending = 0
+        self._resync_start = 0.
+        self.resync_times: deque[float] = deque(maxlen=100)
+
+    def recover_subscription(self) -> None:
+        """
+        重新发送所有有效的订阅
+        :return:
+        """
+        for channel, payload, require_auth in self.subscriptions.replay_payloads():
+            self.send_msg(WebSocketChannelRequest(self.cfg, channel, 'subscribe', payload, require_auth))
+
+    def subscription_stats(self) -> dict:
+        """
+        :return: 各通道有效订阅数量，重连次数，最近一次和最慢一次重新订阅耗时，毫秒
+        """
+        return {
+            'live': self.subscriptions.stats(),
+            'reconnects': self.reconnect_count,
+            'resync_pending': self._resync_pending,
+            'last_resync_ms': self.resync_times[-1] * 1000 if self.resync_times else None,
+            'max_resync_ms': max(self.resync_times) * 1000 if self.resync_times else None,
+        }
+
+    def login(self) -> None:
+        if self.login_required:
+            super(GateConnection, self).login()
+
+    def close(self) -> None:
+        super(GateConnection, self).close()
+        for each_queue in self._dispatch_queues.values():
+            each_queue.close()
+
+    def dispatch_stats(self) -> dict:
+        """
+        :return: 各通道队列深度、最大深度、交付、丢弃和合并数量，以及未解析丢弃的信息数量
+        """
+        return {
+            'channels': {name: each_queue.stats() for name, each_queue in self._dispatch_queues.items()},
+            'skipped_frames': self.skipped_frames,
+        }
+
+    def _is_coroutine(self, callback: Callable) -> bool:
+        is_coroutine = self._coroutine_callbacks.get(callback)
+        if is_coroutine is None:
+            is_coroutine = self._coroutine_callbacks[callback] = asyncio.iscoroutinefunction(callback)
+        return is_coroutine
+
+    async def _dispatch(self, queue_name: str, callback: Callable, response: Any) -> None:
+        if not self._is_coroutine(callback):
+            self.event_loop.run_in_executor(self.cfg.pool, callback, self, response)
+            return
+        dispatch_queue = self._dispatch_queues.get(queue_name)
+        if dispatch_queue is None:
+            mode, key_func = self.DISPATCH_MODES.get(queue_name, (DispatchQueue.ORDERED, None))
+            dispatch_queue = self._dispatch_queues[queue_name] = DispatchQueue(
+                queue_name, partial(callback, self), mode=mode, maxsize=self.dispatch_queue_size, key_func=key_func)
+        await dispatch_queue.put(response)
+
+    async def _write(self, conn: websockets.WebSocketClientProtocol):
+        """
+        连接成功后先重新发送有效的订阅，再发送队列中的请求
+        :param conn:
+        :return:
+        """
+        if self._has_connected:
+            self.reconnect_count += 1
+            replay_payloads = self.subscriptions.replay_payloads()
+            self._resync_pending = len(replay_payloads)
+            self._resync_start = time.perf_counter()
+            for channel, payload, require_auth in replay_payloads:
+                await conn.send(str(WebSocketChannelRequest(self.cfg, channel, 'subscribe', payload, require_auth)))
+            if not replay_payloads:
+                self._resync_done()
+        self._has_connected = True
+
+        while True:
+            msg = await self.sending_queue.get()
+            if isinstance(msg, WebSocketChannelRequest):
+                self.subscriptions.record(msg.channel, msg.event, msg.payload, msg.require_auth)
+                msg = str(msg)
+            elif isinstance(msg, WebSocketApiRequest):
+                msg = str(msg)
+            elif isinstance(msg, WebSocketRequest):
+                raise TypeError('invalid instance created! plz check code')
+            await conn.send(msg)
+
+    def _check_resync(self, response: ChannelFrame) -> None:
+        """
+        重新订阅期间统计订阅回复，全部收到后记录耗时
+        :param response:
+        :return:
+        """
+        if response.event != 'subscribe':
+            return
+        if response.error:
+            print('重新订阅失败 {}: {}'.format(response.channel, response.error))
+        self._resync_pending -= 1
+        if self._resync_pending == 0:
+            self.resync_times.append(time.perf_counter() - self._resync_start)
+            self._resync_done()
+
+    def _resync_done(self) -> None:
+        if self.resync_callback is not None:
+            asyncio.create_task(self.resync_callback())
+
+    async def _read(self, conn: websockets.WebSocketClientProtocol):
+        """
+        解析返回信息，读取通道信息，放入对应通道的分发队列
+        :param conn:
+        :return:
+        """
+        async for body in conn:
+            channel = peek_channel(body) if PEEK_CHANNEL else None
+            if channel is not None:
+                callback = self.channels.get(channel, self.cfg.default_callback)
+                if callback is None:
+                    self.skipped_frames += 1
+                    continue
+                response = decode_frame(body, channel)
+                if self._resync_pending:
+                    self._check_resync(response)
+                await self._dispatch(channel, callback, response)
+                continue
+
+            response = decode_frame(body)
+            if response.__class__ is ChannelFrame:
+                channel = response.channel
+                callback = self.channels.get(channel, self.cfg.default_callback)
+                if callback is None:
+                    self.skipped_frames += 1
+                    continue
+                if self._resync_pending:
+                    self._check_resync(response)
+            else:
+                channel = self.API_QUEUE_NAME
+                callback = self.api_callback
+            if callback is not None:
+                await self._dispatch(channel, callback, response)
+
+
+if __name__ == '__main__':
+    print('json backend:', JSON_BACKEND)
+    for each_body in (
+            '{"time":1710000000,"time_ms":1710000000123,"channel":"futures.pong","event":"","result":null}',
+            '{"time":1710000000,"channel":"futures.tickers","event":"update","result":[{"contract":"BTC_USDT","last":"42000"}]}',
+            '{"request_id":"000000000001","ack":false,"header":{"response_time":"1710000000123","status":"200","channel":"futures.order_place"},"data":{"result":{"id":1}}}',
+    ):
+        print(peek_channel(each_body), type(decode_frame(each_body, peek_channel(each_body))).__name__)
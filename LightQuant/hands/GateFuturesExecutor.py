@@ -10,18 +10,26 @@ import typing
 import asyncio
 import numpy as np
 import pandas as pd
-from typing import Union
+from typing import AsyncIterator, Callable, Iterator, Union
 from LightQuant.Recorder import LogRecorder
+from LightQuant.tools.order_coalescer import OrderCoalescer
+from LightQuant.tools.order_scheduler import OrderScheduler, TokenBucket
+from LightQuant.tools.rest_gateway import RestGateway
+from LightQuant.tools.order_state import OrderState, OrderStateBook
+from LightQuant.tools.position_ledger import PositionLedger
 from LightQuant.Executor import Executor
 from LightQuant.Analyzer import Analyzer
+from LightQuant.hands.GateOrderClient import GateOrderClient
+from LightQuant.hands.GateConnection import GateConnection
+from LightQuant.hands.GateMarketHub import GateMarketHub
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
 
 import gate_api
 from gate_api.exceptions import ApiException, GateApiException
-from gate_api import FuturesOrder, FuturesOrderAmendment
+from gate_api import FuturesOrder, FuturesOrderAmendment, BatchAmendOrderReq
 import gate_ws
-from gate_ws.futures import FuturesOrderChannel, FuturesTickerChannel, FuturesUserTradesChannel, FuturesPublicTradeChannel, FuturesBookTickerChannel
-from gate_ws.api import AsyncOrderClient, GateWebsocketApiError
+from gate_ws.futures import FuturesOrderChannel, FuturesUserTradesChannel
+from gate_ws.api import GateWebsocketApiError
 
 
 class GateFuturesExecutor(Executor):
@@ -31,6 +39,25 @@ class GateFuturesExecutor(Executor):
 
     """
     NAME = 'Gate 合约'
+    # 上报理由分发表 {token: 是否附带额外信息}，值为 None 的理由不上报
+    REPORT_DISPATCH = {
+        Token.ORDER_FILLED: True,
+        Token.POST_SUCCESS: False,
+        Token.POC_SUCCESS: False,
+        Token.CANCEL_SUCCESS: False,
+        Token.CANCEL_POC_SUCCESS: False,
+        Token.PARTIALLY_FILLED: True,
+        Token.ORDER_UPDATE: False,
+        Token.UNIDENTIFIED: True,
+        Token.FAILED: None,
+        Token.POST_FAILED: False,
+        Token.POC_FAILED: True,
+        Token.POC_REJECTED: False,
+        Token.CANCEL_FAILED: True,
+        Token.AMEND_POC_FAILED: True,
+        Token.AMEND_NONEXISTENT_POC: True,
+        Token.TEMP_TOKEN: None,
+    }
 
     # noinspection PyTypeChecker
     def __init__(self) -> None:
@@ -43,15 +70,32 @@ class GateFuturesExecutor(Executor):
         # 钱包接口
         self._wallet_client: gate_api.WalletApi = None
         self._websocket_channel_order: FuturesOrderChannel = None
-        self._websocket_channel_ticker: FuturesTickerChannel = None
         self._websocket_channel_trade: FuturesUserTradesChannel = None
-        self._websocket_channel_public_trade: FuturesPublicTradeChannel = None
-        self._websocket_channel_book_ticker: FuturesBookTickerChannel = None
 
-        self._websocket_connection: gate_ws.Connection = None
+        # 下单连接: 下单 api 和用户私有频道，行情推送不进入该连接的读取循环和 socket 缓冲区
+        self._websocket_connection: GateConnection = None
+        # 行情中心: ticker、公有成交和最佳买卖价，进程内所有 executor 共用行情连接，每个 (通道, 合约) 只订阅一次
+        self._market_hub: GateMarketHub = None
         # todo: 进行更好的封装，只需要一个connection即可pingpong
         # self._websocket_client_connection: ClientConnection = None
-        self._async_client: AsyncOrderClient = None
+        self._async_client: GateOrderClient = None
+        # 挂单请求合并，时间窗口内的 poc 和限价挂单合并为 batch 请求，每个 batch 最多 10 个订单
+        self._order_coalescer = OrderCoalescer(
+            send_single=self._send_order_request,
+            send_batch=self._send_batch_order_request,
+            window=0.0005,
+            max_batch_size=10
+        )
+        # websocket 下单请求调度，每个接口一个令牌桶，按 gate 合约接口每秒 100 个请求设置
+        # 优先级: 撤单 > 修改 > 平仓 > 新挂单 > 撒网，挂单令牌桶的突发数量不超过合约最大挂单数量
+        self._order_scheduler = OrderScheduler(
+            buckets={
+                'order_place': TokenBucket(rate=100),
+                'order_amend': TokenBucket(rate=100),
+                'order_cancel': TokenBucket(rate=100),
+            },
+            key_func=lambda request_item: getattr(request_item, 'text', None)
+        )
 
         self.gathered_connection = None
         # 该变量用于确保只创建一次连接
@@ -61,12 +105,41 @@ class GateFuturesExecutor(Executor):
         self._api_secret = None
         self._user_id = 0
 
-        self._time_out = None
-
-        # 用于存储不确定是否成功的请求 {'self_orderid': timestamp_when_posted}
-        # todo: 添加循环检错功能
-        self._unidentified_pending_order = {}
-        self._unidentified_cancel_order = {}
+        # rest 请求超时时间，秒
+        self._time_out = 10
+        # 同步 rest 请求在线程池中执行，不阻塞事件循环
+        # 等待时间比客户端超时稍长，超时时优先抛出客户端带有请求信息的超时错误
+        self._rest_gateway = RestGateway(max_workers=8, timeout=self._time_out + 1, name='gate_futures_rest')
+
+        # 用于存储不确定是否成功的请求 {'self_orderid': timestamp_when_expired}
+        # 由在途请求检查定时填入超时未返回的挂单和撤单请求，之后收到该订单的返回或成交时删除
+        self._unidentified_pending_order: dict[str, int] = {}
+        self._unidentified_cancel_order: dict[str, int] = {}
+        self._max_unidentified_num = 1000
+        # 在途请求检查间隔，秒
+        self._inflight_check_interval = 1
+        self._inflight_check_task: asyncio.Task = None
+        # 挂单的策略 id 与服务器 id 对应关系 {contract: {stg_id: server_id}}，由挂单、撤单回报和分页查询维护
+        self._open_order_server_ids: dict[str, dict[str, int]] = {}
+        # 分页查询挂单时每页数量
+        self._open_orders_page_size = 100
+        # 本地订单状态机，合并订单频道、成交频道和下单返回，重复的状态信息不再上报
+        self._order_states = OrderStateBook(max_finished=1000)
+        # 按私有成交累计的仓位，定时与 rest 仓位对比修正，间隔秒
+        self._position_ledger = PositionLedger()
+        self._position_reconcile_interval = 60
+        self._position_reconcile_task: asyncio.Task = None
+
+        # 断线重连后的补查: 监听订单的合约及开始监听的时间戳，秒，每个合约最近收到的成交 id
+        self._order_subscribed_contracts: dict[str, float] = {}
+        self._last_trade_ids: dict[str, int] = {}
+        # 最近处理过的成交 id，补发成交与推送重复时只处理一次
+        self._recent_trade_ids: dict[int, None] = {}
+        self._max_recent_trade_num = 1000
+        # 补查成交时每页数量和最多查询页数
+        self._resync_trade_page_size = 100
+        self._resync_trade_max_pages = 10
+        self._resync_stats: dict = {'count': 0, 'failed': 0, 'last_ms': None, 'missed_trades': 0, 'positions': {}}
 
         # binance socket manager 类
         self._socket_manager = None
@@ -154,21 +227,21 @@ class GateFuturesExecutor(Executor):
                 key=self._api_key,
                 secret=self._api_secret
             )
+            # 连接池与线程池大小相同，每个线程都能复用 keep-alive 连接
+            api_cfg.connection_pool_maxsize = self._rest_gateway.max_workers
             gate_api_client = gate_api.ApiClient(api_cfg)
             self._order_client = gate_api.FuturesApi(gate_api_client)
             self._wallet_client = gate_api.WalletApi(gate_api_client)
 
             ws_cfg = gate_ws.Configuration(app='futures', settle='usdt', api_key=self._api_key, api_secret=self._api_secret, ping_interval=10)
-            self._websocket_connection = gate_ws.Connection(ws_cfg)
+            self._websocket_connection = GateConnection(ws_cfg, resync_callback=self._resync_after_reconnect)
             self._websocket_channel_order = FuturesOrderChannel(self._websocket_connection, callback=self._user_order_socket_receiver)
-            self._websocket_channel_ticker = FuturesTickerChannel(conn=self._websocket_connection, callback=self._ticker_socket_receiver)
             self._websocket_channel_trade = FuturesUserTradesChannel(conn=self._websocket_connection, callback=self._user_trade_socket_receiver)
 
-            self._websocket_channel_public_trade = FuturesPublicTradeChannel(conn=self._websocket_connection, callback=self._public_trade_socket_receiver)
-            self._websocket_channel_book_ticker = FuturesBookTickerChannel(conn=self._websocket_connection, callback=self._book_ticker_socket_receiver)
+            self._market_hub = GateMarketHub.shared(settle='usdt')
 
             # self._websocket_client_connection = ClientConnection(ws_cfg)
-            self._async_client = AsyncOrderClient(conn=self._websocket_connection, callback=self._user_order_api_receiver)
+            self._async_client = GateOrderClient(conn=self._websocket_connection, callback=self._user_order_api_receiver, request_timeout=self._time_out)
             self._async_client.login(key=self._api_key, secret=self._api_secret)
             print('client创建成功')
 
@@ -189,7 +262,15 @@ class GateFuturesExecutor(Executor):
         :return:
         """
         self._connected = False
+        if self._inflight_check_task is not None:
+            self._inflight_check_task.cancel()
+            self._inflight_check_task = None
+        if self._position_reconcile_task is not None:
+            self._position_reconcile_task.cancel()
+            self._position_reconcile_task = None
         self._websocket_connection.close()
+        self._market_hub.release(self)
+        self._rest_gateway.shutdown()
         # self._websocket_client_connection.close()
 
     async def engine_start(self) -> None:
@@ -202,6 +283,10 @@ class GateFuturesExecutor(Executor):
         await super().engine_start()
         self._connected = True
         print('connect gate api')
+        self._inflight_check_task = asyncio.create_task(self._check_inflight_requests())
+        self._position_reconcile_task = asyncio.create_task(self._reconcile_positions())
+        # 行情连接由行情中心运行，各连接独立运行和重连
+        self._market_hub.acquire()
         await self._websocket_connection.run()
         # await self._websocket_client_connection.run()
 
@@ -214,6 +299,68 @@ class GateFuturesExecutor(Executor):
 
         print('结束gate连接')
 
+    async def _rest_request(self, api_method: Callable, **kwargs):
+        """
+        在线程池中执行同步 rest 请求，等待期间事件循环继续处理其他策略的数据
+        :param api_method: gate_api 客户端方法
+        :param kwargs: 请求参数
+        :return:
+        """
+        return await self._rest_gateway.call(api_method, _request_timeout=self._time_out, **kwargs)
+
+    async def _check_inflight_requests(self) -> None:
+        """
+        定时取出超时未返回的 websocket 请求，记录为不确定状态的挂单和撤单，
+        并以 UNIDENTIFIED 上报给所属策略，由策略的挂单检查修正
+        :return:
+        """
+        while True:
+            await asyncio.sleep(self._inflight_check_interval)
+            if self._async_client is None:
+                continue
+            expired_requests = self._async_client.expire_requests()
+            if expired_requests:
+                unidentified_orders = self._record_unidentified_requests(expired_requests)
+                for each_stg_id, each_info in unidentified_orders.items():
+                    report_data_dict = Token.ORDER_INFO.copy()
+                    order_state = self._order_states.get(each_stg_id)
+                    report_data_dict['symbol'] = order_state.contract if order_state is not None else None
+                    report_data_dict['id'] = each_stg_id
+                    await self.reporter(report_data=report_data_dict, token=Token.UNIDENTIFIED, appending_info=each_info)
+
+    def _record_unidentified_requests(self, expired_requests: list[tuple]) -> dict[str, str]:
+        """
+        :param expired_requests: [(req_id, channel, req_info), ]
+        :return: 本次记录的不确定订单 {stg_id: 说明}
+        """
+        expired_timestamp = int(round(time.time() * 1000))
+        unidentified_orders: dict[str, str] = {}
+        for req_id, channel, req_info in expired_requests:
+            if channel == 'futures.order_place':
+                unidentified_orders[req_info.text[2:]] = '挂单请求超时未返回'
+                self._unidentified_pending_order[req_info.text[2:]] = expired_timestamp
+                self._order_states.expire(req_info.text[2:])
+            elif channel == 'futures.order_batch_place':
+                for each_order in req_info:
+                    unidentified_orders[each_order.text[2:]] = '挂单请求超时未返回'
+                    self._unidentified_pending_order[each_order.text[2:]] = expired_timestamp
+                    self._order_states.expire(each_order.text[2:])
+            elif channel == 'futures.order_cancel':
+                unidentified_orders[req_info[2:]] = '撤单请求超时未返回'
+                self._unidentified_cancel_order[req_info[2:]] = expired_timestamp
+            elif channel == 'futures.order_cancel_ids':
+                for each_text in req_info.values():
+                    each_stg_id = each_text[2:] if each_text.startswith('t-') else each_text
+                    unidentified_orders[each_stg_id] = '撤单请求超时未返回'
+                    self._unidentified_cancel_order[each_stg_id] = expired_timestamp
+            print('websocket 请求超时未返回: {} {} {}'.format(channel, req_id, req_info if channel != 'futures.order_batch_place' else len(req_info)))
+
+        # 只保留最近的记录
+        for unidentified_dict in (self._unidentified_pending_order, self._unidentified_cancel_order):
+            while len(unidentified_dict) > self._max_unidentified_num:
+                unidentified_dict.pop(next(iter(unidentified_dict)))
+        return unidentified_orders
+
     async def get_symbol_info(self, symbol_name: str) -> Union[dict, None]:
         """
         在策略开始前，被 Analyzer 调用一次
@@ -228,7 +375,7 @@ class GateFuturesExecutor(Executor):
         symbol_info_dict = {}
 
         try:
-            info_res = self._order_client.get_futures_contract(settle='usdt', contract=symbol_name)
+            info_res = await self._rest_request(self._order_client.get_futures_contract, settle='usdt', contract=symbol_name)
         except GateApiException as ex:
             if ex.label == 'CONTRACT_NOT_FOUND':
                 return None
@@ -240,6 +387,8 @@ class GateFuturesExecutor(Executor):
         symbol_info_dict['max_leverage'] = int(info_res.leverage_max)
         symbol_info_dict['order_price_deviate'] = float(info_res.order_price_deviate)
         symbol_info_dict['orders_limit'] = info_res.orders_limit
+        if info_res.orders_limit:
+            self._order_scheduler.buckets['order_place'].limit_capacity(info_res.orders_limit)
 
         return symbol_info_dict
 
@@ -250,7 +399,7 @@ class GateFuturesExecutor(Executor):
         :param symbol_name: 合约名
         :return:
         """
-        ticker_res = self._order_client.list_futures_tickers(settle='usdt', contract=symbol_name)
+        ticker_res = await self._rest_request(self._order_client.list_futures_tickers, settle='usdt', contract=symbol_name)
         return float(ticker_res[0].last)
 
     async def change_symbol_leverage(self, symbol_name: str, leverage: int) -> None:
@@ -261,7 +410,7 @@ class GateFuturesExecutor(Executor):
         :return:
         """
         try:
-            lev_res = self._order_client.update_position_leverage(
+            lev_res = await self._rest_request(self._order_client.update_position_leverage,
                 settle='usdt',
                 contract=symbol_name,
                 leverage='0',
@@ -281,7 +430,7 @@ class GateFuturesExecutor(Executor):
         :param symbol_name:
         :return:
         """
-        info_res = self._order_client.get_position(settle='usdt', contract=symbol_name)
+        info_res = await self._rest_request(self._order_client.get_position, settle='usdt', contract=symbol_name)
         return info_res.size
 
     def get_all_accounts_balance(self, uid_list: list[int]) -> list[dict]:
@@ -299,6 +448,59 @@ class GateFuturesExecutor(Executor):
 
         return info
 
+    def get_cached_position(self, symbol_name: str) -> Union[int, float, None]:
+        """
+        查询按私有成交累计的合约仓位，不需要网络请求，可以在每次收到行情时调用
+        :param symbol_name:
+        :return: 没有监听该合约或还没有完成第一次 rest 同步时返回 None
+        """
+        return self._position_ledger.position(symbol_name)
+
+    def get_partial_orders(self, symbol_name: str) -> dict[str, Union[int, float]]:
+        """
+        查询部分成交、仍在挂单中的订单，成交数量由私有成交累计，不需要网络请求
+        :param symbol_name:
+        :return: {策略订单 id: 已成交数量}，数量为绝对值
+        """
+        return {client_id: abs(filled) for client_id, filled in self._order_states.partial_orders(symbol_name).items()}
+
+    async def _reconcile_position(self, symbol_name: str) -> Union[int, float]:
+        """
+        查询 rest 仓位并修正本地仓位
+        :param symbol_name:
+        :return: rest 仓位
+        """
+        trade_count = self._position_ledger.trade_count(symbol_name)
+        rest_position = await self.get_symbol_position(symbol_name)
+        drift = self._position_ledger.reconcile(symbol_name, rest_position, trade_count)
+        if drift:
+            print('{} 本地仓位与账户仓位偏差 {} 张，已按账户仓位修正'.format(symbol_name, drift))
+        return rest_position
+
+    async def _reconcile_positions(self) -> None:
+        """
+        定时对比所有监听合约的本地仓位与 rest 仓位
+        :return:
+        """
+        while True:
+            await asyncio.sleep(self._position_reconcile_interval)
+            for each_contract in list(self._order_subscribed_contracts):
+                await self._try_reconcile_position(each_contract)
+
+    async def _try_reconcile_position(self, symbol_name: str) -> None:
+        try:
+            await self._reconcile_position(symbol_name)
+        except Exception as e:
+            print('{} 仓位对比失败: {}'.format(symbol_name, e))
+            print(type(e))
+
+    def get_position_ledger_stats(self) -> dict:
+        """
+        本地仓位统计：各合约仓位，与 rest 仓位对比次数，因请求期间有成交跳过的次数，出现偏差的次数和最近的偏差
+        :return:
+        """
+        return self._position_ledger.stats()
+
     def get_symbol_position_with_io(self, symbol_name: str) -> Union[int, float]:
         """
         非协程版本的获账户仓位函数，运行该函数会等待网络io
@@ -320,7 +522,7 @@ class GateFuturesExecutor(Executor):
             'taker_fee': 0
         }
         try:
-            fee_res = self._wallet_client.get_trade_fee(currency_pair=symbol_name, settle='usdt')
+            fee_res = await self._rest_request(self._wallet_client.get_trade_fee, currency_pair=symbol_name, settle='usdt')
 
             trade_fee['maker_fee'] = float(fee_res.futures_maker_fee)
             trade_fee['taker_fee'] = float(fee_res.futures_taker_fee)
@@ -338,19 +540,10 @@ class GateFuturesExecutor(Executor):
         """
         open_orders_stg_id = []
         open_orders_real_id = []
-        orders_res = self._order_client.list_futures_orders(
-            settle='usdt',
-            contract=symbol_name,
-            status='open',
-            # limit=100,
-            # offset=0,
-        )
-        for each_order_ins in orders_res:
-            strategy_id = each_order_ins.text[2:]
-            real_id = str(each_order_ins.id)
-
-            open_orders_stg_id.append(strategy_id)
-            open_orders_real_id.append(real_id)
+        async for each_page in self.iter_open_orders(symbol_name):
+            for each_order in each_page:
+                open_orders_stg_id.append(each_order['stg_id'])
+                open_orders_real_id.append(str(each_order['server_id']))
 
         return open_orders_stg_id, open_orders_real_id
 
@@ -360,25 +553,123 @@ class GateFuturesExecutor(Executor):
         :param symbol_name:
         :return:
         """
-        orders_res = self._order_client.list_futures_orders(
-            settle='usdt',
-            contract=symbol_name,
-            status='open',
-        )
         acc_open_orders = []
-        for each_order_ins in orders_res:
-            acc_open_orders.append(
-                {
-                    'stg_id': each_order_ins.text[2:],      # str
-                    'server_id': each_order_ins.id,         # int id
-                    'price': each_order_ins.price,          # str
-                    'size': each_order_ins.size,            # int with +-
-                    'left_qty': each_order_ins.left         # int with +-
-                }
-            )
+        async for each_page in self.iter_open_orders(symbol_name):
+            acc_open_orders.extend(each_page)
 
         return acc_open_orders
 
+    async def iter_open_orders(self, symbol_name: str, page_size: int = None) -> AsyncIterator[list[dict]]:
+        """
+        分页获取合约挂单，每获取一页返回一页
+        以上一页最后一个订单 id 作为下一页的起点，翻页期间挂单成交或撤销不会导致后面的挂单被跳过
+        每页请求在线程池中执行，翻页之间事件循环可以处理其他数据
+        完整遍历后更新该合约的 stg_id -> server_id 对应关系
+        :param symbol_name:
+        :param page_size: 每页数量，为 None 时使用默认值
+        :return: 每页为 get_open_orders_beta 格式的 list
+        """
+        page_size = self._open_orders_page_size if page_size is None else page_size
+        former_stg_ids = set(self._open_order_server_ids.get(symbol_name, ()))
+        server_ids: dict[str, int] = {}
+        last_id = None
+        while True:
+            orders_res = await self._rest_request(self._order_client.list_futures_orders,
+                settle='usdt',
+                contract=symbol_name,
+                status='open',
+                limit=page_size,
+                last_id=last_id
+            )
+            each_page = [self._parse_open_order(each_order_ins) for each_order_ins in orders_res]
+            for each_order in each_page:
+                server_ids[each_order['stg_id']] = each_order['server_id']
+            if each_page:
+                yield each_page
+            if len(orders_res) < page_size:
+                break
+            last_id = str(orders_res[-1].id)
+
+        # 查询期间新挂的单已经由回报记录，只删除查询前已有但不再存在的挂单
+        known_server_ids = self._open_order_server_ids.setdefault(symbol_name, {})
+        for each_stg_id in former_stg_ids - server_ids.keys():
+            known_server_ids.pop(each_stg_id, None)
+        known_server_ids.update(server_ids)
+
+    def _iter_open_orders_with_io(self, symbol_name: str, page_size: int = None) -> Iterator[list[dict]]:
+        """
+        非协程版分页获取挂单，运行时会等待网络io
+        :param symbol_name:
+        :param page_size:
+        :return:
+        """
+        page_size = self._open_orders_page_size if page_size is None else page_size
+        last_id = None
+        while True:
+            orders_res = self._order_client.list_futures_orders(
+                settle='usdt',
+                contract=symbol_name,
+                status='open',
+                limit=page_size,
+                last_id=last_id
+            )
+            each_page = [self._parse_open_order(each_order_ins) for each_order_ins in orders_res]
+            if each_page:
+                yield each_page
+            if len(orders_res) < page_size:
+                break
+            last_id = str(orders_res[-1].id)
+
+    @staticmethod
+    def _parse_open_order(order_ins: FuturesOrder) -> dict:
+        return {
+            'stg_id': order_ins.text[2:],       # str
+            'server_id': order_ins.id,          # int id
+            'price': order_ins.price,           # str
+            'size': order_ins.size,             # int with +-
+            'left_qty': order_ins.left,         # int with +-
+            'tif': order_ins.tif                # str
+        }
+
+    @staticmethod
+    def _parse_my_trade(trade_ins: gate_api.MyFuturesTrade) -> dict:
+        """
+        rest 查询的成交转为私有成交频道的推送格式
+        :param trade_ins:
+        :return:
+        """
+        size = trade_ins.size
+        if isinstance(size, str):
+            size = int(size) if size.lstrip('-').isdigit() else float(size)
+        return {
+            'id': trade_ins.id,
+            'create_time': int(trade_ins.create_time),
+            'create_time_ms': int(trade_ins.create_time * 1000),
+            'contract': trade_ins.contract,
+            'order_id': trade_ins.order_id,
+            'size': size,
+            'price': trade_ins.price,
+            'role': trade_ins.role,
+            'text': trade_ins.text,
+            'fee': trade_ins.fee,
+            'point_fee': trade_ins.point_fee,
+        }
+
+    def get_server_id(self, symbol_name: str, stg_id: str) -> Union[int, None]:
+        """
+        查询挂单的服务器 id，不需要重新获取全部挂单
+        :param symbol_name:
+        :param stg_id: 策略 id
+        :return: 不存在时返回 None
+        """
+        return self._open_order_server_ids.get(symbol_name, {}).get(stg_id)
+
+    def _record_server_id(self, symbol_name: str, stg_id: str, server_id: int) -> None:
+        self._open_order_server_ids.setdefault(symbol_name, {})[stg_id] = server_id
+
+    def _forget_server_id(self, symbol_name: str, stg_id: str) -> None:
+        self._open_order_server_ids.get(symbol_name, {}).pop(stg_id, None)
+
     def get_single_order(self, order_id: str) -> tuple[bool, float, int]:
         # 临时方法，检查单个挂单是否存在及其价格
         try:
@@ -410,17 +701,10 @@ class GateFuturesExecutor(Executor):
         """
         open_orders_stg_id = []
         open_orders_real_id = []
-        orders_res = self._order_client.list_futures_orders(
-            settle='usdt',
-            contract=symbol_name,
-            status='open',
-        )
-        for each_order_ins in orders_res:
-            strategy_id = each_order_ins.text[2:]
-            real_id = str(each_order_ins.id)
-
-            open_orders_stg_id.append(strategy_id)
-            open_orders_real_id.append(real_id)
+        for each_page in self._iter_open_orders_with_io(symbol_name):
+            for each_order in each_page:
+                open_orders_stg_id.append(each_order['stg_id'])
+                open_orders_real_id.append(str(each_order['server_id']))
 
         return open_orders_stg_id, open_orders_real_id
 
@@ -505,6 +789,9 @@ class GateFuturesExecutor(Executor):
         if trade_info_dict['event'] == 'update':
             result_list = trade_info_dict['result']
             for _, each_result in enumerate(result_list):
+                # 重连补查时已经补发的成交不再处理
+                if not self._remember_trade(each_result):
+                    continue
                 # 从此刻开始，协程函数都是使用 await, 确保收信时，不会有两个协程同时调用策略变量
                 await self._handle_user_futures_trade_data(each_result)
 
@@ -527,6 +814,10 @@ class GateFuturesExecutor(Executor):
         try:
             # self._websocket_channel_order.subscribe([self._user_id, contract_name])
             self._websocket_channel_trade.subscribe([self._user_id, contract_name])
+            self._order_subscribed_contracts.setdefault(contract_name, time.time())
+            if contract_name not in self._position_ledger:
+                # 订阅成交后查询仓位作为本地仓位的起点
+                asyncio.create_task(self._try_reconcile_position(contract_name))
         except Exception as ex:
             print(ex)
             print(type(ex))
@@ -540,35 +831,143 @@ class GateFuturesExecutor(Executor):
         """
         # self._websocket_channel_order.unsubscribe([self._user_id, contract_name])
         self._websocket_channel_trade.unsubscribe([self._user_id, contract_name])
+        self._order_subscribed_contracts.pop(contract_name, None)
+        self._last_trade_ids.pop(contract_name, None)
+        self._position_ledger.forget(contract_name)
         print('关闭合约数据监听 {}'.format(contract_name))
 
-    async def _ticker_socket_receiver(self, conn: gate_ws.Connection, ticker_res: gate_ws.WebSocketResponse) -> None:
+    def _remember_trade(self, trade_data: dict) -> bool:
         """
-        持续获得从gate服务器订阅的合约ticker信息，即最新价格
-        :return:
+        记录成交 id 和合约最近的成交 id
+        :param trade_data: 私有成交频道格式
+        :return: 是否为新的成交
         """
-        if ticker_res.error:
-            print('合约ticker频道  gate服务器返回报错信息: ', ticker_res.error)
-            return
-
-        ticker_info_dict = ticker_res.msg
-        if ticker_info_dict['event'] == 'update':
-            symbol_ticker = ticker_info_dict['result'][0]
-            await self._handle_futures_ticker_data(symbol_ticker)
+        trade_id = int(trade_data['id'])
+        if trade_id in self._recent_trade_ids:
+            return False
+        self._recent_trade_ids[trade_id] = None
+        if len(self._recent_trade_ids) > self._max_recent_trade_num:
+            self._recent_trade_ids.pop(next(iter(self._recent_trade_ids)))
+        if trade_id > self._last_trade_ids.get(trade_data['contract'], 0):
+            self._last_trade_ids[trade_data['contract']] = trade_id
+        return True
 
-            # result_list = ticker_info_dict['result']
-            # for _, each_result in enumerate(result_list):
-            #     await self._handle_spot_ticker_data(each_result)
+    async def _get_missed_trades(self, contract_name: str) -> list[dict]:
+        """
+        查询最近收到的成交之后的所有成交，没有收到过成交时查询开始监听之后的成交
+        rest 返回的成交按时间倒序，逐页查询直到遇到已收到的成交
+        :param contract_name:
+        :return: 按成交 id 顺序排列，私有成交频道格式
+        """
+        last_trade_id = self._last_trade_ids.get(contract_name, 0)
+        since_time = self._order_subscribed_contracts.get(contract_name, 0)
+        missed_trades = []
+        for page_index in range(self._resync_trade_max_pages):
+            trades_res = await self._rest_request(self._order_client.get_my_trades,
+                settle='usdt',
+                contract=contract_name,
+                limit=self._resync_trade_page_size,
+                offset=page_index * self._resync_trade_page_size
+            )
+            reached = False
+            for each_trade_ins in trades_res:
+                if each_trade_ins.id <= last_trade_id or each_trade_ins.create_time < since_time:
+                    reached = True
+                    break
+                missed_trades.append(self._parse_my_trade(each_trade_ins))
+            if reached or len(trades_res) < self._resync_trade_page_size:
+                break
+        else:
+            print('{} 断线期间成交超过 {} 条，只补发最近的成交'.format(contract_name, len(missed_trades)))
 
-        elif ticker_info_dict['event'] == 'subscribe':
-            print('成功订阅合约ticker信息')
+        missed_trades.sort(key=lambda x: int(x['id']))
+        return missed_trades
 
-        elif ticker_info_dict['event'] == 'unsubscribe':
-            print('成功取消合约ticker信息')
+    async def _resync_after_reconnect(self) -> None:
+        """
+        下单连接断线重连并恢复订阅后调用
+        并发查询所有监听合约的挂单和断线期间的成交，按顺序补发漏掉的成交后查询仓位，
+        并确认超时未返回的挂单和撤单请求，策略不需要等待挂单检查撤销全部挂单重新布局
+        :return:
+        """
+        contract_names = list(self._order_subscribed_contracts)
+        if not contract_names:
+            return
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(self._resync_contract(each_contract) for each_contract in contract_names), return_exceptions=True)
+
+        self._resync_stats['count'] += 1
+        for each_contract, each_result in zip(contract_names, results):
+            if isinstance(each_result, Exception):
+                self._resync_stats['failed'] += 1
+                print('{} 重连补查失败: {}'.format(each_contract, each_result))
+                print(type(each_result))
+                continue
+            missed_num, position = each_result
+            self._resync_stats['missed_trades'] += missed_num
+            self._resync_stats['positions'][each_contract] = position
+        self._resync_stats['last_ms'] = (time.perf_counter() - start_time) * 1000
+        print('重连补查完成，合约 {} 个，耗时 {:.0f} ms'.format(len(contract_names), self._resync_stats['last_ms']))
+
+    async def _resync_contract(self, contract_name: str) -> tuple[int, Union[int, float]]:
+        """
+        单个合约的重连补查
+        :param contract_name:
+        :return: 补发的成交数量，当前仓位
+        """
+        known_stg_ids = set(self._open_order_server_ids.get(contract_name, ()))
+        open_orders, missed_trades = await asyncio.gather(
+            self.get_open_orders_beta(contract_name),
+            self._get_missed_trades(contract_name)
+        )
 
-        else:
-            print('其他未记录的ticker socket事件类型:')
-            print(str(ticker_info_dict))
+        # 先按顺序补发成交，推送已经处理过的成交跳过
+        missed_num = 0
+        filled_stg_ids = set()
+        for each_trade in missed_trades:
+            if not self._remember_trade(each_trade):
+                continue
+            missed_num += 1
+            filled_stg_ids.add(each_trade['text'][2:])
+            await self._handle_user_futures_trade_data(each_trade)
+
+        # 超时的挂单请求仍在挂单中，说明挂单成功
+        open_orders_by_id = {each_order['stg_id']: each_order for each_order in open_orders}
+        for each_stg_id in [each_id for each_id in self._unidentified_pending_order if each_id in open_orders_by_id]:
+            self._unidentified_pending_order.pop(each_stg_id)
+            each_order = open_orders_by_id[each_stg_id]
+            report_data_dict = Token.ORDER_INFO.copy()
+            report_data_dict['symbol'] = contract_name
+            report_data_dict['id'] = each_stg_id
+            report_data_dict['price'] = each_order['price']
+            report_data_dict['side'] = 'BUY' if each_order['size'] > 0 else 'SELL'
+            report_data_dict['quantity'] = each_order['size']
+            if not self._order_states.open(each_stg_id, contract_name, each_order['size'], each_order['price'], each_order['tif']):
+                continue
+            await self.reporter(report_data=report_data_dict, token=Token.POC_SUCCESS if each_order['tif'] == 'poc' else Token.POST_SUCCESS)
+
+        # 超时的撤单请求对应的挂单已不存在且没有成交，说明撤单成功
+        for each_stg_id in [each_id for each_id in self._unidentified_cancel_order if each_id in known_stg_ids]:
+            if each_stg_id in open_orders_by_id or each_stg_id in filled_stg_ids:
+                continue
+            self._unidentified_cancel_order.pop(each_stg_id)
+            report_data_dict = Token.ORDER_INFO.copy()
+            report_data_dict['symbol'] = contract_name
+            report_data_dict['id'] = each_stg_id
+            if not self._order_states.cancel(each_stg_id):
+                continue
+            await self.reporter(report_data=report_data_dict, token=Token.CANCEL_SUCCESS)
+
+        # 补发成交之后再查询仓位，rest 仓位已包含补发的成交，避免本地仓位重复计算
+        position = await self._reconcile_position(contract_name)
+        return missed_num, position
+
+    def get_resync_stats(self) -> dict:
+        """
+        断线重连补查统计：补查次数，失败合约数，最近一次耗时，补发成交数量，各合约补查时的仓位
+        :return:
+        """
+        return self._resync_stats
 
     def start_single_contract_ticker_subscription(self, contract_name: str) -> None:
         """
@@ -576,7 +975,7 @@ class GateFuturesExecutor(Executor):
         :param contract_name:
         :return:
         """
-        self._websocket_channel_ticker.subscribe([contract_name])
+        self._market_hub.subscribe('ticker', contract_name, self._handle_futures_ticker_data)
         print('开启合约ticker数据监听 {}'.format(contract_name))
 
     def stop_single_contract_ticker_subscription(self, contract_name: str) -> None:
@@ -585,75 +984,23 @@ class GateFuturesExecutor(Executor):
         :param contract_name:
         :return:
         """
-        self._websocket_channel_ticker.unsubscribe([contract_name])
+        self._market_hub.unsubscribe('ticker', contract_name, self._handle_futures_ticker_data)
         print('关闭合约ticker数据监听 {}'.format(contract_name))
 
-    async def _public_trade_socket_receiver(self, conn: gate_ws.Connection, public_trade_res: gate_ws.WebSocketResponse) -> None:
-        """
-        获得共有成交信息，即盘口成交信息
-        :param public_trade_res:
-        :return:
-        """
-        if public_trade_res.error:
-            print('共有成交频道  gate服务器返回报错信息: ', public_trade_res.error)
-            return
-
-        # public_trade_info = json.loads(public_trade_res.body)
-        public_trade_info = public_trade_res.msg
-        if public_trade_info['event'] == 'update':
-            symbol_trade_info = public_trade_info['result'][0]
-            await self._handle_futures_public_trade_data(symbol_trade_info)
-
-        elif public_trade_info['event'] == 'subscribe':
-            print('成功订阅合约公有成交信息')
-
-        elif public_trade_info['event'] == 'unsubscribe':
-            print('成功取消合约公有成交信息')
-
-        else:
-            print('其他未记录的public trade socket事件类型:')
-            print(str(public_trade_info))
-
-    async def _book_ticker_socket_receiver(self, conn: gate_ws.Connection, book_ticker_res: gate_ws.WebSocketResponse) -> None:
-        """
-        获取最佳买卖价信息
-        :param conn:
-        :param book_ticker_res:
-        :return:
-        """
-        if book_ticker_res.error:
-            print('共有成交频道  gate服务器返回报错信息: ', book_ticker_res.error)
-            return
-
-        book_ticker_info = book_ticker_res.msg
-        if book_ticker_info['event'] == 'update':
-            symbol_book_ticker_info: dict = book_ticker_info['result']
-            await self._handle_futures_book_ticker_data(symbol_book_ticker_info)
-
-        elif book_ticker_info['event'] == 'subscribe':
-            print('成功订阅合约最佳买卖价信息')
-
-        elif book_ticker_info['event'] == 'unsubscribe':
-            print('成功取消合约最佳买卖价信息')
-
-        else:
-            print('其他未记录的public trade socket事件类型:')
-            print(str(book_ticker_info))
-
     def start_single_contract_public_trade_subscription(self, contract_name: str) -> None:
-        self._websocket_channel_public_trade.subscribe([contract_name])
+        self._market_hub.subscribe('public_trade', contract_name, self._handle_futures_public_trade_data)
         print('开启合约public trade数据监听 {}'.format(contract_name))
 
     def stop_single_contract_public_trade_subscription(self, contract_name: str) -> None:
-        self._websocket_channel_public_trade.unsubscribe([contract_name])
+        self._market_hub.unsubscribe('public_trade', contract_name, self._handle_futures_public_trade_data)
         print('关闭合约public trade数据监听 {}'.format(contract_name))
 
     def start_single_contract_book_ticker_subscription(self, contract_name: str) -> None:
-        self._websocket_channel_book_ticker.subscribe([contract_name])
+        self._market_hub.subscribe('book_ticker', contract_name, self._handle_futures_book_ticker_data)
         print('开启合约book ticker数据监听 {}'.format(contract_name))
 
     def stop_single_contract_book_ticker_subscription(self, contract_name: str) -> None:
-        self._websocket_channel_book_ticker.unsubscribe([contract_name])
+        self._market_hub.unsubscribe('book_ticker', contract_name, self._handle_futures_book_ticker_data)
         print('关闭合约book ticker数据监听 {}'.format(contract_name))
 
     def temp_reconnect(self) -> None:
@@ -751,6 +1098,11 @@ class GateFuturesExecutor(Executor):
         report_data_dict['side'] = 'BUY' if order_data['size'] > 0 else 'SELL'
         report_data_dict['quantity'] = order_data['size']
 
+        if order_status == '_new':
+            self._record_server_id(order_data['contract'], report_data_dict['id'], order_data['id'])
+        elif order_status in ('filled', 'cancelled'):
+            self._forget_server_id(order_data['contract'], report_data_dict['id'])
+
         if order_status == 'filled':
             return
             # # 挂单成交，需要上报
@@ -773,6 +1125,8 @@ class GateFuturesExecutor(Executor):
             # 已有判断挂单成功的方法(request 返回)，暂不需要使用
             # print('撮合时间: {}'.format(str(user_data['T'])))
             # print('事件时间: {}'.format(str(user_data['E'])))
+            if not self._order_states.open(report_data_dict['id'], order_data['contract'], order_data['size'], order_data['price'], order_data['tif']):
+                return
             if order_data['tif'] == 'poc':
                 await self.reporter(report_data=report_data_dict, token=Token.POC_SUCCESS)
             else:
@@ -780,6 +1134,9 @@ class GateFuturesExecutor(Executor):
             # todo: 自己处理该信息
             pass
         elif order_status == 'cancelled':
+            if not self._order_states.cancel(report_data_dict['id']):
+                return
+            self._add_fill_info(report_data_dict, self._order_states.get(report_data_dict['id']))
             if order_data['tif'] == 'poc':
                 await self.reporter(report_data=report_data_dict, token=Token.CANCEL_POC_SUCCESS)
             else:
@@ -788,6 +1145,9 @@ class GateFuturesExecutor(Executor):
         elif order_status == '_update':
             # append_info = 'left={}'.format(order_data['left'])
             # await self.reporter(report_data=report_data_dict, token=Token.PARTIALLY_FILLED, appending_info=append_info)
+            # 部分成交也会推送 _update，成交由成交频道上报，只有价格或数量变化时上报
+            if not self._order_states.amend(report_data_dict['id'], order_data['price'], order_data['size']):
+                return
             await self.reporter(report_data=report_data_dict, token=Token.ORDER_UPDATE)
 
         else:
@@ -804,20 +1164,26 @@ class GateFuturesExecutor(Executor):
         order_info = action_status['result']
         if action_status['channel'] == 'futures.order_place' or action_status['channel'] == 'futures.order_batch_place':
             # print('\n###确认挂单成功')
-
             report_data_dict['symbol'] = order_info['contract']
             report_data_dict['id'] = order_info['text'][2:]
             report_data_dict['price'] = order_info['price']
             report_data_dict['side'] = 'BUY' if order_info['size'] > 0 else 'SELL'
             report_data_dict['quantity'] = order_info['size']
+            self._unidentified_pending_order.pop(report_data_dict['id'], None)
 
             if action_status['success']:
+                if 'id' in order_info:
+                    self._record_server_id(order_info['contract'], report_data_dict['id'], order_info['id'])
+                if not self._order_states.open(report_data_dict['id'], order_info['contract'], order_info['size'], order_info['price'], order_info['tif']):
+                    return
                 if order_info['tif'] == 'poc':
                     await self.reporter(report_data=report_data_dict, token=Token.POC_SUCCESS)
                 else:
                     # todo: 市价挂单的成交也会作为挂单成功返回并输出信息, ioc
                     await self.reporter(report_data=report_data_dict, token=Token.POST_SUCCESS)
             else:
+                if not self._order_states.reject(report_data_dict['id']):
+                    return
                 error: GateWebsocketApiError = action_status['error']
                 if order_info['tif'] == 'poc':
                     if error.label == 'ORDER_POC_IMMEDIATE':
@@ -832,8 +1198,13 @@ class GateFuturesExecutor(Executor):
         elif action_status['channel'] == 'futures.order_cancel':
             # print('\n###确认撤单成功')
             report_data_dict['id'] = order_info['text'][2:]
+            self._unidentified_cancel_order.pop(report_data_dict['id'], None)
 
             if action_status['success']:
+                self._forget_server_id(order_info.get('contract'), report_data_dict['id'])
+                if not self._order_states.cancel(report_data_dict['id']):
+                    return
+                self._add_fill_info(report_data_dict, self._order_states.get(report_data_dict['id']))
                 if order_info['tif'] == 'poc':
                     await self.reporter(report_data=report_data_dict, token=Token.CANCEL_POC_SUCCESS)
                 else:
@@ -841,11 +1212,30 @@ class GateFuturesExecutor(Executor):
             else:
                 error: GateWebsocketApiError = action_status['error']
                 await self.reporter(report_data=report_data_dict, token=Token.CANCEL_FAILED, appending_info=str(error))
+        elif action_status['channel'] == 'futures.order_cancel_ids':
+            # 批量撤单的每个订单单独返回，服务器 id 的记录由订单频道的撤销信息删除
+            report_data_dict['id'] = order_info['text'][2:] if order_info['text'].startswith('t-') else order_info['text']
+            self._unidentified_cancel_order.pop(report_data_dict['id'], None)
+
+            if action_status['success']:
+                # 返回中没有 tif，使用挂单时记录的 tif
+                order_state = self._order_states.get(report_data_dict['id'])
+                if not self._order_states.cancel(report_data_dict['id']):
+                    return
+                self._add_fill_info(report_data_dict, self._order_states.get(report_data_dict['id']))
+                if order_state is not None and order_state.tif == 'poc':
+                    await self.reporter(report_data=report_data_dict, token=Token.CANCEL_POC_SUCCESS)
+                else:
+                    await self.reporter(report_data=report_data_dict, token=Token.CANCEL_SUCCESS)
+            else:
+                await self.reporter(report_data=report_data_dict, token=Token.CANCEL_FAILED, appending_info=str(action_status['error']))
         elif action_status['channel'] == 'futures.order_amend':
             # print('\n###确认修改成功')
             report_data_dict['id'] = order_info['text'][2:]
 
             if action_status['success']:
+                if not self._order_states.amend(report_data_dict['id'], order_info.get('price'), order_info.get('size')):
+                    return
                 # todo: token 可以更新，此处只是兼容旧系统
                 await self.reporter(report_data=report_data_dict, token=Token.ORDER_UPDATE)
             else:
@@ -871,6 +1261,11 @@ class GateFuturesExecutor(Executor):
         report_data_dict['price'] = order_data['price']
         report_data_dict['side'] = 'BUY' if order_data['size'] > 0 else 'SELL'
         report_data_dict['quantity'] = order_data['size']
+        # 超时的挂单请求已成交，说明挂单成功
+        self._unidentified_pending_order.pop(report_data_dict['id'], None)
+        self._position_ledger.apply_trade(order_data['contract'], order_data['size'])
+        order_state = self._order_states.fill(report_data_dict['id'], order_data['contract'], order_data['size'], order_data['price'])
+        self._add_fill_info(report_data_dict, order_state)
 
         current_timestamp = int(round(time.time() * 1000))
         filled_timestamp = order_data['create_time_ms']
@@ -879,6 +1274,20 @@ class GateFuturesExecutor(Executor):
 
         await self.reporter(report_data=report_data_dict, token=Token.ORDER_FILLED, appending_info=append_info)
 
+    @staticmethod
+    def _add_fill_info(report_data_dict: dict, order_state: OrderState) -> None:
+        """
+        上报信息中加入订单累计成交数量，数量均为绝对值，订单原始数量未知时为 None
+        同时加入订单当前状态，撤单成功先于成交到达时，成交上报的订单状态为已撤销
+        :param report_data_dict:
+        :param order_state:
+        :return:
+        """
+        report_data_dict['filled_qty'] = abs(order_state.filled)
+        report_data_dict['order_qty'] = abs(order_state.size) if order_state.size else None
+        report_data_dict['left_qty'] = abs(order_state.left) if order_state.size else None
+        report_data_dict['order_status'] = order_state.status
+
     async def _handle_futures_ticker_data(self, ticker_data: dict) -> None:
         """
         根据得到的合约ticker数据，分析判断是否需要上报及其他操作
@@ -929,45 +1338,7 @@ class GateFuturesExecutor(Executor):
                 print('{} :该策略已停止，不上报 '.format(stg_num))
                 return
 
-            if token == Token.ORDER_FILLED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.POST_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.POC_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_POC_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.PARTIALLY_FILLED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.ORDER_UPDATE:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.UNIDENTIFIED:
-                pass
-            elif token == Token.FAILED:
-                pass
-            elif token == Token.POST_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.POC_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.POC_REJECTED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.AMEND_POC_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.AMEND_NONEXISTENT_POC:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-
-            elif token == Token.TEMP_TOKEN:
-                # report_data_dict['status'] = token
-                # await self._my_analyzer.report_receiver(recv_data_dict=report_data_dict)
-                pass
-            elif token is None:
-                print('未定义上报理由，不上报')
-            else:
-                print('错误定义上报理由，不上报')
+            await self._dispatch_report(reporting_analyzer, report_data, token, appending_info)
 
         else:
             # 非自定策略产生的order id      # todo: 用某种形式记录
@@ -1031,6 +1402,10 @@ class GateFuturesExecutor(Executor):
             await self._change_poc_order_price(recv_command)
         elif recv_command['status'] == Token.AMEND_POC_QTY:
             await self._change_poc_order_qty(recv_command)
+        elif recv_command['status'] == Token.TO_CANCEL_BATCH:
+            await self._post_cancel_batch_orders(recv_command)
+        elif recv_command['status'] == Token.AMEND_POC_BATCH:
+            await self._change_poc_batch_orders(recv_command)
         elif recv_command['status'] == Token.CANCEL_ALL:
             await self._cancel_all_orders(recv_command)
         elif recv_command['status'] == Token.CLOSE_POSITION:
@@ -1046,12 +1421,8 @@ class GateFuturesExecutor(Executor):
         向 analyzer发送 ticker信息
         :return:
         """
-        # todo: 临时分辨办法，后续修改，使用 { 'eth_usdt': ['UI3stg6', ] } 字典方法分辨
-        symbol_name = ticker_data['symbol']
-        for each_stg_num in self._running_strategies.keys():
-            each_analyzer: Analyzer = self._running_strategies[each_stg_num]
-            if each_analyzer.symbol_name == symbol_name:
-                await each_analyzer.ticker_receiver(recv_ticker_data=ticker_data)
+        for each_analyzer in self._symbol_subscribers(ticker_data['symbol']):
+            await each_analyzer.ticker_receiver(recv_ticker_data=ticker_data)
 
     async def public_trade_reporter(self, public_trade_data: dict) -> None:
         """
@@ -1059,16 +1430,16 @@ class GateFuturesExecutor(Executor):
         :param public_trade_data:
         :return:
         """
-        # todo: 临时分辨方法，同上
-        symbol_name = public_trade_data['symbol']
-        for each_stg_num in self._running_strategies.keys():
-            each_analyzer: Analyzer = self._running_strategies[each_stg_num]
-            if each_analyzer.symbol_name == symbol_name:
-                await each_analyzer.public_trade_receiver(recv_trade_data=public_trade_data)
+        for each_analyzer in self._symbol_subscribers(public_trade_data['symbol']):
+            await each_analyzer.public_trade_receiver(recv_trade_data=public_trade_data)
 
     async def book_ticker_reporter(self, book_ticker_data: dict) -> None:
-        # todo: 暂时不分辨，
-        for each_stg_num, each_analyzer in self._running_strategies.items():
+        """
+        向 analyzer 发送最优挂单信息，只发送给运行该合约的策略
+        :param book_ticker_data: gate 原始 book ticker 数据，合约名为 's'
+        :return:
+        """
+        for each_analyzer in self._symbol_subscribers(book_ticker_data['s']):
             await each_analyzer.book_ticker_receiver(recv_book_data=book_ticker_data)
 
     # core function methods
@@ -1086,7 +1457,7 @@ class GateFuturesExecutor(Executor):
             text='t-' + command['id']
         )
         try:
-            response = self._order_client.create_futures_order(settle='usdt', futures_order=futures_order)
+            response = await self._rest_request(self._order_client.create_futures_order, settle='usdt', futures_order=futures_order)
             # print('市价下单返回')
             # print(response)
 
@@ -1119,7 +1490,8 @@ class GateFuturesExecutor(Executor):
             tif='ioc',  # ioc代表市价单
             text='t-' + command['id']
         )
-        self._async_client.create_order(market_order)
+        self._order_coalescer.flush()
+        self._order_scheduler.submit(OrderScheduler.CLOSE, 'order_place', self._send_place_request, [market_order])
 
     async def _post_limit_order_sync(self, command: dict):
         """
@@ -1138,7 +1510,7 @@ class GateFuturesExecutor(Executor):
         )
         # for _ in range(5):
         try:
-            response = self._order_client.create_futures_order(settle='usdt', futures_order=futures_order)
+            response = await self._rest_request(self._order_client.create_futures_order, settle='usdt', futures_order=futures_order)
 
         except GateApiException as api_error:
 
@@ -1164,6 +1536,21 @@ class GateFuturesExecutor(Executor):
             await self.reporter(report_data=command, token=Token.POST_FAILED)
             pass
 
+    async def _post_limit_order(self, command: dict):
+        """
+        异步发送限价挂单请求，与同一时间窗口内的其他挂单合并发送
+        :param command:
+        :return:
+        """
+        limit_order = FuturesOrder(
+            contract=command['symbol'],
+            size=int(command['quantity']) if command['side'] == 'BUY' else -int(command['quantity']),
+            price=np.format_float_positional(command['price'], trim='-'),
+            tif='gtc',
+            text='t-' + command['id']
+        )
+        self._order_coalescer.submit(limit_order)
+
     async def _post_poc_order_sync(self, command: dict):
         """
         poc挂单，返回两种失败信息
@@ -1182,7 +1569,7 @@ class GateFuturesExecutor(Executor):
         )
         # for _ in range(5):
         try:
-            response = self._order_client.create_futures_order(settle='usdt', futures_order=futures_order)
+            response = await self._rest_request(self._order_client.create_futures_order, settle='usdt', futures_order=futures_order)
 
         except GateApiException as api_error:
 
@@ -1217,7 +1604,7 @@ class GateFuturesExecutor(Executor):
 
     async def _post_poc_order(self, command: dict):
         """
-        异步发送poc挂单请求
+        异步发送poc挂单请求，与同一时间窗口内的其他挂单合并发送
         :param command:
         :return:
         """
@@ -1228,7 +1615,7 @@ class GateFuturesExecutor(Executor):
             tif='poc',
             text='t-' + command['id']
         )
-        self._async_client.create_order(poc_order)
+        self._order_coalescer.submit(poc_order)
 
     async def _change_poc_order_price_sync(self, command: dict):
         """
@@ -1244,7 +1631,7 @@ class GateFuturesExecutor(Executor):
         )
         # for _ in range(5):
         try:
-            amend_response = self._order_client.amend_futures_order(
+            amend_response = await self._rest_request(self._order_client.amend_futures_order,
                 settle='usdt',
                 order_id='t-' + command['id'],
                 futures_order_amendment=order_patch
@@ -1279,10 +1666,14 @@ class GateFuturesExecutor(Executor):
         order_patch = FuturesOrderAmendment(
             price=np.format_float_positional(command['price'], trim='-')
         )
-        self._async_client.amend_order(
-            order_id='t-' + command['id'],
-            amend_info=order_patch
-        )
+        self._order_coalescer.flush()
+        pending_order: FuturesOrder = self._order_scheduler.find('t-' + command['id'])
+        if pending_order is not None:
+            # 挂单还在排队，直接修改挂单内容
+            pending_order.price = order_patch.price
+            await self.reporter(report_data=command, token=Token.ORDER_UPDATE)
+            return
+        self._order_scheduler.submit(OrderScheduler.AMEND, 'order_amend', self._send_amend_request, [('t-' + command['id'], order_patch)])
 
     async def _change_poc_order_qty_sync(self, command: dict):
         """
@@ -1298,7 +1689,7 @@ class GateFuturesExecutor(Executor):
         )
         # for _ in range(5):
         try:
-            amend_response = self._order_client.amend_futures_order(
+            amend_response = await self._rest_request(self._order_client.amend_futures_order,
                 settle='usdt',
                 order_id='t-' + command['id'],
                 futures_order_amendment=order_patch
@@ -1329,10 +1720,14 @@ class GateFuturesExecutor(Executor):
         order_patch = FuturesOrderAmendment(
             size=int(command['quantity']),
         )
-        self._async_client.amend_order(
-            order_id='t-' + command['id'],
-            amend_info=order_patch
-        )
+        self._order_coalescer.flush()
+        pending_order: FuturesOrder = self._order_scheduler.find('t-' + command['id'])
+        if pending_order is not None:
+            # 挂单还在排队，直接修改挂单数量，保留方向
+            pending_order.size = order_patch.size if pending_order.size > 0 else -order_patch.size
+            await self.reporter(report_data=command, token=Token.ORDER_UPDATE)
+            return
+        self._order_scheduler.submit(OrderScheduler.AMEND, 'order_amend', self._send_amend_request, [('t-' + command['id'], order_patch)])
 
     async def _post_limit_batch_orders_sync(self, batch_command: dict):
         """
@@ -1360,7 +1755,7 @@ class GateFuturesExecutor(Executor):
             ) for index, _ in enumerate(orders_list)
 
         ]
-        response_list = self._order_client.create_batch_futures_order(settle='usdt', futures_order=batch_order_params)
+        response_list = await self._rest_request(self._order_client.create_batch_futures_order, settle='usdt', futures_order=batch_order_params)
         for each_index, each_res in enumerate(response_list):
             if not each_res.succeeded:
                 print('{} 价位 挂单失败\nlabel: {}\ndetail: {}'.format(str(orders_list[each_index]['price']), each_res.label, each_res.detail))
@@ -1372,6 +1767,24 @@ class GateFuturesExecutor(Executor):
             else:
                 pass
 
+    async def _post_limit_batch_orders(self, batch_command: dict):
+        """
+        异步批量限价挂单，作为撒网请求，优先级低于单个挂单
+        :param batch_command:
+        :return:
+        """
+        orders_list = batch_command['orders']
+        batch_order_params = [
+            FuturesOrder(
+                contract=orders_list[index]['symbol'],
+                size=int(orders_list[index]['quantity']) if orders_list[index]['side'] == 'BUY' else -int(orders_list[index]['quantity']),
+                price=np.format_float_positional(orders_list[index]['price'], trim='-'),
+                tif='gtc',
+                text='t-' + orders_list[index]['id']
+            ) for index, _ in enumerate(orders_list)
+        ]
+        self._submit_layout_orders(batch_order_params)
+
     async def _post_poc_batch_orders_sync(self, batch_command: dict):
         """
         批量挂poc挂单
@@ -1388,7 +1801,7 @@ class GateFuturesExecutor(Executor):
                 text='t-' + orders_list[index]['id']
             ) for index, _ in enumerate(orders_list)
         ]
-        response_list = self._order_client.create_batch_futures_order(settle='usdt', futures_order=batch_order_params)
+        response_list = await self._rest_request(self._order_client.create_batch_futures_order, settle='usdt', futures_order=batch_order_params)
         for each_index, each_res in enumerate(response_list):
             if not each_res.succeeded:
                 failure_info = Token.ORDER_INFO.copy()
@@ -1405,7 +1818,7 @@ class GateFuturesExecutor(Executor):
 
     async def _post_poc_batch_orders(self, batch_command: dict):
         """
-        异步批量挂单
+        异步批量挂单，作为撒网请求，优先级低于单个挂单
         :param batch_command:
         :return:
         """
@@ -1419,7 +1832,7 @@ class GateFuturesExecutor(Executor):
                 text='t-' + orders_list[index]['id']
             ) for index, _ in enumerate(orders_list)
         ]
-        self._async_client.create_batch_order(batch_order_params)
+        self._submit_layout_orders(batch_order_params)
 
     async def _post_cancel_order_sync(self, command: dict):
         """
@@ -1431,7 +1844,7 @@ class GateFuturesExecutor(Executor):
         error_msg = ''
         # todo: 此处用了一个临时判断，使可以使用真实id撤单
         try:
-            response = self._order_client.cancel_futures_order(
+            response = await self._rest_request(self._order_client.cancel_futures_order,
                 settle='usdt',
                 order_id='t-' + command['id'] if '_' in command['id'] else command['id'],
             )
@@ -1451,22 +1864,80 @@ class GateFuturesExecutor(Executor):
                   (str(type(other_error)), other_error))
             success = False
 
-        if not success:
+        if success:
+            self._forget_server_id(command['symbol'], command['id'])
+        else:
             # test_analyzer._log_info('\n撤销挂单失败!!!\t\t价格: {:<12}\tid: {:<10}'.format(command['price'], command['id']))
             await self.reporter(report_data=command, token=Token.CANCEL_FAILED, appending_info=error_msg)
             pass
 
     async def _post_cancel_order(self, command: dict):
-        self._async_client.cancel_order(
-            user_order_id='t-' + command['id']
-        )
+        # 等待合并的挂单先进入调度器，还在排队的挂单直接撤回，撤单请求不会先于挂单到达
+        self._order_coalescer.flush()
+        withdrawn_order: FuturesOrder = self._order_scheduler.withdraw('t-' + command['id'])
+        if withdrawn_order is not None:
+            await self.reporter(report_data=command, token=Token.CANCEL_POC_SUCCESS if withdrawn_order.tif == 'poc' else Token.CANCEL_SUCCESS)
+            return
+        self._order_scheduler.submit(OrderScheduler.CANCEL, 'order_cancel', self._send_cancel_request, ['t-' + command['id']])
 
     async def _post_cancel_batch_orders(self, batch_command: dict):
         """
-        目前该功能无法使用
+        使用 websocket 批量撤单，每个请求最多 20 个挂单
+        已知服务器 id 的挂单使用服务器 id，其他使用自定义 id
         :param batch_command:
         :return:
         """
+        self._order_coalescer.flush()
+        cancel_requests = []
+        for each_order in batch_command['orders']:
+            # 与单个撤单相同，不含 '_' 的 id 是真实 id
+            order_text = 't-' + each_order['id'] if '_' in each_order['id'] else each_order['id']
+            withdrawn_order: FuturesOrder = self._order_scheduler.withdraw(order_text)
+            if withdrawn_order is not None:
+                await self.reporter(report_data=each_order, token=Token.CANCEL_POC_SUCCESS if withdrawn_order.tif == 'poc' else Token.CANCEL_SUCCESS)
+                continue
+            server_id = self.get_server_id(each_order['symbol'], each_order['id'])
+            cancel_requests.append((str(server_id) if server_id is not None else order_text, order_text))
+
+        batch_size = self._async_client.MAX_CANCEL_BATCH_SIZE
+        for start_index in range(0, len(cancel_requests), batch_size):
+            self._order_scheduler.submit(OrderScheduler.CANCEL, 'order_cancel', self._send_batch_cancel_request, cancel_requests[start_index:start_index + batch_size])
+
+    async def _change_poc_batch_orders(self, batch_command: dict):
+        """
+        批量修改poc挂单的价格或数量，websocket 没有批量修改通道，使用 rest 批量接口，每个请求最多 10 个挂单
+        每个挂单的修改结果单独上报，与单个修改相同
+        :param batch_command: orders 中每个挂单包含 price 或 quantity
+        :return:
+        """
+        self._order_coalescer.flush()
+        orders_list = batch_command['orders']
+        for start_index in range(0, len(orders_list), 10):
+            amend_orders = orders_list[start_index:start_index + 10]
+            amend_params = [
+                BatchAmendOrderReq(
+                    text='t-' + each_order['id'],
+                    price=np.format_float_positional(each_order['price'], trim='-') if each_order.get('price') else None,
+                    size=str(int(each_order['quantity'])) if each_order.get('quantity') else None
+                ) for each_order in amend_orders
+            ]
+            try:
+                response_list = await self._rest_request(self._order_client.amend_batch_future_orders, settle='usdt', batch_amend_order_req=amend_params)
+            except Exception as api_error:
+                error_msg = 'label: {}, msg: {}'.format(getattr(api_error, 'label', type(api_error)), getattr(api_error, 'message', api_error))
+                print('批量修改挂单失败\n{}'.format(error_msg))
+                for each_order in amend_orders:
+                    await self.reporter(report_data=each_order, token=Token.AMEND_POC_FAILED, appending_info=error_msg)
+                continue
+
+            for each_order, each_res in zip(amend_orders, response_list):
+                if each_res.succeeded:
+                    await self.reporter(report_data=each_order, token=Token.ORDER_UPDATE)
+                elif each_res.label == 'ORDER_NOT_FOUND':
+                    await self.reporter(report_data=each_order, token=Token.AMEND_NONEXISTENT_POC)
+                else:
+                    error_msg = 'label: {}\ndetail: {}'.format(each_res.label, each_res.detail)
+                    await self.reporter(report_data=each_order, token=Token.AMEND_POC_FAILED, appending_info=error_msg)
 
     async def _cancel_all_orders(self, command: dict) -> None:
         """
@@ -1474,8 +1945,13 @@ class GateFuturesExecutor(Executor):
         :param command:
         :return:
         """
+        # 该合约还在合并和排队的挂单直接撤回，不再发送，其他合约和策略的请求不受影响
+        symbol_name = command['symbol']
+        withdrawn_orders = self._order_coalescer.withdraw_matching(lambda each_order: each_order.contract == symbol_name)
+        withdrawn_orders += self._order_scheduler.withdraw_matching(
+            lambda request_item: isinstance(request_item, FuturesOrder) and request_item.contract == symbol_name)
         try:
-            cancel_res = self._order_client.cancel_futures_orders(settle='usdt', contract=command['symbol'])
+            cancel_res = await self._rest_request(self._order_client.cancel_futures_orders, settle='usdt', contract=symbol_name)
         except GateApiException as api_error:
             print('撤销所有挂单失败，请检查 GateApiException 信息')
             print('label: {}, msg: {}\n'.format(str(api_error.label), api_error.message))
@@ -1488,6 +1964,16 @@ class GateFuturesExecutor(Executor):
                   (str(type(other_error)), other_error))
             # break
 
+        # 撤回的挂单与单个撤单相同，按撤单成功上报
+        for each_order in withdrawn_orders:
+            report_data_dict = Token.ORDER_INFO.copy()
+            report_data_dict['symbol'] = each_order.contract
+            report_data_dict['id'] = each_order.text[2:]
+            report_data_dict['price'] = each_order.price
+            report_data_dict['side'] = 'BUY' if each_order.size > 0 else 'SELL'
+            report_data_dict['quantity'] = each_order.size
+            await self.reporter(report_data=report_data_dict, token=Token.CANCEL_POC_SUCCESS if each_order.tif == 'poc' else Token.CANCEL_SUCCESS)
+
     async def _close_position_sync(self, command: dict) -> None:
         """
         平掉当前仓位，需要 command 包含数量信息
@@ -1506,7 +1992,7 @@ class GateFuturesExecutor(Executor):
         )
 
         try:
-            close_res = self._order_client.create_futures_order(settle='usdt', futures_order=futures_order)
+            close_res = await self._rest_request(self._order_client.create_futures_order, settle='usdt', futures_order=futures_order)
             if close_res.status == 'finished':
                 print('成功市价平仓，数量 {} 张'.format(str(close_res.size)))
             else:
@@ -1532,9 +2018,107 @@ class GateFuturesExecutor(Executor):
             tif='ioc',
             text='t-close_position'
         )
-        self._async_client.create_order(close_order)
+        self._order_coalescer.flush()
+        self._order_scheduler.submit(OrderScheduler.CLOSE, 'order_place', self._send_place_request, [close_order])
 
     # tool methods
+    def get_order_traffic_stats(self) -> dict:
+        """
+        下单请求统计：各优先级排队数量和发送数量，限频排队次数，合并发送的请求和订单数量
+        :return:
+        """
+        traffic_stats = self._order_scheduler.stats()
+        traffic_stats['coalesced_messages'] = self._order_coalescer.sent_messages
+        traffic_stats['coalesced_orders'] = self._order_coalescer.sent_orders
+        return traffic_stats
+
+    def get_connection_stats(self) -> dict:
+        """
+        websocket 连接统计：下单连接和各行情连接每个通道的队列深度、交付、丢弃和合并数量，有效订阅数量和重连后恢复订阅的耗时，
+        以及共享行情中心每个 (通道, 合约) 的订阅者数量
+        :return:
+        """
+        if self._websocket_connection is None:
+            return {}
+        return {
+            'order': dict(self._websocket_connection.dispatch_stats(), subscriptions=self._websocket_connection.subscription_stats()),
+            'market': self._market_hub.stats(),
+        }
+
+    def get_order_latency_stats(self) -> dict:
+        """
+        websocket 下单请求统计：在途请求数量，超时数量，各通道回声延时和回声到结果的延时，不确定状态的挂单和撤单数量
+        :return:
+        """
+        if self._async_client is None:
+            return {}
+        latency_stats = self._async_client.get_latency_stats()
+        latency_stats['unidentified_pending_order'] = len(self._unidentified_pending_order)
+        latency_stats['unidentified_cancel_order'] = len(self._unidentified_cancel_order)
+        return latency_stats
+
+    def get_order_state_stats(self) -> dict:
+        """
+        本地订单状态统计：活动订单和已结束订单数量，被合并的重复挂单成功、撤单成功、修改成功和挂单失败信息数量
+        :return:
+        """
+        return self._order_states.stats()
+
+    def _send_order_request(self, futures_order: FuturesOrder) -> None:
+        """
+        挂单合并器发送单个订单，经过调度器限频
+        :param futures_order:
+        :return:
+        """
+        self._order_scheduler.submit(OrderScheduler.MAKER, 'order_place', self._send_place_request, [futures_order])
+
+    def _send_batch_order_request(self, futures_orders: list[FuturesOrder]) -> None:
+        """
+        挂单合并器发送 batch 订单，经过调度器限频
+        :param futures_orders:
+        :return:
+        """
+        self._order_scheduler.submit(OrderScheduler.MAKER, 'order_place', self._send_place_request, futures_orders)
+
+    def _submit_layout_orders(self, futures_orders: list[FuturesOrder]) -> None:
+        """
+        撒网和批量补单请求，按 batch 大小拆分后以最低优先级排队
+        :param futures_orders:
+        :return:
+        """
+        batch_size = self._order_coalescer.max_batch_size
+        for start_index in range(0, len(futures_orders), batch_size):
+            self._order_scheduler.submit(OrderScheduler.LAYOUT, 'order_place', self._send_place_request, futures_orders[start_index:start_index + batch_size])
+
+    def _send_place_request(self, futures_orders: list[FuturesOrder]) -> None:
+        """
+        调度器发送挂单请求，排队期间部分订单可能已被撤回，每个订单的返回信息由 AsyncOrderClient 按顺序对应到订单
+        :param futures_orders:
+        :return:
+        """
+        for each_order in futures_orders:
+            self._order_states.submit(each_order.text[2:], each_order.contract, each_order.size, each_order.price, each_order.tif)
+        if len(futures_orders) == 1:
+            self._async_client.create_order(futures_orders[0])
+        else:
+            self._async_client.create_batch_order(futures_orders)
+
+    def _send_amend_request(self, amend_requests: list[tuple[str, FuturesOrderAmendment]]) -> None:
+        for each_order_id, each_patch in amend_requests:
+            self._async_client.amend_order(order_id=each_order_id, amend_info=each_patch)
+
+    def _send_cancel_request(self, order_texts: list[str]) -> None:
+        for each_text in order_texts:
+            self._async_client.cancel_order(user_order_id=each_text)
+
+    def _send_batch_cancel_request(self, cancel_requests: list[tuple[str, str]]) -> None:
+        """
+        :param cancel_requests: [(撤单使用的 id, 自定义 id)]
+        :return:
+        """
+        order_ids, order_texts = zip(*cancel_requests)
+        self._async_client.cancel_batch_orders(list(order_ids), list(order_texts))
+
     def _parse_stg_num(self, client_order_id: str) -> Union[str | bool]:
         """
         从自定义的订单id中解析出 stg_num
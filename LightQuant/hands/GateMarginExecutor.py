@@ -15,6 +15,7 @@ from LightQuant.Recorder import LogRecorder
 from LightQuant.Executor import Executor
 from LightQuant.Analyzer import Analyzer
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
+from LightQuant.hands.GateConnection import GateConnection
 
 import gate_api
 from gate_api.exceptions import ApiException, GateApiException
@@ -30,6 +31,21 @@ class GateMarginExecutor(Executor):
 
     """
     NAME = 'Gate 现货'
+    # 上报理由分发表 {token: 是否附带额外信息}，值为 None 的理由不上报
+    REPORT_DISPATCH = {
+        Token.ORDER_FILLED: True,
+        Token.POST_SUCCESS: False,
+        Token.POC_SUCCESS: False,
+        Token.CANCEL_SUCCESS: False,
+        Token.CANCEL_POC_SUCCESS: False,
+        Token.PARTIALLY_FILLED: True,
+        Token.UNIDENTIFIED: None,
+        Token.FAILED: None,
+        Token.POST_FAILED: False,
+        Token.POC_FAILED: False,
+        Token.CANCEL_FAILED: False,
+        Token.TEMP_TOKEN: None,
+    }
 
     # noinspection PyTypeChecker
     def __init__(self) -> None:
@@ -155,7 +171,7 @@ class GateMarginExecutor(Executor):
             self._wallet_client = gate_api.WalletApi(gate_api_client)
 
             ws_cfg = gate_ws.Configuration(api_key=self._api_key, api_secret=self._api_secret)
-            self._websocket_connection = gate_ws.Connection(ws_cfg)
+            self._websocket_connection = GateConnection(ws_cfg)
             self._websocket_client_order = SpotOrderChannel(conn=self._websocket_connection, callback=self._user_socket_receiver)
             self._websocket_client_ticker = SpotTickerChannel(conn=self._websocket_connection, callback=self._ticker_socket_receiver)
             print('client创建成功')
@@ -488,37 +504,7 @@ class GateMarginExecutor(Executor):
                 print('{} :该策略已停止，不上报 '.format(stg_num))
                 return
 
-            if token == Token.ORDER_FILLED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.POST_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.POC_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_POC_SUCCESS:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.PARTIALLY_FILLED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data, append_info=appending_info)
-            elif token == Token.UNIDENTIFIED:
-                pass
-            elif token == Token.FAILED:
-                pass
-            elif token == Token.POST_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.POC_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-            elif token == Token.CANCEL_FAILED:
-                await reporting_analyzer.report_receiver(recv_data_dict=report_data)
-
-            elif token == Token.TEMP_TOKEN:
-                # report_data_dict['status'] = token
-                # await self._my_analyzer.report_receiver(recv_data_dict=report_data_dict)
-                pass
-            elif token is None:
-                print('未定义上报理由，不上报')
-            else:
-                print('错误定义上报理由，不上报')
+            await self._dispatch_report(reporting_analyzer, report_data, token, appending_info)
 
         else:
             # 非自定策略产生的order id      # todo: 用某种形式记录
@@ -567,12 +553,8 @@ class GateMarginExecutor(Executor):
         向 analyzer发送 ticker信息
         :return:
         """
-        # todo: 临时分辨办法，后续修改，使用 { 'eth_usdt': ['UI3stg6', ] } 字典方法分辨
-        symbol_name = ticker_data['symbol']
-        for each_stg_num in self._running_strategies.keys():
-            each_analyzer: Analyzer = self._running_strategies[each_stg_num]
-            if each_analyzer.symbol_name == symbol_name:
-                await each_analyzer.ticker_receiver(recv_ticker_data=ticker_data)
+        for each_analyzer in self._symbol_subscribers(ticker_data['symbol']):
+            await each_analyzer.ticker_receiver(recv_ticker_data=ticker_data)
 
     # core function methods
     async def _post_market_order(self, command: dict):
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/28 10:30
+# @Author :
+# @File : GateMarketHub.py
+# @Software: PyCharm
+import asyncio
+from typing import Callable, Coroutine, Union
+
+import gate_ws
+from gate_ws.client import BaseChannel
+from gate_ws.futures import FuturesTickerChannel, FuturesPublicTradeChannel, FuturesBookTickerChannel
+
+from LightQuant.hands.GateConnection import GateConnection
+
+# 行情处理函数，参数为一条解析后的行情数据
+MarketHandler = Callable[[dict], Coroutine]
+
+
+class GateMarketHub:
+    """
+    进程内共享的 gate 合约公共行情中心，所有交易界面的 executor 使用同一组行情连接
+    每个 (通道, 合约) 只向服务器订阅一次，记录订阅该行情的处理函数，第一个订阅者加入时订阅，最后一个订阅者离开时取消订阅
+    每条行情只解析一次，按顺序交给所有订阅者的处理函数
+
+    下单和用户私有频道与账户相关，仍由每个 executor 的下单连接处理
+    通过 shared 获取共享实例，executor 开始时调用 acquire，断开时调用 release，没有使用者时关闭连接
+    """
+    _shared_hubs: dict[str, 'GateMarketHub'] = {}
+
+    CHANNEL_CLASSES = {
+        'ticker': FuturesTickerChannel,
+        'public_trade': FuturesPublicTradeChannel,
+        'book_ticker': FuturesBookTickerChannel,
+    }
+
+    @classmethod
+    def shared(cls, settle: str = 'usdt') -> 'GateMarketHub':
+        """
+        :param settle: 结算币种
+        :return: 该结算币种的共享行情中心，不存在或已关闭时创建
+        """
+        hub = cls._shared_hubs.get(settle)
+        if hub is None:
+            hub = cls._shared_hubs[settle] = cls(settle)
+        return hub
+
+    def __init__(self, settle: str = 'usdt', connection_num: int = 1, ping_interval: int = 10) -> None:
+        """
+        :param settle: 结算币种
+        :param connection_num: 行情连接数量，合约按数量平均分配到各个连接
+        :param ping_interval: 心跳间隔，秒
+        """
+        self.settle = settle
+        # 公共行情不需要登录，每个通道的回调逐条执行，策略的行情处理中耗时操作需要使用 create_task
+        market_ws_cfg = gate_ws.Configuration(app='futures', settle=settle, ping_interval=ping_interval)
+        self._connections: list[GateConnection] = []
+        self._channels: list[dict[str, BaseChannel]] = []
+        receivers = {
+            'ticker': self._ticker_socket_receiver,
+            'public_trade': self._public_trade_socket_receiver,
+            'book_ticker': self._book_ticker_socket_receiver,
+        }
+        for _ in range(connection_num):
+            market_connection = GateConnection(market_ws_cfg, login_required=False)
+            self._connections.append(market_connection)
+            self._channels.append({
+                channel_key: channel_class(conn=market_connection, callback=receivers[channel_key])
+                for channel_key, channel_class in self.CHANNEL_CLASSES.items()
+            })
+        self._symbol_connection_index: dict[str, int] = {}
+
+        # {(channel_key, contract): (handler, )}，订阅者变化时替换整个 tuple，分发过程中订阅者变化不影响本次分发
+        self._subscribers: dict[tuple[str, str], tuple[MarketHandler, ...]] = {}
+        self._users = 0
+        self._run_task: Union[asyncio.Task, None] = None
+
+    def _channel(self, contract_name: str, channel_key: str) -> BaseChannel:
+        """
+        合约的所有行情通道使用同一个行情连接，第一次订阅时分配到合约数量最少的连接
+        :param contract_name:
+        :param channel_key: 'ticker', 'public_trade', 'book_ticker'
+        :return:
+        """
+        connection_index = self._symbol_connection_index.get(contract_name)
+        if connection_index is None:
+            symbol_nums = [0] * len(self._connections)
+            for each_index in self._symbol_connection_index.values():
+                symbol_nums[each_index] += 1
+            connection_index = self._symbol_connection_index[contract_name] = symbol_nums.index(min(symbol_nums))
+        return self._channels[connection_index][channel_key]
+
+    def acquire(self) -> None:
+        """
+        executor 开始运行时调用，第一个使用者开始运行行情连接
+        :return:
+        """
+        self._users += 1
+        # 关闭后再次使用时重新作为共享实例
+        self._shared_hubs.setdefault(self.settle, self)
+        if self._run_task is None:
+            self._run_task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # 各连接独立运行和重连
+        await asyncio.gather(*(each_connection.run() for each_connection in self._connections))
+
+    def release(self, owner: object) -> None:
+        """
+        executor 断开时调用，移除该 executor 的所有订阅，没有使用者时关闭行情连接
+        :param owner: 处理函数所属的 executor
+        :return:
+        """
+        for (channel_key, contract_name), handlers in list(self._subscribers.items()):
+            for each_handler in handlers:
+                if getattr(each_handler, '__self__', None) is owner:
+                    self.unsubscribe(channel_key, contract_name, each_handler)
+        self._users = max(self._users - 1, 0)
+        if self._users == 0:
+            self.close()
+
+    def close(self) -> None:
+        for each_connection in self._connections:
+            each_connection.close()
+        if self._run_task is not None:
+            self._run_task.cancel()
+            self._run_task = None
+        if self._shared_hubs.get(self.settle) is self:
+            del self._shared_hubs[self.settle]
+
+    def subscribe(self, channel_key: str, contract_name: str, handler: MarketHandler) -> None:
+        """
+        添加一个行情订阅者，同一处理函数重复订阅只记录一次
+        :param channel_key: 'ticker', 'public_trade', 'book_ticker'
+        :param contract_name:
+        :param handler: 行情处理函数
+        :return:
+        """
+        if channel_key not in self.CHANNEL_CLASSES:
+            raise ValueError('未知的行情通道: {}'.format(channel_key))
+        subscribe_key = (channel_key, contract_name)
+        handlers = self._subscribers.get(subscribe_key)
+        if handlers is None:
+            self._subscribers[subscribe_key] = (handler, )
+            self._channel(contract_name, channel_key).subscribe([contract_name])
+        elif handler not in handlers:
+            self._subscribers[subscribe_key] = handlers + (handler, )
+
+    def unsubscribe(self, channel_key: str, contract_name: str, handler: MarketHandler) -> None:
+        """
+        移除一个行情订阅者，没有订阅者时取消订阅
+        :param channel_key:
+        :param contract_name:
+        :param handler:
+        :return:
+        """
+        subscribe_key = (channel_key, contract_name)
+        handlers = self._subscribers.get(subscribe_key)
+        if handlers is None or handler not in handlers:
+            return
+        handlers = tuple(each_handler for each_handler in handlers if each_handler != handler)
+        if handlers:
+            self._subscribers[subscribe_key] = handlers
+        else:
+            del self._subscribers[subscribe_key]
+            self._channel(contract_name, channel_key).unsubscribe([contract_name])
+
+    def subscriber_num(self, channel_key: str, contract_name: str) -> int:
+        return len(self._subscribers.get((channel_key, contract_name), ()))
+
+    async def _fan_out(self, channel_key: str, contract_name: str, market_data: dict) -> None:
+        for each_handler in self._subscribers.get((channel_key, contract_name), ()):
+            try:
+                await each_handler(market_data)
+            except Exception as e:
+                print('行情处理出错 {} {}: {}'.format(channel_key, contract_name, e))
+                print(type(e))
+
+    async def _ticker_socket_receiver(self, conn: gate_ws.Connection, ticker_res: gate_ws.WebSocketResponse) -> None:
+        """
+        持续获得从gate服务器订阅的合约ticker信息，即最新价格
+        :return:
+        """
+        if ticker_res.error:
+            print('合约ticker频道  gate服务器返回报错信息: ', ticker_res.error)
+            return
+
+        ticker_info_dict = ticker_res.msg
+        if ticker_info_dict['event'] == 'update':
+            symbol_ticker = ticker_info_dict['result'][0]
+            await self._fan_out('ticker', symbol_ticker['contract'], symbol_ticker)
+
+        elif ticker_info_dict['event'] == 'subscribe':
+            print('成功订阅合约ticker信息')
+
+        elif ticker_info_dict['event'] == 'unsubscribe':
+            print('成功取消合约ticker信息')
+
+        else:
+            print('其他未记录的ticker socket事件类型:')
+            print(str(ticker_info_dict))
+
+    async def _public_trade_socket_receiver(self, conn: gate_ws.Connection, public_trade_res: gate_ws.WebSocketResponse) -> None:
+        """
+        获得共有成交信息，即盘口成交信息
+        :param public_trade_res:
+        :return:
+        """
+        if public_trade_res.error:
+            print('共有成交频道  gate服务器返回报错信息: ', public_trade_res.error)
+            return
+
+        public_trade_info = public_trade_res.msg
+        if public_trade_info['event'] == 'update':
+            symbol_trade_info = public_trade_info['result'][0]
+            await self._fan_out('public_trade', symbol_trade_info['contract'], symbol_trade_info)
+
+        elif public_trade_info['event'] == 'subscribe':
+            print('成功订阅合约公有成交信息')
+
+        elif public_trade_info['event'] == 'unsubscribe':
+            print('成功取消合约公有成交信息')
+
+        else:
+            print('其他未记录的public trade socket事件类型:')
+            print(str(public_trade_info))
+
+    async def _book_ticker_socket_receiver(self, conn: gate_ws.Connection, book_ticker_res: gate_ws.WebSocketResponse) -> None:
+        """
+        获取最佳买卖价信息
+        :param conn:
+        :param book_ticker_res:
+        :return:
+        """
+        if book_ticker_res.error:
+            print('最佳买卖价频道  gate服务器返回报错信息: ', book_ticker_res.error)
+            return
+
+        book_ticker_info = book_ticker_res.msg
+        if book_ticker_info['event'] == 'update':
+            symbol_book_ticker_info: dict = book_ticker_info['result']
+            await self._fan_out('book_ticker', symbol_book_ticker_info['s'], symbol_book_ticker_info)
+
+        elif book_ticker_info['event'] == 'subscribe':
+            print('成功订阅合约最佳买卖价信息')
+
+        elif book_ticker_info['event'] == 'unsubscribe':
+            print('成功取消合约最佳买卖价信息')
+
+        else:
+            print('其他未记录的book ticker socket事件类型:')
+            print(str(book_ticker_info))
+
+    def stats(self) -> dict:
+        """
+        :return: 各行情连接的分发和订阅统计，每个 (通道, 合约) 的订阅者数量
+        """
+        return {
+            'connections': [dict(each_connection.dispatch_stats(), subscriptions=each_connection.subscription_stats())
+                            for each_connection in self._connections],
+            'subscribers': {'{}:{}'.format(*subscribe_key): len(handlers) for subscribe_key, handlers in self._subscribers.items()},
+        }
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/20 10:30
+# @Author :
+# @File : GateOrderClient.py
+# @Software: PyCharm
+from collections import OrderedDict
+from typing import Any, Callable
+
+from gate_api import FuturesOrder, FuturesOrderAmendment
+from gate_ws.api import AsyncOrderClient
+from gate_ws.client import Connection, WebSocketApiRequest, WebSocketApiResponse, GateWebsocketApiError
+
+from LightQuant.hands.GateRequestEncoder import GateRequestEncoder
+from LightQuant.tools.inflight_tracker import InflightTracker
+
+
+class GateOrderClient(AsyncOrderClient):
+    """
+    在 AsyncOrderClient 基础上增加批量撤单
+    一个 futures.order_cancel_ids 请求最多撤销 20 个挂单，每个挂单的返回结果按返回的订单 id 对应到请求的订单，逐个回调
+
+    整个批量挂单请求被拒绝时，从请求信息中恢复每个订单的信息后逐个回调失败，与单个订单挂单失败的返回格式相同
+
+    gate websocket api 没有批量修改订单的通道，批量修改由 executor 使用 rest 批量接口完成
+
+    下单、撤单、改单请求由 GateRequestEncoder 直接拼接为文本放入发送队列，不再创建 WebSocketApiRequest
+
+    所有请求由 InflightTracker 记录发送时间和延时，超时未返回的请求由 expire_requests 取出，
+    其请求信息暂存在有上限的超时缓存中，之后仍收到返回时按正常返回处理
+    """
+    MAX_CANCEL_BATCH_SIZE = 20
+    MAX_EXPIRED_CACHE = 1000
+
+    def __init__(self, conn: Connection, callback: Callable = None, request_timeout: float = 10., max_inflight: int = 10000) -> None:
+        """
+        :param conn:
+        :param callback:
+        :param request_timeout: 请求超时时间，秒
+        :param max_inflight: 最多记录的在途请求数量
+        """
+        super(GateOrderClient, self).__init__(conn, callback)
+        self.encoder = GateRequestEncoder(event=self.event)
+        self.tracker = InflightTracker(timeout=request_timeout, max_inflight=max_inflight)
+        # 超时请求的信息 {req_id: req_info}
+        self._expired_cache: OrderedDict[str, Any] = OrderedDict()
+
+    def _send_request(self, channel: str, req_id: str, req_info: Any, req_param: str) -> None:
+        self._add_cache(req_id, req_info)
+        self.tracker.track(req_id, channel, req_info)
+        self.conn.send_msg(self.encoder.encode(channel, req_id, req_param))
+
+    def expire_requests(self, now: float = None) -> list[tuple[str, str, Any]]:
+        """
+        取出超时未返回的请求，需要定时调用
+        :param now:
+        :return: [(req_id, channel, req_info), ]
+        """
+        expired_requests = self.tracker.expire(now)
+        for req_id, _, _ in expired_requests:
+            if req_id in self._info_cache:
+                self._expired_cache[req_id] = self._info_cache.pop(req_id)
+        while len(self._expired_cache) > self.MAX_EXPIRED_CACHE:
+            self._expired_cache.popitem(last=False)
+        return expired_requests
+
+    def get_latency_stats(self) -> dict:
+        """
+        :return: 在途请求数量，超时数量和各通道延时统计，毫秒
+        """
+        return self.tracker.stats()
+
+    def login(self, key: str, secret: str) -> None:
+        self._add_cache(self.login_id, 'longin')
+        self.tracker.track(self.login_id, 'futures.login')
+        self.conn.send_msg(WebSocketApiRequest(
+            cfg=self.cfg,
+            channel='futures.login',
+            event=self.event,
+            payload=self.encoder.login_payload(key, secret, self.login_id),
+        ))
+
+    def create_order(self, order_info: FuturesOrder) -> None:
+        if not isinstance(order_info, FuturesOrder):
+            raise TypeError('input argument err')
+        self._send_request('futures.order_place', self.gen_req_id(), order_info, self.encoder.order_param(order_info))
+
+    def create_batch_order(self, orders_info: list[FuturesOrder]) -> None:
+        self._send_request('futures.order_batch_place', self.gen_req_id(), orders_info, self.encoder.batch_order_param(orders_info))
+
+    def cancel_order(self, user_order_id: str) -> None:
+        self._send_request('futures.order_cancel', self.gen_req_id(), user_order_id, self.encoder.cancel_param(user_order_id))
+
+    def amend_order(self, order_id: str, amend_info: FuturesOrderAmendment) -> None:
+        if not isinstance(amend_info, FuturesOrderAmendment):
+            raise TypeError('input argument err')
+        if (amend_info.size is None) == (amend_info.price is None):
+            raise ValueError('redundant amend arg received')
+        self._send_request('futures.order_amend', self.gen_req_id(), order_id, self.encoder.amend_param(order_id, amend_info.size, amend_info.price))
+
+    def cancel_batch_orders(self, order_ids: list[str], order_texts: list[str] = None) -> None:
+        """
+        按订单 id 批量撤单
+        :param order_ids: 服务器订单 id 或 't-' 开头的自定义 id
+        :param order_texts: 对应的自定义 id，用于回调时识别订单，默认与 order_ids 相同
+        :return:
+        """
+        if len(order_ids) > self.MAX_CANCEL_BATCH_SIZE:
+            raise ValueError('批量撤单数量超过 {}'.format(self.MAX_CANCEL_BATCH_SIZE))
+        order_texts = list(order_texts) if order_texts else [str(each_id) for each_id in order_ids]
+        # {撤单使用的 id: 自定义 id}
+        order_map = {str(each_id): each_text for each_id, each_text in zip(order_ids, order_texts)}
+        self._send_request('futures.order_cancel_ids', self.gen_req_id(), order_map, self.encoder.cancel_batch_param(order_ids))
+
+    async def dealing_api_response(self, conn: Connection, response: WebSocketApiResponse) -> None:
+        """
+        记录请求延时，处理批量撤单的返回，其他通道交给 AsyncOrderClient
+        :param conn:
+        :param response:
+        :return:
+        """
+        if response.request_id not in self._info_cache and response.request_id in self._expired_cache:
+            if response.ack:
+                return
+            # 超时后才收到的返回，恢复请求信息后按正常返回处理
+            print('收到超时请求的返回: {} {}'.format(response.channel, response.request_id))
+            self._info_cache[response.request_id] = self._expired_cache.pop(response.request_id)
+        elif response.ack:
+            self.tracker.ack(response.request_id)
+        else:
+            self.tracker.complete(response.request_id)
+
+        if response.channel == 'futures.order_batch_place' and response.error and not response.ack and response.request_id in self._info_cache:
+            await self._reject_batch_orders(response)
+            return
+        if response.channel != 'futures.order_cancel_ids' or response.request_id not in self._info_cache:
+            await super(GateOrderClient, self).dealing_api_response(conn, response)
+            return
+        if response.ack:
+            return
+
+        order_map: dict[str, str] = self._info_cache.pop(response.request_id)
+        if response.error:
+            # 整个请求失败，每个订单都返回失败
+            for each_text in order_map.values():
+                await self.callback({
+                    'channel': response.channel,
+                    'success': False,
+                    'result': {'text': each_text},
+                    'error': response.error
+                })
+            return
+
+        # 返回顺序不一定与请求相同，按订单 id 对应
+        unmatched_results = []
+        for each_result in response.result or []:
+            each_text = order_map.pop(str(each_result.get('id')), None)
+            if each_text is None:
+                unmatched_results.append(each_result)
+            else:
+                await self._callback_cancel_result(response.channel, each_text, each_result)
+        # 按自定义 id 撤单时返回的可能是服务器 id，剩余的返回按请求顺序对应
+        for each_text, each_result in zip(list(order_map.values()), unmatched_results):
+            await self._callback_cancel_result(response.channel, each_text, each_result)
+
+    async def _callback_cancel_result(self, channel: str, order_text: str, cancel_result: dict) -> None:
+        single_ack_status = {
+            'channel': channel,
+            'success': bool(cancel_result.get('succeeded')),
+            'result': {'text': order_text, 'id': cancel_result.get('id')},
+            'error': ''
+        }
+        if not single_ack_status['success']:
+            single_ack_status['error'] = GateWebsocketApiError(cancel_result.get('message') or 'UNIDENTIFIED', cancel_result.get('message') or 'No_Detail')
+        await self.callback(single_ack_status)
+
+    async def _reject_batch_orders(self, response: WebSocketApiResponse) -> None:
+        """
+        整个批量挂单请求失败，每个订单都返回失败，订单信息从请求信息中恢复
+        :param response:
+        :return:
+        """
+        save_orders: list[FuturesOrder] = self._info_cache.pop(response.request_id)
+        for save_order in save_orders:
+            await self.callback({
+                'channel': response.channel,
+                'success': False,
+                'result': {
+                    'contract': save_order.contract,
+                    'size': save_order.size,
+                    'price': save_order.price,
+                    'tif': save_order.tif,
+                    'text': save_order.text
+                },
+                'error': response.error
+            })
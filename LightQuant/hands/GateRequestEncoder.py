@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/23 9:40
+# @Author :
+# @File : GateRequestEncoder.py
+# @Software: PyCharm
+import hmac
+import json
+import time
+import hashlib
+from json.encoder import encode_basestring_ascii
+from typing import Any, Union
+
+from gate_api import FuturesOrder
+
+
+def encode_value(value: Any) -> str:
+    """
+    将单个字段编码为 json 文本，与 json.dumps 结果相同
+    :param value:
+    :return:
+    """
+    value_type = value.__class__
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value_type is int:
+        return int.__repr__(value)
+    if value_type is bool:
+        return 'true' if value else 'false'
+    if value_type is float:
+        return float.__repr__(value)
+    return json.dumps(value)
+
+
+class GateRequestEncoder:
+    """
+    websocket api 请求编码器，直接拼接请求文本，不再逐个创建 WebSocketApiRequest 并对整个字典调用 json.dumps
+    每个通道的固定部分预先编码为模板，下单、撤单、改单只拼接订单字段，合约名等重复出现的字段缓存编码结果
+    编码结果与 str(WebSocketApiRequest) 解析后相同，可以直接放入 Connection 的发送队列
+    """
+
+    def __init__(self, event: str = 'api') -> None:
+        self.event = event
+        # 通道名 -> 请求中 time_ms 之后到 req_id 之前的固定文本
+        self._channel_templates: dict[str, str] = {}
+        # 合约名等短字符串的编码缓存
+        self._string_cache: dict[str, str] = {}
+        # 登录签名使用的 hmac 对象，密钥只处理一次
+        self._login_hmac: Union[hmac.HMAC, None] = None
+        self._login_secret: str = ''
+
+    def _template(self, channel: str) -> str:
+        template = self._channel_templates.get(channel)
+        if template is None:
+            template = self._channel_templates[channel] = ',"channel":{},"event":{},"payload":{{"req_id":'.format(
+                encode_basestring_ascii(channel), encode_basestring_ascii(self.event))
+        return template
+
+    def _cached_string(self, value: str) -> str:
+        if value.__class__ is not str:
+            return encode_value(value)
+        encoded = self._string_cache.get(value)
+        if encoded is None:
+            encoded = self._string_cache[value] = encode_basestring_ascii(value)
+        return encoded
+
+    def encode(self, channel: str, req_id: str, req_param: str) -> str:
+        """
+        :param channel: 请求通道
+        :param req_id: 请求 id
+        :param req_param: 已编码的请求参数文本
+        :return: 完整的请求文本
+        """
+        time_ms = int(time.time() * 1000)
+        return ''.join(('{"time":', str(time_ms // 1000), ',"time_ms":', str(time_ms), self._template(channel),
+                        encode_basestring_ascii(req_id), ',"req_param":', req_param, '}}'))
+
+    # ==================== 请求参数 ==================== #
+    def order_param(self, order_info: FuturesOrder) -> str:
+        """
+        单个挂单的请求参数，字段与 AsyncOrderClient.create_order 相同
+        :param order_info:
+        :return:
+        """
+        param = ''.join(('{"contract":', self._cached_string(order_info.contract), ',"size":', encode_value(order_info.size),
+                         ',"price":', encode_value(order_info.price), ',"tif":', self._cached_string(order_info.tif),
+                         ',"text":', encode_value(order_info.text)))
+        if order_info.close:
+            return param + ',"close":' + encode_value(order_info.close) + '}'
+        return param + '}'
+
+    def batch_order_param(self, orders_info: list[FuturesOrder]) -> str:
+        """
+        批量挂单的请求参数，batch 请求不包含 close 字段
+        :param orders_info:
+        :return:
+        """
+        cached_string = self._cached_string
+        return '[' + ','.join([''.join((
+            '{"contract":', cached_string(each.contract), ',"size":', encode_value(each.size), ',"price":', encode_value(each.price),
+            ',"tif":', cached_string(each.tif), ',"text":', encode_value(each.text), '}')) for each in orders_info]) + ']'
+
+    @staticmethod
+    def cancel_param(order_id: str) -> str:
+        return '{"order_id":' + encode_value(order_id) + '}'
+
+    @staticmethod
+    def cancel_batch_param(order_ids: list[str]) -> str:
+        return '[' + ','.join([encode_basestring_ascii(str(each_id)) for each_id in order_ids]) + ']'
+
+    @staticmethod
+    def amend_param(order_id: str, size: int = None, price: str = None) -> str:
+        """
+        修改订单的请求参数，size 和 price 只使用一个，size 优先
+        :param order_id:
+        :param size:
+        :param price:
+        :return:
+        """
+        if size is not None:
+            return '{"order_id":' + encode_value(order_id) + ',"size":' + encode_value(size) + '}'
+        return '{"order_id":' + encode_value(order_id) + ',"price":' + encode_value(price) + '}'
+
+    # ==================== 登录 ==================== #
+    def login_payload(self, key: str, secret: str, req_id: str, channel: str = 'futures.login') -> dict:
+        """
+        登录请求的 payload，同一个密钥的 hmac 对象只创建一次，之后复制使用
+        :param key:
+        :param secret:
+        :param req_id:
+        :param channel:
+        :return:
+        """
+        if self._login_hmac is None or secret != self._login_secret:
+            self._login_hmac = hmac.new(secret.encode('utf8'), digestmod=hashlib.sha512)
+            self._login_secret = secret
+        time_now = int(time.time())
+        signature = self._login_hmac.copy()
+        signature.update(('api\n' + channel + '\n\n' + str(time_now)).encode('utf8'))
+        return {
+            'api_key': key,
+            'signature': signature.hexdigest(),
+            'timestamp': str(time_now),
+            'req_id': req_id
+        }
+
+
+if __name__ == '__main__':
+    encoder = GateRequestEncoder()
+    demo_order = FuturesOrder(contract='BTC_USDT', size=-3, price='42000.1', tif='poc', text='t-stg1_00000001SELL')
+    print(encoder.encode('futures.order_place', '000000000001', encoder.order_param(demo_order)))
+    print(encoder.encode('futures.order_batch_place', '000000000002', encoder.batch_order_param([demo_order, demo_order])))
+    print(encoder.encode('futures.order_cancel', '000000000003', encoder.cancel_param('t-stg1_00000001SELL')))
+    print(encoder.encode('futures.order_amend', '000000000004', encoder.amend_param('t-stg1_00000001SELL', price='42000.2')))
@@ -52,6 +52,8 @@ class BinanceToken:
     CANCEL_ALL = 'cancel_all'
     AMEND_POC_PRICE = 'amend_poc_price'
     AMEND_POC_QTY = 'amend_poc_qty'
+    TO_CANCEL_BATCH = 'to_cancel_batch'         # 批量撤单，使用 BATCH_ORDER_INFO 格式
+    AMEND_POC_BATCH = 'amend_poc_batch'         # 批量修改poc挂单价格或数量，使用 BATCH_ORDER_INFO 格式
 
     # 接受命令
     ORDER_FILLED = 'order_filled'
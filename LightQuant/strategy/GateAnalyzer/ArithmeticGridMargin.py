@@ -12,6 +12,10 @@ import pandas as pd
 from LightQuant.Recorder import LogRecorder
 from LightQuant.tools.calc import calc, calc_sum
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_calc import arithmetic_grid_prices
+from LightQuant.tools.grid_locator import nearest_grid_index
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.open_order_book import GridOrder, OpenOrderBook
 from LightQuant.Analyzer import Analyzer
 from LightQuant.Executor import Executor
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
@@ -68,17 +72,11 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         # 缓冲数量，单边网格数量过少或过多时增减的网格数量
         self.buffer_num = 5
 
+        # 订单 id 编解码，缓存已生成的 id
+        self._id_codec = ClientIdCodec(5)
         # 定义了买卖单存储方式    todo:考虑自定义常量
-        self.open_buy_orders = [{
-            'id': '00032BUY',
-            'status': 'NEW',
-            'time': None
-        }, ]
-        self.open_sell_orders = [{
-            'id': '00032SELL',
-            'status': 'FILLED',
-            'time': None
-        }, ]
+        self.open_buy_orders = OpenOrderBook([GridOrder('00032BUY', *self.parse_id('00032BUY'))])
+        self.open_sell_orders = OpenOrderBook([GridOrder('00032SELL', *self.parse_id('00032SELL'), status='FILLED')])
 
         self.account_leverage = None
         # 该合约交易规则
@@ -383,19 +381,16 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         # max_profit = valid_param_dict['max_profit']
         min_profit = valid_param_dict['min_profit']
 
-        all_grid_price = tuple(calc(down_price, calc(price_abs_step, i, '*'), '+') for i in range(self.grid_total_num))
+        all_grid_price = arithmetic_grid_prices(down_price, price_abs_step, self.grid_total_num)
 
         info_texts += '*** {} ***\n'.format('=' * 32)
         current_symbol_price = await self._my_executor.get_current_price(symbol_name)
         info_texts += '\n当前时间: {}\n'.format(str(pd.to_datetime(self.gen_timestamp(), unit='ms')))
         info_texts += '\n合约名称: {}\t\t\t当前价格: {}\n'.format(symbol_name, str(current_symbol_price))
 
-        for each_index, each_grid_price in enumerate(all_grid_price):
-            if each_grid_price <= current_symbol_price < (each_grid_price + price_abs_step):
-                if current_symbol_price - each_grid_price <= price_abs_step / 2:
-                    self.critical_index = each_index
-                else:
-                    self.critical_index = each_index + 1
+        nearest_index = nearest_grid_index(all_grid_price, current_symbol_price, price_abs_step)
+        if nearest_index != -1:
+            self.critical_index = nearest_index
 
         info_texts += '\ncritical index = {}\n'.format(str(self.critical_index))
         info_texts += '\n网格总数量\t\t{:<8}\n'.format(str(self.grid_total_num))
@@ -578,7 +573,7 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         self._is_trading = True
         self._log_info('网格策略开始')
         # 等待 10s 启动
-        self.all_grid_price = tuple(calc(self.grid_down_limit, calc(self.grid_price_step, i, '*'), '+') for i in range(self.grid_total_num))
+        self.all_grid_price = arithmetic_grid_prices(self.grid_down_limit, self.grid_price_step, self.grid_total_num)
         # self._log_info(self.all_grid_price)
 
         # 开启数据统计
@@ -614,12 +609,9 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
             # # sys.exit()
             return
 
-        for each_index, each_grid_price in enumerate(self.all_grid_price):
-            if each_grid_price <= current_symbol_price < (each_grid_price + self.grid_price_step):
-                if current_symbol_price - each_grid_price <= self.grid_price_step / 2:
-                    self.critical_index = each_index
-                else:
-                    self.critical_index = each_index + 1
+        nearest_index = nearest_grid_index(self.all_grid_price, current_symbol_price, self.grid_price_step)
+        if nearest_index != -1:
+            self.critical_index = nearest_index
         self._log_info('critical index = {}'.format(str(self.critical_index)))
         self._initial_index = self.critical_index
         self._zero_pos_index = self.critical_index
@@ -667,20 +659,12 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         # self.open_buy_orders = [str.zfill(str(_index), 5) for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)]
         # self.open_sell_orders = [str.zfill(str(_index), 5) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))]
 
-        self.open_buy_orders = [
-            {
-                'id': self.gen_id(_index, self.BUY),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
-        ]
-        self.open_sell_orders = [
-            {
-                'id': self.gen_id(_index, self.SELL),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
-        ]
+        self.open_buy_orders.reset([
+            self.gen_order(_index, self.BUY) for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
+        ])
+        self.open_sell_orders.reset([
+            self.gen_order(_index, self.SELL) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
+        ])
         self._log_info('\n开始撒网\n')
         temp_buy_indices = [_each for _each in self.open_buy_orders]
         temp_sell_indices = [_each for _each in self.open_sell_orders]
@@ -693,8 +677,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 batch_buy_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.BUY,
                         'quantity': self.grid_qty_per_order,
                         'status': Token.TO_POST_LIMIT
@@ -706,8 +690,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 batch_sell_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.SELL,
                         'quantity': self.grid_qty_per_order,
                         'status': Token.TO_POST_LIMIT
@@ -748,7 +732,7 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
             if self.low_boundary_stop:
                 self._log_info('达到网格下边界，退出策略')
 
-                self.open_buy_orders = []
+                self.open_buy_orders.clear()
                 filled_buy_num = self.critical_index - this_order_index
                 self._trading_statistics['filled_buy_order_num'] += filled_buy_num
                 adding_volume = calc_sum([calc(each_price, self.grid_qty_per_order, '*') for each_price in
@@ -768,7 +752,7 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
             if self.up_boundary_stop:
                 self._log_info('达到网格上边界，退出策略')
 
-                self.open_sell_orders = []
+                self.open_sell_orders.clear()
                 # todo: 统计代码有些重复，可以优化
                 filled_sell_num = this_order_index - self.critical_index
                 self._trading_statistics['filled_sell_order_num'] += filled_sell_num
@@ -813,15 +797,11 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                 # todo: 测试好后撤销价格索引，提升效率
                 instant_post_buy: list = [
-                    {
-                        'id': self.gen_id(each_index, self.BUY),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                    self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                 ]
 
-                self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                self.open_sell_orders = self.open_sell_orders[instant_post_num:]
+                self.open_buy_orders.push_top(reversed(instant_post_buy))
+                self.open_sell_orders.pop_bottom(instant_post_num)
 
                 while True:
                     # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -829,8 +809,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                         for each_num, each_info in enumerate(instant_post_buy):
                             posting_order = Token.ORDER_INFO.copy()
                             posting_order['symbol'] = self.symbol_name
-                            posting_order['id'] = each_info['id']
-                            posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                            posting_order['id'] = each_info.id
+                            posting_order['price'] = self.all_grid_price[each_info.index]
                             posting_order['side'] = self.BUY
                             posting_order['quantity'] = self.grid_qty_per_order
                             self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -844,8 +824,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                         batch_order['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': each_info['id'],
-                                'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                'id': each_info.id,
+                                'price': self.all_grid_price[each_info.index],
                                 'side': self.BUY,
                                 'quantity': self.grid_qty_per_order,
                             } for each_info in instant_post_batch
@@ -880,23 +860,19 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 # self._log_info('买 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                 # todo: 测试好后撤销价格索引，提升效率
                 instant_post_sell: list = [
-                    {
-                        'id': self.gen_id(each_index, self.SELL),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                    self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                 ]
 
-                self.open_buy_orders = self.open_buy_orders[:-instant_post_num]
-                self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                self.open_buy_orders.pop_top(instant_post_num)
+                self.open_sell_orders.push_bottom(instant_post_sell)
 
                 while True:
                     if len(instant_post_sell) < 5:
                         for each_num, each_info in enumerate(instant_post_sell):
                             posting_order = Token.ORDER_INFO.copy()
                             posting_order['symbol'] = self.symbol_name
-                            posting_order['id'] = each_info['id']
-                            posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                            posting_order['id'] = each_info.id
+                            posting_order['price'] = self.all_grid_price[each_info.index]
                             posting_order['side'] = self.SELL
                             posting_order['quantity'] = self.grid_qty_per_order
                             self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -911,8 +887,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                         batch_order['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': each_info['id'],
-                                'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                'id': each_info.id,
+                                'price': self.all_grid_price[each_info.index],
                                 'side': self.SELL,
                                 'quantity': self.grid_qty_per_order,
                             } for each_info in instant_post_batch
@@ -944,7 +920,7 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         # 第二步：填补完成后，检查买卖单数量并维护其边界挂单，补单全用batch order
         # 买单挂单维护
         if len(self.open_buy_orders) > self.max_buy_order_num:
-            post_cancel, self.open_buy_orders = self.open_buy_orders[:self.buffer_num], self.open_buy_orders[self.buffer_num:]
+            post_cancel = self.open_buy_orders.pop_bottom(self.buffer_num)
             for each_info in post_cancel:
                 cancel_cmd = Token.ORDER_INFO.copy()
                 cancel_cmd['symbol'] = self.symbol_name
@@ -952,17 +928,13 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
 
         elif 0 < len(self.open_buy_orders) < self.min_buy_order_num:
-            endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+            endpoint_index = self.open_buy_orders[0].index
             if endpoint_index > 0:
                 # =0时已经达到边界，不补充挂单
                 filling_post_buy: list = [
-                    {
-                        'id': self.gen_id(each_index, self.BUY),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(max(0, endpoint_index - self.buffer_num), endpoint_index)
+                    self.gen_order(each_index, self.BUY) for each_index in range(max(0, endpoint_index - self.buffer_num), endpoint_index)
                 ]
-                self.open_buy_orders = filling_post_buy + self.open_buy_orders
+                self.open_buy_orders.push_bottom(filling_post_buy)
                 while True:
                     if len(filling_post_buy) == 0:
                         break
@@ -971,8 +943,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                     filling_batch_cmd['orders'] = [
                         {
                             'symbol': self.symbol_name,
-                            'id': _info['id'],
-                            'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                            'id': _info.id,
+                            'price': self.all_grid_price[_info.index],
                             'side': self.BUY,
                             'quantity': self.grid_qty_per_order,
                         } for _info in filling_post_batch
@@ -981,7 +953,7 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
 
         # 卖单挂单维护
         if len(self.open_sell_orders) > self.max_sell_order_num:
-            self.open_sell_orders, post_cancel = self.open_sell_orders[:-self.buffer_num], self.open_sell_orders[-self.buffer_num:]
+            post_cancel = self.open_sell_orders.pop_top(self.buffer_num)
             for each_info in post_cancel:
                 cancel_cmd = Token.ORDER_INFO.copy()
                 cancel_cmd['symbol'] = self.symbol_name
@@ -989,17 +961,13 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                 await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
 
         elif 0 < len(self.open_sell_orders) < self.min_sell_order_num:
-            endpoint_index = self.parse_id(self.open_sell_orders[-1]['id'])[0]
+            endpoint_index = self.open_sell_orders[-1].index
             if endpoint_index < self.max_index:
                 # 否则已经达到边界，不补充挂单
                 filling_post_sell: list = [
-                    {
-                        'id': self.gen_id(each_index, self.SELL),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + self.buffer_num) + 1)
+                    self.gen_order(each_index, self.SELL) for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + self.buffer_num) + 1)
                 ]
-                self.open_sell_orders = self.open_sell_orders + filling_post_sell
+                self.open_sell_orders.push_top(filling_post_sell)
                 while True:
                     if len(filling_post_sell) == 0:
                         break
@@ -1008,8 +976,8 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
                     filling_batch_cmd['orders'] = [
                         {
                             'symbol': self.symbol_name,
-                            'id': _info['id'],
-                            'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                            'id': _info.id,
+                            'price': self.all_grid_price[_info.index],
                             'side': self.SELL,
                             'quantity': self.grid_qty_per_order,
                         } for _info in filling_post_batch
@@ -1329,8 +1297,10 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
         :param side: 方向，需要规范化输入
         :return:
         """
-        self_id = self.stg_num + '_' + str.zfill(str(self_index), 5) + side
-        return self_id
+        return self._id_codec.encode(self.stg_num, self_index, side)
+
+    def gen_order(self, self_index: int, side: str) -> GridOrder:
+        return GridOrder(self.gen_id(self_index, side), self_index, side, 'NEW', self.gen_timestamp())
 
     @staticmethod
     def unmatched_profit_calc(initial_index: int, current_index: int, all_prices: tuple[float | int], each_gird_qty: float,
@@ -1361,23 +1331,14 @@ class ArithmeticGridAnalyzerMargin(Analyzer):
     def id_in_order_list() -> tuple[bool, int]:
         pass
 
-    @staticmethod
-    def parse_id(client_id: str) -> tuple[int, str]:
+    def parse_id(self, client_id: str) -> tuple[int, str]:
         """
         解析自定义id中的index和side信息，先洗去stg_num信息
         [0]索引得到index
         :param client_id: stg8_00058BUY
         :return:
         """
-        internal_client_id = client_id.split('_')[-1]
-        try:
-            order_index = int(internal_client_id[:5])
-            order_side = internal_client_id[5:]
-        except ValueError:
-            order_index = -1
-            order_side = client_id
-
-        return order_index, order_side
+        return self._id_codec.decode(client_id)
 
     @staticmethod
     def gen_timestamp():
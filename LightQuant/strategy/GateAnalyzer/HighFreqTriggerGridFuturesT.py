@@ -7,8 +7,15 @@ import time
 import asyncio
 import pandas as pd
 from LightQuant.Recorder import LogRecorder
-from LightQuant.tools.calc import calc, calc_sum
+from LightQuant.tools.calc import calc
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_calc import arithmetic_grid_prices
+from LightQuant.tools.grid_locator import nearest_grid_index
+from LightQuant.tools.fixed_point import FixedPoint
+from LightQuant.tools.grid_index import GridIndex
+from LightQuant.tools.matched_profit import MatchedProfitAccumulator
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.open_order_book import GridOrder, OpenOrderBook
 from LightQuant.Analyzer import Analyzer
 from LightQuant.Executor import Executor
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
@@ -112,6 +119,10 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         # 手续费
         self.symbol_maker_fee = 0
         self.symbol_taker_fee = 0
+        # 定点数计算器，获取交易规则后创建
+        self._fp: FixedPoint = None
+        # 网格前缀和索引，用于快速计算未配对盈亏
+        self._grid_index: GridIndex = None
 
         # ==================== 策略功能相关变量 ==================== #
         self._pre_update_text_task: asyncio.coroutine = None
@@ -140,17 +151,11 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         self._batch_orders_num = 10
         # 策略布撒网格完成
         self._layout_complete = False
+        # 订单 id 编解码，缓存已生成的 id
+        self._id_codec = ClientIdCodec(6)
         # 定义了买卖单存储方式
-        self.open_buy_orders = [{
-            'id': '000032BUY',
-            'status': 'NEW',
-            'time': None
-        }, ]
-        self.open_sell_orders = [{
-            'id': '000032SELL',
-            'status': 'FILLED',
-            'time': None
-        }, ]
+        self.open_buy_orders = OpenOrderBook([GridOrder('000032BUY', *self.parse_id('000032BUY'))])
+        self.open_sell_orders = OpenOrderBook([GridOrder('000032SELL', *self.parse_id('000032SELL'), status='FILLED')])
         # 上下边界是否终止策略
         self.up_boundary_stop = False
         self.low_boundary_stop = False
@@ -219,6 +224,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         # 存储所有 coroutine
         self._market_locker_task: asyncio.coroutine = None
         self._fix_position_task: asyncio.coroutine = None
+        # 上一次开启校验仓差任务的时间，ticker 发现仓差时间隔一段时间再校验
+        self._fix_position_start_time: float = 0
         self._fix_order_task: asyncio.coroutine = None
 
         self.stg_num = None
@@ -253,6 +260,7 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             self.symbol_max_leverage = self.symbol_info['max_leverage']
             self.symbol_order_price_div = self.symbol_info['order_price_deviate']
             self.symbol_orders_limit_num = self.symbol_info['orders_limit']
+            self._fp = FixedPoint(self.symbol_price_min_step, self.symbol_quantity_min_step)
             return True
 
     async def validate_param(self, input_params: dict) -> dict:
@@ -606,15 +614,13 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         self.max_profit = 0 if self._x_max_profit == '' else self._x_max_profit
         self.min_profit = 0 if self._x_min_profit == '' else self._x_min_profit
 
-        self.all_grid_price = tuple(calc(self._x_grid_down_price, calc(self._x_price_abs_step, i, '*'), '+') for i in range(self._x_grid_total_num))
+        self.all_grid_price = arithmetic_grid_prices(self._x_grid_down_price, self._x_price_abs_step, self._x_grid_total_num)
+        self._grid_index = GridIndex(self._fp, self.all_grid_price)
         self.max_index = self._x_grid_total_num - 1
 
-        for each_index, each_grid_price in enumerate(self.all_grid_price):
-            if each_grid_price <= self.entry_grid_price < (each_grid_price + self._x_price_abs_step):
-                if self.entry_grid_price - each_grid_price <= self._x_price_abs_step / 2:
-                    self.critical_index = each_index
-                else:
-                    self.critical_index = each_index + 1
+        nearest_index = nearest_grid_index(self.all_grid_price, self.entry_grid_price, self._x_price_abs_step)
+        if nearest_index != -1:
+            self.critical_index = nearest_index
         self.initial_index = self.critical_index
         # self.initial_symbol_price = self.current_symbol_price
 
@@ -869,20 +875,12 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         """
         ini_buy_order_num = round((self.min_buy_order_num + self.max_buy_order_num) / 2)
         ini_sell_order_num = round((self.min_sell_order_num + self.max_sell_order_num) / 2)
-        self.open_buy_orders = [
-            {
-                'id': self.gen_id(_index, self.BUY),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
-        ]
-        self.open_sell_orders = [
-            {
-                'id': self.gen_id(_index, self.SELL),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
-        ]
+        self.open_buy_orders.reset([
+            self.gen_order(_index, self.BUY) for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
+        ])
+        self.open_sell_orders.reset([
+            self.gen_order(_index, self.SELL) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
+        ])
         self._log_info('\n开始撒网\n')
         temp_buy_indices = [_each for _each in self.open_buy_orders]
         temp_sell_indices = [_each for _each in self.open_sell_orders]
@@ -894,8 +892,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 batch_buy_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.BUY,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_POC
@@ -908,8 +906,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 batch_sell_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.SELL,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_POC
@@ -1019,13 +1017,10 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             if self.low_boundary_stop:
                 self._log_info('达到网格下边界，退出策略')
 
-                self.open_buy_orders = []
+                self.open_buy_orders.clear()
                 filled_buy_num = self.critical_index - this_order_index
                 self._trading_statistics['filled_buy_order_num'] += filled_buy_num
-                adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                          self.all_grid_price[this_order_index:self.critical_index]])
-                self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                self._fp.add_trade(self._fp.range_notional(self.all_grid_price[this_order_index:self.critical_index], self.grid_each_qty), self.symbol_maker_fee)
 
                 self.critical_index = this_order_index
 
@@ -1036,13 +1031,10 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             if self.up_boundary_stop:
                 self._log_info('达到网格上边界，退出策略')
 
-                self.open_sell_orders = []
+                self.open_sell_orders.clear()
                 filled_sell_num = this_order_index - self.critical_index
                 self._trading_statistics['filled_sell_order_num'] += filled_sell_num
-                adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                          self.all_grid_price[self.critical_index + 1:this_order_index + 1]])
-                self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                self._fp.add_trade(self._fp.range_notional(self.all_grid_price[self.critical_index + 1:this_order_index + 1], self.grid_each_qty), self.symbol_maker_fee)
 
                 self.critical_index = this_order_index
 
@@ -1066,25 +1058,18 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                     # 需要瞬间补上的订单数量
                     instant_post_num = this_order_index - self.critical_index
                     self._trading_statistics['filled_sell_order_num'] += instant_post_num
-                    adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                              self.all_grid_price[self.critical_index + 1:this_order_index + 1]])
-                    self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                    self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                    self._fp.add_trade(self._fp.range_notional(self.all_grid_price[self.critical_index + 1:this_order_index + 1], self.grid_each_qty), self.symbol_maker_fee)
 
                     self._account_position_theory -= self.grid_each_qty
                     self._log_info('{}卖  {:2} 订单成交\t\t价格: {:<12}\tid: {:<10}'.format
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                     # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_post_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_post_num)
 
                     while True:
                         # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -1092,8 +1077,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1107,8 +1092,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1133,33 +1118,26 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                     # 下方买单成交，维护网格
                     instant_post_num = self.critical_index - this_order_index
                     self._trading_statistics['filled_buy_order_num'] += instant_post_num
-                    adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                              self.all_grid_price[this_order_index:self.critical_index]])
-                    self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                    self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                    self._fp.add_trade(self._fp.range_notional(self.all_grid_price[this_order_index:self.critical_index], self.grid_each_qty), self.symbol_maker_fee)
 
                     self._account_position_theory += self.grid_each_qty
                     self._log_info('{}买  {:2} 订单成交\t\t价格: {:<12}\tid: {:<10}'.format
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                     # self._log_info('买 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_post_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_post_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1178,8 +1156,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1226,15 +1204,11 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                     # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_reject_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_reject_num)
 
                     while True:
                         # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -1242,8 +1216,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1257,8 +1231,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1289,23 +1263,19 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_reject_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_reject_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1320,8 +1290,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1358,19 +1328,15 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             # 买单挂单维护
             open_buy_orders_num, open_sell_orders_num = len(self.open_buy_orders), len(self.open_sell_orders)
             if open_buy_orders_num > self.max_buy_order_num:
-                post_cancel, self.open_buy_orders = self.open_buy_orders[:self.buffer_buy_num], self.open_buy_orders[self.buffer_buy_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
+                post_cancel = self.open_buy_orders.pop_bottom(self.buffer_buy_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
 
             elif open_buy_orders_num < self.min_buy_order_num:
                 if open_buy_orders_num == 0:
                     # todo: 需要检查，是否需要 -1
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+                    endpoint_index = self.open_buy_orders[0].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单
                 instant_add_num = self.buffer_buy_num if (self.min_buy_order_num - open_buy_orders_num < self.buffer_buy_num) \
@@ -1379,13 +1345,9 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 if endpoint_index > 0:
                     # = 时，下方挂单已经达到下边界，不补充挂单
                     filling_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(max(0, endpoint_index - instant_add_num), endpoint_index)
+                        self.gen_order(each_index, self.BUY) for each_index in range(max(0, endpoint_index - instant_add_num), endpoint_index)
                     ]
-                    self.open_buy_orders = filling_post_buy + self.open_buy_orders
+                    self.open_buy_orders.push_bottom(filling_post_buy)
                     while True:
                         if len(filling_post_buy) == 0:
                             break
@@ -1394,8 +1356,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.BUY,
                                 'quantity': self.grid_each_qty,
                             } for _info in filling_post_batch
@@ -1405,18 +1367,14 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
 
             # 卖单挂单维护
             if len(self.open_sell_orders) > self.max_sell_order_num:
-                self.open_sell_orders, post_cancel = self.open_sell_orders[:-self.buffer_sell_num], self.open_sell_orders[-self.buffer_sell_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
+                post_cancel = self.open_sell_orders.pop_top(self.buffer_sell_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
 
             elif len(self.open_sell_orders) < self.min_sell_order_num:
                 if len(self.open_sell_orders) == 0:
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_sell_orders[-1]['id'])[0]
+                    endpoint_index = self.open_sell_orders[-1].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单
                 instant_add_num = self.buffer_sell_num if (self.min_sell_order_num - open_sell_orders_num < self.buffer_sell_num) \
@@ -1425,13 +1383,9 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 if endpoint_index < self.max_index:
                     # 否则已经达到边界，不补充挂单
                     filling_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
                     ]
-                    self.open_sell_orders = self.open_sell_orders + filling_post_sell
+                    self.open_sell_orders.push_top(filling_post_sell)
                     while True:
                         if len(filling_post_sell) == 0:
                             break
@@ -1440,8 +1394,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.SELL,
                                 'quantity': self.grid_each_qty,
                             } for _info in filling_post_batch
@@ -1451,17 +1405,25 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
 
         # 5.最后根据需要校验仓差
         if (self._trading_statistics['filled_buy_order_num'] + self._trading_statistics['filled_sell_order_num']) % 60 == 0:
+            self._start_fix_position_task()
 
-            if self._fix_position_task:
-                self._fix_position_task: asyncio.coroutine
-                if self._fix_position_task.done():
-                    # 旧任务已完成，再次执行
-                    self._fix_position_task = asyncio.create_task(self._fix_position())
-                else:
-                    self._log_info('### 存在执行中的校验仓差任务，不开启新任务')
-            else:
-                self._log_info('### 首次开启校验仓差任务')
+    def _start_fix_position_task(self) -> None:
+        """
+        开启校验仓差任务，已有执行中的任务时不开启新任务
+        :return:
+        """
+        if self._fix_position_task:
+            self._fix_position_task: asyncio.coroutine
+            if self._fix_position_task.done():
+                # 旧任务已完成，再次执行
                 self._fix_position_task = asyncio.create_task(self._fix_position())
+            else:
+                self._log_info('### 存在执行中的校验仓差任务，不开启新任务')
+                return
+        else:
+            self._log_info('### 首次开启校验仓差任务')
+            self._fix_position_task = asyncio.create_task(self._fix_position())
+        self._fix_position_start_time = self._running_loop.time()
 
     async def _terminate_trading(self, reason: str = '') -> None:
         if not self._is_trading:
@@ -1571,8 +1533,15 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             self._bound_running_column = None
 
     async def _update_trading_statistics(self) -> None:
-        filled_trading_pair = min(self._trading_statistics['filled_buy_order_num'], self._trading_statistics['filled_sell_order_num'])
-        self._trading_statistics['matched_profit'] = calc(calc(filled_trading_pair, self.grid_price_step, '*'), calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*')
+        # 合并热路径中累计的成交量和手续费
+        add_volume, add_fees = self._fp.flush_trades()
+        if add_volume:
+            self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], add_volume, '+')
+            self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], add_fees, '+')
+
+        # 等差等量网格，配对收益只与买卖总成交次数有关，不需要逐格统计
+        self._trading_statistics['matched_profit'] = self._fp.to_value(MatchedProfitAccumulator.uniform_matched_units(
+            self._trading_statistics['filled_buy_order_num'], self._trading_statistics['filled_sell_order_num'], self._fp.to_ticks(self.grid_price_step), self.grid_each_qty))
 
         if self.grid_side == self.BUY:
             init_abs_qty = calc(self.initial_quantity, self.symbol_quantity_min_step, '*')
@@ -1626,9 +1595,12 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         if self._maker_market_switch_on:
             self._log_info('### 存在市价下单任务，暂不校验仓位')
             return
-        current_qty = await self._my_executor.get_symbol_position(self.symbol_name)
+        # 优先使用 executor 按成交累计的仓位，不需要等待网络请求，存在较大仓差时再使用 rest 仓位校验
+        current_qty = self._my_executor.get_cached_position(self.symbol_name)
+        if current_qty is None:
+            current_qty = await self._my_executor.get_symbol_position(self.symbol_name)
 
-        self.derive_valid_position()
+        fix_qty = self._position_deviation(current_qty)
         self._log_info('\n### 执行仓位修正:')
         self._log_info('### 账户初始仓位:\t\t{}\t张'.format(self._init_account_position))
         self._log_info('### 累计理论当前仓位:\t\t{}\t张'.format(self._account_position_theory))
@@ -1636,18 +1608,16 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         self._log_info('### 策略要求当前仓位:\t\t{}\t张'.format(self._current_valid_position))
         self._log_info('### 账户实际当前仓位:\t\t{}\t张'.format(current_qty))
 
-        fix_qty = int(current_qty + self._accumulated_market_quantity - self._current_valid_position)
         # 小一点的差别就不管了
-        if abs(fix_qty) > 5 * self.grid_each_qty:
+        if self._position_gap_too_large(fix_qty):
             # if True:
             self._log_info('### 存在仓位差\t\t{}\t校验仓位中......'.format(fix_qty))
             verify_qty_list = []
             for _ in range(2):
                 await asyncio.sleep(5)
                 c_qty = await self._my_executor.get_symbol_position(self.symbol_name)
-                self.derive_valid_position()
                 # d_qty = round_step_size(calc(c_qty, self._current_valid_position, '-'), self.symbol_quantity_min_step, upward=False)
-                d_qty = int(c_qty + self._accumulated_market_quantity - self._current_valid_position)
+                d_qty = self._position_deviation(c_qty)
                 verify_qty_list.append(d_qty)
 
             all_equal = True
@@ -1669,6 +1639,18 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         else:
             self._log_info('### 无需修正仓位\n')
 
+    def _position_deviation(self, current_qty: int) -> int:
+        """
+        计算账户仓位与策略要求仓位的仓差，不需要网络请求
+        :param current_qty: 账户当前仓位
+        :return: 仓差，大于 0 表示账户多余仓位
+        """
+        self.derive_valid_position()
+        return int(current_qty + self._accumulated_market_quantity - self._current_valid_position)
+
+    def _position_gap_too_large(self, fix_qty: int) -> bool:
+        return abs(fix_qty) > 5 * self.grid_each_qty
+
     async def _fix_open_orders(self) -> None:
         """
         修正挂单
@@ -1736,7 +1718,7 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
 
         # 2. 价格无偏移情况
         account_orders_list, account_orders_list_id = await self._my_executor.get_open_orders(self.symbol_name)
-        stg_open_orders: list[str] = [each_order['id'] for each_order in self.open_buy_orders] + [each_order['id'] for each_order in self.open_sell_orders]
+        stg_open_orders: list[str] = self.open_buy_orders.id_list() + self.open_sell_orders.id_list()
         # 剔除特殊挂单
         market_buy_id, market_sell_id = self.gen_id(self.MAKER_MARKET_ID, self.BUY), self.gen_id(self.MAKER_MARKET_ID, self.SELL)
         for each_i, each_stg_id in enumerate(account_orders_list):
@@ -1754,21 +1736,21 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 self._executing_order_fixing = False
                 return
 
+        # 使用集合对账，不在 list 中逐个查找
+        stg_open_ids, account_open_ids = set(stg_open_orders), set(account_orders_list)
         # 勤快方法
         exist_redundant_order, exist_missing_order = False, False
+        redundant_ids = []
         for each_index, each_account_order_id in enumerate(account_orders_list):
-            if each_account_order_id not in stg_open_orders:
+            if each_account_order_id not in stg_open_ids:
                 real_id = account_orders_list_id[each_index]
                 self._log_info('$$$ 检测到多余挂单，撤销挂单\t\tid: {:<12}\tid: {:<10}'.format(real_id, each_account_order_id))
                 exist_redundant_order = True
-
-                cancel_cmd = Token.ORDER_INFO.copy()
-                cancel_cmd['symbol'] = self.symbol_name
-                cancel_cmd['id'] = real_id
-                await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
+                redundant_ids.append(real_id)
+        await self._post_cancel_batch(redundant_ids)
 
         for each_stg_order_id in stg_open_orders:
-            if each_stg_order_id not in account_orders_list:
+            if each_stg_order_id not in account_open_ids:
                 self._log_info('$$$ 检测到缺失挂单，补充挂单\t\t\tid: {:<10}'.format(each_stg_order_id))
                 exist_missing_order = True
 
@@ -1964,7 +1946,9 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 self._log_info('订单部分成交!!\t\t价格: {:<12}\tid: {:<10}'.format(recv_data_dict['price'], recv_data_dict['id']))
             pass
         elif recv_data_dict['status'] == Token.UNIDENTIFIED:
-            pass
+            # 请求超时未返回，不确定是否成功，由挂单检查修正
+            self._log_info('\n{}，需要检查挂单\t\tid: {:<10}'.format(append_info, recv_data_dict['id']))
+            self._need_fix_order = True
         elif recv_data_dict['status'] == Token.FAILED:
             pass
         elif recv_data_dict['status'] == Token.POST_FAILED:
@@ -2020,6 +2004,19 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         elif recv_data_dict['status'] == Token.TEMP_TOKEN:
             pass
 
+    async def _post_cancel_batch(self, cancel_ids: list[str]) -> None:
+        """
+        批量撤销挂单，一次发送所有撤单请求，由 executor 按交易所上限分批
+        :param cancel_ids: 需要撤销的挂单 id
+        :return:
+        """
+        if not cancel_ids:
+            return
+        batch_cancel_cmd = Token.BATCH_ORDER_INFO.copy()
+        batch_cancel_cmd['orders'] = [{'symbol': self.symbol_name, 'id': each_id} for each_id in cancel_ids]
+        batch_cancel_cmd['status'] = Token.TO_CANCEL_BATCH
+        await self.command_transmitter(trans_command=batch_cancel_cmd, token=Token.TO_CANCEL_BATCH)
+
     async def command_transmitter(self, trans_command: dict = None, token: str = None) -> None:
         command_dict = Token.ORDER_INFO.copy()
         command_dict['symbol'] = self.symbol_name
@@ -2048,6 +2045,8 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_BATCH_POC:
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
+        elif token == Token.TO_CANCEL_BATCH:
+            asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_MARKET:
             command_dict['side'] = trans_command['side']
             command_dict['id'] = self.gen_id(999998, trans_command['side'])
@@ -2098,7 +2097,7 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         # 策略还在运行时，检查最新价格是否偏离过大，
         if self._is_trading:
             if self._x_grid_down_price < self.current_symbol_price < self._x_grid_up_price:
-                if abs(calc(self.current_symbol_price, self.all_grid_price[self.critical_index], '-')) > 2 * self.grid_price_step:
+                if abs(self._fp.to_ticks(self.current_symbol_price) - self._fp.to_ticks(self.all_grid_price[self.critical_index])) > 2 * self._fp.to_ticks(self.grid_price_step):
                     self._log_info('$$$ 检测到价格偏离过大，策略挂单出现问题')
                     self._need_fix_order = True
 
@@ -2110,6 +2109,14 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
                 self._log_info('检测到价格超出下边界!需要终止策略')
                 asyncio.create_task(self._terminate_trading(reason='价格超出网格下边界'))
 
+            # executor 按成交累计的仓位不需要网络请求，每个 ticker 对比一次，存在较大仓差时才开启校验仓差任务
+            if self._layout_complete and not self._maker_market_switch_on and \
+                    self._running_loop.time() - self._fix_position_start_time > 30:
+                ledger_qty = self._my_executor.get_cached_position(self.symbol_name)
+                if ledger_qty is not None and self._position_gap_too_large(self._position_deviation(ledger_qty)):
+                    self._log_info('### 成交仓位存在仓差，开启校验仓差任务')
+                    self._start_fix_position_task()
+
         # 开启maker市价开关，需要使用功能，临时取消这个功能
         # if self._maker_market_switch_on:
         #     await self._maker_market_post()
@@ -2123,23 +2130,15 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
 
     # tool methods
     def gen_id(self, self_index: int, side: str) -> str:
-        self_id = self.stg_num + '_' + str.zfill(str(self_index), 6) + side
-        return self_id
+        return self._id_codec.encode(self.stg_num, self_index, side)
 
-    @staticmethod
-    def parse_id(client_id: str) -> tuple[int, str]:
-        internal_client_id = client_id.split('_')[-1]
-        try:
-            order_index = int(internal_client_id[:6])
-            order_side = internal_client_id[6:]
-        except ValueError:
-            order_index = -1
-            order_side = client_id
+    def gen_order(self, self_index: int, side: str) -> GridOrder:
+        return GridOrder(self.gen_id(self_index, side), self_index, side, 'NEW', self.gen_timestamp())
 
-        return order_index, order_side
+    def parse_id(self, client_id: str) -> tuple[int, str]:
+        return self._id_codec.decode(client_id)
 
-    @staticmethod
-    def unmatched_profit_calc(initial_index: int, current_index: int, all_prices: tuple[float | int], each_grid_qty: float,
+    def unmatched_profit_calc(self, initial_index: int, current_index: int, all_prices: tuple[float | int], each_grid_qty: float,
                               init_pos_price: float, init_pos_qty: float, current_price: float) -> float:
         """
         新式便携计算器，可以计算超出区间的网格未配对盈亏
@@ -2152,12 +2151,19 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         :param current_price: 当前最新价格
         :return: 返回盈亏 和 平均持仓价格
         """
+        if all_prices is self.all_grid_price and self._grid_index is not None:
+            # 策略网格本身，使用前缀和索引，常数时间
+            return self._grid_index.uniform_unmatched_profit(initial_index, current_index, self._fp.to_lots(each_grid_qty),
+                                                             init_pos_price, self._fp.to_lots(init_pos_qty), current_price)
         if initial_index == -1:
             initial_index = len(all_prices) - 1
         if current_index == -1:
             current_index = len(all_prices) - 1
 
-        part_1 = calc(calc(current_price, init_pos_price, '-'), init_pos_qty, '*')
+        # 全部使用定点整数计算，价格为tick数，数量为合约张数
+        to_ticks = self._fp.to_ticks
+        current_ticks = to_ticks(current_price)
+        part_1 = (current_ticks - to_ticks(init_pos_price)) * self._fp.to_lots(init_pos_qty)
         if current_index > initial_index + 1:
             price_slice = all_prices[initial_index + 1:current_index]
         elif current_index < initial_index - 1:
@@ -2165,9 +2171,9 @@ class HighFreqTriggerGridAnalyzerFuturesT(Analyzer):
         else:
             price_slice = []
 
-        part_2 = calc(-abs(calc(calc_sum(price_slice), calc(len(price_slice), current_price, '*'), '-')), each_grid_qty, '*')
+        part_2 = -abs(sum([to_ticks(each_price) for each_price in price_slice]) - len(price_slice) * current_ticks) * self._fp.to_lots(each_grid_qty)
 
-        return calc(part_1, part_2, '+')
+        return self._fp.to_value(part_1 + part_2)
 
     @staticmethod
     def unmatched_profit_calc_fast(initial_index: int, current_index: int, all_prices: tuple[float | int], each_gird_qty: float,
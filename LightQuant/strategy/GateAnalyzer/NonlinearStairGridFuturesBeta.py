@@ -10,8 +10,17 @@ import pandas as pd
 from decimal import Decimal
 from LightQuant.Preserver import Preserver
 from LightQuant.Recorder import LogRecorder
-from LightQuant.tools.calc import calc, calc_sum
+from LightQuant.tools.calc import calc
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_calc import arithmetic_grid_prices, round_step_precision_array
+from LightQuant.tools.grid_locator import ceil_grid_index, nearest_grid_index
+from LightQuant.tools.fixed_point import FixedPoint
+from LightQuant.tools.grid_index import GridIndex
+from LightQuant.tools.grid_store import GridStore
+from LightQuant.tools.matched_profit import MatchedProfitAccumulator
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.order_state import OrderState
+from LightQuant.tools.open_order_book import GridOrder, OpenOrderBook
 from LightQuant.Analyzer import Analyzer
 from LightQuant.Executor import Executor
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
@@ -101,6 +110,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         # 手续费
         self.symbol_maker_fee = 0
         self.symbol_taker_fee = 0
+        # 定点数计算器，获取交易规则后创建
+        self._fp: FixedPoint = None
+        # 网格前缀和索引，用于快速计算未配对盈亏
+        self._grid_index: GridIndex = None
+        # 网格价格的可增长存储，all_grid_price 为其中数组的引用
+        self._grid_store: GridStore = None
 
         # ==================== 策略功能相关变量 ==================== #
         # noinspection PyTypeChecker
@@ -170,24 +185,13 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         self._batch_orders_num = 10
         # 策略布撒网格完成
         self._layout_complete = False
+        # 订单 id 编解码，缓存已生成的 id
+        self._id_codec = ClientIdCodec(8)
         # 定义了买卖单存储方式
-        self.open_buy_orders = [{
-            'id': '00032BUY',
-            'status': 'NEW',
-            'time': None
-        }, ]
-        self.open_sell_orders = [{
-            'id': '00032SELL',
-            'status': 'FILLED',
-            'time': None
-        }, ]
+        self.open_buy_orders = OpenOrderBook([GridOrder('00032BUY', *self.parse_id('00032BUY'))])
+        self.open_sell_orders = OpenOrderBook([GridOrder('00032SELL', *self.parse_id('00032SELL'), status='FILLED')])
 
         # ==================== 特殊功能相关变量 ==================== #
-        # 部分成交订单处理  {'id': int}   order_id, left_quantity   注意买卖挂单数量均用绝对值储存
-        self.partially_filled_orders: dict[str, int] = {}
-        # 按大小顺序？存储部分成交订单index list, 用于判断距离并定时处理
-        self.partially_orders_indices_list: list[int] = []
-
         # 策略需要马上修正挂单，该变量也充当类似开关功能
         self._need_fix_order: bool = False
         # noinspection PyTypeChecker
@@ -310,6 +314,7 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             self.symbol_min_notional = 0
             self.symbol_order_price_div = self.symbol_info['order_price_deviate']
             self.symbol_orders_limit_num = self.symbol_info['orders_limit']
+            self._fp = FixedPoint(self.symbol_price_min_step, self.symbol_quantity_min_step)
             return True
 
     async def validate_param(self, input_params: dict, acquire_params: bool = True) -> dict:
@@ -507,15 +512,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                              round_step_size(calc(virtual_current_price, 0.9, '*'), self.symbol_price_min_step),
                              round_step_size(calc(virtual_current_price, 0.8, '*'), self.symbol_price_min_step),
                              round_step_size(calc(virtual_current_price, 0.7, '*'), self.symbol_price_min_step)]
-        for _index, _ in enumerate(self.all_grid_price[:-1]):
-            if self.all_grid_price[_index] < percentage_prices[0] <= self.all_grid_price[_index + 1]:
-                percentage_indices[0] = _index + 1
-            if self.all_grid_price[_index] < percentage_prices[1] <= self.all_grid_price[_index + 1]:
-                percentage_indices[1] = _index + 1
-            if self.all_grid_price[_index] < percentage_prices[2] <= self.all_grid_price[_index + 1]:
-                percentage_indices[2] = _index + 1
-            if self.all_grid_price[_index] < percentage_prices[3] <= self.all_grid_price[_index + 1]:
-                percentage_indices[3] = _index + 1
+        for _index, each_price in enumerate(percentage_prices):
+            percentage_indices[_index] = max(ceil_grid_index(self.all_grid_price, each_price), 0)
 
         percent_5_loss_ref = self.unmatched_profit_calc(
             initial_index=self.entry_index + 1,
@@ -674,8 +672,7 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         self.upper_buffer_steps_num = max(int(calc(100, self.filling_grid_step_num, '/')), 5)
         # print('缓冲台阶数量 {}'.format(self.upper_buffer_steps_num))
         # 线性区域网格价格，包括缓冲台阶
-        linear_grid_prices = tuple([calc(self.lower_step_price, calc(i, self.grid_price_step, '*'), '+')
-                                    for i in range(1 + self.lower_grid_step_num + self.upper_buffer_steps_num * self.filling_grid_step_num)])
+        linear_grid_prices = arithmetic_grid_prices(self.lower_step_price, self.grid_price_step, 1 + self.lower_grid_step_num + self.upper_buffer_steps_num * self.filling_grid_step_num)
 
         # 现在计算所有非线性网格价格
         self.nonlinear_grid_prices = self.nonlinear_grid_price_calc(
@@ -685,7 +682,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             lower_price_limit=self.lower_buffer_price_limit,
             alpha=self.alpha
         )
-        self.all_grid_price = self.nonlinear_grid_prices + linear_grid_prices
+        self._grid_store = GridStore(self.nonlinear_grid_prices + linear_grid_prices)
+        self.all_grid_price = self._grid_store.prices
+        self._grid_index = GridIndex(self._fp, self.all_grid_price)
         self.lower_buffer_grid_num = len(self.nonlinear_grid_prices)
         self.grid_total_num = self.up_grid_num + self.lower_grid_step_num + self.lower_buffer_grid_num
 
@@ -880,11 +879,17 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         else:
             max_range = self.grid_total_num - len(self.all_grid_price) + 1
 
-        add_grid_price = tuple(calc(end_price, calc(self.grid_price_step, i, '*'), '+') for i in range(1, max_range))
+        add_grid_price = arithmetic_grid_prices(end_price, self.grid_price_step, max_range, start_num=1)
         self.nonlinear_grid_prices = tuple([calc(each_price, self.filling_price_step, '+') for each_price in self.nonlinear_grid_prices])
 
-        self.all_grid_price = (0,) * (self.present_stair_num + 1) * self.filling_grid_step_num + \
-                              self.nonlinear_grid_prices + self.all_grid_price[self.present_low_step_index + self.filling_grid_step_num:] + add_grid_price
+        # 原地改写下方区域并追加上方价格，非线性区域上移一个台阶，原非线性区域置0
+        new_bottom_index = (self.present_stair_num + 1) * self.filling_grid_step_num
+        self._grid_store.clear(self.present_bottom_index, new_bottom_index)
+        self._grid_store.write_prices(new_bottom_index, self.nonlinear_grid_prices)
+        self._grid_store.append(add_grid_price)
+        # 原底部以下均为0，只需改写非线性区域并追加上方价格
+        self._grid_index.rewrite_lower(self.present_bottom_index, self.present_low_step_index + self.filling_grid_step_num, self.all_grid_price)
+        self._grid_index.append(add_grid_price)
 
         self.present_stair_num += 1
         self.present_step_up_index += self.filling_grid_step_num
@@ -902,20 +907,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         """
         ini_buy_order_num = round((self.min_buy_order_num + self.max_buy_order_num) / 2)
         ini_sell_order_num = round((self.min_sell_order_num + self.max_sell_order_num) / 2)
-        self.open_buy_orders = [
-            {
-                'id': self.gen_id(_index, self.BUY),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(max(self.present_bottom_index, self.critical_index - ini_buy_order_num), self.critical_index)
-        ]
-        self.open_sell_orders = [
-            {
-                'id': self.gen_id(_index, self.SELL),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
-        ]
+        self.open_buy_orders.reset([
+            self.gen_order(_index, self.BUY) for _index in range(max(self.present_bottom_index, self.critical_index - ini_buy_order_num), self.critical_index)
+        ])
+        self.open_sell_orders.reset([
+            self.gen_order(_index, self.SELL) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
+        ])
         self._log_info('\n开始撒网\n')
         temp_buy_indices = [_each for _each in self.open_buy_orders]
         temp_sell_indices = [_each for _each in self.open_sell_orders]
@@ -927,8 +924,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 batch_buy_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.BUY,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_POC
@@ -941,8 +938,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 batch_sell_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.SELL,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_POC
@@ -1027,13 +1024,10 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         if this_order_index == self.max_index:
             self._log_info('达到网格上边界，退出策略')
 
-            self.open_sell_orders = []
+            self.open_sell_orders.clear()
             filled_sell_num = this_order_index - self.critical_index
             self._trading_statistics['filled_sell_order_num'] += filled_sell_num
-            adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                      self.all_grid_price[self.critical_index + 1:this_order_index + 1]])
-            self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-            self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+            self._fp.add_trade(self._fp.range_notional(self.all_grid_price[self.critical_index + 1:this_order_index + 1], self.grid_each_qty), self.symbol_maker_fee)
 
             # self._account_position_theory = calc(self._account_position_theory, calc(filled_sell_num, self.grid_each_qty, '*'), '-')
 
@@ -1056,33 +1050,26 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                     # 需要瞬间补上的订单数量
                     instant_post_num = this_order_index - self.critical_index
                     self._trading_statistics['filled_sell_order_num'] += instant_post_num
-                    adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                              self.all_grid_price[self.critical_index + 1:this_order_index + 1]])
-                    self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                    self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                    self._fp.add_trade(self._fp.range_notional(self.all_grid_price[self.critical_index + 1:this_order_index + 1], self.grid_each_qty), self.symbol_maker_fee)
 
                     # self._account_position_theory -= self.grid_each_qty
                     self._log_info('{}卖  {:2} 订单成交\t\t价格: {:<12}\tid: {:<10}'.format
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_post_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_post_num)
 
                     while True:
                         if len(instant_post_buy) < 5:
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1096,8 +1083,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1122,33 +1109,26 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                     # 下方买单成交，维护网格
                     instant_post_num = self.critical_index - this_order_index
                     self._trading_statistics['filled_buy_order_num'] += instant_post_num
-                    adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
-                                              self.all_grid_price[this_order_index:self.critical_index]])
-                    self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-                    self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+                    self._fp.add_trade(self._fp.range_notional(self.all_grid_price[this_order_index:self.critical_index], self.grid_each_qty), self.symbol_maker_fee)
 
                     # self._account_position_theory += self.grid_each_qty
                     self._log_info('{}买  {:2} 订单成交\t\t价格: {:<12}\tid: {:<10}'.format
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_post_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_post_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1162,8 +1142,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1210,15 +1190,11 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                     # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_reject_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_reject_num)
 
                     while True:
                         # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -1226,8 +1202,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1241,8 +1217,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1273,23 +1249,19 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_reject_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_reject_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
                                 posting_order['quantity'] = self.grid_each_qty
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -1303,8 +1275,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
                                     'quantity': self.grid_each_qty,
                                 } for each_info in instant_post_batch
@@ -1345,22 +1317,13 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             # 买单挂单维护
             open_buy_orders_num, open_sell_orders_num = len(self.open_buy_orders), len(self.open_sell_orders)
             if open_buy_orders_num > self.max_buy_order_num:
-                post_cancel, self.open_buy_orders = self.open_buy_orders[:self.buffer_buy_num], self.open_buy_orders[self.buffer_buy_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    if each_info['id'] in self.partially_filled_orders.keys():
-                        traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                        self._accumulated_pos_deviation -= traded_qty
-                        self.partially_filled_orders.pop(each_info['id'])
-
+                post_cancel = self.open_buy_orders.pop_bottom(self.buffer_buy_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
             elif open_buy_orders_num < self.min_buy_order_num:
                 if open_buy_orders_num == 0:
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+                    endpoint_index = self.open_buy_orders[0].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单
                 instant_add_num = self.buffer_buy_num if (self.min_buy_order_num - open_buy_orders_num < self.buffer_buy_num) \
@@ -1369,13 +1332,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 if endpoint_index > self.present_bottom_index:
                     # <= 时，下方挂单已经达到下边界，不补充挂单
                     filling_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(max(self.present_bottom_index, endpoint_index - instant_add_num), endpoint_index)
+                        self.gen_order(each_index, self.BUY) for each_index in range(max(self.present_bottom_index, endpoint_index - instant_add_num), endpoint_index)
                     ]
-                    self.open_buy_orders = filling_post_buy + self.open_buy_orders
+                    self.open_buy_orders.push_bottom(filling_post_buy)
                     while True:
                         if len(filling_post_buy) == 0:
                             break
@@ -1384,8 +1343,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.BUY,
                                 'quantity': self.grid_each_qty,
                             } for _info in filling_post_batch
@@ -1395,22 +1354,13 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
 
             # 卖单挂单维护
             if len(self.open_sell_orders) > self.max_sell_order_num:
-                self.open_sell_orders, post_cancel = self.open_sell_orders[:-self.buffer_sell_num], self.open_sell_orders[-self.buffer_sell_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    if each_info['id'] in self.partially_filled_orders.keys():
-                        traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                        self._accumulated_pos_deviation += traded_qty
-                        self.partially_filled_orders.pop(each_info['id'])
-
+                post_cancel = self.open_sell_orders.pop_top(self.buffer_sell_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
             elif len(self.open_sell_orders) < self.min_sell_order_num:
                 if len(self.open_sell_orders) == 0:
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_sell_orders[-1]['id'])[0]
+                    endpoint_index = self.open_sell_orders[-1].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单
                 instant_add_num = self.buffer_sell_num if (self.min_sell_order_num - open_sell_orders_num < self.buffer_sell_num) \
@@ -1419,13 +1369,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 if endpoint_index < self.max_index:
                     # 否则已经达到边界，不补充挂单
                     filling_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
                     ]
-                    self.open_sell_orders = self.open_sell_orders + filling_post_sell
+                    self.open_sell_orders.push_top(filling_post_sell)
                     while True:
                         if len(filling_post_sell) == 0:
                             break
@@ -1434,8 +1380,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.SELL,
                                 'quantity': self.grid_each_qty,
                             } for _info in filling_post_batch
@@ -1459,21 +1405,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             await self._post_market_order(self.BUY, self.filling_quantity)
 
             # 删除多余挂单
-            endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+            endpoint_index = self.open_buy_orders[0].index
             if endpoint_index < self.present_bottom_index:
                 cancel_num = self.present_bottom_index - endpoint_index
-                post_cancel, self.open_buy_orders = self.open_buy_orders[:cancel_num], self.open_buy_orders[cancel_num:]
+                post_cancel = self.open_buy_orders.pop_bottom(cancel_num)
                 # todo: 可能有一次性撤销挂单非常多的情况，gate还好，币安则要额外判断
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    if each_info['id'] in self.partially_filled_orders.keys():
-                        traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                        self._accumulated_pos_deviation -= traded_qty
-                        self.partially_filled_orders.pop(each_info['id'])
-
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
             self._grid_stair_step_up()
 
     async def _maintainer_by_index(self) -> None:
@@ -1488,21 +1425,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             await self._post_market_order(self.BUY, self.filling_quantity)
 
             # 删除多余挂单
-            endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+            endpoint_index = self.open_buy_orders[0].index
             if endpoint_index < self.present_bottom_index:
                 cancel_num = self.present_bottom_index - endpoint_index
-                post_cancel, self.open_buy_orders = self.open_buy_orders[:cancel_num], self.open_buy_orders[cancel_num:]
+                post_cancel = self.open_buy_orders.pop_bottom(cancel_num)
                 # todo: 可能有一次性撤销挂单非常多的情况，gate还好，币安则要额外判断
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    if each_info['id'] in self.partially_filled_orders.keys():
-                        traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                        self._accumulated_pos_deviation -= traded_qty
-                        self.partially_filled_orders.pop(each_info['id'])
-
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
             self._grid_stair_step_up()
 
     async def _terminate_trading(self, reason: str = '') -> None:
@@ -1565,9 +1493,15 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             self._bound_running_column = None
 
     async def _update_trading_statistics(self) -> None:
+        # 合并热路径中累计的成交量和手续费
+        add_volume, add_fees = self._fp.flush_trades()
+        if add_volume:
+            self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], add_volume, '+')
+            self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], add_fees, '+')
 
-        filled_trading_pair = min(self._trading_statistics['filled_buy_order_num'], self._trading_statistics['filled_sell_order_num'])
-        self._trading_statistics['matched_profit'] = calc(calc(filled_trading_pair, self.grid_price_step, '*'), calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*')
+        # 等差等量网格，配对收益只与买卖总成交次数有关，不需要逐格统计
+        self._trading_statistics['matched_profit'] = self._fp.to_value(MatchedProfitAccumulator.uniform_matched_units(
+            self._trading_statistics['filled_buy_order_num'], self._trading_statistics['filled_sell_order_num'], self._fp.to_ticks(self.grid_price_step), self.grid_each_qty))
 
         self._trading_statistics['realized_profit'] = calc(self._each_stair_profit, self.present_stair_num, '*')
 
@@ -1626,7 +1560,7 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             showing_texts += '当前正确仓位:\t\t{:<10}张\n'.format(self._current_valid_position)
             showing_texts += '累计计算仓位:\t\t{:<10}张\n'.format(self._account_position_theory)
             showing_texts += '累计仓位偏移:\t\t{:<10}张\n\n'.format(self._accumulated_pos_deviation)
-            showing_texts += '部分成交订单:\t\t{:<10}个挂单\n\n'.format(len(self.partially_filled_orders))
+            showing_texts += '部分成交订单:\t\t{:<10}个挂单\n\n'.format(len(self._partially_filled_orders()))
 
             showing_texts += '-' * 58
             showing_texts += '\n\n卖单挂单成交次数:\t{:<10}\n'.format(str(self._trading_statistics['filled_sell_order_num']))
@@ -1827,12 +1761,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                     self.indices_of_filling.pop(0)
                     self._grid_stair_step_up()
             # 获得 c index
-            for each_index, each_grid_price in enumerate(self.all_grid_price):
-                if each_grid_price <= self.current_symbol_price < (each_grid_price + self._x_price_abs_step):
-                    if self.current_symbol_price - each_grid_price <= self._x_price_abs_step / 2:
-                        self.critical_index = each_index
-                    else:
-                        self.critical_index = each_index + 1
+            nearest_index = nearest_grid_index(self.all_grid_price, self.current_symbol_price, self._x_price_abs_step)
+            if nearest_index != -1:
+                self.critical_index = nearest_index
             # 获得详细统计信息
             self._trading_statistics['waiting_start_time'] = stg_statistics['waiting_start_time']
             self._trading_statistics['strategy_start_time'] = stg_statistics['strategy_start_time']
@@ -1905,85 +1836,50 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         self._bound_running_column = None
 
     # functional methods
-    def _clean_accumulated_partial_orders(self) -> None:
+    def _partially_filled_orders(self) -> dict[str, int]:
         """
-        每次维护网格后，判断已累积的部分成交订单中，是否有距离过远的，
-        如果有，翻新该订单并将仓位偏移记录在变量中
-        :return:
+        本策略部分成交、仍在挂单中的普通网格挂单，成交数量由 executor 按私有成交累计
+        :return: {'id': filled_quantity}   注意买卖挂单数量均用绝对值
         """
-        # 条件执行该函数，可以不必要
-        if len(self.partially_orders_indices_list) == 0:
-            return
-        # 可以考虑买卖单距离判定不相等
-        if abs(self.critical_index - self.partially_orders_indices_list[0]) > min(self.min_buy_order_num, self.min_sell_order_num, 10):
-            if self.partially_orders_indices_list[0] < self.critical_index:
-                traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[self.gen_id(self.partially_orders_indices_list[0], self.BUY)]
-                self._accumulated_pos_deviation -= traded_qty
-                asyncio.create_task(self._renew_remote_partial_order(self.partially_orders_indices_list[0], self.BUY))
-            else:
-                traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[self.gen_id(self.partially_orders_indices_list[0], self.SELL)]
-                self._accumulated_pos_deviation += traded_qty
-                asyncio.create_task(self._renew_remote_partial_order(self.partially_orders_indices_list[0], self.SELL))
-
-        if len(self.partially_orders_indices_list) > 1:
-            if abs(self.critical_index - self.partially_orders_indices_list[-1]) > min(self.min_buy_order_num, self.min_sell_order_num, 10):
-                if self.partially_orders_indices_list[-1] < self.critical_index:
-                    traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[self.gen_id(self.partially_orders_indices_list[-1], self.BUY)]
-                    self._accumulated_pos_deviation -= traded_qty
-                    asyncio.create_task(self._renew_remote_partial_order(self.partially_orders_indices_list[-1], self.BUY))
-                else:
-                    traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[self.gen_id(self.partially_orders_indices_list[-1], self.SELL)]
-                    self._accumulated_pos_deviation += traded_qty
-                    asyncio.create_task(self._renew_remote_partial_order(self.partially_orders_indices_list[-1], self.SELL))
+        stg_id_prefix = self.stg_num + '_'
+        partial_orders: dict[str, int] = {}
+        for each_id, each_filled_qty in self._my_executor.get_partial_orders(self.symbol_name).items():
+            if each_id.startswith(stg_id_prefix) and self.parse_id(each_id)[0] not in (self.ENTRY_ORDER_ID, self.MARKET_ORDER_ID, self.adjusting_index):
+                partial_orders[each_id] = int(each_filled_qty)
+        return partial_orders
 
-    def _clean_accumulated_partial_orders_beta(self) -> None:
+    def _dealing_cancelled_partial_order(self, order_data_dict: dict) -> None:
         """
-        上一个方法的beta版，遍历原始字典，减少出错可能性
+        收到撤单成功时调用，以修正部分成交挂单带来的仓位影响
+        操作：订单已有成交但未全部成交时，已成交部分不再由网格维护，根据挂单方向记入仓位偏移
+        仓位修正挂单的成交已由仓位修正功能处理，不在此处修正
+        :param order_data_dict: 撤单成功信息，包含订单累计成交数量
         :return:
         """
-        if len(self.partially_filled_orders) == 0:
+        filled_qty = order_data_dict.get('filled_qty')
+        if not filled_qty or order_data_dict.get('left_qty') == 0:
             return
+        order_index, order_side = self.parse_id(order_data_dict['id'])
+        if order_index in (self.ENTRY_ORDER_ID, self.MARKET_ORDER_ID, self.adjusting_index, self._pre_adjusting_index):
+            return
+        if order_side == self.BUY:
+            self._accumulated_pos_deviation -= int(filled_qty)
+        else:
+            self._accumulated_pos_deviation += int(filled_qty)
+        self._log_info('部分成交订单已撤销，已成交 {} 张计入仓位偏移\tid: {:<10}'.format(filled_qty, order_data_dict['id']))
 
-        for each_id, each_left_qty in self.partially_filled_orders.items():
-            each_index, each_side = self.parse_id(each_id)
-            if abs(self.critical_index - each_index) > min(self.min_buy_order_num, self.min_sell_order_num, 10):
-                traded_qty = int(self.grid_each_qty) - each_left_qty
-                if each_side == self.BUY:
-                    self._accumulated_pos_deviation -= traded_qty
-                    asyncio.create_task(self._renew_remote_partial_order(each_index, self.BUY))
-                else:
-                    self._accumulated_pos_deviation += traded_qty
-                    asyncio.create_task(self._renew_remote_partial_order(each_index, self.SELL))
-
-    async def _renew_remote_partial_order(self, order_index: int, order_side: str) -> None:
+    def _dealing_cancelled_order_fill(self, order_data_dict: dict) -> None:
         """
-        使用协程来翻新订单，避免主功能函数时间阻塞
-        操作：撤销残缺订单，等待一定时间后，用新订单代替
-        :param order_index:
+        收到已撤销订单的成交时调用，该成交不会再由网格维护，根据挂单方向记入仓位偏移
+        :param order_data_dict: 成交信息
         :return:
         """
-        self._cannot_check_open_orders = True
-        renew_order_id = self.gen_id(order_index, order_side)
-
-        cancel_partial = Token.ORDER_INFO.copy()
-        cancel_partial['symbol'] = self.symbol_name
-        cancel_partial['id'] = renew_order_id
-
-        asyncio.create_task(self.command_transmitter(trans_command=cancel_partial, token=Token.TO_CANCEL))
-
-        time.sleep(0.8)
-
-        renew_order = Token.ORDER_INFO.copy()
-        renew_order['symbol'] = self.symbol_name
-        renew_order['id'] = renew_order_id
-        renew_order['price'] = self.all_grid_price[order_index]
-        renew_order['side'] = order_side
-        renew_order['quantity'] = self.grid_each_qty
-
-        asyncio.create_task(self.command_transmitter(trans_command=renew_order, token=Token.TO_POST_POC))
-
-        time.sleep(0.4)
-        self._cannot_check_open_orders = False
+        filled_qty = int(abs(order_data_dict['quantity']))
+        if self.parse_id(order_data_dict['id'])[1] == self.BUY:
+            self._accumulated_pos_deviation -= filled_qty
+        else:
+            self._accumulated_pos_deviation += filled_qty
+        self._log_info('已撤销订单收到成交，{} 张计入仓位偏移\tid: {:<10}'.format(filled_qty, order_data_dict['id']))
 
     async def _check_position(self) -> None:
         """
@@ -2000,34 +1896,27 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         :return:
         """
         start_t = self._running_loop.time()
-        current_account_qty = await self._my_executor.get_symbol_position(self.symbol_name)     # todo: 测试延时
+        # 优先使用 executor 按成交累计的仓位，与策略仓位一致时不需要等待网络请求
+        current_account_qty = self._my_executor.get_cached_position(self.symbol_name)
+        if current_account_qty is None or self._position_deviation(current_account_qty) != 0:
+            # 账本仓位不可用或存在仓位偏移时，以 rest 仓位为准
+            current_account_qty = await self._my_executor.get_symbol_position(self.symbol_name)     # todo: 测试延时
         end_t = self._running_loop.time()
         elapsed_t_ms = int((end_t - start_t) * 1000)
         self._log_info('>>> 获取仓位耗时: {} ms'.format(elapsed_t_ms))
 
-        self.derive_valid_position()
+        fix_qty = self._position_deviation(current_account_qty)
         self._log_info('\n### 执行仓位修正:')
         # self._log_info('### 账户初始仓位:\t\t{}\t张'.format(self._init_account_position))
         self._log_info('### 累计理论当前仓位:\t\t{}\t张'.format(self._account_position_theory))
         self._log_info('### 账户实际当前仓位:\t\t{}\t张\n'.format(current_account_qty))
         # 这两行不相等，说明正向理论计算当前仓位存在遗漏或者偏差
 
-        # todo: 统计部分成交订单带来的仓位偏移，该变量
-        partial_order_pos_dev: int = 0
-        if len(self.partially_filled_orders) > 0:
-            for each_id, each_qty in self.partially_filled_orders.items():
-                if self.parse_id(each_id)[1] == self.BUY:
-                    # 部分买单成交表示需要立即卖出，因此为负数
-                    partial_order_pos_dev -= each_qty
-                else:
-                    partial_order_pos_dev += each_qty
-
         # self._log_info('### 除去已知偏差后:\t\t{}\t张'.format(str(self._account_position_theory + self._accumulated_pos_deviation)))
         self._log_info('### 策略当前正确仓位:\t\t{}\t张'.format(self._current_valid_position))
-        self._log_info('### 当前矫正后仓位: \t\t{}\t张'.format(str(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev)))
+        self._log_info('### 当前矫正后仓位: \t\t{}\t张'.format(str(self._current_valid_position + fix_qty)))
         # 后两行如果不相等，则表示反向计算累计仓位偏移不完备，存在未知的仓位偏移来源
 
-        fix_qty = int(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev - self._current_valid_position)
         # fix_qty 大于 0 表示 修正后 账户多余仓位，小于0 表示 修正后 账户缺少仓位
 
         if fix_qty == 0:
@@ -2042,6 +1931,22 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             self._accumulated_pos_deviation -= fix_qty
             # self._log_info('### 已记录')
 
+    def _position_deviation(self, current_account_qty: int) -> int:
+        """
+        计算除去已知仓位偏移和部分成交挂单后，账户仓位与策略正确仓位的差值，不需要网络请求
+        :param current_account_qty: 账户当前仓位
+        :return: 大于 0 表示 修正后 账户多余仓位，小于0 表示 修正后 账户缺少仓位
+        """
+        self.derive_valid_position()
+        partial_order_pos_dev: int = 0
+        for each_id, each_filled_qty in self._partially_filled_orders().items():
+            if self.parse_id(each_id)[1] == self.BUY:
+                # 部分买单成交的数量已计入账户仓位，策略正确仓位尚未变化，因此为负数
+                partial_order_pos_dev -= each_filled_qty
+            else:
+                partial_order_pos_dev += each_filled_qty
+        return int(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev - self._current_valid_position)
+
     async def _check_open_orders(self) -> None:
         """
         协程方式检查策略挂单，将挂单修正至正常
@@ -2077,12 +1982,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 await asyncio.sleep(1)
 
                 self.current_symbol_price = await self._my_executor.get_current_price(self.symbol_name)
-                for each_index, each_grid_price in enumerate(self.all_grid_price):
-                    if each_grid_price <= self.current_symbol_price < (each_grid_price + self._x_price_abs_step):
-                        if self.current_symbol_price - each_grid_price <= self._x_price_abs_step / 2:
-                            self.critical_index = each_index
-                        else:
-                            self.critical_index = each_index + 1
+                nearest_index = nearest_grid_index(self.all_grid_price, self.current_symbol_price, self._x_price_abs_step)
+                if nearest_index != -1:
+                    self.critical_index = nearest_index
 
                 self.derive_valid_position()
 
@@ -2106,13 +2008,7 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
 
         account_orders_list = [each_info['stg_id'] for each_info in account_open_orders]
         account_orders_list_id = [str(each_info['server_id']) for each_info in account_open_orders]
-        # 重新更新部分成交挂单信息
-        self.partially_filled_orders = {}
-        for each_info in account_open_orders:
-            if each_info['size'] != each_info['left_qty']:
-                self.partially_filled_orders[each_info['stg_id']] = abs(each_info['left_qty'])
-
-        stg_open_orders: list[str] = [each_order['id'] for each_order in self.open_buy_orders] + [each_order['id'] for each_order in self.open_sell_orders]
+        stg_open_orders: list[str] = self.open_buy_orders.id_list() + self.open_sell_orders.id_list()
         # 剔除特殊挂单
         market_ioc_buy, market_ioc_sell = self.gen_id(self.MARKET_ORDER_ID, self.BUY), self.gen_id(self.MARKET_ORDER_ID, self.SELL)
         for each_i, each_stg_id in enumerate(account_orders_list):
@@ -2128,21 +2024,21 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             self._need_fix_order = False
             return
 
+        # 使用集合对账，不在 list 中逐个查找
+        stg_open_ids, account_open_ids = set(stg_open_orders), set(account_orders_list)
         # 勤快方法
         exist_redundant_order, exist_missing_order = False, False
+        redundant_ids = []
         for each_index, each_account_order_id in enumerate(account_orders_list):
-            if each_account_order_id not in stg_open_orders:
+            if each_account_order_id not in stg_open_ids:
                 real_id = account_orders_list_id[each_index]
                 self._log_info('$$$ 检测到多余挂单，撤销挂单\t\tid: {:<12}\tid: {:<10}'.format(real_id, each_account_order_id))
                 exist_redundant_order = True
-
-                cancel_cmd = Token.ORDER_INFO.copy()
-                cancel_cmd['symbol'] = self.symbol_name
-                cancel_cmd['id'] = real_id
-                asyncio.create_task(self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL))
+                redundant_ids.append(real_id)
+        await self._post_cancel_batch(redundant_ids)
 
         for each_stg_order_id in stg_open_orders:
-            if each_stg_order_id not in account_orders_list:
+            if each_stg_order_id not in account_open_ids:
                 self._log_info('$$$ 检测到缺失挂单，补充挂单\t\t\tid: {:<10}'.format(each_stg_order_id))
                 exist_missing_order = True
 
@@ -2177,61 +2073,6 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                 self._need_fix_order = True
             await asyncio.sleep(interval_time)
 
-    async def _dealing_partial_order(self, order_data_dict: dict) -> bool:
-        """
-        用于处理部分成交的订单，操作：
-        如果该订单已被记录，则根据交易量判断订单是否全部完成，已完成则删除记录，未完成则更新信息
-        如果未被记录，则增添记录
-        :param order_data_dict: 部分成交订单的订单信息
-        :return: True, 订单已全部完成，交给处理。False, 订单未全部完成，继续等待，不操作
-        """
-        fully_fulfilled = False
-
-        filled_qty = int(abs(order_data_dict['quantity']))
-
-        if order_data_dict['side'] == self.BUY:
-            self._account_position_theory += filled_qty
-        else:
-            self._account_position_theory -= filled_qty
-
-        partial_order_id = order_data_dict['id']
-        if partial_order_id in self.partially_filled_orders.keys():
-
-            ini_left_qty = self.partially_filled_orders[partial_order_id]
-
-            left_qty = ini_left_qty - filled_qty
-            if left_qty > 0:
-                self.partially_filled_orders[partial_order_id] = left_qty
-                self._log_info('订单再次部分成交!\t\t价格: {:<12}\tid: {:<10}'.format(order_data_dict['price'], partial_order_id))
-                self._log_info('剩余 {} 张'.format(left_qty))
-            elif left_qty == 0:
-                # 订单已完成
-                self.partially_filled_orders.pop(partial_order_id)
-                # self.partially_orders_indices_list.remove(self.parse_id(partial_order_id)[0])
-
-                fully_fulfilled = True
-            else:
-                self._log_info('error: left qty < 0, plz check code!')
-                self._log_info('{} : {} = {} - {}'.format(partial_order_id, left_qty, ini_left_qty, filled_qty))
-                # 在极高频的情况下，有可能会出现这种情况，比如adjusting order 维护不到位导致普通挂单数量不正常，此时也剔除该记录
-                self.partially_filled_orders.pop(partial_order_id)
-                # self.partially_orders_indices_list.remove(self.parse_id(partial_order_id)[0])
-
-        else:
-            left_qty = int(self.grid_each_qty) - filled_qty
-            if left_qty < 0:
-                self._log_info('error: got an normal order but traded quantity abnormal !')
-                self._log_info('order: {}, filled qty: {}'.format(partial_order_id, filled_qty))
-                return False
-            self.partially_filled_orders[partial_order_id] = left_qty
-            # self.partially_orders_indices_list.append(self.parse_id(partial_order_id)[0])
-            # self.partially_orders_indices_list.sort()
-
-            self._log_info('\n订单部分成交!!\t\t价格: {:<12}\tid: {:<10}'.format(order_data_dict['price'], partial_order_id))
-            self._log_info('剩余 {} 张'.format(left_qty))
-
-        return fully_fulfilled
-
     async def _dealing_ENTRY_ORDER(self, order_data_dict: dict) -> None:
         """
         处理入场挂单，计算挂单剩余数量，如果为0，则表示全部成交，开启网格
@@ -2349,7 +2190,6 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         """
         # 挂单处理相关
         self._need_fix_order = False
-        self.partially_filled_orders: dict[str, int] = {}
         self._cannot_check_open_orders = False
 
         # 仓位矫正相关
@@ -2431,13 +2271,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                                 adjusting_id = self.open_buy_orders[-1]['id']      # 买 1 订单
                                 self.adjusting_index = self.parse_id(adjusting_id)[0]
                                 self._adjusting_order_side = self.BUY
-                                if adjusting_id in self.partially_filled_orders.keys():
+                                adjusting_filled_qty = self._my_executor.get_partial_orders(self.symbol_name).get(adjusting_id)
+                                if adjusting_filled_qty:
                                     self._log_info('### 罕见: 部分成交挂单作为仓位修正挂单')
-                                    self._adjusting_qty_target = self._adjusting_qty_left = int(self.partially_filled_orders[adjusting_id]) + int(self._accumulated_pos_deviation)
-                                    self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                     # 此后该部分成交挂单就交给特殊仓位修正挂单功能处理
-                                    self.partially_filled_orders.pop(adjusting_id)
-                                    # self.partially_orders_indices_list.remove(self.adjusting_index)
+                                    self._adjusting_qty_target = self._adjusting_qty_left = int(self.grid_each_qty) - int(adjusting_filled_qty) + int(self._accumulated_pos_deviation)
+                                    self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                 else:
                                     self._adjusting_qty_target = self._adjusting_qty_left = int(self.grid_each_qty) + int(self._accumulated_pos_deviation)
                                     self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
@@ -2460,13 +2299,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                             adjusting_id = self.open_sell_orders[0]['id']     # 卖 1 订单
                             self.adjusting_index = self.parse_id(adjusting_id)[0]
                             self._adjusting_order_side = self.SELL
-                            if adjusting_id in self.partially_filled_orders.keys():
+                            adjusting_filled_qty = self._my_executor.get_partial_orders(self.symbol_name).get(adjusting_id)
+                            if adjusting_filled_qty:
                                 self._log_info('### 罕见: 部分成交挂单作为仓位修正挂单')
-                                self._adjusting_qty_target = self._adjusting_qty_left = int(self.partially_filled_orders[adjusting_id]) + int(abs(self._accumulated_pos_deviation))
-                                self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                 # 此后该部分成交挂单就交给特殊仓位修正挂单功能处理
-                                self.partially_filled_orders.pop(adjusting_id)
-                                # self.partially_orders_indices_list.remove(self.adjusting_index)
+                                self._adjusting_qty_target = self._adjusting_qty_left = int(self.grid_each_qty) - int(adjusting_filled_qty) + int(abs(self._accumulated_pos_deviation))
+                                self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                             else:
                                 self._adjusting_qty_target = self._adjusting_qty_left = int(self.grid_each_qty) + int(abs(self._accumulated_pos_deviation))
                                 self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
@@ -2586,18 +2424,30 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                     await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
 
             else:
-                # 其他订单，维护网格
-                order_qty: int = abs(recv_data_dict['quantity'])
-                if order_qty == self.grid_each_qty:
-                    if order_side == self.BUY:
-                        self._account_position_theory += int(self.grid_each_qty)
-                    else:
-                        self._account_position_theory -= int(self.grid_each_qty)
+                # 其他订单，每笔成交更新仓位，订单全部成交后维护网格
+                filled_qty: int = abs(recv_data_dict['quantity'])
+                left_qty = recv_data_dict.get('left_qty')
+                if left_qty is None:
+                    # executor 不知道订单原始数量，按网格数量计算剩余数量
+                    left_qty = int(self.grid_each_qty) - recv_data_dict.get('filled_qty', filled_qty)
+
+                if order_side == self.BUY:
+                    self._account_position_theory += filled_qty
+                else:
+                    self._account_position_theory -= filled_qty
+
+                if recv_data_dict.get('order_status') == OrderState.CANCELLED:
+                    # 撤单成功先于该成交到达，撤单时没有计入这部分成交
+                    self._dealing_cancelled_order_fill(recv_data_dict)
+                elif left_qty == 0:
                     await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
+                elif left_qty > 0:
+                    self._log_info('\n订单部分成交!!\t\t价格: {:<12}\tid: {:<10}'.format(recv_data_dict['price'], recv_data_dict['id']))
+                    self._log_info('剩余 {} 张'.format(left_qty))
                 else:
-                    order_fulfilled = await self._dealing_partial_order(recv_data_dict)
-                    if order_fulfilled:
-                        await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
+                    # 在极高频的情况下，有可能会出现这种情况，比如adjusting order 维护不到位导致普通挂单数量不正常
+                    self._log_info('error: got an normal order but traded quantity abnormal !')
+                    self._log_info('order: {}, filled qty: {}, left qty: {}'.format(recv_data_dict['id'], filled_qty, left_qty))
 
         elif recv_data_dict['status'] == Token.POST_SUCCESS:
             self._log_info('收到挂单成功信息\t\t价格: {:<12}\tid: {:<10}'.format(str(float(recv_data_dict['price'])), recv_data_dict['id']))
@@ -2607,9 +2457,11 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
 
         elif recv_data_dict['status'] == Token.CANCEL_SUCCESS:
             self._log_info('收到撤单成功信息\t\t\t\tid: {:<10}'.format(recv_data_dict['id']))
+            self._dealing_cancelled_partial_order(recv_data_dict)
 
         elif recv_data_dict['status'] == Token.CANCEL_POC_SUCCESS:
             self._log_info('收到poc撤单成功信息\t\t\t\tid: {:<10}'.format(recv_data_dict['id']))
+            self._dealing_cancelled_partial_order(recv_data_dict)
 
         elif recv_data_dict['status'] == Token.PARTIALLY_FILLED:
             self._log_info('\nerror: invalid info received, plz check code\n')
@@ -2626,7 +2478,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
                     pass
 
         elif recv_data_dict['status'] == Token.UNIDENTIFIED:
-            pass
+            # 请求超时未返回，不确定是否成功，由挂单检查修正
+            self._log_info('\n{}，需要检查挂单\t\tid: {:<10}'.format(append_info, recv_data_dict['id']))
+            self._need_fix_order = True
         elif recv_data_dict['status'] == Token.FAILED:
             pass
         elif recv_data_dict['status'] == Token.POST_FAILED:
@@ -2674,6 +2528,19 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         elif recv_data_dict['status'] == Token.TEMP_TOKEN:
             pass
 
+    async def _post_cancel_batch(self, cancel_ids: list[str]) -> None:
+        """
+        批量撤销挂单，一次发送所有撤单请求，由 executor 按交易所上限分批
+        :param cancel_ids: 需要撤销的挂单 id
+        :return:
+        """
+        if not cancel_ids:
+            return
+        batch_cancel_cmd = Token.BATCH_ORDER_INFO.copy()
+        batch_cancel_cmd['orders'] = [{'symbol': self.symbol_name, 'id': each_id} for each_id in cancel_ids]
+        batch_cancel_cmd['status'] = Token.TO_CANCEL_BATCH
+        await self.command_transmitter(trans_command=batch_cancel_cmd, token=Token.TO_CANCEL_BATCH)
+
     async def command_transmitter(self, trans_command: dict = None, token: str = None) -> None:
         command_dict = Token.ORDER_INFO.copy()
         command_dict['symbol'] = self.symbol_name
@@ -2702,6 +2569,8 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_BATCH_POC:
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
+        elif token == Token.TO_CANCEL_BATCH:
+            asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_MARKET:
             command_dict['side'] = trans_command['side']
             command_dict['id'] = self.gen_id(self.MARKET_ORDER_ID, trans_command['side'])
@@ -2756,8 +2625,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             if self.all_grid_price[self.present_bottom_index] < self.current_symbol_price < self._x_grid_up_limit:
                 # 新检测方法
                 if self.critical_index >= 1:
-                    if abs(calc(self.current_symbol_price, self.all_grid_price[self.critical_index], '-')) > \
-                            5 * calc(self.all_grid_price[self.critical_index], self.all_grid_price[self.critical_index - 1], '-'):
+                    to_ticks = self._fp.to_ticks
+                    if abs(to_ticks(self.current_symbol_price) - to_ticks(self.all_grid_price[self.critical_index])) > \
+                            5 * (to_ticks(self.all_grid_price[self.critical_index]) - to_ticks(self.all_grid_price[self.critical_index - 1])):
                         self._log_info('$$$ 检测到价格偏离，未收到挂单成交信息')
                         self._log_info('$$$ 当前ticker价: {}\t\t网格critical价: {}'.format(self.current_symbol_price, self.all_grid_price[self.critical_index]))
                         self._need_fix_order = True
@@ -2772,6 +2642,12 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
             # 如果订单成交迅速，ticker收信为 1s，判断也比较频繁
             if self._accumulated_pos_deviation != 0:
                 self._need_adjust_pos = True
+            elif self._layout_complete and self.adjusting_index == -1 and not self._need_adjust_pos:
+                # executor 按成交累计的仓位不需要网络请求，与策略仓位不一致时才开启仓位修正
+                ledger_position = self._my_executor.get_cached_position(self.symbol_name)
+                if ledger_position is not None and self._position_deviation(ledger_position) != 0:
+                    self._log_info('>>> 成交仓位与策略仓位不一致，需要修正仓位')
+                    self._need_adjust_pos = True
 
             # === 核心功能 === # 超过某个固定时间仍未收到ticker信息，则此时交易不剧烈，可以做额外操作
             if self._ticker_delay_timer:
@@ -2785,23 +2661,15 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
 
     # tool methods
     def gen_id(self, self_index: int, side: str) -> str:
-        self_id = self.stg_num + '_' + str.zfill(str(self_index), 8) + side
-        return self_id
+        return self._id_codec.encode(self.stg_num, self_index, side)
 
-    @staticmethod
-    def parse_id(client_id: str) -> tuple[int, str]:
-        internal_client_id = client_id.split('_')[-1]
-        try:
-            order_index = int(internal_client_id[:8])
-            order_side = internal_client_id[8:]
-        except ValueError:
-            order_index = -1
-            order_side = client_id
+    def gen_order(self, self_index: int, side: str) -> GridOrder:
+        return GridOrder(self.gen_id(self_index, side), self_index, side, 'NEW', self.gen_timestamp())
 
-        return order_index, order_side
+    def parse_id(self, client_id: str) -> tuple[int, str]:
+        return self._id_codec.decode(client_id)
 
-    @staticmethod
-    def unmatched_profit_calc(initial_index: int, current_index: int, all_prices: tuple[float | int], each_grid_qty: float,
+    def unmatched_profit_calc(self, initial_index: int, current_index: int, all_prices: tuple[float | int], each_grid_qty: float,
                               init_pos_price: float, init_pos_qty: float, current_price: float) -> float:
         """
         新式便携计算器，可以计算超出区间的网格未配对盈亏
@@ -2815,12 +2683,19 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         :param current_price: 当前最新价格
         :return: 返回盈亏 和 平均持仓价格
         """
+        if all_prices is self.all_grid_price and self._grid_index is not None:
+            # 策略网格本身，使用前缀和索引，常数时间
+            return self._grid_index.uniform_unmatched_profit(initial_index, current_index, self._fp.to_lots(each_grid_qty),
+                                                             init_pos_price, self._fp.to_lots(init_pos_qty), current_price)
         if initial_index == -1:
             initial_index = len(all_prices) - 1
         if current_index == -1:
             current_index = len(all_prices) - 1
 
-        part_1 = calc(calc(current_price, init_pos_price, '-'), init_pos_qty, '*')
+        # 全部使用定点整数计算，价格为tick数，数量为合约张数
+        to_ticks = self._fp.to_ticks
+        current_ticks = to_ticks(current_price)
+        part_1 = (current_ticks - to_ticks(init_pos_price)) * self._fp.to_lots(init_pos_qty)
         if current_index > initial_index + 1:
             price_slice = all_prices[initial_index + 1:current_index]
         elif current_index < initial_index - 1:
@@ -2828,9 +2703,9 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         else:
             price_slice = []
 
-        part_2 = calc(-abs(calc(calc_sum(price_slice), calc(len(price_slice), current_price, '*'), '-')), each_grid_qty, '*')
+        part_2 = -abs(sum([to_ticks(each_price) for each_price in price_slice]) - len(price_slice) * current_ticks) * self._fp.to_lots(each_grid_qty)
 
-        return calc(part_1, part_2, '+')
+        return self._fp.to_value(part_1 + part_2)
 
     def nonlinear_grid_price_calc(self, min_grid_step: float, max_grid_step: float, top_start_price: float,
                                   lower_price_limit: float, alpha: float) -> tuple[float | int]:
@@ -2894,9 +2769,7 @@ class NonlinearStairGridAnalyzerFuturesBeta(Analyzer):
         """
 
         x_series = np.linspace(1 / N, 1, N)
-        all_diffs = np.power(x_series, alpha) * max_diff
-        for index, _ in enumerate(all_diffs):
-            all_diffs[index] = self.round_step_precision(all_diffs[index], self.symbol_price_min_step)
+        all_diffs = round_step_precision_array(np.power(x_series, alpha) * max_diff, self.symbol_price_min_step)
         # 这里的求和可能仍然存在精度问题，不过无关紧要
         # print(all_diffs)
         return float(np.sum(all_diffs)), list(all_diffs)
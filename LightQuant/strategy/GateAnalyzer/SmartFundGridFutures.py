@@ -8,6 +8,10 @@ import numpy as np
 import pandas as pd
 from LightQuant.tools.calc import calc, calc_sum
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_index import GridIndex
+from LightQuant.tools.grid_store import GridStore
+from LightQuant.tools.grid_locator import floor_grid_index
+from LightQuant.tools.matched_profit import MatchedProfitAccumulator
 from .SmartGridFutures import SmartGridAnalyzerFutures
 
 
@@ -219,10 +223,8 @@ class SmartFundGridAnalyzerFutures(SmartGridAnalyzerFutures):
         list_critical_indices = [0] * len(list_callback_ratio)
         list_prices = [round_step_size(calc(self.entry_grid_price, 1 - each_ratio, '*'), self.symbol_price_min_step) for each_ratio in list_callback_ratio]
         list_callback_losses = [0.] * len(list_callback_ratio)
-        for p_index, _ in enumerate(self.all_grid_price):
-            for _index, _price in enumerate(list_prices):
-                if self.all_grid_price[p_index] <= _price < self.all_grid_price[p_index + 1]:
-                    list_critical_indices[_index] = p_index
+        for _index, _price in enumerate(list_prices):
+            list_critical_indices[_index] = max(floor_grid_index(self.all_grid_price, _price), 0)
         # print(list_prices, '\n', list_critical_indices)
         for index in range(len(list_callback_losses)):
             list_callback_losses[index] = self.unmatched_profit_calc(
@@ -361,11 +363,14 @@ class SmartFundGridAnalyzerFutures(SmartGridAnalyzerFutures):
         down_grid_qty = [up_grid_qty[0]] * (self.lower_grid_step_num + 1)  # 包含 base index
         self.all_grid_quantity = tuple(down_grid_qty + up_grid_qty)
         self.entry_grid_qty = sum(up_grid_qty)
+        self._grid_store = GridStore(self.all_grid_price, self.all_grid_quantity)
+        self.all_grid_price, self.all_grid_quantity = self._grid_store.prices, self._grid_store.quantities
+        self._grid_index = GridIndex(self._fp, self.all_grid_price, self.all_grid_quantity)
         # print('len prices = {}, len qty = {}'.format(len(self.all_grid_price), len(self.all_grid_quantity)))
 
         # 更新初始统计变量
-        self._all_grid_buy_num = [0] * len(self.all_grid_price)
-        self._all_grid_sell_num = [0] * len(self.all_grid_price)
+        self._all_grid_buy_num, self._all_grid_sell_num = self._grid_store.buy_num, self._grid_store.sell_num
+        self._matched_profit = MatchedProfitAccumulator(self._fp, self._all_grid_buy_num, self._all_grid_sell_num)
         self._each_stair_profit = [self.unmatched_profit_calc(
             initial_index=self.entry_index,
             current_index=self.present_step_up_index,
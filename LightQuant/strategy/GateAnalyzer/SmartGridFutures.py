@@ -12,6 +12,15 @@ from LightQuant.Preserver import Preserver
 from LightQuant.Recorder import LogRecorder
 from LightQuant.tools.calc import calc, calc_sum
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_calc import isometric_grid_prices
+from LightQuant.tools.grid_locator import ceil_grid_index, floor_grid_index
+from LightQuant.tools.fixed_point import FixedPoint
+from LightQuant.tools.grid_index import GridIndex
+from LightQuant.tools.grid_store import GridStore
+from LightQuant.tools.matched_profit import MatchedProfitAccumulator
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.order_state import OrderState
+from LightQuant.tools.open_order_book import GridOrder, OpenOrderBook
 from LightQuant.Analyzer import Analyzer
 from LightQuant.Executor import Executor
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
@@ -96,6 +105,12 @@ class SmartGridAnalyzerFutures(Analyzer):
         # 手续费
         self.symbol_maker_fee = 0
         self.symbol_taker_fee = 0
+        # 定点数计算器，获取交易规则后创建
+        self._fp: FixedPoint = None
+        # 网格前缀和索引，用于快速计算未配对盈亏
+        self._grid_index: GridIndex = None
+        # 网格价格、数量和买卖成交次数的可增长存储，all_grid_price 等变量为其中数组的引用
+        self._grid_store: GridStore = None
 
         # ==================== 策略功能相关变量 ==================== #
         # noinspection PyTypeChecker
@@ -160,17 +175,11 @@ class SmartGridAnalyzerFutures(Analyzer):
         self._batch_orders_num = 10
         # 策略布撒网格完成
         self._layout_complete = False
+        # 订单 id 编解码，缓存已生成的 id
+        self._id_codec = ClientIdCodec(8)
         # 定义了买卖单存储方式
-        self.open_buy_orders = [{
-            'id': '00032BUY',
-            'status': 'NEW',
-            'time': None
-        }, ]
-        self.open_sell_orders = [{
-            'id': '00032SELL',
-            'status': 'FILLED',
-            'time': None
-        }, ]
+        self.open_buy_orders = OpenOrderBook([GridOrder('00032BUY', *self.parse_id('00032BUY'))])
+        self.open_sell_orders = OpenOrderBook([GridOrder('00032SELL', *self.parse_id('00032SELL'), status='FILLED')])
 
         # ==================== 策略统计相关变量 ==================== #
         # 当前最新价格，实时更新，要求最新
@@ -179,6 +188,8 @@ class SmartGridAnalyzerFutures(Analyzer):
         # 存储所有网格的买入卖出数量，用于计算套利收益，长度和网格数量，价格一致，同时更新
         self._all_grid_buy_num: list[int] = []
         self._all_grid_sell_num: list[int] = []
+        # 增量配对收益计算器，引用上面两个 list，成交时标记脏位置
+        self._matched_profit: MatchedProfitAccumulator = None
 
         # 策略开始前，账户存量仓位，策略结束后，需要回归该数字
         self._init_account_position: int = 0
@@ -213,11 +224,6 @@ class SmartGridAnalyzerFutures(Analyzer):
         }
 
         # ==================== 特殊功能相关变量 ==================== #
-        # 部分成交订单处理  {'id': int}   order_id, left_quantity   注意买卖挂单数量均用绝对值储存
-        self.partially_filled_orders: dict[str, int] = {}
-        # 按大小顺序？存储部分成交订单index list, 用于判断距离并定时处理
-        self.partially_orders_indices_list: list[int] = []
-
         # 策略需要马上修正挂单，该变量也充当类似开关功能
         self._need_fix_order: bool = False
         # noinspection PyTypeChecker
@@ -300,6 +306,7 @@ class SmartGridAnalyzerFutures(Analyzer):
             self.symbol_min_notional = 0
             self.symbol_order_price_div = self.symbol_info['order_price_deviate']
             self.symbol_orders_limit_num = self.symbol_info['orders_limit']
+            self._fp = FixedPoint(self.symbol_price_min_step, self.symbol_quantity_min_step)
             return True
 
     async def validate_param(self, input_params: dict, acquire_params: bool = True) -> dict:
@@ -482,10 +489,8 @@ class SmartGridAnalyzerFutures(Analyzer):
         list_critical_indices = [0] * len(list_callback_ratio)
         list_prices = [round_step_size(calc(self.entry_grid_price, 1 - each_ratio, '*'), self.symbol_price_min_step) for each_ratio in list_callback_ratio]
         list_callback_losses = [0.] * len(list_callback_ratio)
-        for p_index, _ in enumerate(self.all_grid_price):
-            for _index, _price in enumerate(list_prices):
-                if self.all_grid_price[p_index] <= _price < self.all_grid_price[p_index + 1]:
-                    list_critical_indices[_index] = p_index
+        for _index, _price in enumerate(list_prices):
+            list_critical_indices[_index] = max(floor_grid_index(self.all_grid_price, _price), 0)
         # print(list_prices, '\n', list_critical_indices)
         for index in range(len(list_callback_losses)):
             list_callback_losses[index] = self.unmatched_profit_calc(
@@ -637,11 +642,14 @@ class SmartGridAnalyzerFutures(Analyzer):
         down_grid_qty = [up_grid_qty[0]] * (self.lower_grid_step_num + 1)  # 包含 base index
         self.all_grid_quantity = tuple(down_grid_qty + up_grid_qty)
         self.entry_grid_qty = sum(up_grid_qty)
+        self._grid_store = GridStore(self.all_grid_price, self.all_grid_quantity)
+        self.all_grid_price, self.all_grid_quantity = self._grid_store.prices, self._grid_store.quantities
+        self._grid_index = GridIndex(self._fp, self.all_grid_price, self.all_grid_quantity)
         # print('len prices = {}, len qty = {}'.format(len(self.all_grid_price), len(self.all_grid_quantity)))
 
         # 更新初始统计变量
-        self._all_grid_buy_num = [0] * len(self.all_grid_price)
-        self._all_grid_sell_num = [0] * len(self.all_grid_price)
+        self._all_grid_buy_num, self._all_grid_sell_num = self._grid_store.buy_num, self._grid_store.sell_num
+        self._matched_profit = MatchedProfitAccumulator(self._fp, self._all_grid_buy_num, self._all_grid_sell_num)
         self._each_stair_profit = [self.unmatched_profit_calc(
             initial_index=self.entry_index,
             current_index=self.present_step_up_index,
@@ -812,13 +820,15 @@ class SmartGridAnalyzerFutures(Analyzer):
             raise ValueError('已达到策略台阶上限，不可调用')
             return
         upward_grid_num = self.present_step_up_index - self.present_base_index
+        former_bottom_index = self.present_bottom_index
 
-        self.all_grid_price = (0,) * (self.indices_of_filling[0] - len(self.all_lower_prices[self.present_stair_num])) + \
-                              self.all_lower_prices[self.present_stair_num] + self.all_grid_price[self.indices_of_filling[0]:]
-
-        self.all_grid_quantity = (0,) * (self.indices_of_filling[0] - len(self.all_lower_prices[self.present_stair_num])) + \
-                                 (self.all_grid_quantity[self.indices_of_filling[0] + 1],) * (len(self.all_lower_prices[self.present_stair_num]) + 1) + \
-                                 self.all_grid_quantity[self.indices_of_filling[0] + 1:]
+        # 原地改写下方区域：新底部以下置0，写入下方价格，补仓点及以下数量与补仓点上一格相同。原底部以下均为0，不需要改写
+        new_lower_prices = self.all_lower_prices[self.present_stair_num]
+        new_bottom_index = self.indices_of_filling[0] - len(new_lower_prices)
+        self._grid_store.clear(min(former_bottom_index, new_bottom_index), new_bottom_index)
+        self._grid_store.write_prices(new_bottom_index, new_lower_prices)
+        self._grid_store.write_quantities(new_bottom_index, (self.all_grid_quantity[self.indices_of_filling[0] + 1],) * (len(new_lower_prices) + 1))
+        self._grid_index.rewrite_lower(former_bottom_index, self.indices_of_filling[0] + 1, self.all_grid_price, self.all_grid_quantity)
 
         self.present_base_index += upward_grid_num
         self.present_bottom_index = self.present_base_index - len(self.all_lower_prices[self.present_stair_num])
@@ -831,7 +841,7 @@ class SmartGridAnalyzerFutures(Analyzer):
 
         # 增添统计数据，并更新
         self._trading_statistics['realized_profit'] = calc(self._trading_statistics['realized_profit'], self._each_stair_profit[self.present_stair_num], '+')
-        self._all_grid_sell_num[:self.present_base_index + 1] = [0] * (self.present_base_index + 1)
+        self._grid_store.clear_sells(self.present_base_index + 1)
 
         self.present_stair_num += 1
         self.indices_of_filling.pop(0)
@@ -887,13 +897,12 @@ class SmartGridAnalyzerFutures(Analyzer):
             fund=calc(self.all_filling_prices[self.saved_stair_num], calc(self.all_filling_quantities[self.saved_stair_num], self.symbol_quantity_min_step, '*'), '*')
         ))[:len(add_grid_price)]
 
-        self.all_grid_price += tuple(add_grid_price)
-        self.all_grid_quantity += add_grid_qty
+        # 价格、数量和买卖成交次数同时追加
+        self._grid_store.append(add_grid_price, add_grid_qty)
+        self._grid_index.append(add_grid_price, add_grid_qty)
         if not up_step_low_prices == ():
             self.all_lower_prices.append(up_step_low_prices)
         self.indices_of_filling.append(self.indices_of_filling[-1] + filling_grid_num)  # 会超出max index
-        self._all_grid_buy_num += [0] * len(add_grid_price)
-        self._all_grid_sell_num += [0] * len(add_grid_price)
         self._each_stair_profit.append(self.unmatched_profit_calc(
             initial_index=self.indices_of_filling[-2],
             current_index=self.indices_of_filling[-1] if self.saved_stair_num < self.stairs_total_num - 1 else self.max_index,
@@ -913,20 +922,12 @@ class SmartGridAnalyzerFutures(Analyzer):
         """
         ini_buy_order_num = round((self.min_buy_order_num + self.max_buy_order_num) / 2)
         ini_sell_order_num = round((self.min_sell_order_num + self.max_sell_order_num) / 2)
-        self.open_buy_orders = [
-            {
-                'id': self.gen_id(_index, self.BUY),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(max(self.present_bottom_index, self.critical_index - ini_buy_order_num), self.critical_index)
-        ]
-        self.open_sell_orders = [
-            {
-                'id': self.gen_id(_index, self.SELL),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
-        ]
+        self.open_buy_orders.reset([
+            self.gen_order(_index, self.BUY) for _index in range(max(self.present_bottom_index, self.critical_index - ini_buy_order_num), self.critical_index)
+        ])
+        self.open_sell_orders.reset([
+            self.gen_order(_index, self.SELL) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
+        ])
         self._log_info('\n开始撒网\n')
         temp_buy_indices = [_each for _each in self.open_buy_orders]
         temp_sell_indices = [_each for _each in self.open_sell_orders]
@@ -938,10 +939,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                 batch_buy_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.BUY,
-                        'quantity': self.all_grid_quantity[self.parse_id(each['id'])[0] + 1],
+                        'quantity': self.all_grid_quantity[each.index + 1],
                         'status': Token.TO_POST_POC
                     } for each in temp_post_buy
                 ]
@@ -952,10 +953,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                 batch_sell_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.SELL,
-                        'quantity': self.all_grid_quantity[self.parse_id(each['id'])[0]],
+                        'quantity': self.all_grid_quantity[each.index],
                         'status': Token.TO_POST_POC
                     } for each in temp_post_sell
                 ]
@@ -1035,7 +1036,7 @@ class SmartGridAnalyzerFutures(Analyzer):
         if this_order_index == self.max_index:
             self._log_info('达到网格上边界，退出策略')
 
-            self.open_sell_orders = []
+            self.open_sell_orders.clear()
             # filled_sell_num = this_order_index - self.critical_index
             # self._trading_statistics['filled_sell_order_num'] += filled_sell_num
             # adding_volume = calc_sum([calc(each_price, calc(self.grid_each_qty, self.symbol_quantity_min_step, '*'), '*') for each_price in
@@ -1074,25 +1075,21 @@ class SmartGridAnalyzerFutures(Analyzer):
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_post_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_post_num)
 
                     while True:
                         if len(instant_post_buy) < 5:
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
-                                posting_order['quantity'] = self.all_grid_quantity[self.parse_id(each_info['id'])[0] + 1]
+                                posting_order['quantity'] = self.all_grid_quantity[each_info.index + 1]
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
 
                                 await self.command_transmitter(trans_command=posting_order, token=Token.TO_POST_POC)
@@ -1104,10 +1101,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
-                                    'quantity': self.all_grid_quantity[self.parse_id(each_info['id'])[0] + 1],
+                                    'quantity': self.all_grid_quantity[each_info.index + 1],
                                 } for each_info in instant_post_batch
                             ]
                             batch_order['status'] = Token.TO_POST_BATCH_POC
@@ -1140,25 +1137,21 @@ class SmartGridAnalyzerFutures(Analyzer):
                                    (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_post_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_post_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
-                                posting_order['quantity'] = self.all_grid_quantity[self.parse_id(each_info['id'])[0]]
+                                posting_order['quantity'] = self.all_grid_quantity[each_info.index]
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
 
                                 # if this_order_index % 2 == 0:
@@ -1175,10 +1168,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
-                                    'quantity': self.all_grid_quantity[self.parse_id(each_info['id'])[0]],
+                                    'quantity': self.all_grid_quantity[each_info.index],
                                 } for each_info in instant_post_batch
                             ]
                             batch_order['status'] = Token.TO_POST_BATCH_POC
@@ -1223,15 +1216,11 @@ class SmartGridAnalyzerFutures(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                     # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                     instant_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                        self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                    self.open_sell_orders = self.open_sell_orders[instant_reject_num:]
+                    self.open_buy_orders.push_top(reversed(instant_post_buy))
+                    self.open_sell_orders.pop_bottom(instant_reject_num)
 
                     while True:
                         # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -1239,10 +1228,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                             for each_num, each_info in enumerate(instant_post_buy):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.BUY
-                                posting_order['quantity'] = self.all_grid_quantity[self.parse_id(each_info['id'])[0] + 1]
+                                posting_order['quantity'] = self.all_grid_quantity[each_info.index + 1]
                                 self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
                                 # self._log_info('在 {} 价位挂买单, id: {}'.format((str(posting_order['price'])), posting_order['id']))
                                 await self.command_transmitter(trans_command=posting_order, token=Token.TO_POST_POC)
@@ -1254,10 +1243,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.BUY,
-                                    'quantity': self.all_grid_quantity[self.parse_id(each_info['id'])[0] + 1],
+                                    'quantity': self.all_grid_quantity[each_info.index + 1],
                                 } for each_info in instant_post_batch
                             ]
                             batch_order['status'] = Token.TO_POST_BATCH_POC
@@ -1286,25 +1275,21 @@ class SmartGridAnalyzerFutures(Analyzer):
                                    (chr(12288), str(instant_reject_num), str(self.all_grid_price[this_order_index]), filled_order_id))
 
                     instant_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                     ]
 
-                    self.open_buy_orders = self.open_buy_orders[:-instant_reject_num]
-                    self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                    self.open_buy_orders.pop_top(instant_reject_num)
+                    self.open_sell_orders.push_bottom(instant_post_sell)
 
                     while True:
                         if len(instant_post_sell) < 5:
                             for each_num, each_info in enumerate(instant_post_sell):
                                 posting_order = Token.ORDER_INFO.copy()
                                 posting_order['symbol'] = self.symbol_name
-                                posting_order['id'] = each_info['id']
-                                posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                                posting_order['id'] = each_info.id
+                                posting_order['price'] = self.all_grid_price[each_info.index]
                                 posting_order['side'] = self.SELL
-                                posting_order['quantity'] = self.all_grid_quantity[self.parse_id(each_info['id'])[0]]
+                                posting_order['quantity'] = self.all_grid_quantity[each_info.index]
                                 self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
 
                                 await self.command_transmitter(trans_command=posting_order, token=Token.TO_POST_POC)
@@ -1316,10 +1301,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                             batch_order['orders'] = [
                                 {
                                     'symbol': self.symbol_name,
-                                    'id': each_info['id'],
-                                    'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                    'id': each_info.id,
+                                    'price': self.all_grid_price[each_info.index],
                                     'side': self.SELL,
-                                    'quantity': self.all_grid_quantity[self.parse_id(each_info['id'])[0]],
+                                    'quantity': self.all_grid_quantity[each_info.index],
                                 } for each_info in instant_post_batch
                             ]
                             batch_order['status'] = Token.TO_POST_BATCH_POC
@@ -1354,23 +1339,14 @@ class SmartGridAnalyzerFutures(Analyzer):
             # 买单挂单维护
             open_buy_orders_num, open_sell_orders_num = len(self.open_buy_orders), len(self.open_sell_orders)
             if open_buy_orders_num > self.max_buy_order_num:
-                post_cancel, self.open_buy_orders = self.open_buy_orders[:self.buffer_buy_num], self.open_buy_orders[self.buffer_buy_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    self._cancel_partial_order_check(each_info['id'])
-                    # if each_info['id'] in self.partially_filled_orders.keys():
-                    #     traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                    #     self._accumulated_pos_deviation -= traded_qty
-                    #     self.partially_filled_orders.pop(each_info['id'])
+                post_cancel = self.open_buy_orders.pop_bottom(self.buffer_buy_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
 
             elif open_buy_orders_num < self.min_buy_order_num:
                 if open_buy_orders_num == 0:
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+                    endpoint_index = self.open_buy_orders[0].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单     # todo: 在未来的Ultra策略中可以优化
                 instant_add_num = self.buffer_buy_num if (self.min_buy_order_num - open_buy_orders_num < self.buffer_buy_num) \
@@ -1379,13 +1355,9 @@ class SmartGridAnalyzerFutures(Analyzer):
                 if endpoint_index > self.present_bottom_index:
                     # <= 时，下方挂单已经达到下边界，不补充挂单
                     filling_post_buy: list = [
-                        {
-                            'id': self.gen_id(each_index, self.BUY),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(max(self.present_bottom_index, endpoint_index - instant_add_num), endpoint_index)
+                        self.gen_order(each_index, self.BUY) for each_index in range(max(self.present_bottom_index, endpoint_index - instant_add_num), endpoint_index)
                     ]
-                    self.open_buy_orders = filling_post_buy + self.open_buy_orders
+                    self.open_buy_orders.push_bottom(filling_post_buy)
                     while True:
                         if len(filling_post_buy) == 0:
                             break
@@ -1394,10 +1366,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.BUY,
-                                'quantity': self.all_grid_quantity[self.parse_id(_info['id'])[0] + 1],
+                                'quantity': self.all_grid_quantity[_info.index + 1],
                             } for _info in filling_post_batch
                         ]
                         filling_batch_cmd['status'] = Token.TO_POST_BATCH_POC
@@ -1405,23 +1377,14 @@ class SmartGridAnalyzerFutures(Analyzer):
 
             # 卖单挂单维护
             if len(self.open_sell_orders) > self.max_sell_order_num:
-                self.open_sell_orders, post_cancel = self.open_sell_orders[:-self.buffer_sell_num], self.open_sell_orders[-self.buffer_sell_num:]
-                for each_info in post_cancel:
-                    cancel_cmd = Token.ORDER_INFO.copy()
-                    cancel_cmd['symbol'] = self.symbol_name
-                    cancel_cmd['id'] = each_info['id']
-                    await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-                    self._cancel_partial_order_check(each_info['id'])
-                    # if each_info['id'] in self.partially_filled_orders.keys():
-                    #     traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-                    #     self._accumulated_pos_deviation += traded_qty
-                    #     self.partially_filled_orders.pop(each_info['id'])
+                post_cancel = self.open_sell_orders.pop_top(self.buffer_sell_num)
+                await self._post_cancel_batch([each_info.id for each_info in post_cancel])
 
             elif len(self.open_sell_orders) < self.min_sell_order_num:
                 if len(self.open_sell_orders) == 0:
                     endpoint_index = self.critical_index
                 else:
-                    endpoint_index = self.parse_id(self.open_sell_orders[-1]['id'])[0]
+                    endpoint_index = self.open_sell_orders[-1].index
 
                 # 在超高频网格当中，可能一下子现存订单就非常少，需要一次补充很多挂单
                 instant_add_num = self.buffer_sell_num if (self.min_sell_order_num - open_sell_orders_num < self.buffer_sell_num) \
@@ -1430,13 +1393,9 @@ class SmartGridAnalyzerFutures(Analyzer):
                 if endpoint_index < self.max_index:
                     # 否则已经达到边界，不补充挂单
                     filling_post_sell: list = [
-                        {
-                            'id': self.gen_id(each_index, self.SELL),
-                            'status': 'NEW',
-                            'time': self.gen_timestamp()
-                        } for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
+                        self.gen_order(each_index, self.SELL) for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + instant_add_num) + 1)
                     ]
-                    self.open_sell_orders = self.open_sell_orders + filling_post_sell
+                    self.open_sell_orders.push_top(filling_post_sell)
                     while True:
                         if len(filling_post_sell) == 0:
                             break
@@ -1445,10 +1404,10 @@ class SmartGridAnalyzerFutures(Analyzer):
                         filling_batch_cmd['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': _info['id'],
-                                'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                                'id': _info.id,
+                                'price': self.all_grid_price[_info.index],
                                 'side': self.SELL,
-                                'quantity': self.all_grid_quantity[self.parse_id(_info['id'])[0]],
+                                'quantity': self.all_grid_quantity[_info.index],
                             } for _info in filling_post_batch
                         ]
                         filling_batch_cmd['status'] = Token.TO_POST_BATCH_POC
@@ -1496,11 +1455,11 @@ class SmartGridAnalyzerFutures(Analyzer):
         :return:
         """
         # 首先获取所有index
-        repost_buy_indices = [self.parse_id(each_order['id'])[0] for each_order in self.open_buy_orders]
+        repost_buy_indices = [each_order.index for each_order in self.open_buy_orders]
         # 如果买单跨越网格下界，删除多余网格
         if self.present_bottom_index >= repost_buy_indices[0]:
             over_border_num = repost_buy_indices.index(self.present_bottom_index)
-            self.open_buy_orders = self.open_buy_orders[over_border_num:]
+            self.open_buy_orders.pop_bottom(over_border_num)
             # repost_buy_indices = repost_buy_indices[over_border_num:]
         repost_buy_orders = self.open_buy_orders.copy()
 
@@ -1513,16 +1472,7 @@ class SmartGridAnalyzerFutures(Analyzer):
                 self._log_info('##### 重新挂单，撤销仓位修正')
 
         # 撤销挂单，使用open buy变量即可
-        for each_info in reversed(self.open_buy_orders):
-            cancel_cmd = Token.ORDER_INFO.copy()
-            cancel_cmd['symbol'] = self.symbol_name
-            cancel_cmd['id'] = each_info['id']
-            await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
-            self._cancel_partial_order_check(each_info['id'])
-            # if each_info['id'] in self.partially_filled_orders.keys():
-            #     traded_qty = int(self.grid_each_qty) - self.partially_filled_orders[each_info['id']]
-            #     self._accumulated_pos_deviation -= traded_qty           # 部分成交买单，如此计算
-            #     self.partially_filled_orders.pop(each_info['id'])
+        await self._post_cancel_batch([each_info.id for each_info in reversed(self.open_buy_orders)])
         # 撤单后停顿
         await asyncio.sleep(0.5)
         # 重新撒网下部分，由于时间停顿，使用复制变量操作
@@ -1534,10 +1484,10 @@ class SmartGridAnalyzerFutures(Analyzer):
             filling_batch_cmd['orders'] = [
                 {
                     'symbol': self.symbol_name,
-                    'id': _info['id'],
-                    'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                    'id': _info.id,
+                    'price': self.all_grid_price[_info.index],
                     'side': self.BUY,
-                    'quantity': self.all_grid_quantity[self.parse_id(_info['id'])[0]],
+                    'quantity': self.all_grid_quantity[_info.index],
                 } for _info in filling_post_batch
             ]
             filling_batch_cmd['status'] = Token.TO_POST_BATCH_POC
@@ -1609,24 +1559,16 @@ class SmartGridAnalyzerFutures(Analyzer):
         更新策略统计数据，需要计算已套利收益，未实现盈亏和总收益。已做多收益在台阶上升时已统计
         :return:
         """
-        # 计算套利收益
-        add_matched_profit = 0
-        # 注意：由于我们需要同时访问当前和下一个网格，循环将停止在倒数第二个元素
-        for i in range(len(self.all_grid_price) - 1):
-            # 计算每个网格的成交对数
-            matched_num = min(self._all_grid_buy_num[i], self._all_grid_sell_num[i + 1])
-            # 更新买卖成交次数
-            self._all_grid_buy_num[i] -= matched_num
-            self._all_grid_sell_num[i + 1] -= matched_num
-            # 如果存在成交对，计算套利收益
-            if matched_num > 0:
-                profit_per_pair = calc(calc(calc(self.all_grid_price[i + 1], self.all_grid_price[i], '-'),
-                                            calc(self.all_grid_quantity[i + 1], self.symbol_quantity_min_step, '*'), '*'), matched_num, '*')
-                # profit_per_pair = (self.all_grid_price[i + 1] - self.all_grid_price[i]) * self.all_grid_quantity[i + 1] * matched_num
-                add_matched_profit = calc(add_matched_profit, profit_per_pair, '+')
-            elif matched_num < 0:  # todo: delete if not happened
-                raise ValueError('成交对数小于0，统计错误!!!')
-        self._trading_statistics['matched_profit'] = calc(self._trading_statistics['matched_profit'], add_matched_profit, '+')
+        # 合并热路径中累计的成交量和手续费
+        add_volume, add_fees = self._fp.flush_trades()
+        if add_volume:
+            self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], add_volume, '+')
+            self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], add_fees, '+')
+
+        # 计算套利收益，只计算上次统计后有成交的配对位置，使用定点整数累计，价值单位
+        add_matched_units = self._matched_profit.settle(self.all_grid_price, self.all_grid_quantity)
+        if add_matched_units:
+            self._trading_statistics['matched_profit'] = calc(self._trading_statistics['matched_profit'], self._fp.to_value(add_matched_units), '+')
 
         # 用最新实时价格计算未配对盈亏
         unmatched_profit = self.unmatched_profit_calc(
@@ -1678,7 +1620,7 @@ class SmartGridAnalyzerFutures(Analyzer):
             showing_texts += '当前正确仓位:\t\t{:<10}张\n'.format(self._current_valid_position)
             showing_texts += '累计计算仓位:\t\t{:<10}张\n'.format(self._account_position_theory)
             showing_texts += '累计仓位偏移:\t\t{:<10}张\n\n'.format(self._accumulated_pos_deviation)
-            showing_texts += '部分成交订单:\t\t{:<10}个挂单\n\n'.format(len(self.partially_filled_orders))
+            showing_texts += '部分成交订单:\t\t{:<10}个挂单\n\n'.format(len(self._partially_filled_orders()))
 
             showing_texts += '-' * 58
             showing_texts += '\n\n卖单挂单成交次数:\t{:<10}\n'.format(str(self._trading_statistics['filled_sell_order_num']))
@@ -1923,10 +1865,7 @@ class SmartGridAnalyzerFutures(Analyzer):
                     self._log_info('补充策略停止期间的台阶上移操作')
                     self._grid_stair_step_up()
             # 获得 c index
-            self.critical_index = -1
-            for each_index in range(1, len(self.all_grid_price)):
-                if self.all_grid_price[each_index - 1] < self.current_symbol_price <= self.all_grid_price[each_index]:
-                    self.critical_index = each_index
+            self.critical_index = ceil_grid_index(self.all_grid_price, self.current_symbol_price)
             # 有可能价格跌出最开始开单的下限
             if self.current_symbol_price <= self.all_grid_price[0]:
                 self.critical_index = self.present_bottom_index
@@ -2021,33 +1960,27 @@ class SmartGridAnalyzerFutures(Analyzer):
         :return:
         """
         start_t = self._running_loop.time()
-        current_account_qty = await self._my_executor.get_symbol_position(self.symbol_name)  # todo: 测试延时
+        # 优先使用 executor 按成交累计的仓位，与策略仓位一致时不需要等待网络请求
+        current_account_qty = self._my_executor.get_cached_position(self.symbol_name)
+        if current_account_qty is None or self._position_deviation(current_account_qty) != 0:
+            # 账本仓位不可用或存在仓位偏移时，以 rest 仓位为准
+            current_account_qty = await self._my_executor.get_symbol_position(self.symbol_name)  # todo: 测试延时
         end_t = self._running_loop.time()
         elapsed_t_ms = int((end_t - start_t) * 1000)
         self._log_info('>>> 获取仓位耗时: {} ms'.format(elapsed_t_ms))
 
-        self.derive_valid_position()
+        fix_qty = self._position_deviation(current_account_qty)
         self._log_info('\n### 执行仓位修正:')
         # self._log_info('### 账户初始仓位:\t\t{}\t张'.format(self._init_account_position))
         self._log_info('### 累计理论当前仓位:\t\t{}\t张'.format(self._account_position_theory))
         self._log_info('### 账户实际当前仓位:\t\t{}\t张\n'.format(current_account_qty))
         # 这两行不相等，说明正向理论计算当前仓位存在遗漏或者偏差
 
-        partial_order_pos_dev: int = 0
-        if len(self.partially_filled_orders) > 0:
-            for each_id, each_qty in self.partially_filled_orders.items():
-                if self.parse_id(each_id)[1] == self.BUY:
-                    # 部分买单成交表示需要立即卖出，因此为负数
-                    partial_order_pos_dev -= each_qty
-                else:
-                    partial_order_pos_dev += each_qty
-
         # self._log_info('### 除去已知偏差后:\t\t{}\t张'.format(str(self._account_position_theory + self._accumulated_pos_deviation)))
         self._log_info('### 策略当前正确仓位:\t\t{}\t张'.format(self._current_valid_position))
-        self._log_info('### 当前矫正后仓位: \t\t{}\t张'.format(str(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev)))
+        self._log_info('### 当前矫正后仓位: \t\t{}\t张'.format(str(self._current_valid_position + fix_qty)))
         # 后两行如果不相等，则表示反向计算累计仓位偏移不完备，存在未知的仓位偏移来源
 
-        fix_qty = int(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev - self._current_valid_position)
         # fix_qty 大于 0 表示 修正后 账户多余仓位，小于0 表示 修正后 账户缺少仓位
 
         if fix_qty == 0:
@@ -2061,6 +1994,22 @@ class SmartGridAnalyzerFutures(Analyzer):
 
             self._accumulated_pos_deviation -= fix_qty
 
+    def _position_deviation(self, current_account_qty: int) -> int:
+        """
+        计算除去已知仓位偏移和部分成交挂单后，账户仓位与策略正确仓位的差值，不需要网络请求
+        :param current_account_qty: 账户当前仓位
+        :return: 大于 0 表示 修正后 账户多余仓位，小于0 表示 修正后 账户缺少仓位
+        """
+        self.derive_valid_position()
+        partial_order_pos_dev: int = 0
+        for each_id, each_filled_qty in self._partially_filled_orders().items():
+            if self.parse_id(each_id)[1] == self.BUY:
+                # 部分买单成交的数量已计入账户仓位，策略正确仓位尚未变化，因此为负数
+                partial_order_pos_dev -= each_filled_qty
+            else:
+                partial_order_pos_dev += each_filled_qty
+        return int(current_account_qty + self._accumulated_pos_deviation + partial_order_pos_dev - self._current_valid_position)
+
     async def _check_open_orders(self) -> None:
         """
         协程方式检查策略挂单，将挂单修正至正常
@@ -2096,9 +2045,9 @@ class SmartGridAnalyzerFutures(Analyzer):
 
                 self.current_symbol_price = await self._my_executor.get_current_price(self.symbol_name)
                 # 获得 c index
-                for each_index in range(len(self.all_grid_price) - 1):
-                    if self.all_grid_price[each_index] <= self.current_symbol_price < self.all_grid_price[each_index + 1]:
-                        self.critical_index = each_index
+                floor_index = floor_grid_index(self.all_grid_price, self.current_symbol_price)
+                if floor_index != -1:
+                    self.critical_index = floor_index
 
                 self.derive_valid_position()
 
@@ -2122,13 +2071,7 @@ class SmartGridAnalyzerFutures(Analyzer):
 
         account_orders_list = [each_info['stg_id'] for each_info in account_open_orders]
         account_orders_list_id = [str(each_info['server_id']) for each_info in account_open_orders]
-        # 重新更新部分成交挂单信息
-        self.partially_filled_orders = {}
-        for each_info in account_open_orders:
-            if each_info['size'] != each_info['left_qty']:
-                self.partially_filled_orders[each_info['stg_id']] = abs(each_info['left_qty'])
-
-        stg_open_orders: list[str] = [each_order['id'] for each_order in self.open_buy_orders] + [each_order['id'] for each_order in self.open_sell_orders]
+        stg_open_orders: list[str] = self.open_buy_orders.id_list() + self.open_sell_orders.id_list()
         # 剔除特殊挂单
         market_ioc_buy, market_ioc_sell = self.gen_id(self.MARKET_ORDER_ID, self.BUY), self.gen_id(self.MARKET_ORDER_ID, self.SELL)
         for each_i, each_stg_id in enumerate(account_orders_list):
@@ -2144,21 +2087,21 @@ class SmartGridAnalyzerFutures(Analyzer):
             self._need_fix_order = False
             return
 
+        # 使用集合对账，不在 list 中逐个查找
+        stg_open_ids, account_open_ids = set(stg_open_orders), set(account_orders_list)
         # 勤快方法
         exist_redundant_order, exist_missing_order = False, False
+        redundant_ids = []
         for each_index, each_account_order_id in enumerate(account_orders_list):
-            if each_account_order_id not in stg_open_orders:
+            if each_account_order_id not in stg_open_ids:
                 real_id = account_orders_list_id[each_index]
                 self._log_info('$$$ 检测到多余挂单，撤销挂单\t\tid: {:<12}\tid: {:<10}'.format(real_id, each_account_order_id))
                 exist_redundant_order = True
-
-                cancel_cmd = Token.ORDER_INFO.copy()
-                cancel_cmd['symbol'] = self.symbol_name
-                cancel_cmd['id'] = real_id
-                asyncio.create_task(self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL))
+                redundant_ids.append(real_id)
+        await self._post_cancel_batch(redundant_ids)
 
         for each_stg_order_id in stg_open_orders:
-            if each_stg_order_id not in account_orders_list:
+            if each_stg_order_id not in account_open_ids:
                 self._log_info('$$$ 检测到缺失挂单，补充挂单\t\t\tid: {:<10}'.format(each_stg_order_id))
                 exist_missing_order = True
                 index, side = self.parse_id(each_stg_order_id)
@@ -2194,81 +2137,50 @@ class SmartGridAnalyzerFutures(Analyzer):
                 self._need_fix_order = True
             await asyncio.sleep(interval_time)
 
-    async def _dealing_partial_order(self, order_data_dict: dict) -> bool:
+    def _partially_filled_orders(self) -> dict[str, int]:
         """
-        用于处理部分成交的订单，操作：
-        如果该订单已被记录，则根据交易量判断订单是否全部完成，已完成则删除记录，未完成则更新信息
-        如果未被记录，则增添记录
-        并更新统计信息
-        :param order_data_dict: 部分成交订单的订单信息
-        :return: True, 订单已全部完成，交给处理。False, 订单未全部完成，继续等待，不操作
+        本策略部分成交、仍在挂单中的普通网格挂单，成交数量由 executor 按私有成交累计
+        :return: {'id': filled_quantity}   注意买卖挂单数量均用绝对值
         """
-        fully_fulfilled = False
-
-        partial_order_id = order_data_dict['id']
-        order_index, order_side = self.parse_id(partial_order_id)
-        filled_qty = int(abs(order_data_dict['quantity']))
-        filled_price: float = float(order_data_dict['price'])
-        # 更新统计信息，此处信息最准确
-        adding_volume = calc(calc(filled_qty, self.symbol_quantity_min_step, '*'), filled_price, '*')
-        self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], adding_volume, '+')
-        self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(adding_volume, self.symbol_maker_fee, '*'), '+')
+        stg_id_prefix = self.stg_num + '_'
+        partial_orders: dict[str, int] = {}
+        for each_id, each_filled_qty in self._my_executor.get_partial_orders(self.symbol_name).items():
+            if each_id.startswith(stg_id_prefix) and self.parse_id(each_id)[0] not in (self.ENTRY_ORDER_ID, self.MARKET_ORDER_ID, self.adjusting_index):
+                partial_orders[each_id] = int(each_filled_qty)
+        return partial_orders
 
+    def _dealing_cancelled_partial_order(self, order_data_dict: dict) -> None:
+        """
+        收到撤单成功时调用，以修正部分成交挂单带来的仓位影响
+        操作：订单已有成交但未全部成交时，已成交部分不再由网格维护，根据挂单方向记入仓位偏移
+        仓位修正挂单的成交已由仓位修正功能处理，不在此处修正
+        :param order_data_dict: 撤单成功信息，包含订单累计成交数量
+        :return:
+        """
+        filled_qty = order_data_dict.get('filled_qty')
+        if not filled_qty or order_data_dict.get('left_qty') == 0:
+            return
+        order_index, order_side = self.parse_id(order_data_dict['id'])
+        if order_index in (self.ENTRY_ORDER_ID, self.MARKET_ORDER_ID, self.adjusting_index, self._pre_adjusting_index):
+            return
         if order_side == self.BUY:
-            self._account_position_theory += filled_qty
-        elif order_side == self.SELL:
-            self._account_position_theory -= filled_qty
+            self._accumulated_pos_deviation -= int(filled_qty)
         else:
-            raise ValueError('parsed unknown side info!')
+            self._accumulated_pos_deviation += int(filled_qty)
+        self._log_info('部分成交订单已撤销，已成交 {} 张计入仓位偏移\tid: {:<10}'.format(filled_qty, order_data_dict['id']))
 
-        if partial_order_id in self.partially_filled_orders.keys():
-
-            ini_left_qty = self.partially_filled_orders[partial_order_id]
-
-            left_qty = ini_left_qty - filled_qty
-            if left_qty > 0:
-                self.partially_filled_orders[partial_order_id] = left_qty
-                self._log_info('订单再次部分成交!\t\t价格: {:<12}\tid: {:<10}'.format(order_data_dict['price'], partial_order_id))
-                self._log_info('剩余 {} 张'.format(left_qty))
-            elif left_qty == 0:
-                # 订单已完成
-                self.partially_filled_orders.pop(partial_order_id)
-
-                fully_fulfilled = True
-            else:
-                self._log_info('error: left qty < 0, plz check code!')
-                self._log_info('{} : {} = {} - {}'.format(partial_order_id, left_qty, ini_left_qty, filled_qty))
-                # 在极高频的情况下，有可能会出现这种情况，比如adjusting order 维护不到位导致普通挂单数量不正常，此时也剔除该记录
-                self.partially_filled_orders.pop(partial_order_id)
-
-        else:
-            left_qty = self.all_grid_quantity[order_index + 1] - filled_qty if order_side == self.BUY else self.all_grid_quantity[order_index] - filled_qty
-            if left_qty < 0:
-                self._log_info('error: got a normal order but traded quantity abnormal !')
-                self._log_info('order: {}, filled qty: {}'.format(partial_order_id, filled_qty))
-                return False
-            self.partially_filled_orders[partial_order_id] = left_qty
-
-            self._log_info('\n订单部分成交!!\t\t价格: {:<12}\tid: {:<10}'.format(order_data_dict['price'], partial_order_id))
-            self._log_info('剩余 {} 张'.format(left_qty))
-
-        return fully_fulfilled
-
-    def _cancel_partial_order_check(self, order_id: str) -> None:
+    def _dealing_cancelled_order_fill(self, order_data_dict: dict) -> None:
         """
-        每次撤销挂单时，调用此函数，以修正部分成交挂单带来的仓位影响
-        操作：判断该挂单是否记录为部分成交挂单，根据挂单方向和订单原数量修正仓位
+        收到已撤销订单的成交时调用，该成交不会再由网格维护，根据挂单方向记入仓位偏移
+        :param order_data_dict: 成交信息
         :return:
         """
-        if order_id in self.partially_filled_orders.keys():
-            order_index, order_side = self.parse_id(order_id)
-            if order_side == self.BUY:
-                traded_qty = self.all_grid_quantity[order_index + 1] - self.partially_filled_orders[order_id]
-                self._accumulated_pos_deviation -= traded_qty
-            elif order_side == self.SELL:
-                traded_qty = self.all_grid_quantity[order_index] - self.partially_filled_orders[order_id]
-                self._accumulated_pos_deviation += traded_qty
-            self.partially_filled_orders.pop(order_id)
+        filled_qty = int(abs(order_data_dict['quantity']))
+        if self.parse_id(order_data_dict['id'])[1] == self.BUY:
+            self._accumulated_pos_deviation -= filled_qty
+        else:
+            self._accumulated_pos_deviation += filled_qty
+        self._log_info('已撤销订单收到成交，{} 张计入仓位偏移\tid: {:<10}'.format(filled_qty, order_data_dict['id']))
 
     async def _dealing_ENTRY_ORDER(self, order_data_dict: dict) -> None:
         """
@@ -2387,7 +2299,6 @@ class SmartGridAnalyzerFutures(Analyzer):
         """
         # 挂单处理相关
         self._need_fix_order = False
-        self.partially_filled_orders: dict[str, int] = {}
         self._cannot_check_open_orders = False
 
         # 仓位矫正相关
@@ -2469,12 +2380,13 @@ class SmartGridAnalyzerFutures(Analyzer):
                                 adjusting_id = self.open_buy_orders[-1]['id']  # 买 1 订单
                                 self.adjusting_index = self.parse_id(adjusting_id)[0]
                                 self._adjusting_order_side = self.BUY
-                                if adjusting_id in self.partially_filled_orders.keys():
+                                adjusting_filled_qty = self._my_executor.get_partial_orders(self.symbol_name).get(adjusting_id)
+                                if adjusting_filled_qty:
                                     self._log_info('### 罕见: 部分成交挂单作为仓位修正挂单')
-                                    self._adjusting_qty_target = self._adjusting_qty_left = int(self.partially_filled_orders[adjusting_id]) + int(self._accumulated_pos_deviation)
-                                    self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                     # 此后该部分成交挂单就交给特殊仓位修正挂单功能处理
-                                    self.partially_filled_orders.pop(adjusting_id)
+                                    self._adjusting_qty_target = self._adjusting_qty_left = \
+                                        self.all_grid_quantity[self.adjusting_index + 1] - int(adjusting_filled_qty) + int(self._accumulated_pos_deviation)
+                                    self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                 else:
                                     self._adjusting_qty_target = self._adjusting_qty_left = self.all_grid_quantity[self.adjusting_index + 1] + int(self._accumulated_pos_deviation)
                                     self._log_info('\n>>> 设定修正买单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
@@ -2498,13 +2410,13 @@ class SmartGridAnalyzerFutures(Analyzer):
                             adjusting_id = self.open_sell_orders[0]['id']  # 卖 1 订单
                             self.adjusting_index = self.parse_id(adjusting_id)[0]
                             self._adjusting_order_side = self.SELL
-                            if adjusting_id in self.partially_filled_orders.keys():
+                            adjusting_filled_qty = self._my_executor.get_partial_orders(self.symbol_name).get(adjusting_id)
+                            if adjusting_filled_qty:
                                 self._log_info('### 罕见: 部分成交挂单作为仓位修正挂单')
-                                self._adjusting_qty_target = self._adjusting_qty_left = int(self.partially_filled_orders[adjusting_id]) + int(abs(self._accumulated_pos_deviation))
-                                self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                                 # 此后该部分成交挂单就交给特殊仓位修正挂单功能处理
-                                self.partially_filled_orders.pop(adjusting_id)
-                                # self.partially_orders_indices_list.remove(self.adjusting_index)
+                                self._adjusting_qty_target = self._adjusting_qty_left = \
+                                    self.all_grid_quantity[self.adjusting_index] - int(adjusting_filled_qty) + int(abs(self._accumulated_pos_deviation))
+                                self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
                             else:
                                 self._adjusting_qty_target = self._adjusting_qty_left = self.all_grid_quantity[self.adjusting_index] + int(abs(self._accumulated_pos_deviation))
                                 self._log_info('\n>>> 设定修正卖单数量 {} 张, id: {}'.format(self._adjusting_qty_target, adjusting_id))
@@ -2623,56 +2535,50 @@ class SmartGridAnalyzerFutures(Analyzer):
                 if order_fulfilled:
                     # 更新订单成交数统计
                     if order_side == self.BUY:
-                        self._all_grid_buy_num[order_index] += 1
+                        self._matched_profit.add_buy(order_index)
                         self._trading_statistics['filled_buy_order_num'] += 1
                     else:
-                        self._all_grid_sell_num[order_index] += 1
+                        self._matched_profit.add_sell(order_index)
                         self._trading_statistics['filled_sell_order_num'] += 1
                     await self._maintainer_by_index(order_index)
                     await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
 
             else:
-                # 其他普通订单，维护网格。判断成交数量是否为原始网格数量，如果是，则直接维护网格，如果不是，则先判断部分成交再维护网格
-                order_qty: int = abs(recv_data_dict['quantity'])  # 这一部分相当于 dealing normal fulfilled order
-                order_fully_fulfilled = False
-                if order_side == self.BUY:
-                    if order_qty == self.all_grid_quantity[order_index + 1]:
-                        order_fully_fulfilled = True
-                        self._account_position_theory += order_qty
-                        # 更新订单成交数统计，交易量和手续费
-                        self._all_grid_buy_num[order_index] += 1
-                        self._trading_statistics['filled_buy_order_num'] += 1
-                        add_volume = calc(calc(self.all_grid_quantity[order_index + 1], self.symbol_quantity_min_step, '*'), self.all_grid_price[order_index], '*')
-                        self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], add_volume, '+')
-                        self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(add_volume, self.symbol_maker_fee, '*'), '+')
+                # 其他普通订单，每笔成交更新仓位和统计，订单全部成交后维护网格
+                filled_qty: int = abs(recv_data_dict['quantity'])
+                grid_qty = self.all_grid_quantity[order_index + 1] if order_side == self.BUY else self.all_grid_quantity[order_index]
+                left_qty = recv_data_dict.get('left_qty')
+                if left_qty is None:
+                    # executor 不知道订单原始数量，按网格数量计算剩余数量
+                    left_qty = grid_qty - recv_data_dict.get('filled_qty', filled_qty)
 
+                if order_side == self.BUY:
+                    self._account_position_theory += filled_qty
                 else:
-                    if order_qty == self.all_grid_quantity[order_index]:
-                        order_fully_fulfilled = True
-                        self._account_position_theory -= order_qty
-
-                        self._all_grid_sell_num[order_index] += 1
+                    self._account_position_theory -= filled_qty
+                # 更新交易量和手续费，此处信息最准确
+                self._fp.add_trade(self._fp.notional(float(recv_data_dict['price']), filled_qty), self.symbol_maker_fee)
+
+                if recv_data_dict.get('order_status') == OrderState.CANCELLED:
+                    # 撤单成功先于该成交到达，撤单时没有计入这部分成交
+                    self._dealing_cancelled_order_fill(recv_data_dict)
+                elif left_qty == 0:
+                    # 更新订单成交数统计
+                    if order_side == self.BUY:
+                        self._matched_profit.add_buy(order_index)
+                        self._trading_statistics['filled_buy_order_num'] += 1
+                    else:
+                        self._matched_profit.add_sell(order_index)
                         self._trading_statistics['filled_sell_order_num'] += 1
-                        add_volume = calc(calc(self.all_grid_quantity[order_index], self.symbol_quantity_min_step, '*'), self.all_grid_price[order_index], '*')
-                        self._trading_statistics['achieved_trade_volume'] = calc(self._trading_statistics['achieved_trade_volume'], add_volume, '+')
-                        self._trading_statistics['total_trading_fees'] = calc(self._trading_statistics['total_trading_fees'], calc(add_volume, self.symbol_maker_fee, '*'), '+')
-
-                # 如果订单完全成交，直接维护网格。如果部分成交，额外判断逻辑
-                if order_fully_fulfilled:
                     await self._maintainer_by_index(order_index)
                     await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
+                elif left_qty > 0:
+                    self._log_info('\n订单部分成交!!\t\t价格: {:<12}\tid: {:<10}'.format(recv_data_dict['price'], recv_data_dict['id']))
+                    self._log_info('剩余 {} 张'.format(left_qty))
                 else:
-                    order_fulfilled = await self._dealing_partial_order(recv_data_dict)
-                    if order_fulfilled:
-                        # 更新订单成交数统计
-                        if order_side == self.BUY:
-                            self._all_grid_buy_num[order_index] += 1
-                            self._trading_statistics['filled_buy_order_num'] += 1
-                        else:
-                            self._all_grid_sell_num[order_index] += 1
-                            self._trading_statistics['filled_sell_order_num'] += 1
-                        await self._maintainer_by_index(order_index)
-                        await self._maintain_grid_order(order_index, order_side, recv_data_dict['id'], append_info, order_filled=True)
+                    # 在极高频的情况下，有可能会出现这种情况，比如adjusting order 维护不到位导致普通挂单数量不正常
+                    self._log_info('error: got a normal order but traded quantity abnormal !')
+                    self._log_info('order: {}, filled qty: {}, left qty: {}'.format(recv_data_dict['id'], filled_qty, left_qty))
 
         elif recv_data_dict['status'] == Token.POST_SUCCESS:
             self._log_info('收到挂单成功信息\t\t价格: {:<12}\tid: {:<10}'.format(str(float(recv_data_dict['price'])), recv_data_dict['id']))
@@ -2682,9 +2588,11 @@ class SmartGridAnalyzerFutures(Analyzer):
 
         elif recv_data_dict['status'] == Token.CANCEL_SUCCESS:
             self._log_info('收到撤单成功信息\t\t\t\tid: {:<10}'.format(recv_data_dict['id']))
+            self._dealing_cancelled_partial_order(recv_data_dict)
 
         elif recv_data_dict['status'] == Token.CANCEL_POC_SUCCESS:
             self._log_info('收到poc撤单成功信息\t\t\t\tid: {:<10}'.format(recv_data_dict['id']))
+            self._dealing_cancelled_partial_order(recv_data_dict)
 
         elif recv_data_dict['status'] == Token.PARTIALLY_FILLED:
             self._log_info('\nerror: invalid info received, plz check code\n')
@@ -2701,7 +2609,9 @@ class SmartGridAnalyzerFutures(Analyzer):
                     pass
 
         elif recv_data_dict['status'] == Token.UNIDENTIFIED:
-            pass
+            # 请求超时未返回，不确定是否成功，由挂单检查修正
+            self._log_info('\n{}，需要检查挂单\t\tid: {:<10}'.format(append_info, recv_data_dict['id']))
+            self._need_fix_order = True
         elif recv_data_dict['status'] == Token.FAILED:
             pass
         elif recv_data_dict['status'] == Token.POST_FAILED:
@@ -2754,6 +2664,19 @@ class SmartGridAnalyzerFutures(Analyzer):
         elif recv_data_dict['status'] == Token.TEMP_TOKEN:
             pass
 
+    async def _post_cancel_batch(self, cancel_ids: list[str]) -> None:
+        """
+        批量撤销挂单，一次发送所有撤单请求，由 executor 按交易所上限分批
+        :param cancel_ids: 需要撤销的挂单 id
+        :return:
+        """
+        if not cancel_ids:
+            return
+        batch_cancel_cmd = Token.BATCH_ORDER_INFO.copy()
+        batch_cancel_cmd['orders'] = [{'symbol': self.symbol_name, 'id': each_id} for each_id in cancel_ids]
+        batch_cancel_cmd['status'] = Token.TO_CANCEL_BATCH
+        await self.command_transmitter(trans_command=batch_cancel_cmd, token=Token.TO_CANCEL_BATCH)
+
     async def command_transmitter(self, trans_command: dict = None, token: str = None) -> None:
         command_dict = Token.ORDER_INFO.copy()
         command_dict['symbol'] = self.symbol_name
@@ -2782,6 +2705,8 @@ class SmartGridAnalyzerFutures(Analyzer):
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_BATCH_POC:
             asyncio.create_task(self._my_executor.command_receiver(trans_command))
+        elif token == Token.TO_CANCEL_BATCH:
+            asyncio.create_task(self._my_executor.command_receiver(trans_command))
         elif token == Token.TO_POST_MARKET:
             command_dict['side'] = trans_command['side']
             command_dict['id'] = self.gen_id(self.MARKET_ORDER_ID, trans_command['side'])
@@ -2835,8 +2760,9 @@ class SmartGridAnalyzerFutures(Analyzer):
             if self.all_grid_price[self.present_bottom_index] < self.current_symbol_price < self._x_grid_up_limit:
                 # 新检测方法，价格偏离c index两端网格距离之和的5倍，
                 if 1 <= self.critical_index <= self.max_index - 1:
-                    if abs(calc(self.current_symbol_price, self.all_grid_price[self.critical_index], '-')) > \
-                            5 * calc(self.all_grid_price[self.critical_index + 1], self.all_grid_price[self.critical_index - 1], '-'):
+                    to_ticks = self._fp.to_ticks
+                    if abs(to_ticks(self.current_symbol_price) - to_ticks(self.all_grid_price[self.critical_index])) > \
+                            5 * (to_ticks(self.all_grid_price[self.critical_index + 1]) - to_ticks(self.all_grid_price[self.critical_index - 1])):
                         self._log_info('$$$ 检测到价格偏离，未收到挂单成交信息')
                         self._log_info('$$$ 当前ticker价: {}\t\t网格critical价: {}'.format(self.current_symbol_price, self.all_grid_price[self.critical_index]))
                         self._need_fix_order = True
@@ -2851,6 +2777,12 @@ class SmartGridAnalyzerFutures(Analyzer):
             # 如果订单成交迅速，ticker收信为 1s，判断也比较频繁
             if self._accumulated_pos_deviation != 0:
                 self._need_adjust_pos = True
+            elif self._layout_complete and self.adjusting_index == -1 and not self._need_adjust_pos:
+                # executor 按成交累计的仓位不需要网络请求，与策略仓位不一致时才开启仓位修正
+                ledger_position = self._my_executor.get_cached_position(self.symbol_name)
+                if ledger_position is not None and self._position_deviation(ledger_position) != 0:
+                    self._log_info('>>> 成交仓位与策略仓位不一致，需要修正仓位')
+                    self._need_adjust_pos = True
 
             # === 高频仓位功能 === # 超过某个固定时间仍未收到ticker信息，则此时交易不剧烈，可以做额外操作
             if self._ticker_delay_timer:
@@ -2865,20 +2797,13 @@ class SmartGridAnalyzerFutures(Analyzer):
 
     # tool methods
     def gen_id(self, self_index: int, side: str) -> str:
-        self_id = self.stg_num + '_' + str.zfill(str(self_index), 8) + side
-        return self_id
+        return self._id_codec.encode(self.stg_num, self_index, side)
 
-    @staticmethod
-    def parse_id(client_id: str) -> tuple[int, str]:
-        internal_client_id = client_id.split('_')[-1]
-        try:
-            order_index = int(internal_client_id[:8])
-            order_side = internal_client_id[8:]
-        except ValueError:
-            order_index = -1
-            order_side = client_id
+    def gen_order(self, self_index: int, side: str) -> GridOrder:
+        return GridOrder(self.gen_id(self_index, side), self_index, side, 'NEW', self.gen_timestamp())
 
-        return order_index, order_side
+    def parse_id(self, client_id: str) -> tuple[int, str]:
+        return self._id_codec.decode(client_id)
 
     def isometric_grid_calc(self, base_price: float, grid_ratio: float, boundary_price: float) -> list[float]:
         """
@@ -2888,37 +2813,8 @@ class SmartGridAnalyzerFutures(Analyzer):
         :param boundary_price: 边界价格，计算小于等于该边界的网格价格
         :return: 返回存储网格价格的list，包括最开始的base_price，包括边界价格
         """
-        all_price = []
-        n_count = 0  # 保险，防止死循环
-        if boundary_price > base_price:
-            # 计算上方网格价格
-            while True:
-                each_grid_price = self.round_step_precision(base_price * (1 + grid_ratio) ** n_count, self.symbol_price_min_step)
-                if each_grid_price <= boundary_price:
-                    all_price.append(each_grid_price)
-                else:
-                    break
-                n_count += 1
-                if n_count >= 99999999:
-                    raise ValueError('计算上方网格价格迭代次数过多!')
-                    break
-        elif boundary_price < base_price:
-            # 计算下方网格价格
-            while True:
-                each_grid_price = self.round_step_precision(base_price * (1 - grid_ratio) ** n_count, self.symbol_price_min_step)
-                if each_grid_price >= boundary_price:
-                    all_price.insert(0, each_grid_price)
-                else:
-                    break
-                n_count += 1
-                if n_count >= 99999999:
-                    raise ValueError('计算下方网格价格迭代次数过多!')
-                    break
-
-        else:
-            raise ValueError('网格价格区间范围为0')
-        # 防止太密的价格导致网格价格重复
-        return sorted(set(all_price))
+        # 一次性计算全部等比价格并批量规整，结果与逐个计算相同
+        return isometric_grid_prices(base_price, grid_ratio, boundary_price, self.symbol_price_min_step)
 
     def unequal_grid_qty_calc(self, base_price: float, grid_num: int, fund: float) -> list[int]:
         """
@@ -3000,30 +2896,33 @@ class SmartGridAnalyzerFutures(Analyzer):
         if len(all_prices) != len(all_quantities):  # todo: delete if test good，测试计算器正确性，使用工具
             raise ValueError('价格和数量list长度不等，无法计算盈亏')
             return 0
+        if all_prices is self.all_grid_price and all_quantities is self.all_grid_quantity and self._grid_index is not None:
+            # 策略网格本身，使用前缀和索引，常数时间
+            return self._grid_index.unmatched_profit(initial_index, current_index, init_pos_price, init_pos_qty, current_price)
         if initial_index == -1:
             initial_index = len(all_prices) - 1
         if current_index == -1:
             current_index = len(all_prices) - 1
 
+        # 全部使用定点整数计算，价格为tick数，数量为合约张数
+        to_ticks = self._fp.to_ticks
+        current_ticks = to_ticks(current_price)
         # 第一部分考虑无网格时的持仓盈亏
-        part_1 = calc(calc(current_price, init_pos_price, '-'), calc(init_pos_qty, self.symbol_quantity_min_step, '*'), '*')
+        part_1 = (current_ticks - to_ticks(init_pos_price)) * init_pos_qty
         # 第二部分计算未配对网格仓位带来的盈亏
         if current_index > initial_index + 1:
             price_slice = all_prices[initial_index + 1:current_index + 1]  # 索引时，index可以超出范围
-            qty_slice = [calc(each_sheet_num, self.symbol_quantity_min_step, '*') for each_sheet_num in all_quantities[initial_index + 1:current_index + 1]]
-            # qty_slice = all_quantities[initial_index + 1:current_index + 1]
+            qty_slice = all_quantities[initial_index + 1:current_index + 1]
         elif current_index < initial_index - 1:  # 重要! 需要注意买单的数量为 c index + 1
             price_slice = all_prices[current_index:initial_index]
-            qty_slice = [calc(each_sheet_num, self.symbol_quantity_min_step, '*') for each_sheet_num in all_quantities[current_index + 1:initial_index + 1]]
-            # qty_slice = all_quantities[current_index:initial_index]
+            qty_slice = all_quantities[current_index + 1:initial_index + 1]
         else:
             price_slice = qty_slice = []
 
-        # part_2 = -abs(calc_sum(each_price * each_qty) - total_qty * current_price)        第二部分计算网格带来的盈亏
-        part_2 = -abs(calc(calc_sum([calc(each_price, each_qty, '*') for each_price, each_qty in zip(price_slice, qty_slice)]),
-                           calc(calc_sum(qty_slice), current_price, '*'), '-'))
+        # part_2 = -abs(sum(each_price * each_qty) - total_qty * current_price)        第二部分计算网格带来的盈亏
+        part_2 = -abs(sum([to_ticks(each_price) * each_qty for each_price, each_qty in zip(price_slice, qty_slice)]) - sum(qty_slice) * current_ticks)
 
-        return calc(part_1, part_2, '+')
+        return self._fp.to_value(part_1 + part_2)
 
     @staticmethod
     def round_step_precision(price: float, step: float) -> float:
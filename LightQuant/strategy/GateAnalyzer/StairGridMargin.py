@@ -9,6 +9,9 @@ import pandas as pd
 from LightQuant.Recorder import LogRecorder
 from LightQuant.tools.calc import calc, calc_sum
 from LightQuant.tools.round_step_size import round_step_size
+from LightQuant.tools.grid_calc import ArithmeticGridLadder
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.open_order_book import GridOrder, OpenOrderBook
 from LightQuant.Analyzer import Analyzer
 from LightQuant.Executor import Executor
 from LightQuant.protocols.BinanceToken import BinanceToken as Token
@@ -70,7 +73,7 @@ class StairGridAnalyzerMargin(Analyzer):
 
         # ==================== 策略功能相关变量 ==================== #
         self.critical_index = 0
-        # 所有网格的价格，由index索引，考虑到无限网格可能会很大，该元祖会随着网格抬升自动添加
+        # 所有网格的价格，由index索引，考虑到无限网格可能会很大，使用虚拟等差网格，可用长度会随着网格抬升自动添加
         self.all_grid_price: tuple = ()
         # 需要补仓的价格index， 当 critical_index 属于其中时，执行补仓操作，补仓后，删除index以实现到达位置只补仓一次的功能
         self.indices_of_filling: list = []
@@ -102,17 +105,11 @@ class StairGridAnalyzerMargin(Analyzer):
         # 缓冲数量，单边网格数量过少或过多时增减的网格数量
         self.buffer_buy_num = 3
         self.buffer_sell_num = 5
+        # 订单 id 编解码，缓存已生成的 id
+        self._id_codec = ClientIdCodec(8)
         # 定义了买卖单存储方式
-        self.open_buy_orders = [{
-            'id': '00032BUY',
-            'status': 'NEW',
-            'time': None
-        }, ]
-        self.open_sell_orders = [{
-            'id': '00032SELL',
-            'status': 'FILLED',
-            'time': None
-        }, ]
+        self.open_buy_orders = OpenOrderBook([GridOrder('00032BUY', *self.parse_id('00032BUY'))])
+        self.open_sell_orders = OpenOrderBook([GridOrder('00032SELL', *self.parse_id('00032SELL'), status='FILLED')])
 
         # 市价下单锁，为True时，不能自动修正仓位
         self._market_order_lock: bool = False
@@ -335,7 +332,7 @@ class StairGridAnalyzerMargin(Analyzer):
         # print('入场价:\t\t{}'.format(self.entry_grid_price))
         # print('最高台阶最低价:\t{}'.format(last_stair_bottom_price))
         # 最后一次补仓的价格及下方的所有价格
-        stair_last_prices = [calc(last_stair_bottom_price, calc(self.grid_price_step, i, '*'), '+') for i in range(self.lower_grid_max_num + 1)]
+        stair_last_prices = list(ArithmeticGridLadder(last_stair_bottom_price, self.grid_price_step, self.lower_grid_max_num + 1))
         # print('最高台阶最高价:\t{}'.format(stair_last_prices[-1]))
 
         min_filling_fund_consume = calc(self.filling_quantity, self.current_symbol_price, '*')
@@ -435,7 +432,7 @@ class StairGridAnalyzerMargin(Analyzer):
 
         bottom_price = calc(self.entry_grid_price, calc(self.grid_price_step, self.lower_grid_max_num, '*'), '-')
         # 此处计算从最底部到 entry index 的所有价格
-        self.all_grid_price = tuple(calc(bottom_price, calc(self.grid_price_step, i, '*'), '+') for i in range(self.lower_grid_max_num + 1))
+        self.all_grid_price = ArithmeticGridLadder(bottom_price, self.grid_price_step, self.lower_grid_max_num + 1)
         self._add_stair(add_num=int(self.max_sell_order_num / self.filling_grid_step_num) + 2)  # 初始时使用的 prices
 
         self._each_stair_profit = self.unmatched_profit_calc(
@@ -511,10 +508,10 @@ class StairGridAnalyzerMargin(Analyzer):
     def _add_stair(self, add_num: int = 1) -> None:
         """
         动态的添加所有网格价格（因为无限网格的数量可能达到几十万，一次性计算完成需要耗费太多时间，所以用动态分批次添加）
+        网格价格为虚拟等差网格，按 index 计算价格，添加台阶只增加可用长度，不计算和复制价格
         :param add_num: 添加的台阶数量
         :return:
         """
-        end_price = self.all_grid_price[-1]
         # 实际上，由于max_index的存在，就算添加的网格价格超出了界限，也没关系
         range_end_index = len(self.all_grid_price) + self.filling_grid_step_num * add_num - 1
         if range_end_index <= self.max_index:
@@ -522,8 +519,7 @@ class StairGridAnalyzerMargin(Analyzer):
         else:
             max_range = self.grid_total_num - len(self.all_grid_price) + 1
 
-        add_grid_price = tuple(calc(end_price, calc(self.grid_price_step, i, '*'), '+') for i in range(1, max_range))
-        self.all_grid_price += add_grid_price
+        self.all_grid_price.extend_to(len(self.all_grid_price) + max_range - 1)
 
     async def _maker_market_post(self) -> None:
         """
@@ -646,20 +642,12 @@ class StairGridAnalyzerMargin(Analyzer):
         # 布撒网格，使用batch order操作
         ini_buy_order_num = round((self.min_buy_order_num + self.max_buy_order_num) / 2)
         ini_sell_order_num = round((self.min_sell_order_num + self.max_sell_order_num) / 2)
-        self.open_buy_orders = [
-            {
-                'id': self.gen_id(_index, self.BUY),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
-        ]
-        self.open_sell_orders = [
-            {
-                'id': self.gen_id(_index, self.SELL),
-                'status': 'NEW',
-                'time': self.gen_timestamp()
-            } for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
-        ]
+        self.open_buy_orders.reset([
+            self.gen_order(_index, self.BUY) for _index in range(max(0, self.critical_index - ini_buy_order_num), self.critical_index)
+        ])
+        self.open_sell_orders.reset([
+            self.gen_order(_index, self.SELL) for _index in range(self.critical_index + 1, min(self.max_index, (self.critical_index + ini_sell_order_num + 1)))
+        ])
         self._log_info('\n开始撒网\n')
         temp_buy_indices = [_each for _each in self.open_buy_orders]
         temp_sell_indices = [_each for _each in self.open_sell_orders]
@@ -671,8 +659,8 @@ class StairGridAnalyzerMargin(Analyzer):
                 batch_buy_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.BUY,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_LIMIT
@@ -684,8 +672,8 @@ class StairGridAnalyzerMargin(Analyzer):
                 batch_sell_command['orders'] = [
                     {
                         'symbol': self.symbol_name,
-                        'id': each['id'],
-                        'price': self.all_grid_price[self.parse_id(each['id'])[0]],
+                        'id': each.id,
+                        'price': self.all_grid_price[each.index],
                         'side': self.SELL,
                         'quantity': self.grid_each_qty,
                         'status': Token.TO_POST_LIMIT
@@ -772,7 +760,7 @@ class StairGridAnalyzerMargin(Analyzer):
         elif this_order_index == self.max_index:
             self._log_info('达到网格上边界，退出策略')
 
-            self.open_sell_orders = []
+            self.open_sell_orders.clear()
             filled_sell_num = this_order_index - self.critical_index
             self._trading_statistics['filled_sell_order_num'] += filled_sell_num
             adding_volume = calc_sum([calc(each_price, self.grid_each_qty, '*') for each_price in
@@ -813,15 +801,11 @@ class StairGridAnalyzerMargin(Analyzer):
                                (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                 # self._log_info('卖 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                 instant_post_buy: list = [
-                    {
-                        'id': self.gen_id(each_index, self.BUY),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
+                    self.gen_order(each_index, self.BUY) for each_index in range(this_order_index - 1, self.critical_index - 1, -1)
                 ]
 
-                self.open_buy_orders = self.open_buy_orders + list(reversed(instant_post_buy))
-                self.open_sell_orders = self.open_sell_orders[instant_post_num:]
+                self.open_buy_orders.push_top(reversed(instant_post_buy))
+                self.open_sell_orders.pop_bottom(instant_post_num)
 
                 while True:
                     # todo: 如果2-5之间的情况频繁，考虑也用 batch order
@@ -829,8 +813,8 @@ class StairGridAnalyzerMargin(Analyzer):
                         for each_num, each_info in enumerate(instant_post_buy):
                             posting_order = Token.ORDER_INFO.copy()
                             posting_order['symbol'] = self.symbol_name
-                            posting_order['id'] = each_info['id']
-                            posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                            posting_order['id'] = each_info.id
+                            posting_order['price'] = self.all_grid_price[each_info.index]
                             posting_order['side'] = self.BUY
                             posting_order['quantity'] = self.grid_each_qty
                             self._log_info('挂买  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -844,8 +828,8 @@ class StairGridAnalyzerMargin(Analyzer):
                         batch_order['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': each_info['id'],
-                                'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                'id': each_info.id,
+                                'price': self.all_grid_price[each_info.index],
                                 'side': self.BUY,
                                 'quantity': self.grid_each_qty,
                             } for each_info in instant_post_batch
@@ -879,23 +863,19 @@ class StairGridAnalyzerMargin(Analyzer):
                                (chr(12288), str(instant_post_num), str(self.all_grid_price[this_order_index]), filled_order_id))
                 # self._log_info('买 {} 订单成交，价格 {}'.format(str(instant_post_num), str(self.all_grid_price[this_order_index])))
                 instant_post_sell: list = [
-                    {
-                        'id': self.gen_id(each_index, self.SELL),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(this_order_index + 1, self.critical_index + 1)
+                    self.gen_order(each_index, self.SELL) for each_index in range(this_order_index + 1, self.critical_index + 1)
                 ]
 
-                self.open_buy_orders = self.open_buy_orders[:-instant_post_num]
-                self.open_sell_orders = instant_post_sell + self.open_sell_orders
+                self.open_buy_orders.pop_top(instant_post_num)
+                self.open_sell_orders.push_bottom(instant_post_sell)
 
                 while True:
                     if len(instant_post_sell) < 5:
                         for each_num, each_info in enumerate(instant_post_sell):
                             posting_order = Token.ORDER_INFO.copy()
                             posting_order['symbol'] = self.symbol_name
-                            posting_order['id'] = each_info['id']
-                            posting_order['price'] = self.all_grid_price[self.parse_id(each_info['id'])[0]]
+                            posting_order['id'] = each_info.id
+                            posting_order['price'] = self.all_grid_price[each_info.index]
                             posting_order['side'] = self.SELL
                             posting_order['quantity'] = self.grid_each_qty
                             self._log_info('挂卖  {:2} 单\t\t\t价格: {:<12}\tid: {:<10}'.format(str(each_num + 1), posting_order['price'], posting_order['id']))
@@ -910,8 +890,8 @@ class StairGridAnalyzerMargin(Analyzer):
                         batch_order['orders'] = [
                             {
                                 'symbol': self.symbol_name,
-                                'id': each_info['id'],
-                                'price': self.all_grid_price[self.parse_id(each_info['id'])[0]],
+                                'id': each_info.id,
+                                'price': self.all_grid_price[each_info.index],
                                 'side': self.SELL,
                                 'quantity': self.grid_each_qty,
                             } for each_info in instant_post_batch
@@ -985,10 +965,10 @@ class StairGridAnalyzerMargin(Analyzer):
                     self.present_bottom_index += self.filling_grid_step_num
 
                     # 删除多余挂单
-                    endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+                    endpoint_index = self.open_buy_orders[0].index
                     if endpoint_index < self.present_bottom_index:
                         cancel_num = self.present_bottom_index - endpoint_index
-                        post_cancel, self.open_buy_orders = self.open_buy_orders[:cancel_num], self.open_buy_orders[cancel_num:]
+                        post_cancel = self.open_buy_orders.pop_bottom(cancel_num)
                         # todo: 可能有一次性撤销挂单非常多的情况，gate还好，币安则要额外判断
                         for each_info in post_cancel:
                             cancel_cmd = Token.ORDER_INFO.copy()
@@ -1004,7 +984,7 @@ class StairGridAnalyzerMargin(Analyzer):
         # 4.检查买卖单数量并维护其边界挂单，补单全用batch order
         # 买单挂单维护
         if len(self.open_buy_orders) > self.max_buy_order_num:
-            post_cancel, self.open_buy_orders = self.open_buy_orders[:self.buffer_buy_num], self.open_buy_orders[self.buffer_buy_num:]
+            post_cancel = self.open_buy_orders.pop_bottom(self.buffer_buy_num)
             for each_info in post_cancel:
                 cancel_cmd = Token.ORDER_INFO.copy()
                 cancel_cmd['symbol'] = self.symbol_name
@@ -1012,17 +992,13 @@ class StairGridAnalyzerMargin(Analyzer):
                 await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
 
         elif 0 < len(self.open_buy_orders) < self.min_buy_order_num:
-            endpoint_index = self.parse_id(self.open_buy_orders[0]['id'])[0]
+            endpoint_index = self.open_buy_orders[0].index
             if endpoint_index > self.present_bottom_index:
                 # <= 时，下方挂单已经达到下边界，不补充挂单
                 filling_post_buy: list = [
-                    {
-                        'id': self.gen_id(each_index, self.BUY),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(max(self.present_bottom_index, endpoint_index - self.buffer_buy_num), endpoint_index)
+                    self.gen_order(each_index, self.BUY) for each_index in range(max(self.present_bottom_index, endpoint_index - self.buffer_buy_num), endpoint_index)
                 ]
-                self.open_buy_orders = filling_post_buy + self.open_buy_orders
+                self.open_buy_orders.push_bottom(filling_post_buy)
                 while True:
                     if len(filling_post_buy) == 0:
                         break
@@ -1031,8 +1007,8 @@ class StairGridAnalyzerMargin(Analyzer):
                     filling_batch_cmd['orders'] = [
                         {
                             'symbol': self.symbol_name,
-                            'id': _info['id'],
-                            'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                            'id': _info.id,
+                            'price': self.all_grid_price[_info.index],
                             'side': self.BUY,
                             'quantity': self.grid_each_qty,
                         } for _info in filling_post_batch
@@ -1041,7 +1017,7 @@ class StairGridAnalyzerMargin(Analyzer):
 
         # 卖单挂单维护
         if len(self.open_sell_orders) > self.max_sell_order_num:
-            self.open_sell_orders, post_cancel = self.open_sell_orders[:-self.buffer_sell_num], self.open_sell_orders[-self.buffer_sell_num:]
+            post_cancel = self.open_sell_orders.pop_top(self.buffer_sell_num)
             for each_info in post_cancel:
                 cancel_cmd = Token.ORDER_INFO.copy()
                 cancel_cmd['symbol'] = self.symbol_name
@@ -1049,17 +1025,13 @@ class StairGridAnalyzerMargin(Analyzer):
                 await self.command_transmitter(trans_command=cancel_cmd, token=Token.TO_CANCEL)
 
         elif 0 < len(self.open_sell_orders) < self.min_sell_order_num:
-            endpoint_index = self.parse_id(self.open_sell_orders[-1]['id'])[0]
+            endpoint_index = self.open_sell_orders[-1].index
             if endpoint_index < self.max_index:
                 # 否则已经达到边界，不补充挂单
                 filling_post_sell: list = [
-                    {
-                        'id': self.gen_id(each_index, self.SELL),
-                        'status': 'NEW',
-                        'time': self.gen_timestamp()
-                    } for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + self.buffer_sell_num) + 1)
+                    self.gen_order(each_index, self.SELL) for each_index in range(endpoint_index + 1, min(self.max_index, endpoint_index + self.buffer_sell_num) + 1)
                 ]
-                self.open_sell_orders = self.open_sell_orders + filling_post_sell
+                self.open_sell_orders.push_top(filling_post_sell)
                 while True:
                     if len(filling_post_sell) == 0:
                         break
@@ -1068,8 +1040,8 @@ class StairGridAnalyzerMargin(Analyzer):
                     filling_batch_cmd['orders'] = [
                         {
                             'symbol': self.symbol_name,
-                            'id': _info['id'],
-                            'price': self.all_grid_price[self.parse_id(_info['id'])[0]],
+                            'id': _info.id,
+                            'price': self.all_grid_price[_info.index],
                             'side': self.SELL,
                             'quantity': self.grid_each_qty,
                         } for _info in filling_post_batch
@@ -1536,20 +1508,13 @@ class StairGridAnalyzerMargin(Analyzer):
 
     # tool methods
     def gen_id(self, self_index: int, side: str) -> str:
-        self_id = self.stg_num + '_' + str.zfill(str(self_index), 8) + side
-        return self_id
+        return self._id_codec.encode(self.stg_num, self_index, side)
 
-    @staticmethod
-    def parse_id(client_id: str) -> tuple[int, str]:
-        internal_client_id = client_id.split('_')[-1]
-        try:
-            order_index = int(internal_client_id[:8])
-            order_side = internal_client_id[8:]
-        except ValueError:
-            order_index = -1
-            order_side = client_id
-
-        return order_index, order_side
+    def gen_order(self, self_index: int, side: str) -> GridOrder:
+        return GridOrder(self.gen_id(self_index, side), self_index, side, 'NEW', self.gen_timestamp())
+
+    def parse_id(self, client_id: str) -> tuple[int, str]:
+        return self._id_codec.decode(client_id)
 
     @staticmethod
     def unmatched_profit_calc(initial_index: int, current_index: int, all_prices: tuple[float | int], each_grid_qty: float,
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/15 10:20
+# @Author :
+# @File : client_id.py
+# @Software: PyCharm
+
+# 尚未绑定策略编号
+_UNBOUND = object()
+
+
+class ClientIdCodec:
+    """
+    网格订单自定义 id 编解码器，id 格式为 stg_num + '_' + 补零的网格 index + side
+    同一个 (index, side) 的 id 只拼接一次，之后直接从缓存中取出同一个字符串对象
+    编码过的 id 解码时为一次字典查找，其他 id 使用固定位置切片解析，结果与原来的 parse_id 相同
+    """
+
+    def __init__(self, index_width: int, max_cache_num: int = 4096) -> None:
+        """
+        :param index_width: 网格 index 补零位数
+        :param max_cache_num: 最大缓存数量，超过后清空缓存，防止长时间运行时无限增长
+        """
+        self.index_width = index_width
+        self._max_cache_num = max_cache_num
+        self._stg_num = _UNBOUND
+        self._prefix = ''
+        self._encoded: dict[tuple[int, str], str] = {}
+        self._decoded: dict[str, tuple[int, str]] = {}
+
+    def _bind(self, stg_num: str) -> None:
+        self._stg_num = stg_num
+        self._prefix = stg_num + '_'
+        self.clear()
+
+    def clear(self) -> None:
+        self._encoded.clear()
+        self._decoded.clear()
+
+    def encode(self, stg_num: str, index: int, side: str) -> str:
+        """
+        :param stg_num: 策略编号，变化时重新绑定并清空缓存
+        :param index: 网格 index
+        :param side: 方向
+        :return:
+        """
+        if stg_num != self._stg_num:
+            self._bind(stg_num)
+        key = (index, side)
+        client_id = self._encoded.get(key)
+        if client_id is None:
+            if len(self._encoded) >= self._max_cache_num:
+                self.clear()
+            index_str = str.zfill(str(index), self.index_width)
+            client_id = self._prefix + index_str + side
+            self._encoded[key] = client_id
+            # index 超出补零位数时按原来的切片方法解析
+            if len(index_str) == self.index_width:
+                self._decoded[client_id] = key
+        return client_id
+
+    def decode(self, client_id: str) -> tuple[int, str]:
+        """
+        解析 id 中的网格 index 和 side
+        :param client_id: stg8_00000058BUY
+        :return: 无法解析时返回 (-1, client_id)
+        """
+        parsed = self._decoded.get(client_id)
+        if parsed is not None:
+            return parsed
+        # 等同于 client_id.split('_')[-1]，不需要生成 list
+        internal_client_id = client_id[client_id.rfind('_') + 1:]
+        try:
+            return int(internal_client_id[:self.index_width]), internal_client_id[self.index_width:]
+        except ValueError:
+            return -1, client_id
+
+
+if __name__ == '__main__':
+    codec = ClientIdCodec(8)
+    order_id = codec.encode('stg8', 58, 'BUY')
+    print(order_id, codec.encode('stg8', 58, 'BUY') is order_id, codec.decode(order_id))
+    print(codec.decode('stg9_00000012SELL'), codec.decode('00032BUY'), codec.decode('t-123456'))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/26 10:05
+# @Author :
+# @File : dispatch_queue.py
+# @Software: PyCharm
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Callable, Coroutine, Union
+
+
+class DispatchQueue:
+    """
+    单个通道的有界分发队列，由一个消费协程按顺序执行回调
+    三种模式:
+        ORDERED: 严格按顺序全部交付，队列满时 put 等待，压力传回读取循环，用于订单、成交和下单返回
+        DROP_OLDEST: 按顺序交付，队列满时丢弃最早的信息，用于公有成交
+        CONFLATE: 相同 key 的信息只保留最新一条，位置不变，用于 ticker 和最佳买卖价，key 为 None 的信息不合并
+
+    消费协程每执行一个回调后，如果队列中还有信息则让出一次事件循环，避免一个通道的洪峰阻塞其他通道
+    """
+    ORDERED = 'ordered'
+    DROP_OLDEST = 'drop_oldest'
+    CONFLATE = 'conflate'
+
+    def __init__(self, name: str, callback: Callable[[Any], Coroutine], mode: str = ORDERED, maxsize: int = 10000,
+                 key_func: Callable[[Any], Union[str, None]] = None) -> None:
+        """
+        :param name: 通道名，用于输出错误信息
+        :param callback: 协程回调函数，参数为一条信息
+        :param mode: ORDERED, DROP_OLDEST, CONFLATE
+        :param maxsize: 最大排队数量
+        :param key_func: CONFLATE 模式下从信息中取出合并用的 key
+        """
+        if mode not in (self.ORDERED, self.DROP_OLDEST, self.CONFLATE):
+            raise ValueError('未知的分发模式: {}'.format(mode))
+        if mode == self.CONFLATE and key_func is None:
+            raise ValueError('CONFLATE 模式需要 key_func')
+        self.name = name
+        self.mode = mode
+        self.maxsize = maxsize
+        self._callback = callback
+        self._key_func = key_func
+
+        # CONFLATE 模式下队列中保存 key，信息保存在 _latest 中
+        self._queue: deque = deque()
+        self._latest: dict[Any, Any] = {}
+        self._unique_keys = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._consumer: Union[asyncio.Task, None] = None
+
+        # 统计信息
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def put(self, item: Any) -> None:
+        """
+        加入一条信息，ORDERED 模式下队列满时等待
+        :param item:
+        :return:
+        """
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+        if self.mode == self.CONFLATE:
+            key = self._key_func(item)
+            if key is None:
+                key = ('unique', next(self._unique_keys))
+            elif key in self._latest:
+                self._latest[key] = item
+                self.conflated += 1
+                return
+            if len(self._queue) >= self.maxsize:
+                self._latest.pop(self._queue.popleft(), None)
+                self.dropped += 1
+            self._latest[key] = item
+            self._queue.append(key)
+        elif self.mode == self.DROP_OLDEST:
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(item)
+        else:
+            while len(self._queue) >= self.maxsize:
+                self._not_full.clear()
+                await self._not_full.wait()
+            self._queue.append(item)
+
+        if len(self._queue) > self.max_depth:
+            self.max_depth = len(self._queue)
+        self._not_empty.set()
+
+    def _pop(self) -> Any:
+        item = self._queue.popleft()
+        if self.mode == self.CONFLATE:
+            item = self._latest.pop(item)
+        if len(self._queue) < self.maxsize:
+            self._not_full.set()
+        return item
+
+    async def _consume(self) -> None:
+        while True:
+            if not self._queue:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            item = self._pop()
+            try:
+                await self._callback(item)
+            except Exception as e:
+                print('通道 {} 回调出错: {}'.format(self.name, e))
+                print(type(e))
+            self.delivered += 1
+            if self._queue:
+                await asyncio.sleep(0)
+
+    def close(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+        }
+
+
+if __name__ == '__main__':
+    async def demo():
+        received = []
+
+        async def on_item(item):
+            received.append(item)
+
+        ticker_queue = DispatchQueue('ticker', on_item, DispatchQueue.CONFLATE, key_func=lambda x: x[0])
+        for i in range(5):
+            await ticker_queue.put(('BTC_USDT', i))
+            await ticker_queue.put(('ETH_USDT', i))
+        await asyncio.sleep(0.01)
+        print(received, ticker_queue.stats())
+
+    asyncio.run(demo())
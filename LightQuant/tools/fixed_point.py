@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/4 10:12
+# @Author :
+# @File : fixed_point.py
+# @Software: PyCharm
+from typing import Union, Iterable
+from decimal import Decimal
+
+
+class FixedPoint:
+    """
+    定点数计算器，替代策略热路径中的 calc
+    价格以 price_min_step 的整数倍(tick)存储，数量以 qty_min_step(quanto_multiplier) 的整数倍(张)存储
+    价值以 price_min_step * qty_min_step 的整数倍存储，所有中间运算均为整数运算，结果精确
+    只有在 api 和 ui 边界处才转换为 float
+
+    成交量和手续费的累计在热路径中只做整数加法，统计更新时由 flush_trades 一次性换算为 float
+    """
+
+    # 手续费率定点精度，10位小数足够表示交易所费率
+    FEE_DIGITS: int = 10
+
+    def __init__(self, price_min_step: Union[float, str], qty_min_step: Union[float, str]) -> None:
+        self.price_min_step = float(price_min_step)
+        self.qty_min_step = float(qty_min_step)
+
+        # 精度的精确分数表示，用于整数到 float 的转换，python 整数除法结果为正确舍入
+        self._price_num, self._price_den = Decimal(str(price_min_step)).as_integer_ratio()
+        self._qty_num, self._qty_den = Decimal(str(qty_min_step)).as_integer_ratio()
+        self._value_num = self._price_num * self._qty_num
+        self._value_den = self._price_den * self._qty_den
+        self._fee_den = self._value_den * 10 ** self.FEE_DIGITS
+
+        self._fee_rate_cache: dict[float, int] = {}
+
+        # 待合并的成交统计，单位分别为 价值单位 和 价值单位 * 10^-FEE_DIGITS
+        self._pending_volume: int = 0
+        self._pending_fee: int = 0
+
+    # ==================== 转换方法 ==================== #
+    def to_ticks(self, price: Union[float, int]) -> int:
+        """
+        价格转换为 tick 数，交易所价格均在 tick 网格上，浮点误差远小于 0.5 tick
+        :param price:
+        :return:
+        """
+        return round(price / self.price_min_step)
+
+    def to_price(self, ticks: int, divisor: int = 1) -> float:
+        """
+        tick 数转换为价格，divisor 用于精确计算均价
+        :param ticks:
+        :param divisor:
+        :return:
+        """
+        return ticks * self._price_num / (self._price_den * divisor)
+
+    def to_lots(self, quantity: Union[float, int]) -> int:
+        """
+        真实数量转换为合约张数
+        :param quantity:
+        :return:
+        """
+        return round(quantity / self.qty_min_step)
+
+    def to_qty(self, lots: int) -> float:
+        return lots * self._qty_num / self._qty_den
+
+    def to_value(self, value_units: int) -> float:
+        """
+        价值单位转换为 float，单位为 price_min_step * qty_min_step
+        :param value_units:
+        :return:
+        """
+        return value_units * self._value_num / self._value_den
+
+    def fee_rate_units(self, fee_rate: Union[float, str]) -> int:
+        """
+        手续费率转换为定点整数，结果缓存
+        :param fee_rate:
+        :return:
+        """
+        try:
+            return self._fee_rate_cache[fee_rate]
+        except KeyError:
+            rate_units = int(Decimal(str(fee_rate)).scaleb(self.FEE_DIGITS))
+            self._fee_rate_cache[fee_rate] = rate_units
+            return rate_units
+
+    # ==================== 价值计算 ==================== #
+    def notional(self, price: Union[float, int], lots: int) -> int:
+        """
+        单笔成交价值，返回价值单位
+        :param price: 真实价格
+        :param lots: 合约张数
+        :return:
+        """
+        return self.to_ticks(price) * lots
+
+    def range_notional(self, prices: Iterable[Union[float, int]], lots: int) -> int:
+        """
+        一段等量网格的成交价值之和，返回价值单位
+        :param prices: 网格价格切片
+        :param lots: 每格合约张数
+        :return:
+        """
+        return sum([self.to_ticks(each_price) for each_price in prices]) * lots
+
+    def value(self, price: Union[float, int], lots: int) -> float:
+        return self.to_value(self.to_ticks(price) * lots)
+
+    # ==================== 成交统计累计 ==================== #
+    def add_trade(self, value_units: int, fee_rate: Union[float, str]) -> None:
+        """
+        在热路径中累计成交量和手续费，只做整数运算
+        :param value_units: 成交价值单位
+        :param fee_rate: 手续费率
+        :return:
+        """
+        self._pending_volume += value_units
+        self._pending_fee += value_units * self.fee_rate_units(fee_rate)
+
+    def flush_trades(self) -> tuple[float, float]:
+        """
+        取出并清空累计的成交统计，用于更新统计信息
+        :return: 成交量, 手续费
+        """
+        volume = self._pending_volume * self._value_num / self._value_den
+        fee = self._pending_fee * self._value_num / self._fee_den
+        self._pending_volume = self._pending_fee = 0
+        return volume, fee
+
+
+if __name__ == '__main__':
+    fp = FixedPoint(0.0001, 10)
+    print(fp.to_ticks(0.3), fp.to_price(3), fp.to_lots(120), fp.to_qty(12))
+    print(fp.value(0.1235, 3))
+    fp.add_trade(fp.notional(0.1235, 3), 0.0002)
+    fp.add_trade(fp.range_notional([0.1, 0.1001, 0.1002], 2), 0.0002)
+    print(fp.flush_trades())
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/6 14:05
+# @Author :
+# @File : grid_calc.py
+# @Software: PyCharm
+import math
+from collections import OrderedDict
+from typing import Union, Iterator
+from decimal import Decimal
+import numpy as np
+
+# float64 能精确表示的最大整数
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _decimal_ratio(number: Union[float, int, str]) -> tuple[int, int]:
+    """
+    将数字的十进制表示转换为 整数分子 和 10的幂次分母
+    :param number:
+    :return:
+    """
+    sign, digits, exponent = Decimal(str(number)).as_tuple()
+    numerator = int(''.join(map(str, digits))) * (-1 if sign else 1)
+    if exponent >= 0:
+        return numerator * 10 ** exponent, 1
+    return numerator, 10 ** -exponent
+
+
+def round_step_precision_array(prices: Union[list, tuple, np.ndarray], step: float) -> np.ndarray:
+    """
+    批量规整精度，结果与策略中的 round_step_precision 完全相同(四舍五入，恰好一半时舍去)，只考虑大于0的情况
+    先用 float 一次性计算所有价格，距离舍入边界过近的价格使用 Decimal 重新计算，保证结果一致
+    :param prices: 需要规整的价格
+    :param step: 价格精度
+    :return: 规整后价格的 ndarray
+    """
+    step_num, step_den = _decimal_ratio(step)
+    raw_steps = np.asarray(prices, dtype=np.float64) * step_den / step_num
+    floor_steps = np.floor(raw_steps)
+    frac = raw_steps - floor_steps
+    all_ticks = floor_steps + (frac > 0.5)
+
+    # 舍入边界附近的值，float 结果不可信，使用 Decimal 逐个计算
+    for index in np.flatnonzero(np.abs(frac - 0.5) < 1e-6):
+        price = Decimal(str(float(prices[index])))
+        dec_step = Decimal(str(step))
+        mod = price % dec_step
+        all_ticks[index] = (price - mod) / dec_step + (1 if mod > dec_step / 2 else 0)
+
+    if all_ticks.size and all_ticks.max() * step_num >= _MAX_EXACT_INT:
+        return np.array([int(each_tick) * step_num / step_den for each_tick in all_ticks])
+    # 整数除以10的幂次，float64 除法为正确舍入，与 float(Decimal) 结果相同
+    return all_ticks * step_num / step_den
+
+
+def isometric_grid_prices(base_price: float, grid_ratio: float, boundary_price: float, price_step: float) -> list[float]:
+    """
+    一次性计算等比网格的全部网格价格，并批量规整到价格精度
+    :param base_price: 网格基准价格
+    :param grid_ratio: 网格间距百分比，绝对数值
+    :param boundary_price: 边界价格，计算到该边界(包括)为止
+    :param price_step: 价格精度
+    :return: 返回排序后的价格list，包括base_price，去除重复价格
+    """
+    # 未规整价格超出 边界 ± 半个精度 后，规整后的价格一定超出边界，以此估计需要计算的网格数量，最后按边界过滤
+    if boundary_price > base_price:
+        multiplier = 1 + grid_ratio
+        exceed_price = boundary_price + price_step / 2
+    elif boundary_price < base_price:
+        multiplier = 1 - grid_ratio
+        exceed_price = boundary_price - price_step / 2
+    else:
+        raise ValueError('网格价格区间范围为0')
+
+    if exceed_price <= 0:
+        raise ValueError('计算下方网格价格迭代次数过多!')
+    grid_num = int(math.log(exceed_price / base_price) / math.log(multiplier)) + 2
+    if grid_num >= 99999999:
+        raise ValueError('计算网格价格迭代次数过多!')
+    # 幂次使用 python 计算，保证和逐个计算时的浮点结果相同
+    raw_prices = np.fromiter((base_price * multiplier ** n for n in range(grid_num)), dtype=np.float64, count=grid_num)
+    all_prices = round_step_precision_array(raw_prices, price_step)
+
+    if multiplier > 1:
+        all_prices = all_prices[all_prices <= boundary_price]
+    else:
+        all_prices = all_prices[all_prices >= boundary_price]
+    # 防止太密的价格导致网格价格重复
+    return np.unique(all_prices).tolist()
+
+
+def arithmetic_grid_prices(start_price: float, price_abs_step: float, grid_num: int, start_num: int = 0) -> tuple[float, ...]:
+    """
+    一次性计算等差网格价格，结果与 calc(start_price, calc(price_abs_step, i, '*'), '+') 逐个计算相同
+    :param start_price: 起始价格
+    :param price_abs_step: 网格价差
+    :param grid_num: 计算到第 grid_num - 1 个网格
+    :param start_num: 从第几个网格开始计算
+    :return: 网格价格 tuple
+    """
+    start_numerator, start_den = _decimal_ratio(start_price)
+    step_numerator, step_den = _decimal_ratio(price_abs_step)
+    common_den = max(start_den, step_den)
+    start_numerator *= common_den // start_den
+    step_numerator *= common_den // step_den
+
+    if max(abs(start_numerator), abs(start_numerator + step_numerator * grid_num)) >= _MAX_EXACT_INT:
+        return tuple((start_numerator + step_numerator * i) / common_den for i in range(start_num, grid_num))
+    return tuple(((np.arange(start_num, grid_num, dtype=np.int64) * step_numerator + start_numerator) / common_den).tolist())
+
+
+class ArithmeticGridLadder:
+    """
+    虚拟等差网格价格，由 index 直接计算价格，不保存全部网格，用于网格数量可能非常大的无限网格
+    价格计算结果与 arithmetic_grid_prices 相同，用法与 tuple 相同：index、负数 index、切片、迭代和 len
+    切片时按窗口批量计算，最近使用的少量窗口缓存在 LRU 中，内存占用与网格总数无关
+    """
+
+    def __init__(self, start_price: float, price_abs_step: float, length: int = 0, window_size: int = 256, cache_windows: int = 8) -> None:
+        """
+        :param start_price: 第 0 个网格价格
+        :param price_abs_step: 网格价差
+        :param length: 当前可用的网格数量
+        :param window_size: 切片时每个缓存窗口的网格数量
+        :param cache_windows: 缓存窗口数量，为 0 时不缓存
+        """
+        start_numerator, start_den = _decimal_ratio(start_price)
+        step_numerator, step_den = _decimal_ratio(price_abs_step)
+        self._den = max(start_den, step_den)
+        self._start_numerator = start_numerator * (self._den // start_den)
+        self._step_numerator = step_numerator * (self._den // step_den)
+        self._length = length
+        self._window_size = window_size
+        self._cache_windows = cache_windows
+        self._windows: OrderedDict[int, tuple[float, ...]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def extend_to(self, length: int) -> None:
+        """
+        将可用网格数量增加到 length，只修改长度，不计算价格
+        :param length:
+        :return:
+        """
+        self._length = max(self._length, length)
+
+    def price_at(self, index: int) -> float:
+        """
+        不检查范围，直接计算第 index 个网格的价格
+        :param index:
+        :return:
+        """
+        return (self._start_numerator + self._step_numerator * index) / self._den
+
+    def _window(self, window_index: int) -> tuple[float, ...]:
+        try:
+            self._windows.move_to_end(window_index)
+            return self._windows[window_index]
+        except KeyError:
+            begin = window_index * self._window_size
+            prices = tuple((self._start_numerator + self._step_numerator * i) / self._den for i in range(begin, begin + self._window_size))
+            if self._cache_windows > 0:
+                self._windows[window_index] = prices
+                if len(self._windows) > self._cache_windows:
+                    self._windows.popitem(last=False)
+            return prices
+
+    def _range_prices(self, begin: int, end: int) -> tuple[float, ...]:
+        """
+        连续区间 [begin, end) 的价格，按窗口拼接
+        """
+        window_size = self._window_size
+        result = []
+        while begin < end:
+            window_index, offset = divmod(begin, window_size)
+            take_num = min(window_size - offset, end - begin)
+            result.extend(self._window(window_index)[offset:offset + take_num])
+            begin += take_num
+        return tuple(result)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[float, tuple[float, ...]]:
+        if isinstance(item, slice):
+            begin, end, step = item.indices(self._length)
+            if step == 1:
+                return self._range_prices(begin, end)
+            return tuple(self.price_at(i) for i in range(begin, end, step))
+        if item < 0:
+            item += self._length
+        if not 0 <= item < self._length:
+            raise IndexError('网格 index 超出范围')
+        return (self._start_numerator + self._step_numerator * item) / self._den
+
+    def __iter__(self) -> Iterator[float]:
+        for window_begin in range(0, self._length, self._window_size):
+            yield from self._range_prices(window_begin, min(window_begin + self._window_size, self._length))
+
+
+if __name__ == '__main__':
+    print(round_step_precision_array([0.12345, 0.12346, 1.00004], 0.0001))
+    print(isometric_grid_prices(1.5, 0.01, 2, 0.0001)[:5])
+    print(isometric_grid_prices(1.5, 0.01, 1, 0.0001)[:5])
+    print(arithmetic_grid_prices(0.1, 0.0003, 5))
+    ladder = ArithmeticGridLadder(0.1, 0.0003, 5)
+    ladder.extend_to(1000)
+    print(ladder[-1], ladder[3:6], tuple(ladder)[:5] == arithmetic_grid_prices(0.1, 0.0003, 5))
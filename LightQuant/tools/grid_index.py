@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/8 9:47
+# @Author :
+# @File : grid_index.py
+# @Software: PyCharm
+from typing import Iterable, Union
+from LightQuant.tools.fixed_point import FixedPoint
+
+
+class _ShiftedPrefix:
+    """
+    支持下方区域改写的前缀和
+    真实前缀和 T(i) = P[i] + (offset if i >= start else 0)
+    改写下方区域时，只需重算改写区域，上方不变区域的变化量记入 offset，不需要整体重算
+    """
+
+    __slots__ = ('_prefix', '_offset', '_start')
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._prefix = [0]
+        self._offset = 0
+        self._start = 1
+        self.append(values)
+
+    def __len__(self) -> int:
+        return len(self._prefix) - 1
+
+    def at(self, i: int) -> int:
+        """
+        前 i 个元素之和
+        :param i:
+        :return:
+        """
+        if i >= self._start:
+            return self._prefix[i] + self._offset
+        return self._prefix[i]
+
+    def append(self, values: Iterable[int]) -> None:
+        prefix = self._prefix
+        # 新增位置一定不小于 start，存储值需要扣除 offset
+        running_sum = self.at(len(prefix) - 1) - self._offset
+        for each_value in values:
+            running_sum += each_value
+            prefix.append(running_sum)
+
+    def rewrite(self, begin: int, end: int, values: Iterable[int]) -> None:
+        """
+        改写 [begin, end) 区域的元素，要求 begin 以下的前缀和没有 offset
+        :param begin:
+        :param end:
+        :param values: 该区域的新元素
+        :return:
+        """
+        prefix = self._prefix
+        if begin >= self._start:
+            # 改写区域在 offset 之内，先将 offset 合并，属于少见情况
+            for i in range(self._start, len(prefix)):
+                prefix[i] += self._offset
+            self._offset = 0
+            self._start = len(prefix)
+        old_end_sum = self.at(end)
+        # start 下移至 end + 1，中间部分需要扣除 offset
+        for i in range(end + 1, min(self._start, len(prefix))):
+            prefix[i] -= self._offset
+
+        running_sum = prefix[begin]
+        for i, each_value in enumerate(values, start=begin + 1):
+            running_sum += each_value
+            prefix[i] = running_sum
+        self._offset += prefix[end] - old_end_sum
+        self._start = end + 1
+
+
+class GridIndex:
+    """
+    网格前缀和索引，价格为 tick 数，数量为合约张数，全部整数运算
+    保存 价格、数量、价格*数量 以及 价格*上一格数量(买单配对) 的前缀和，
+    可以在常数时间内查询任意区间的未配对盈亏、持仓均价和仓位
+    台阶上升时只需改写下方区域，添加缓冲时只需追加，均为增量更新
+    """
+
+    def __init__(self, fp: FixedPoint, prices: Iterable[Union[float, int]] = (), quantities: Iterable[int] = None) -> None:
+        """
+        :param fp: 定点数计算器
+        :param prices: 网格价格
+        :param quantities: 网格数量(张)，为 None 时每格数量视为 1
+        """
+        self._fp = fp
+        self._ticks: list[int] = []
+        self._lots: list[int] = []
+        self._tick_sum = _ShiftedPrefix()
+        self._lot_sum = _ShiftedPrefix()
+        self._value_sum = _ShiftedPrefix()
+        # 第 j 个元素为 ticks[j] * lots[j + 1]，即买单价格和该买单数量
+        self._buy_value_sum = _ShiftedPrefix()
+        self.append(prices, quantities)
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def append(self, prices: Iterable[Union[float, int]], quantities: Iterable[int] = None) -> None:
+        """
+        在网格上方追加价格和数量
+        :param prices:
+        :param quantities:
+        :return:
+        """
+        to_ticks = self._fp.to_ticks
+        add_ticks = [to_ticks(each_price) for each_price in prices]
+        add_lots = [1] * len(add_ticks) if quantities is None else list(quantities)
+        if len(add_ticks) != len(add_lots):
+            raise ValueError('价格和数量长度不等，无法建立索引')
+
+        begin = len(self._ticks)
+        self._ticks += add_ticks
+        self._lots += add_lots
+        self._tick_sum.append(add_ticks)
+        self._lot_sum.append(add_lots)
+        self._value_sum.append([t * q for t, q in zip(add_ticks, add_lots)])
+        ticks, lots = self._ticks, self._lots
+        self._buy_value_sum.append([ticks[j] * lots[j + 1] for j in range(max(begin - 1, 0), len(ticks) - 1)])
+
+    def rewrite_lower(self, begin: int, end: int, all_prices: tuple, all_quantities: tuple = None) -> None:
+        """
+        改写下方区域 [begin, end) 的价格和数量，begin 以下应当没有变化
+        :param begin: 改写起点，通常为改写前的底部 index
+        :param end: 改写终点(不包括)
+        :param all_prices: 改写后的全部网格价格
+        :param all_quantities: 改写后的全部网格数量，为 None 时数量不变
+        :return:
+        """
+        to_ticks = self._fp.to_ticks
+        ticks, lots = self._ticks, self._lots
+        end = min(end, len(ticks))
+        ticks[begin:end] = [to_ticks(each_price) for each_price in all_prices[begin:end]]
+        if all_quantities is not None:
+            lots[begin:end] = all_quantities[begin:end]
+
+        self._tick_sum.rewrite(begin, end, ticks[begin:end])
+        self._lot_sum.rewrite(begin, end, lots[begin:end])
+        self._value_sum.rewrite(begin, end, [t * q for t, q in zip(ticks[begin:end], lots[begin:end])])
+        buy_begin, buy_end = max(begin - 1, 0), min(end, len(ticks) - 1)
+        if buy_begin < buy_end:
+            self._buy_value_sum.rewrite(buy_begin, buy_end, [ticks[j] * lots[j + 1] for j in range(buy_begin, buy_end)])
+
+    # ==================== 区间查询，左闭右开，整数结果 ==================== #
+    def _clamp(self, lo: int, hi: int) -> tuple[int, int]:
+        n = len(self._ticks)
+        lo, hi = min(max(lo, 0), n), min(max(hi, 0), n)
+        return lo, max(lo, hi)
+
+    def range_ticks(self, lo: int, hi: int) -> int:
+        lo, hi = self._clamp(lo, hi)
+        return self._tick_sum.at(hi) - self._tick_sum.at(lo)
+
+    def range_lots(self, lo: int, hi: int) -> int:
+        lo, hi = self._clamp(lo, hi)
+        return self._lot_sum.at(hi) - self._lot_sum.at(lo)
+
+    def range_value(self, lo: int, hi: int) -> int:
+        lo, hi = self._clamp(lo, hi)
+        return self._value_sum.at(hi) - self._value_sum.at(lo)
+
+    def range_buy_value(self, lo: int, hi: int) -> int:
+        """
+        价格区间 [lo, hi) 的买单价值，买单数量为上一格数量
+        """
+        lo, hi = lo, min(hi, len(self._buy_value_sum))
+        if hi <= lo:
+            return 0
+        return self._buy_value_sum.at(hi) - self._buy_value_sum.at(lo)
+
+    # ==================== 统计查询 ==================== #
+    def unmatched_profit(self, initial_index: int, current_index: int, init_pos_price: float, init_pos_qty: int, current_price: float) -> float:
+        """
+        未配对盈亏，与 SmartGridAnalyzerFutures.unmatched_profit_calc 计算方法相同
+        :param initial_index: 初始的index
+        :param current_index: 网格当前的index
+        :param init_pos_price: 初始仓位价格
+        :param init_pos_qty: 初始仓位数量，合约张数
+        :param current_price: 当前最新价格
+        :return:
+        """
+        n = len(self._ticks)
+        if initial_index == -1:
+            initial_index = n - 1
+        if current_index == -1:
+            current_index = n - 1
+
+        current_ticks = self._fp.to_ticks(current_price)
+        part_1 = (current_ticks - self._fp.to_ticks(init_pos_price)) * init_pos_qty
+        if current_index > initial_index + 1:
+            grid_value = self.range_value(initial_index + 1, current_index + 1)
+            grid_lots = self.range_lots(initial_index + 1, current_index + 1)
+        elif current_index < initial_index - 1:
+            grid_value = self.range_buy_value(current_index, initial_index)
+            grid_lots = self.range_lots(current_index + 1, initial_index + 1)
+        else:
+            grid_value = grid_lots = 0
+        part_2 = -abs(grid_value - grid_lots * current_ticks)
+        return self._fp.to_value(part_1 + part_2)
+
+    def uniform_unmatched_profit(self, initial_index: int, current_index: int, each_grid_lots: int,
+                                 init_pos_price: float, init_pos_lots: int, current_price: float) -> float:
+        """
+        每格数量相同的网格的未配对盈亏，与非线性网格和高频网格中 unmatched_profit_calc 计算方法相同
+        :param initial_index: 初始的index
+        :param current_index: 网格当前的index
+        :param each_grid_lots: 每格合约张数
+        :param init_pos_price: 初始仓位价格
+        :param init_pos_lots: 初始仓位合约张数
+        :param current_price: 当前最新价格
+        :return:
+        """
+        n = len(self._ticks)
+        if initial_index == -1:
+            initial_index = n - 1
+        if current_index == -1:
+            current_index = n - 1
+
+        current_ticks = self._fp.to_ticks(current_price)
+        part_1 = (current_ticks - self._fp.to_ticks(init_pos_price)) * init_pos_lots
+        if current_index > initial_index + 1:
+            lo, hi = self._clamp(initial_index + 1, current_index)
+        elif current_index < initial_index - 1:
+            lo, hi = self._clamp(current_index + 1, initial_index)
+        else:
+            lo = hi = 0
+        part_2 = -abs(self.range_ticks(lo, hi) - (hi - lo) * current_ticks) * each_grid_lots
+        return self._fp.to_value(part_1 + part_2)
+
+    def average_price(self, lo: int, hi: int) -> float:
+        """
+        区间 [lo, hi) 内网格持仓均价
+        """
+        lots = self.range_lots(lo, hi)
+        if lots == 0:
+            return 0
+        return self._fp.to_price(self.range_value(lo, hi), lots)
+
+    def exposure(self, lo: int, hi: int) -> float:
+        """
+        区间 [lo, hi) 内网格总数量，真实数量
+        """
+        return self._fp.to_qty(self.range_lots(lo, hi))
+
+
+if __name__ == '__main__':
+    fp = FixedPoint(0.01, 1)
+    index = GridIndex(fp, [1.0, 1.01, 1.02, 1.03], [2, 2, 3, 3])
+    print(index.unmatched_profit(1, 3, 1.01, 10, 1.03), index.average_price(1, 4), index.exposure(1, 4))
+    index.append([1.04, 1.05], [4, 4])
+    index.rewrite_lower(0, 2, (0, 1.005), (0, 5))
+    print(index.range_value(0, 6), index.range_buy_value(0, 5))
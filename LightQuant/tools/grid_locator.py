@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/12 10:35
+# @Author :
+# @File : grid_locator.py
+# @Software: PyCharm
+from bisect import bisect_left, bisect_right
+from typing import Union
+
+# 网格价格定位，使用二分查找将价格映射为网格 index
+# 网格价格均为升序，台阶上升后下方被清除的网格价格为0，仍然满足升序，二分查找结果不受影响
+# 查找失败时返回 -1，由调用方决定是否保留原 index
+
+
+def floor_grid_index(all_prices: tuple, price: Union[float, int], lo: int = 0) -> int:
+    """
+    找到满足 all_prices[i] <= price < all_prices[i + 1] 的 index i
+    :param all_prices: 升序网格价格
+    :param price: 需要定位的价格
+    :param lo: 查找起点，可以传入底部 index 跳过价格为0的区域
+    :return: 网格 index，价格低于最低网格或不低于最高网格时返回 -1
+    """
+    index = bisect_right(all_prices, price, lo) - 1
+    if lo <= index < len(all_prices) - 1:
+        return index
+    return -1
+
+
+def ceil_grid_index(all_prices: tuple, price: Union[float, int], lo: int = 0) -> int:
+    """
+    找到满足 all_prices[i - 1] < price <= all_prices[i] 的 index i
+    :param all_prices: 升序网格价格
+    :param price: 需要定位的价格
+    :param lo: 查找起点，可以传入底部 index 跳过价格为0的区域
+    :return: 网格 index，价格不高于最低网格或高于最高网格时返回 -1
+    """
+    index = bisect_left(all_prices, price, lo)
+    if lo < index < len(all_prices):
+        return index
+    return -1
+
+
+def nearest_grid_index(all_prices: tuple, price: Union[float, int], price_abs_step: float, lo: int = 0) -> int:
+    """
+    等差网格中离价格最近的网格 index，结果与逐个判断
+    each_grid_price <= price < each_grid_price + price_abs_step 并四舍五入的方法相同
+    :param all_prices: 升序等差网格价格
+    :param price: 需要定位的价格
+    :param price_abs_step: 网格价差
+    :param lo: 查找起点
+    :return: 网格 index，价格在网格范围外时返回 -1
+    """
+    index = bisect_right(all_prices, price, lo) - 1
+    if index < lo or not price < all_prices[index] + price_abs_step:
+        return -1
+    if price - all_prices[index] <= price_abs_step / 2:
+        return index
+    return index + 1
+
+
+if __name__ == '__main__':
+    prices = (0, 0, 0, 1.0, 1.1, 1.2, 1.3)
+    print(floor_grid_index(prices, 1.15), ceil_grid_index(prices, 1.15), nearest_grid_index(prices, 1.17, 0.1))
+    print(floor_grid_index(prices, 0.5), ceil_grid_index(prices, 1.4), nearest_grid_index(prices, 1.5, 0.1))
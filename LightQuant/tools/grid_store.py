@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/13 14:50
+# @Author :
+# @File : grid_store.py
+# @Software: PyCharm
+from array import array
+from typing import Iterable, Union
+
+
+class GridStore:
+    """
+    可增长的网格存储，价格、数量和买卖成交次数分别保存在连续的类型化数组中
+    台阶上升时下方区域原地改写，添加缓冲时在上方追加，数组扩容为均摊常数时间，不再整体复制网格
+
+    prices, quantities, buy_num, sell_num 直接作为策略的 all_grid_price 等变量使用，
+    index、切片、len、二分查找等用法与原来的 tuple 和 list 相同，改写均为原地操作，对象本身不会改变
+    """
+
+    def __init__(self, prices: Iterable[Union[float, int]] = (), quantities: Iterable[int] = None) -> None:
+        """
+        :param prices: 初始网格价格
+        :param quantities: 初始网格数量(张)，为 None 时不保存数量
+        """
+        self.prices = array('d', prices)
+        self.quantities = array('q', quantities) if quantities is not None else None
+        if self.quantities is not None and len(self.quantities) != len(self.prices):
+            raise ValueError('网格价格和数量长度不等')
+        self.buy_num = array('q', bytes(8 * len(self.prices)))
+        self.sell_num = array('q', bytes(8 * len(self.prices)))
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def append(self, prices: Iterable[Union[float, int]], quantities: Iterable[int] = None) -> None:
+        """
+        在网格上方追加价格和数量，买卖成交次数同时补0
+        :param prices:
+        :param quantities:
+        :return:
+        """
+        former_len = len(self.prices)
+        self.prices.extend(prices)
+        add_num = len(self.prices) - former_len
+        if self.quantities is not None:
+            self.quantities.extend(quantities)
+            if len(self.quantities) != len(self.prices):
+                raise ValueError('追加的网格价格和数量长度不等')
+        self.buy_num.frombytes(bytes(8 * add_num))
+        self.sell_num.frombytes(bytes(8 * add_num))
+
+    def clear(self, begin: int, end: int) -> None:
+        """
+        将 [begin, end) 区域的价格和数量置0，台阶上升后下方被清除的网格
+        :param begin:
+        :param end:
+        :return:
+        """
+        if end <= begin:
+            return
+        self.prices[begin:end] = array('d', bytes(8 * (end - begin)))
+        if self.quantities is not None:
+            self.quantities[begin:end] = array('q', bytes(8 * (end - begin)))
+
+    def write_prices(self, begin: int, prices: Iterable[Union[float, int]]) -> None:
+        """
+        从 begin 开始原地改写价格，不改变网格长度
+        """
+        new_prices = array('d', prices)
+        if begin + len(new_prices) > len(self.prices):
+            raise ValueError('改写区域超出网格范围')
+        self.prices[begin:begin + len(new_prices)] = new_prices
+
+    def write_quantities(self, begin: int, quantities: Iterable[int]) -> None:
+        """
+        从 begin 开始原地改写数量，不改变网格长度
+        """
+        new_quantities = array('q', quantities)
+        if begin + len(new_quantities) > len(self.quantities):
+            raise ValueError('改写区域超出网格范围')
+        self.quantities[begin:begin + len(new_quantities)] = new_quantities
+
+    def clear_sells(self, end: int) -> None:
+        """
+        清除 end 以下(不包括)的卖单成交次数
+        :param end:
+        :return:
+        """
+        self.sell_num[:end] = array('q', bytes(8 * end))
+
+
+if __name__ == '__main__':
+    store = GridStore([1.0, 1.1, 1.2, 1.3], [3, 3, 4, 4])
+    store.append([1.4, 1.5], [5, 5])
+    store.clear(0, 2)
+    store.write_prices(2, [1.25])
+    store.write_quantities(2, [5, 5])
+    print(store.prices, store.quantities, len(store.buy_num))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/24 10:15
+# @Author :
+# @File : inflight_tracker.py
+# @Software: PyCharm
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Union
+
+
+class LatencyHistogram:
+    """
+    固定分桶的延时直方图，记录一次的开销与分桶数量无关，内存固定
+    分桶上限按毫秒设置，超过最大上限的记录放入最后一个桶
+    """
+    DEFAULT_BOUNDS_MS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000)
+
+    def __init__(self, bounds_ms: tuple = DEFAULT_BOUNDS_MS) -> None:
+        self.bounds_ms = tuple(bounds_ms)
+        self._bounds = tuple(each / 1000 for each in self.bounds_ms)
+        self.counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(self._bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Union[float, None]:
+        """
+        :param q: 0 ~ 100
+        :return: 对应分桶的上限，毫秒，最后一个桶返回最大值，没有记录时返回 None
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        accumulated = 0
+        for each_index, each_count in enumerate(self.counts):
+            accumulated += each_count
+            if accumulated >= rank and each_count:
+                if each_index < len(self.bounds_ms):
+                    return min(self.bounds_ms[each_index], self.max * 1000)
+                return self.max * 1000
+        return self.max * 1000
+
+    def snapshot(self) -> dict:
+        """
+        :return: 记录数量，平均值和分位数，毫秒
+        """
+        return {
+            'count': self.count,
+            'mean': self.total / self.count * 1000 if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max * 1000 if self.count else None,
+        }
+
+
+class _InflightRequest:
+    __slots__ = ('req_id', 'channel', 'info', 'sent_time', 'ack_time')
+
+    def __init__(self, req_id: str, channel: str, info: Any, sent_time: float) -> None:
+        self.req_id = req_id
+        self.channel = channel
+        self.info = info
+        self.sent_time = sent_time
+        self.ack_time: Union[float, None] = None
+
+
+class InflightTracker:
+    """
+    记录已发送、还没有收到最终结果的请求
+    请求按发送顺序保存，超时检查只需要从最早的请求开始，遇到未超时的请求即停止
+    超过最大数量时丢弃最早的请求，与超时的请求一同返回，内存有上限
+
+    每个通道记录两个延时直方图:
+        ack: 发送到收到服务器回声
+        result: 收到回声到收到最终结果，没有回声的通道从发送时开始计算
+    """
+
+    def __init__(self, timeout: float = 5., max_inflight: int = 10000) -> None:
+        """
+        :param timeout: 请求超时时间，秒
+        :param max_inflight: 最多保存的请求数量
+        """
+        self.timeout = timeout
+        self.max_inflight = max_inflight
+        self._inflight: OrderedDict[str, _InflightRequest] = OrderedDict()
+        self._evicted: list[_InflightRequest] = []
+        self.ack_latency: dict[str, LatencyHistogram] = {}
+        self.result_latency: dict[str, LatencyHistogram] = {}
+
+        # 统计信息
+        self.expired_requests = 0
+        self.evicted_requests = 0
+        self.unknown_responses = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, req_id: str) -> bool:
+        return req_id in self._inflight
+
+    def track(self, req_id: str, channel: str, info: Any = None, now: float = None) -> None:
+        """
+        请求发送时调用
+        :param req_id:
+        :param channel:
+        :param info: 请求内容，超时时返回
+        :param now:
+        :return:
+        """
+        self._inflight[req_id] = _InflightRequest(req_id, channel, info, time.monotonic() if now is None else now)
+        if len(self._inflight) > self.max_inflight:
+            self._evicted.append(self._inflight.popitem(last=False)[1])
+            self.evicted_requests += 1
+
+    def ack(self, req_id: str, now: float = None) -> None:
+        """
+        收到服务器回声时调用
+        :param req_id:
+        :param now:
+        :return:
+        """
+        request = self._inflight.get(req_id)
+        if request is None:
+            self.unknown_responses += 1
+            return
+        request.ack_time = time.monotonic() if now is None else now
+        self._histogram(self.ack_latency, request.channel).record(request.ack_time - request.sent_time)
+
+    def complete(self, req_id: str, now: float = None) -> Union[Any, None]:
+        """
+        收到最终结果时调用
+        :param req_id:
+        :param now:
+        :return: 请求内容，请求不存在(已超时或丢弃)时返回 None
+        """
+        request = self._inflight.pop(req_id, None)
+        if request is None:
+            self.unknown_responses += 1
+            return None
+        now = time.monotonic() if now is None else now
+        start_time = request.sent_time if request.ack_time is None else request.ack_time
+        self._histogram(self.result_latency, request.channel).record(now - start_time)
+        return request.info
+
+    def expire(self, now: float = None) -> list[tuple[str, str, Any]]:
+        """
+        取出所有超时和因数量上限被丢弃的请求
+        :param now:
+        :return: [(req_id, channel, info), ]
+        """
+        deadline = (time.monotonic() if now is None else now) - self.timeout
+        expired, self._evicted = self._evicted, []
+        while self._inflight:
+            request = next(iter(self._inflight.values()))
+            if request.sent_time > deadline:
+                break
+            self._inflight.popitem(last=False)
+            expired.append(request)
+            self.expired_requests += 1
+        return [(each.req_id, each.channel, each.info) for each in expired]
+
+    def stats(self) -> dict:
+        """
+        :return: 在途数量，超时、丢弃和未知返回数量，各通道延时统计
+        """
+        return {
+            'inflight': len(self._inflight),
+            'expired_requests': self.expired_requests,
+            'evicted_requests': self.evicted_requests,
+            'unknown_responses': self.unknown_responses,
+            'ack_latency': {channel: histogram.snapshot() for channel, histogram in self.ack_latency.items()},
+            'result_latency': {channel: histogram.snapshot() for channel, histogram in self.result_latency.items()},
+        }
+
+    @staticmethod
+    def _histogram(histograms: dict[str, LatencyHistogram], channel: str) -> LatencyHistogram:
+        histogram = histograms.get(channel)
+        if histogram is None:
+            histogram = histograms[channel] = LatencyHistogram()
+        return histogram
+
+
+if __name__ == '__main__':
+    tracker = InflightTracker(timeout=1., max_inflight=3)
+    for i in range(4):
+        tracker.track(str(i), 'futures.order_place', 'order{}'.format(i), now=i * 0.1)
+    tracker.ack('1', now=0.15)
+    print(tracker.complete('1', now=0.18))
+    print(tracker.complete('2', now=0.25))
+    print(tracker.expire(now=1.5))
+    print(tracker.stats())
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/11 16:20
+# @Author :
+# @File : matched_profit.py
+# @Software: PyCharm
+from LightQuant.tools.fixed_point import FixedPoint
+
+
+class MatchedProfitAccumulator:
+    """
+    增量配对收益计算器
+    网格 i 的买单与网格 i + 1 的卖单配对，成交时只记录被改动的配对位置(脏位置)，
+    统计时只计算脏位置，统计耗时与成交次数相关，与网格总数无关
+    收益以定点整数(价值单位)返回
+    """
+
+    def __init__(self, fp: FixedPoint, buy_num: list[int], sell_num: list[int]) -> None:
+        """
+        :param fp: 定点数计算器
+        :param buy_num: 每个网格买单成交次数，直接引用策略中的 list
+        :param sell_num: 每个网格卖单成交次数，直接引用策略中的 list
+        """
+        self._fp = fp
+        self.buy_num = buy_num
+        self.sell_num = sell_num
+        # 需要重新计算的配对位置，即买单 index
+        self._dirty_pairs: set[int] = set()
+
+    def add_buy(self, index: int, num: int = 1) -> None:
+        self.buy_num[index] += num
+        self._dirty_pairs.add(index)
+
+    def add_sell(self, index: int, num: int = 1) -> None:
+        self.sell_num[index] += num
+        if index > 0:
+            self._dirty_pairs.add(index - 1)
+
+    def settle(self, all_prices: tuple, all_quantities: tuple) -> int:
+        """
+        计算脏位置的配对收益，并扣除已配对的成交次数
+        未被标记的位置在上次统计后配对数必然为0，因此结果与全网格遍历相同
+        :param all_prices: 网格价格
+        :param all_quantities: 网格数量，卖单数量为该网格数量
+        :return: 新增配对收益，价值单位
+        """
+        if not self._dirty_pairs:
+            return 0
+        to_ticks = self._fp.to_ticks
+        buy_num, sell_num = self.buy_num, self.sell_num
+        last_pair_index = len(all_prices) - 2
+        add_units = 0
+        for i in self._dirty_pairs:
+            if i > last_pair_index:
+                continue
+            matched_num = min(buy_num[i], sell_num[i + 1])
+            if matched_num > 0:
+                buy_num[i] -= matched_num
+                sell_num[i + 1] -= matched_num
+                add_units += (to_ticks(all_prices[i + 1]) - to_ticks(all_prices[i])) * all_quantities[i + 1] * matched_num
+            elif matched_num < 0:
+                raise ValueError('成交对数小于0，统计错误!!!')
+        self._dirty_pairs.clear()
+        return add_units
+
+    @staticmethod
+    def uniform_matched_units(filled_buy_num: int, filled_sell_num: int, step_ticks: int, each_grid_lots: int) -> int:
+        """
+        等差等量网格的配对收益，所有配对收益相同，只需要买卖总成交次数
+        :param filled_buy_num: 买单总成交次数
+        :param filled_sell_num: 卖单总成交次数
+        :param step_ticks: 网格间距 tick 数
+        :param each_grid_lots: 每格合约张数
+        :return: 配对收益，价值单位
+        """
+        return min(filled_buy_num, filled_sell_num) * step_ticks * each_grid_lots
+
+
+if __name__ == '__main__':
+    fp = FixedPoint(0.01, 1)
+    prices = (1.0, 1.01, 1.02, 1.03)
+    acc = MatchedProfitAccumulator(fp, [0] * 4, [0] * 4)
+    acc.add_buy(1)
+    acc.add_sell(2)
+    acc.add_sell(3)
+    print(fp.to_value(acc.settle(prices, (2, 2, 3, 3))), acc.buy_num, acc.sell_num)
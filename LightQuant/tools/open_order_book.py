@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/14 11:05
+# @Author :
+# @File : open_order_book.py
+# @Software: PyCharm
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, Union
+
+
+class GridOrder:
+    """
+    网格挂单记录，使用 __slots__ 保存，比 dict 占用更少内存
+    创建时保存网格 index 和方向，之后不需要再从 id 中解析
+    保留 order['id'] 的读取方式，兼容原来的 dict 写法
+    """
+
+    __slots__ = ('id', 'index', 'side', 'status', 'time')
+
+    def __init__(self, order_id: str, index: int, side: str, status: str = 'NEW', time: int = None) -> None:
+        self.id = order_id
+        self.index = index
+        self.side = side
+        self.status = status
+        self.time = time
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __repr__(self) -> str:
+        return 'GridOrder({!r}, {}, {!r}, {!r}, {})'.format(self.id, self.index, self.side, self.status, self.time)
+
+
+class OpenOrderBook:
+    """
+    单边挂单簿，挂单记录 GridOrder 按网格 index 升序保存
+    网格挂单只会在两端增减：买单在上端(买1)成交和补单，在下端缓冲；卖单在下端(卖1)成交和补单，在上端缓冲
+    两端的添加和删除为 O(k)，按 id 或网格 index 查找为 O(1)，不再需要重建整个 list
+
+    读取用法与原来的 list 相同: len, [0], [-1], 切片, 迭代和 reversed
+    迭代时使用快照，协程等待期间挂单簿被修改也不会影响正在进行的迭代
+    """
+
+    def __init__(self, orders: Iterable[GridOrder] = ()) -> None:
+        """
+        :param orders: 初始挂单，按网格 index 升序
+        """
+        self._orders: deque[GridOrder] = deque()
+        self._by_id: dict[str, GridOrder] = {}
+        self._by_index: dict[int, GridOrder] = {}
+        self.push_top(orders)
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._by_id
+
+    def __iter__(self) -> Iterator[GridOrder]:
+        return iter(tuple(self._orders))
+
+    def __reversed__(self) -> Iterator[GridOrder]:
+        return reversed(tuple(self._orders))
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[GridOrder, list[GridOrder]]:
+        if isinstance(item, slice):
+            begin, end, step = item.indices(len(self._orders))
+            if step == 1:
+                return list(islice(self._orders, begin, max(begin, end)))
+            return list(self._orders)[item]
+        return self._orders[item]
+
+    def __repr__(self) -> str:
+        return 'OpenOrderBook({})'.format([each_order.id for each_order in self._orders])
+
+    # ==================== 查找 ==================== #
+    def get(self, order_id: str) -> Union[GridOrder, None]:
+        return self._by_id.get(order_id)
+
+    def get_by_index(self, grid_index: int) -> Union[GridOrder, None]:
+        return self._by_index.get(grid_index)
+
+    def has_index(self, grid_index: int) -> bool:
+        return grid_index in self._by_index
+
+    def ids(self) -> set[str]:
+        """
+        所有挂单 id 的集合，用于和交易所挂单对账
+        :return:
+        """
+        return set(self._by_id)
+
+    def id_list(self) -> list[str]:
+        """
+        按网格 index 升序的挂单 id
+        :return:
+        """
+        return [each_order.id for each_order in self._orders]
+
+    def copy(self) -> list[GridOrder]:
+        return list(self._orders)
+
+    # ==================== 两端增减 ==================== #
+    def _register(self, order: GridOrder) -> None:
+        self._by_id[order.id] = order
+        self._by_index[order.index] = order
+
+    def _unregister(self, order: GridOrder) -> None:
+        self._by_id.pop(order.id, None)
+        if self._by_index.get(order.index) is order:
+            self._by_index.pop(order.index)
+
+    def push_top(self, orders: Iterable[GridOrder]) -> None:
+        """
+        在上端(高价)添加挂单，orders 按网格 index 升序
+        :param orders:
+        :return:
+        """
+        for each_order in orders:
+            self._orders.append(each_order)
+            self._register(each_order)
+
+    def push_bottom(self, orders: Iterable[GridOrder]) -> None:
+        """
+        在下端(低价)添加挂单，orders 按网格 index 升序
+        :param orders:
+        :return:
+        """
+        for each_order in reversed(list(orders)):
+            self._orders.appendleft(each_order)
+            self._register(each_order)
+
+    def pop_top(self, num: int) -> list[GridOrder]:
+        """
+        删除上端 num 个挂单，数量不足时全部删除
+        :param num:
+        :return: 删除的挂单，按网格 index 升序
+        """
+        popped = [self._orders.pop() for _ in range(min(max(num, 0), len(self._orders)))]
+        popped.reverse()
+        for each_order in popped:
+            self._unregister(each_order)
+        return popped
+
+    def pop_bottom(self, num: int) -> list[GridOrder]:
+        """
+        删除下端 num 个挂单，数量不足时全部删除
+        :param num:
+        :return: 删除的挂单，按网格 index 升序
+        """
+        popped = [self._orders.popleft() for _ in range(min(max(num, 0), len(self._orders)))]
+        for each_order in popped:
+            self._unregister(each_order)
+        return popped
+
+    def reset(self, orders: Iterable[GridOrder] = ()) -> None:
+        """
+        清空并重新设置全部挂单
+        :param orders: 按网格 index 升序
+        :return:
+        """
+        self.clear()
+        self.push_top(orders)
+
+    def clear(self) -> None:
+        self._orders.clear()
+        self._by_id.clear()
+        self._by_index.clear()
+
+
+if __name__ == '__main__':
+    book = OpenOrderBook([GridOrder('{:08d}BUY'.format(i), i, 'BUY') for i in range(5)])
+    book.push_top([GridOrder('00000005BUY', 5, 'BUY')])
+    print(book.pop_bottom(2), book.pop_top(1), book[-1], '00000003BUY' in book, book.get_by_index(4))
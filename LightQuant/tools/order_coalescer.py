@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/19 10:40
+# @Author :
+# @File : order_coalescer.py
+# @Software: PyCharm
+import asyncio
+from typing import Any, Callable, Iterable
+
+
+class OrderCoalescer:
+    """
+    下单请求合并器
+    策略逐个发出的挂单命令先放入等待队列，在一个很短的时间窗口内收集到的订单合并为 batch 请求发出，
+    每个 batch 不超过交易所的最大数量，队列满时立即发送，不等待时间窗口结束
+
+    窗口为 0 时，同一轮事件循环中发出的所有订单合并发送，不增加额外延时
+    只有一个订单时仍使用单个订单的请求，返回信息与原来相同
+    """
+
+    def __init__(self, send_single: Callable[[Any], None], send_batch: Callable[[list], None],
+                 window: float = 0.0005, max_batch_size: int = 10) -> None:
+        """
+        :param send_single: 发送单个订单的同步方法
+        :param send_batch: 发送多个订单的同步方法
+        :param window: 合并时间窗口，秒，可以设置为微秒到毫秒级别
+        :param max_batch_size: 每个 batch 请求的最大订单数量
+        """
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size 至少为 1')
+        self._send_single = send_single
+        self._send_batch = send_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self._pending: list = []
+        self._flush_handle: asyncio.Handle = None
+        # 统计信息，发送的请求数量和订单数量
+        self.sent_messages = 0
+        self.sent_orders = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, order: Any) -> None:
+        """
+        添加一个订单，需要在事件循环中调用
+        :param order:
+        :return:
+        """
+        self._pending.append(order)
+        if len(self._pending) >= self.max_batch_size:
+            self._send_full_batches()
+        self._schedule_flush()
+
+    def submit_many(self, orders: Iterable) -> None:
+        """
+        添加多个订单，与等待中的订单一起合并
+        :param orders:
+        :return:
+        """
+        self._pending.extend(orders)
+        if len(self._pending) >= self.max_batch_size:
+            self._send_full_batches()
+        self._schedule_flush()
+
+    def flush(self) -> None:
+        """
+        立即发送所有等待中的订单
+        撤单和改单等请求发送前需要调用，保证与之前的挂单请求顺序不变
+        :return:
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            sending_orders, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+            self._send(sending_orders)
+
+    def withdraw_matching(self, predicate: Callable[[Any], bool]) -> list:
+        """
+        撤回等待中满足条件的订单，不发送
+        :param predicate:
+        :return: 撤回的订单
+        """
+        withdrawn_orders = [each_order for each_order in self._pending if predicate(each_order)]
+        if withdrawn_orders:
+            self._pending = [each_order for each_order in self._pending if not predicate(each_order)]
+            self._schedule_flush()
+        return withdrawn_orders
+
+    def _send_full_batches(self) -> None:
+        while len(self._pending) >= self.max_batch_size:
+            sending_orders, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+            self._send(sending_orders)
+
+    def _schedule_flush(self) -> None:
+        if not self._pending:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            return
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.window > 0:
+                self._flush_handle = loop.call_later(self.window, self._on_window_end)
+            else:
+                self._flush_handle = loop.call_soon(self._on_window_end)
+
+    def _on_window_end(self) -> None:
+        self._flush_handle = None
+        self.flush()
+
+    def _send(self, orders: list) -> None:
+        if len(orders) == 1:
+            self._send_single(orders[0])
+        else:
+            self._send_batch(orders)
+        self.sent_messages += 1
+        self.sent_orders += len(orders)
+
+
+if __name__ == '__main__':
+    async def demo():
+        coalescer = OrderCoalescer(
+            send_single=lambda order: print('single', order),
+            send_batch=lambda orders: print('batch', orders),
+            window=0.001, max_batch_size=4
+        )
+        for i in range(6):
+            coalescer.submit(i)
+        await asyncio.sleep(0.01)
+        coalescer.submit(6)
+        await asyncio.sleep(0.01)
+        print('请求数量: {}, 订单数量: {}'.format(coalescer.sent_messages, coalescer.sent_orders))
+
+    asyncio.run(demo())
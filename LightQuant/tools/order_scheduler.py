@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/21 10:10
+# @Author :
+# @File : order_scheduler.py
+# @Software: PyCharm
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Union
+
+
+class TokenBucket:
+    """
+    令牌桶限频，每秒补充 rate 个令牌，最多保存 capacity 个
+    """
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        """
+        :param rate: 每秒请求数量
+        :param capacity: 最大突发数量，默认与 rate 相同
+        """
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._tokens = self.capacity
+        self._last_time = time.monotonic()
+
+    def limit_capacity(self, capacity: float) -> None:
+        """
+        减小最大突发数量，如合约的最大挂单数量
+        :param capacity:
+        :return:
+        """
+        self.capacity = min(self.capacity, capacity)
+        self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_time) * self.rate)
+        self._last_time = now
+
+    def try_acquire(self, cost: float, now: float = None) -> bool:
+        """
+        :param cost: 消耗令牌数量，超过 capacity 时按 capacity 计算
+        :param now:
+        :return: 令牌足够时扣除并返回 True
+        """
+        self._refill(time.monotonic() if now is None else now)
+        cost = min(cost, self.capacity)
+        if self._tokens >= cost:
+            self._tokens -= cost
+            return True
+        return False
+
+    def wait_time(self, cost: float) -> float:
+        """
+        令牌足够还需要等待的时间，秒
+        :param cost:
+        :return:
+        """
+        return max(0., (min(cost, self.capacity) - self._tokens) / self.rate)
+
+
+class _ScheduledRequest:
+    __slots__ = ('priority', 'endpoint', 'send', 'payload')
+
+    def __init__(self, priority: int, endpoint: str, send: Callable[[list], None], payload: list) -> None:
+        self.priority = priority
+        self.endpoint = endpoint
+        self.send = send
+        self.payload = payload
+
+
+class OrderScheduler:
+    """
+    下单请求优先级调度器
+    每个接口使用一个令牌桶限频，请求按优先级发送：撤单 > 修改 > 平仓 > 新挂单 > 撒网
+    令牌足够且没有更高优先级的请求等待时立即发送，不增加延时；令牌不足时排队，由定时器在令牌恢复后发送
+
+    同一接口上高优先级请求等待时，低优先级请求不会抢占令牌；不同接口互不影响
+    挂单请求可以在发送前按 key 撤回，撤单不会先于还在排队的挂单到达交易所
+    """
+    CANCEL = 0
+    AMEND = 1
+    CLOSE = 2
+    MAKER = 3
+    LAYOUT = 4
+    PRIORITY_NAMES = ('cancel', 'amend', 'close', 'maker', 'layout')
+
+    def __init__(self, buckets: dict[str, TokenBucket], key_func: Callable[[Any], str] = None) -> None:
+        """
+        :param buckets: {接口名: 令牌桶}
+        :param key_func: 从 payload 元素中取出撤回用的 key，如订单自定义 id，返回 None 的元素不能撤回
+        """
+        self.buckets = buckets
+        self._key_func = key_func
+        self._queues: tuple[deque[_ScheduledRequest], ...] = tuple(deque() for _ in self.PRIORITY_NAMES)
+        # key -> 排队中的请求，用于撤回
+        self._pending_keys: dict[str, _ScheduledRequest] = {}
+        self._drain_handle: asyncio.TimerHandle = None
+        self._idle_event: asyncio.Event = None
+
+        # 统计信息
+        self.throttle_events = 0
+        self.max_queue_depth = 0
+        self.sent_requests = [0] * len(self.PRIORITY_NAMES)
+
+    # ==================== 提交和撤回 ==================== #
+    def submit(self, priority: int, endpoint: str, send: Callable[[list], None], payload: list) -> bool:
+        """
+        提交一个请求，需要在事件循环中调用
+        :param priority: 优先级，CANCEL, AMEND, CLOSE, MAKER, LAYOUT
+        :param endpoint: 接口名，对应 buckets 中的令牌桶
+        :param send: 发送方法，参数为 payload
+        :param payload: 请求内容，列表长度为消耗的令牌数量
+        :return: 是否立即发送
+        """
+        request = _ScheduledRequest(priority, endpoint, send, payload)
+        if not self._has_waiting(priority, endpoint) and self.buckets[endpoint].try_acquire(len(payload)):
+            self._send(request)
+            return True
+
+        self.throttle_events += 1
+        self._queues[priority].append(request)
+        if self._key_func is not None:
+            for each_item in payload:
+                item_key = self._key_func(each_item)
+                if item_key is not None:
+                    self._pending_keys[item_key] = request
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        if self._idle_event is not None:
+            self._idle_event.clear()
+        self._schedule_drain(self.buckets[endpoint].wait_time(len(payload)))
+        return False
+
+    def find(self, key: str) -> Union[Any, None]:
+        """
+        查找还在排队的请求中的元素，可以在发送前直接修改
+        :param key:
+        :return: 已经发送或不存在时返回 None
+        """
+        request = self._pending_keys.get(key)
+        if request is None:
+            return None
+        for each_item in request.payload:
+            if self._key_func(each_item) == key:
+                return each_item
+        return None
+
+    def withdraw(self, key: str) -> Union[Any, None]:
+        """
+        撤回还在排队的请求中的一个元素
+        :param key:
+        :return: 撤回的元素，已经发送或不存在时返回 None
+        """
+        request = self._pending_keys.pop(key, None)
+        if request is None:
+            return None
+        for each_index, each_item in enumerate(request.payload):
+            if self._key_func(each_item) == key:
+                return request.payload.pop(each_index)
+        return None
+
+    def withdraw_matching(self, predicate: Callable[[Any], bool]) -> list:
+        """
+        撤回所有排队请求中满足条件的元素，如某个合约的全部挂单
+        :param predicate:
+        :return: 撤回的元素
+        """
+        withdrawn_items = []
+        for each_queue in self._queues:
+            for each_request in each_queue:
+                kept_items = []
+                for each_item in each_request.payload:
+                    if predicate(each_item):
+                        withdrawn_items.append(each_item)
+                        if self._key_func is not None:
+                            self._pending_keys.pop(self._key_func(each_item), None)
+                    else:
+                        kept_items.append(each_item)
+                # 原地修改，排队中的请求发送时使用同一个 list
+                each_request.payload[:] = kept_items
+        return withdrawn_items
+
+    async def join(self, timeout: float = None) -> bool:
+        """
+        等待所有排队的请求发送完成
+        :param timeout:
+        :return: 是否全部发送
+        """
+        if self.queue_depth() == 0:
+            return True
+        if self._idle_event is None:
+            self._idle_event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # ==================== 统计信息 ==================== #
+    def queue_depth(self, priority: int = None) -> int:
+        if priority is None:
+            return sum(len(each_queue) for each_queue in self._queues)
+        return len(self._queues[priority])
+
+    def stats(self) -> dict:
+        """
+        :return: 各优先级排队数量、发送数量，限频次数和最大排队数量
+        """
+        return {
+            'queue_depth': {name: len(self._queues[i]) for i, name in enumerate(self.PRIORITY_NAMES)},
+            'sent_requests': {name: self.sent_requests[i] for i, name in enumerate(self.PRIORITY_NAMES)},
+            'throttle_events': self.throttle_events,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+    # ==================== 调度 ==================== #
+    def _has_waiting(self, priority: int, endpoint: str) -> bool:
+        """
+        同一接口上是否有相同或更高优先级的请求在排队，有则新请求也需要排队，保证顺序
+        """
+        for each_queue in self._queues[:priority + 1]:
+            for each_request in each_queue:
+                if each_request.endpoint == endpoint:
+                    return True
+        return False
+
+    def _send(self, request: _ScheduledRequest) -> None:
+        if self._key_func is not None:
+            for each_item in request.payload:
+                self._pending_keys.pop(self._key_func(each_item), None)
+        request.send(request.payload)
+        self.sent_requests[request.priority] += 1
+
+    def _schedule_drain(self, delay: float) -> None:
+        if self._drain_handle is not None:
+            return
+        self._drain_handle = asyncio.get_running_loop().call_later(delay, self._drain)
+
+    def _drain(self) -> None:
+        """
+        按优先级发送排队的请求，某个接口令牌不足时，该接口的低优先级请求继续等待
+        """
+        self._drain_handle = None
+        now = time.monotonic()
+        blocked_endpoints: dict[str, float] = {}
+        for each_queue in self._queues:
+            while each_queue:
+                request = each_queue[0]
+                if not request.payload:
+                    # 已全部撤回
+                    each_queue.popleft()
+                    continue
+                if request.endpoint in blocked_endpoints:
+                    break
+                bucket = self.buckets[request.endpoint]
+                if bucket.try_acquire(len(request.payload), now):
+                    each_queue.popleft()
+                    self._send(request)
+                else:
+                    blocked_endpoints[request.endpoint] = bucket.wait_time(len(request.payload))
+                    break
+
+        if blocked_endpoints:
+            self._schedule_drain(min(blocked_endpoints.values()))
+        elif self._idle_event is not None:
+            self._idle_event.set()
+
+
+if __name__ == '__main__':
+    async def demo():
+        scheduler = OrderScheduler({'place': TokenBucket(rate=20, capacity=5), 'cancel': TokenBucket(rate=50)}, key_func=lambda x: x)
+        sent = []
+        for i in range(10):
+            scheduler.submit(OrderScheduler.LAYOUT, 'place', sent.extend, ['layout{}'.format(i)])
+        scheduler.submit(OrderScheduler.MAKER, 'place', sent.extend, ['maker'])
+        print('撤回:', scheduler.withdraw('layout9'))
+        scheduler.submit(OrderScheduler.CANCEL, 'cancel', sent.extend, ['cancel'])
+        await scheduler.join()
+        print(sent)
+        print(scheduler.stats())
+
+    asyncio.run(demo())
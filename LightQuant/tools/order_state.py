@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/29 9:40
+# @Author :
+# @File : order_state.py
+# @Software: PyCharm
+from typing import Union
+
+
+class OrderState:
+    """
+    单个订单的本地状态，数量带方向，买为正，卖为负
+    """
+    PENDING = 'pending'
+    OPEN = 'open'
+    PARTIAL = 'partial'
+    FILLED = 'filled'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+    FINISHED = (FILLED, CANCELLED, FAILED)
+
+    __slots__ = ('client_id', 'contract', 'size', 'price', 'tif', 'status', 'filled')
+
+    def __init__(self, client_id: str, contract: str = None, size: Union[int, float] = 0, price: str = None, tif: str = None,
+                 status: str = PENDING) -> None:
+        self.client_id = client_id
+        self.contract = contract
+        self.size = size
+        self.price = price
+        self.tif = tif
+        self.status = status
+        self.filled: Union[int, float] = 0
+
+    @property
+    def left(self) -> Union[int, float]:
+        return self.size - self.filled
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+
+    def __repr__(self) -> str:
+        return 'OrderState({!r}, {}, size={}, filled={})'.format(self.client_id, self.status, self.size, self.filled)
+
+
+class OrderStateBook:
+    """
+    executor 的本地订单状态机，按自定义 id 合并订单频道、成交频道和下单 api 返回三个来源的信息
+    每个方法返回该信息是否带来新的状态变化，重复的挂单成功、撤单成功和修改成功信息返回 False，不再上报
+    成交逐笔累计，每笔成交都是一次状态变化，重复成交由成交 id 去重，不在此处理
+
+    结束的订单和原始数量未知的成交订单保留最近 max_finished 个，迟到的重复信息仍能识别，内存有上限
+    请求超时或被拒绝、仍在等待挂单结果的订单同样移出活动订单，之后收到挂单成功时重新作为活动订单
+    """
+
+    def __init__(self, max_finished: int = 1000) -> None:
+        """
+        :param max_finished: 保留的已结束订单数量
+        """
+        self.max_finished = max_finished
+        self._active: dict[str, OrderState] = {}
+        self._finished: dict[str, OrderState] = {}
+        # 统计信息，各类被合并掉的重复信息数量
+        self.suppressed: dict[str, int] = {'open': 0, 'cancel': 0, 'amend': 0, 'reject': 0}
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._active or client_id in self._finished
+
+    def get(self, client_id: str) -> Union[OrderState, None]:
+        order_state = self._active.get(client_id)
+        if order_state is None:
+            order_state = self._finished.get(client_id)
+        return order_state
+
+    def _get_or_create(self, client_id: str, contract: str = None) -> OrderState:
+        order_state = self.get(client_id)
+        if order_state is None:
+            order_state = self._active[client_id] = OrderState(client_id, contract)
+        elif contract and not order_state.contract:
+            order_state.contract = contract
+        return order_state
+
+    def _finish(self, order_state: OrderState, status: str) -> None:
+        order_state.status = status
+        self._retire(order_state)
+
+    def _retire(self, order_state: OrderState) -> None:
+        if self._active.pop(order_state.client_id, None) is not None:
+            self._finished[order_state.client_id] = order_state
+            while len(self._finished) > self.max_finished:
+                self._finished.pop(next(iter(self._finished)))
+
+    def submit(self, client_id: str, contract: str, size: Union[int, float], price: str, tif: str) -> None:
+        """
+        发送挂单请求时调用，同一 id 重新挂单时重置状态
+        :param client_id:
+        :param contract:
+        :param size: 带方向的数量
+        :param price:
+        :param tif:
+        :return:
+        """
+        self._finished.pop(client_id, None)
+        self._active[client_id] = OrderState(client_id, contract, size, price, tif)
+
+    def open(self, client_id: str, contract: str = None, size: Union[int, float] = None, price: str = None, tif: str = None) -> bool:
+        """
+        挂单成功，来自下单返回或订单频道
+        :return: 是否第一次确认挂单成功，已确认、已成交或已结束的订单返回 False
+        """
+        order_state = self._get_or_create(client_id, contract)
+        if order_state.status != OrderState.PENDING:
+            self.suppressed['open'] += 1
+            return False
+        order_state.status = OrderState.OPEN
+        if client_id not in self._active:
+            # 请求超时后才确认挂单成功
+            self._active[client_id] = self._finished.pop(client_id)
+        if size:
+            order_state.size = size
+        if price is not None:
+            order_state.price = price
+        if tif is not None:
+            order_state.tif = tif
+        return True
+
+    def reject(self, client_id: str) -> bool:
+        """
+        挂单失败
+        :return: 是否第一次收到失败，订单已挂单成功或已结束时返回 False
+        """
+        order_state = self._get_or_create(client_id)
+        if order_state.status != OrderState.PENDING:
+            self.suppressed['reject'] += 1
+            return False
+        self._finish(order_state, OrderState.FAILED)
+        return True
+
+    def expire(self, client_id: str) -> None:
+        """
+        挂单请求超时未返回，订单移出活动订单，状态仍为等待挂单结果
+        :param client_id:
+        :return:
+        """
+        order_state = self._active.get(client_id)
+        if order_state is not None and order_state.status == OrderState.PENDING:
+            self._retire(order_state)
+
+    def fill(self, client_id: str, contract: str, fill_size: Union[int, float], price: str) -> OrderState:
+        """
+        收到一笔成交，累计成交数量
+        :param client_id:
+        :param contract:
+        :param fill_size: 带方向的成交数量
+        :param price: 成交价格
+        :return: 更新后的订单状态，订单原始数量未知时 size 为 0
+        """
+        order_state = self._get_or_create(client_id, contract)
+        order_state.filled += fill_size
+        if order_state.status == OrderState.CANCELLED:
+            # 撤单返回先于成交到达，订单已结束，只累计成交
+            return order_state
+        if order_state.size and abs(order_state.filled) >= abs(order_state.size):
+            self._finish(order_state, OrderState.FILLED)
+        else:
+            order_state.status = OrderState.PARTIAL
+            if not order_state.size:
+                # 不是由本 executor 发送的订单，无法判断是否完全成交，与已结束订单一同保存，避免一直占用内存
+                self._retire(order_state)
+            elif client_id not in self._active:
+                # 请求超时的订单已有成交，说明挂单成功
+                self._active[client_id] = self._finished.pop(client_id)
+        return order_state
+
+    def cancel(self, client_id: str) -> bool:
+        """
+        撤单成功，来自下单返回或订单频道
+        :return: 是否第一次收到撤单成功，已撤销的订单返回 False
+        """
+        order_state = self._get_or_create(client_id)
+        if order_state.status == OrderState.CANCELLED:
+            self.suppressed['cancel'] += 1
+            return False
+        self._finish(order_state, OrderState.CANCELLED)
+        return True
+
+    def amend(self, client_id: str, price: str = None, size: Union[int, float] = None) -> bool:
+        """
+        订单修改，来自下单返回或订单频道的 _update
+        :return: 价格或数量是否变化，没有记录的订单返回 True
+        """
+        order_state = self.get(client_id)
+        if order_state is None:
+            self._get_or_create(client_id).status = OrderState.OPEN
+            return True
+        changed = False
+        if price is not None and (order_state.price is None or float(price) != float(order_state.price)):
+            order_state.price = price
+            changed = True
+        if size and size != order_state.size:
+            order_state.size = size
+            changed = True
+        if not changed:
+            self.suppressed['amend'] += 1
+        return changed
+
+    def partial_orders(self, contract: str) -> dict[str, Union[int, float]]:
+        """
+        :param contract:
+        :return: 该合约部分成交、仍在挂单中的订单 {client_id: 带方向的已成交数量}
+        """
+        return {
+            client_id: order_state.filled for client_id, order_state in self._active.items()
+            if order_state.status == OrderState.PARTIAL and order_state.contract == contract
+        }
+
+    def stats(self) -> dict:
+        """
+        :return: 活动订单和已结束订单数量，被合并的重复信息数量
+        """
+        return {
+            'active': len(self._active),
+            'finished': len(self._finished),
+            'suppressed': dict(self.suppressed),
+        }
+
+
+if __name__ == '__main__':
+    order_book = OrderStateBook()
+    order_book.submit('stg1_00001BUY', 'BTC_USDT', 5, '42000', 'poc')
+    print(order_book.open('stg1_00001BUY'), order_book.open('stg1_00001BUY'))
+    print(order_book.fill('stg1_00001BUY', 'BTC_USDT', 2, '42000'))
+    print(order_book.fill('stg1_00001BUY', 'BTC_USDT', 3, '42000'))
+    print(order_book.cancel('stg1_00002SELL'), order_book.cancel('stg1_00002SELL'))
+    order_book.submit('stg1_00003BUY', 'BTC_USDT', 4, '41900', 'poc')
+    order_book.expire('stg1_00003BUY')
+    print(len(order_book), order_book.fill('stg1_00003BUY', 'BTC_USDT', 1, '41900'), order_book.partial_orders('BTC_USDT'))
+    print(order_book.stats())
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/29 15:20
+# @Author :
+# @File : position_ledger.py
+# @Software: PyCharm
+from typing import Union
+
+
+class PositionLedger:
+    """
+    按私有成交累计的合约仓位，查询不需要网络请求
+    仓位以 rest 查询结果为起点，之后每笔成交按带方向的数量累加，定时与 rest 仓位对比修正偏差
+
+    rest 请求期间收到的成交不能确定是否已包含在查询结果中，因此记录每个合约的成交次数，
+    请求前后成交次数不同时本次不修正，等待下一次对比
+    """
+
+    def __init__(self) -> None:
+        self._positions: dict[str, Union[int, float]] = {}
+        self._trade_counts: dict[str, int] = {}
+
+        # 统计信息
+        self.last_drifts: dict[str, Union[int, float]] = {}
+        self.drift_count = 0
+        self.reconcile_count = 0
+        self.skipped_reconciles = 0
+
+    def __contains__(self, contract_name: str) -> bool:
+        return contract_name in self._positions
+
+    def position(self, contract_name: str) -> Union[int, float, None]:
+        """
+        :param contract_name:
+        :return: 当前仓位，还没有 rest 起点时返回 None
+        """
+        return self._positions.get(contract_name)
+
+    def trade_count(self, contract_name: str) -> int:
+        return self._trade_counts.get(contract_name, 0)
+
+    def apply_trade(self, contract_name: str, size: Union[int, float]) -> None:
+        """
+        收到一笔成交，重复成交需要在调用前去除
+        :param contract_name:
+        :param size: 带方向的成交数量
+        :return:
+        """
+        self._trade_counts[contract_name] = self._trade_counts.get(contract_name, 0) + 1
+        if contract_name in self._positions:
+            self._positions[contract_name] += size
+
+    def reconcile(self, contract_name: str, rest_position: Union[int, float], trade_count: int) -> Union[int, float, None]:
+        """
+        与 rest 查询的仓位对比，以 rest 仓位为准
+        :param contract_name:
+        :param rest_position: rest 查询的仓位
+        :param trade_count: 发送 rest 请求前的成交次数
+        :return: rest 仓位与本地仓位的偏差，第一次同步时为 0，请求期间有成交、本次不修正时返回 None
+        """
+        if self._trade_counts.get(contract_name, 0) != trade_count:
+            self.skipped_reconciles += 1
+            return None
+        self.reconcile_count += 1
+        local_position = self._positions.get(contract_name)
+        drift = 0 if local_position is None else rest_position - local_position
+        self._positions[contract_name] = rest_position
+        if drift:
+            self.drift_count += 1
+            self.last_drifts[contract_name] = drift
+        return drift
+
+    def forget(self, contract_name: str) -> None:
+        self._positions.pop(contract_name, None)
+        self._trade_counts.pop(contract_name, None)
+        self.last_drifts.pop(contract_name, None)
+
+    def stats(self) -> dict:
+        """
+        :return: 各合约仓位，对比次数，跳过次数，出现偏差的次数和各合约最近的偏差
+        """
+        return {
+            'positions': dict(self._positions),
+            'reconcile_count': self.reconcile_count,
+            'skipped_reconciles': self.skipped_reconciles,
+            'drift_count': self.drift_count,
+            'last_drifts': dict(self.last_drifts),
+        }
+
+
+if __name__ == '__main__':
+    ledger = PositionLedger()
+    ledger.apply_trade('BTC_USDT', 3)
+    print(ledger.position('BTC_USDT'))
+    print(ledger.reconcile('BTC_USDT', 10, ledger.trade_count('BTC_USDT')))
+    ledger.apply_trade('BTC_USDT', -4)
+    ledger.apply_trade('BTC_USDT', 2)
+    print(ledger.position('BTC_USDT'))
+    count_before_request = ledger.trade_count('BTC_USDT')
+    ledger.apply_trade('BTC_USDT', 1)
+    print(ledger.reconcile('BTC_USDT', 9, count_before_request))
+    print(ledger.reconcile('BTC_USDT', 7, ledger.trade_count('BTC_USDT')))
+    print(ledger.stats())
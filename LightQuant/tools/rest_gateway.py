@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/18 10:15
+# @Author :
+# @File : rest_gateway.py
+# @Software: PyCharm
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class RestGateway:
+    """
+    非阻塞 rest 请求网关
+    gate_api 等同步客户端的请求放到有界线程池中执行，事件循环只等待结果，不再被网络 io 阻塞
+    线程池大小应与客户端的连接池大小相同，每个线程复用一个 keep-alive 连接
+
+    异常原样抛出，调用方原有的 try except 不需要修改，超时抛出 asyncio.TimeoutError
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float = 10, name: str = 'rest') -> None:
+        """
+        :param max_workers: 最大并发请求数量
+        :param timeout: 默认超时时间，秒
+        :param name: 线程名前缀
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def call(self, func: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        在线程池中调用同步方法并等待结果
+        超时后协程立即返回，正在执行的请求由客户端自身的超时结束
+        :param func: 同步方法，如 FuturesApi.get_position
+        :param args:
+        :param timeout: 超时时间，秒，为 None 时使用默认超时
+        :param kwargs:
+        :return: func 的返回值
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+if __name__ == '__main__':
+    import time
+
+    async def demo():
+        gateway = RestGateway(max_workers=4, timeout=1)
+        start = time.perf_counter()
+        # 4 个 0.3 秒的阻塞请求并发执行
+        await asyncio.gather(*[gateway.call(time.sleep, 0.3) for _ in range(4)])
+        print('耗时 {:.2f} s'.format(time.perf_counter() - start))
+        try:
+            await gateway.call(time.sleep, 0.5, timeout=0.1)
+        except asyncio.TimeoutError:
+            print('请求超时')
+        gateway.shutdown(wait=True)
+
+    asyncio.run(demo())
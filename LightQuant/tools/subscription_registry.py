@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/27 9:50
+# @Author :
+# @File : subscription_registry.py
+# @Software: PyCharm
+from typing import Iterable
+
+
+class SubscriptionRegistry:
+    """
+    记录当前需要保持的订阅，按 (通道, payload) 保存订阅和取消订阅之后的净状态
+    断线重连时只需要重新发送仍然有效的订阅，内存只与有效订阅数量有关
+
+    payload 为合约列表的公共通道(如 ticker)，每个合约单独记录，重新订阅时同一通道的合约合并为一个请求
+    其他通道(如需要用户 id 的私有通道)按整个 payload 记录，逐个重新订阅
+    """
+
+    def __init__(self, batchable_channels: Iterable[str] = ()) -> None:
+        """
+        :param batchable_channels: payload 为合约列表、可以合并订阅的通道
+        """
+        self.batchable_channels = set(batchable_channels)
+        # {channel: {payload_key: (payload, require_auth)}}，按订阅顺序保存
+        self._live: dict[str, dict[tuple, tuple[list, bool]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(each) for each in self._live.values())
+
+    def _split(self, channel: str, payload: list) -> list[list]:
+        if channel in self.batchable_channels and payload:
+            return [[each] for each in payload]
+        return [list(payload) if payload else []]
+
+    def record(self, channel: str, event: str, payload: list, require_auth: bool = False) -> bool:
+        """
+        记录一个订阅或取消订阅请求
+        :param channel:
+        :param event: 'subscribe' 或 'unsubscribe'，其他事件不记录
+        :param payload:
+        :param require_auth:
+        :return: 订阅状态是否改变
+        """
+        changed = False
+        if event == 'subscribe':
+            channel_subs = self._live.setdefault(channel, {})
+            for each_payload in self._split(channel, payload):
+                payload_key = tuple(each_payload)
+                if payload_key not in channel_subs:
+                    channel_subs[payload_key] = (each_payload, require_auth)
+                    changed = True
+        elif event == 'unsubscribe':
+            channel_subs = self._live.get(channel)
+            if channel_subs is None:
+                return False
+            for each_payload in self._split(channel, payload):
+                if channel_subs.pop(tuple(each_payload), None) is not None:
+                    changed = True
+            if not channel_subs:
+                del self._live[channel]
+        return changed
+
+    def is_subscribed(self, channel: str, payload: list) -> bool:
+        channel_subs = self._live.get(channel, {})
+        return all(tuple(each) in channel_subs for each in self._split(channel, payload))
+
+    def replay_payloads(self) -> list[tuple[str, list, bool]]:
+        """
+        重新订阅需要发送的请求，可合并的通道每个通道一个请求
+        :return: [(channel, payload, require_auth), ]
+        """
+        replay = []
+        for channel, channel_subs in self._live.items():
+            if channel in self.batchable_channels:
+                batch_payload = [each_payload[0] for each_payload, _ in channel_subs.values()]
+                require_auth = any(each_auth for _, each_auth in channel_subs.values())
+                replay.append((channel, batch_payload, require_auth))
+            else:
+                replay.extend((channel, each_payload, each_auth) for each_payload, each_auth in channel_subs.values())
+        return replay
+
+    def stats(self) -> dict:
+        """
+        :return: 每个通道的有效订阅数量
+        """
+        return {channel: len(channel_subs) for channel, channel_subs in self._live.items()}
+
+
+if __name__ == '__main__':
+    registry = SubscriptionRegistry(batchable_channels=['futures.tickers'])
+    for each_symbol in ('BTC_USDT', 'ETH_USDT', 'SOL_USDT'):
+        registry.record('futures.tickers', 'subscribe', [each_symbol])
+        registry.record('futures.usertrades', 'subscribe', ['10001', each_symbol], True)
+    registry.record('futures.tickers', 'unsubscribe', ['ETH_USDT'])
+    registry.record('futures.usertrades', 'unsubscribe', ['10001', 'ETH_USDT'])
+    print(registry.replay_payloads())
+    print(registry.stats())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/4 15:40
+# @Author :
+# @File : benchmark_fixed_point.py
+# @Software: PyCharm
+import time
+
+from LightQuant.tools.calc import calc, calc_sum
+from LightQuant.tools.fixed_point import FixedPoint
+
+# 模拟合约规则和网格
+price_min_step = 0.0001
+qty_min_step = 10
+maker_fee = 0.00015
+grid_num = 500
+all_grid_price = tuple(calc(0.1, calc(price_min_step, 3 * i, '*'), '+') for i in range(grid_num))
+all_grid_quantity = tuple(3 + i % 4 for i in range(grid_num))
+
+fill_times = 20000
+
+
+def fill_with_calc(statistics: dict, index: int) -> None:
+    """
+    原方法：每次成交使用 calc 更新交易量、手续费，并检查价格偏离
+    """
+    add_volume = calc(calc(all_grid_quantity[index + 1], qty_min_step, '*'), all_grid_price[index], '*')
+    statistics['achieved_trade_volume'] = calc(statistics['achieved_trade_volume'], add_volume, '+')
+    statistics['total_trading_fees'] = calc(statistics['total_trading_fees'], calc(add_volume, maker_fee, '*'), '+')
+    abs(calc(all_grid_price[index], all_grid_price[index - 1], '-')) > 5 * calc(all_grid_price[index + 1], all_grid_price[index - 1], '-')
+
+
+def fill_with_fixed_point(fp: FixedPoint, index: int) -> None:
+    """
+    定点数方法：成交只做整数累计
+    """
+    fp.add_trade(fp.notional(all_grid_price[index], all_grid_quantity[index + 1]), maker_fee)
+    to_ticks = fp.to_ticks
+    abs(to_ticks(all_grid_price[index]) - to_ticks(all_grid_price[index - 1])) > 5 * (to_ticks(all_grid_price[index + 1]) - to_ticks(all_grid_price[index - 1]))
+
+
+def unmatched_with_calc(initial_index: int, current_index: int, current_price: float) -> float:
+    price_slice = all_grid_price[initial_index + 1:current_index + 1]
+    qty_slice = [calc(each_qty, qty_min_step, '*') for each_qty in all_grid_quantity[initial_index + 1:current_index + 1]]
+    return -abs(calc(calc_sum([calc(p, q, '*') for p, q in zip(price_slice, qty_slice)]), calc(calc_sum(qty_slice), current_price, '*'), '-'))
+
+
+def unmatched_with_fixed_point(fp: FixedPoint, initial_index: int, current_index: int, current_price: float) -> float:
+    to_ticks = fp.to_ticks
+    current_ticks = to_ticks(current_price)
+    price_slice = all_grid_price[initial_index + 1:current_index + 1]
+    qty_slice = all_grid_quantity[initial_index + 1:current_index + 1]
+    return fp.to_value(-abs(sum([to_ticks(p) * q for p, q in zip(price_slice, qty_slice)]) - sum(qty_slice) * current_ticks))
+
+
+def main():
+    statistics = {'achieved_trade_volume': 0, 'total_trading_fees': 0}
+    t_start = time.perf_counter()
+    for n in range(fill_times):
+        fill_with_calc(statistics, 1 + n % (grid_num - 2))
+    calc_cost = (time.perf_counter() - t_start) / fill_times
+
+    fp = FixedPoint(price_min_step, qty_min_step)
+    t_start = time.perf_counter()
+    for n in range(fill_times):
+        fill_with_fixed_point(fp, 1 + n % (grid_num - 2))
+    volume, fees = fp.flush_trades()
+    fp_cost = (time.perf_counter() - t_start) / fill_times
+
+    print('每次成交 CPU 耗时:')
+    print('\tcalc:\t\t{:.3f} us'.format(calc_cost * 1e6))
+    print('\t定点数:\t\t{:.3f} us\t加速 {:.1f} 倍'.format(fp_cost * 1e6, calc_cost / fp_cost))
+    print('统计结果一致: {}'.format(statistics['achieved_trade_volume'] == volume and statistics['total_trading_fees'] == fees))
+
+    repeat = 200
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        ref_result = unmatched_with_calc(10, grid_num - 10, all_grid_price[-10])
+    calc_cost = (time.perf_counter() - t_start) / repeat
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        fp_result = unmatched_with_fixed_point(fp, 10, grid_num - 10, all_grid_price[-10])
+    fp_cost = (time.perf_counter() - t_start) / repeat
+
+    print('\n未配对盈亏计算耗时 ({} 格):'.format(grid_num - 20))
+    print('\tcalc:\t\t{:.1f} us'.format(calc_cost * 1e6))
+    print('\t定点数:\t\t{:.1f} us\t加速 {:.1f} 倍'.format(fp_cost * 1e6, calc_cost / fp_cost))
+    print('计算结果一致: {}'.format(ref_result == fp_result))
+
+
+if __name__ == '__main__':
+    main()
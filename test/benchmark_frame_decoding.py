@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/22 14:30
+# @Author :
+# @File : benchmark_frame_decoding.py
+# @Software: PyCharm
+import json
+import time
+
+from gate_ws.client import WebSocketResponse, WebSocketChannelResponse, WebSocketApiResponse
+
+import LightQuant.hands.GateConnection as gate_connection
+from LightQuant.hands.GateConnection import peek_channel, decode_frame, ChannelFrame
+
+# 合约 websocket 的返回样本，按实际运行时的比例组成信息流
+frame_samples = {
+    'book_ticker': '{"time":1710996000,"time_ms":1710996000123,"channel":"futures.book_ticker","event":"update","result":{"t":1710996000120,"u":4170863217,"s":"BTC_USDT","b":"67321.4","B":1532,"a":"67321.5","A":887}}',
+    'public_trade': '{"time":1710996000,"time_ms":1710996000130,"channel":"futures.trades","event":"update","result":[{"size":-12,"id":274395133,"create_time":1710996000,"create_time_ms":1710996000127,"price":"67321.4","contract":"BTC_USDT","is_internal":false}]}',
+    'ticker': '{"time":1710996000,"time_ms":1710996000200,"channel":"futures.tickers","event":"update","result":[{"contract":"BTC_USDT","last":"67321.4","change_percentage":"1.2051","total_size":"421093","volume_24h":"3821093","volume_24h_base":"38210","volume_24h_quote":"2571824461","volume_24h_settle":"2571824461","mark_price":"67320.88","funding_rate":"0.0001","funding_rate_indicative":"0.0001","index_price":"67318.36","quanto_base_rate":"","low_24h":"65102.1","high_24h":"68210.2"}]}',
+    'user_trade': '{"time":1710996000,"time_ms":1710996000210,"channel":"futures.usertrades","event":"update","result":[{"id":"3335259","create_time":1710996000,"create_time_ms":1710996000205,"contract":"BTC_USDT","order_id":"4872460","size":1,"price":"67321.4","role":"maker","text":"t-stg1_00000123BUY","fee":"-0.00067","point_fee":"0"}]}',
+    'order_ack': '{"request_id":"000000000123","ack":true,"header":{"response_time":"1710996000215","status":"200","channel":"futures.order_place","event":"api","client_id":"::1-0x140001623c0","conn_id":"f2e6b2d6","trace_id":"2f9a0a1c"},"data":{"result":{"req_id":"000000000123","req_header":null,"req_param":{"contract":"BTC_USDT","size":1,"price":"67321.4","tif":"poc","text":"t-stg1_00000124BUY"}}}}',
+    'order_result': '{"request_id":"000000000123","ack":false,"header":{"response_time":"1710996000221","status":"200","channel":"futures.order_place","event":"api","client_id":"::1-0x140001623c0","conn_id":"f2e6b2d6","trace_id":"2f9a0a1c"},"data":{"result":{"id":74046514,"user":6790020,"create_time":1710996000.22,"finish_as":"_new","status":"open","contract":"BTC_USDT","size":1,"price":"67321.4","tif":"poc","left":1,"fill_price":"0","text":"t-stg1_00000124BUY","tkfr":"0.0005","mkfr":"-0.0001"}}}',
+    'pong': '{"time":1710996000,"time_ms":1710996000300,"channel":"futures.pong","event":"","result":null}',
+    'subscribe_ack': '{"time":1710996000,"time_ms":1710996000301,"channel":"futures.book_ticker","event":"subscribe","result":{"status":"success"}}',
+}
+stream_weights = {'book_ticker': 60, 'public_trade': 20, 'ticker': 5, 'user_trade': 4, 'order_ack': 4, 'order_result': 4, 'pong': 2, 'subscribe_ack': 1}
+repeat_num = 20000
+
+# 与 executor 注册的通道相同，pong 没有回调
+registered_channels = {
+    'futures.book_ticker': print,
+    'futures.trades': print,
+    'futures.tickers': print,
+    'futures.usertrades': print,
+}
+
+
+def original_read(body: str):
+    """
+    Connection._read 的处理流程，不包括回调
+    """
+    response = WebSocketResponse.parse(body)
+    if isinstance(response, WebSocketChannelResponse):
+        callback = registered_channels.get(response.channel)
+    elif isinstance(response, WebSocketApiResponse):
+        callback = print
+    else:
+        callback = None
+    return callback, response
+
+
+def fast_read(body: str):
+    """
+    GateConnection._read 的处理流程，不包括回调
+    """
+    channel = peek_channel(body) if gate_connection.PEEK_CHANNEL else None
+    if channel is not None:
+        callback = registered_channels.get(channel)
+        if callback is None:
+            return None, None
+        return callback, decode_frame(body, channel)
+    response = decode_frame(body)
+    if response.__class__ is ChannelFrame:
+        callback = registered_channels.get(response.channel)
+        if callback is None:
+            return None, None
+        return callback, response
+    return print, response
+
+
+def measure(read_func, frames: list[str], repeat: int = 5) -> float:
+    """
+    :return: 多次测量中最快的速率，条/s
+    """
+    best_cost = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for each_frame in frames:
+            read_func(each_frame)
+        best_cost = min(best_cost, time.perf_counter() - start)
+    return len(frames) / best_cost
+
+
+def use_backend(name: str, loads) -> None:
+    """
+    切换 GateConnection 使用的 json 解析库，是否预先查找通道名与导入模块时的选择方式相同
+    """
+    gate_connection.json_loads = loads
+    gate_connection.PEEK_CHANNEL = name != 'json'
+
+
+def check_same_result() -> None:
+    for name, body in frame_samples.items():
+        _, original = original_read(body)
+        _, fast = fast_read(body)
+        if fast is None:
+            assert registered_channels.get(original.channel) is None, name
+            continue
+        if isinstance(original, WebSocketApiResponse):
+            assert (fast.channel, fast.request_id, fast.ack, fast.result) == (original.channel, original.request_id, original.ack, original.result), name
+        else:
+            assert (fast.channel, fast.event, fast.result, fast.msg) == (original.channel, original.event, original.result, original.msg), name
+
+
+def main():
+    backends = [('json', json.loads)]
+    if gate_connection.JSON_BACKEND != 'json':
+        backends.append((gate_connection.JSON_BACKEND, gate_connection.json_loads))
+    fast_json_loads = gate_connection.json_loads
+    for backend_name, loads in backends:
+        use_backend(backend_name, loads)
+        check_same_result()
+    use_backend(gate_connection.JSON_BACKEND, fast_json_loads)
+
+    print('每种样本 {} 次，单位: 条/s'.format(repeat_num))
+    title = '{:<14}{:>12}'.format('样本', '原始流程') + ''.join('{:>16}'.format('快速流程+' + name) for name, _ in backends)
+    print(title)
+    for name, body in frame_samples.items():
+        frames = [body] * repeat_num
+        result_str = '{:<14}{:>12.0f}'.format(name, measure(original_read, frames))
+        for backend_name, loads in backends:
+            use_backend(backend_name, loads)
+            result_str += '{:>16.0f}'.format(measure(fast_read, frames))
+        use_backend(gate_connection.JSON_BACKEND, fast_json_loads)
+        print(result_str)
+
+    stream = []
+    for name, weight in stream_weights.items():
+        stream.extend([frame_samples[name]] * weight)
+    stream = stream * (repeat_num // sum(stream_weights.values()))
+    result_str = '{:<14}{:>12.0f}'.format('混合信息流', measure(original_read, stream))
+    for backend_name, loads in backends:
+        use_backend(backend_name, loads)
+        result_str += '{:>16.0f}'.format(measure(fast_read, stream))
+    use_backend(gate_connection.JSON_BACKEND, fast_json_loads)
+    print(result_str)
+
+
+if __name__ == '__main__':
+    main()
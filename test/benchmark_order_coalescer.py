@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/19 15:10
+# @Author :
+# @File : benchmark_order_coalescer.py
+# @Software: PyCharm
+import json
+import time
+import asyncio
+import threading
+
+import websockets
+
+from LightQuant.tools.order_coalescer import OrderCoalescer
+
+# 本地 websocket 下单服务器，按顺序处理请求，模拟交易所每个请求的固定开销和每个订单的开销
+message_cost = 0.0002
+order_cost = 0.00002
+# 策略负载: 每轮行情像 command_transmitter 一样为每个订单创建一个 task
+# 间隔 2ms 时测量延时，间隔为 0 时服务器满负荷，测量吞吐量
+round_num = 300
+orders_per_round = 6
+round_interval = 0.002
+coalesce_window = 0.0005
+
+
+async def order_server(websocket, *args) -> None:
+    async for message in websocket:
+        request = json.loads(message)
+        req_param = request['payload']['req_param']
+        orders = req_param if isinstance(req_param, list) else [req_param]
+        # 交易所逐个处理请求，同步 sleep 阻塞服务器，与真实的排队情况相同
+        time.sleep(message_cost + order_cost * len(orders))
+        result = [{'succeeded': True, 'text': each['text']} for each in orders]
+        await websocket.send(json.dumps({
+            'request_id': request['payload']['req_id'],
+            'channel': request['channel'],
+            'result': result if isinstance(req_param, list) else result[0],
+        }))
+
+
+class OrderSender:
+    """
+    模拟 AsyncOrderClient，记录每个订单的发送时间，收到返回后计算延时
+    """
+
+    def __init__(self, websocket) -> None:
+        self.websocket = websocket
+        self.req_count = 0
+        self.submit_time: dict[str, float] = {}
+        self.latency: list[float] = []
+        self.all_received = asyncio.Event()
+        self.expected_num = 0
+
+    def _send(self, channel: str, req_param) -> None:
+        self.req_count += 1
+        payload = {'req_id': str(self.req_count).zfill(12), 'req_param': req_param}
+        asyncio.create_task(self.websocket.send(json.dumps({'channel': channel, 'event': 'api', 'payload': payload})))
+
+    def create_order(self, order: dict) -> None:
+        self._send('futures.order_place', order)
+
+    def create_batch_order(self, orders: list[dict]) -> None:
+        self._send('futures.order_batch_place', orders)
+
+    async def receive(self) -> None:
+        async for message in self.websocket:
+            response = json.loads(message)
+            results = response['result'] if isinstance(response['result'], list) else [response['result']]
+            now = time.perf_counter()
+            for each_result in results:
+                self.latency.append(now - self.submit_time.pop(each_result['text']))
+            if len(self.latency) >= self.expected_num:
+                self.all_received.set()
+
+
+async def run_load(uri: str, use_coalescer: bool, interval: float) -> dict:
+    async with websockets.connect(uri) as websocket:
+        sender = OrderSender(websocket)
+        sender.expected_num = round_num * orders_per_round
+        receive_task = asyncio.create_task(sender.receive())
+        coalescer = OrderCoalescer(sender.create_order, sender.create_batch_order, window=coalesce_window, max_batch_size=10)
+
+        async def post_poc_order(order: dict) -> None:
+            sender.submit_time[order['text']] = time.perf_counter()
+            if use_coalescer:
+                coalescer.submit(order)
+            else:
+                sender.create_order(order)
+
+        start = time.perf_counter()
+        for each_round in range(round_num):
+            for i in range(orders_per_round):
+                order = {'contract': 'BTC_USDT', 'size': 1, 'price': '42000', 'tif': 'poc', 'text': 't-stg1_{:08d}BUY'.format(each_round * orders_per_round + i)}
+                asyncio.create_task(post_poc_order(order))
+            await asyncio.sleep(interval)
+        await sender.all_received.wait()
+        cost = time.perf_counter() - start
+        receive_task.cancel()
+
+    latency = sorted(sender.latency)
+    return {
+        'messages': sender.req_count,
+        'orders_per_sec': len(latency) / cost,
+        'messages_per_sec': sender.req_count / cost,
+        'p50': latency[len(latency) // 2],
+        'p99': latency[int(len(latency) * 0.99)],
+        'max': latency[-1],
+    }
+
+
+def start_server() -> int:
+    """
+    服务器在独立线程的事件循环中运行，不阻塞客户端
+    :return: 端口
+    """
+    started = threading.Event()
+    port_box = []
+
+    async def serve_forever():
+        async with websockets.serve(order_server, '127.0.0.1', 0) as server:
+            port_box.append(list(server.sockets)[0].getsockname()[1])
+            started.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve_forever()), daemon=True).start()
+    started.wait()
+    return port_box[0]
+
+
+async def main():
+    uri = 'ws://127.0.0.1:{}'.format(start_server())
+    print('{} 轮，每轮 {} 个订单，合并窗口 {:.0f} us'.format(round_num, orders_per_round, coalesce_window * 1e6))
+    for interval in (round_interval, 0):
+        print('行情间隔 {} ms:'.format(interval * 1000))
+        for title, use_coalescer in (('逐个发送', False), ('合并发送', True)):
+            res = await run_load(uri, use_coalescer, interval)
+            result_str = '\t{}:\t请求 {:>5} 个\tp50 {:>7.2f} ms\tp99 {:>7.2f} ms\tmax {:>7.2f} ms'.format(
+                title, res['messages'], res['p50'] * 1000, res['p99'] * 1000, res['max'] * 1000)
+            if interval == 0:
+                # 只有满负荷时的速率代表吞吐量，有间隔时速率由策略负载决定
+                result_str += '\t{:>6.0f} 请求/s\t{:>6.0f} 订单/s'.format(res['messages_per_sec'], res['orders_per_sec'])
+            print(result_str)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/15 14:30
+# @Author :
+# @File : benchmark_order_records.py
+# @Software: PyCharm
+import time
+import tracemalloc
+
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.open_order_book import GridOrder
+
+# 模拟一次 200 个挂单的撒网，买卖各 100 个
+stg_num = 'stg8'
+critical_index = 500
+layout_num = 200
+grid_num = 1000
+all_grid_price = tuple(0.1 + 0.0003 * i for i in range(grid_num))
+all_grid_quantity = tuple(3 + i % 4 for i in range(grid_num))
+
+repeat = 500
+
+
+def gen_id(self_index: int, side: str) -> str:
+    return stg_num + '_' + str.zfill(str(self_index), 8) + side
+
+
+def parse_id(client_id: str) -> tuple[int, str]:
+    internal_client_id = client_id.split('_')[-1]
+    try:
+        order_index = int(internal_client_id[:8])
+        order_side = internal_client_id[8:]
+    except ValueError:
+        order_index = -1
+        order_side = client_id
+    return order_index, order_side
+
+
+def layout_indices() -> list[tuple[int, str]]:
+    half_num = layout_num // 2
+    return [(i, 'BUY') for i in range(critical_index - half_num, critical_index)] + \
+        [(i, 'SELL') for i in range(critical_index + 1, critical_index + half_num + 1)]
+
+
+def layout_with_dict() -> list[dict]:
+    """
+    原方法：dict 挂单记录，生成 batch 指令时每个挂单解析两次 id
+    """
+    orders = [{'id': gen_id(index, side), 'status': 'NEW', 'time': 0} for index, side in layout_indices()]
+    [
+        {
+            'id': each['id'],
+            'price': all_grid_price[parse_id(each['id'])[0]],
+            'quantity': all_grid_quantity[parse_id(each['id'])[0]],
+        } for each in orders
+    ]
+    return orders
+
+
+def layout_with_record(codec: ClientIdCodec) -> list[GridOrder]:
+    """
+    新方法：slots 挂单记录保存 index，id 从编码缓存中取出
+    """
+    orders = [GridOrder(codec.encode(stg_num, index, side), index, side, 'NEW', 0) for index, side in layout_indices()]
+    [
+        {
+            'id': each.id,
+            'price': all_grid_price[each.index],
+            'quantity': all_grid_quantity[each.index],
+        } for each in orders
+    ]
+    return orders
+
+
+def measure_memory(layout_func, *args) -> int:
+    tracemalloc.start()
+    orders = layout_func(*args)
+    current_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del orders
+    return current_size
+
+
+def main():
+    codec = ClientIdCodec(8)
+    # 预热编码缓存，与策略运行中重复挂单的情况相同
+    layout_with_record(codec)
+
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        layout_with_dict()
+    dict_cost = (time.perf_counter() - t_start) / repeat
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        layout_with_record(codec)
+    record_cost = (time.perf_counter() - t_start) / repeat
+
+    print('{} 个挂单撒网 CPU 耗时:'.format(layout_num))
+    print('\tdict + parse_id:\t{:.1f} us'.format(dict_cost * 1e6))
+    print('\tslots + 编码缓存:\t{:.1f} us\t加速 {:.1f} 倍'.format(record_cost * 1e6, dict_cost / record_cost))
+
+    dict_size = measure_memory(layout_with_dict)
+    # 编码缓存只在第一次挂单时建立，之后的撒网和补单重复使用，单独统计
+    tracemalloc.start()
+    new_codec = ClientIdCodec(8)
+    for index, side in layout_indices():
+        new_codec.encode(stg_num, index, side)
+    cache_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record_size = measure_memory(layout_with_record, codec)
+    print('{} 个挂单记录内存占用:'.format(layout_num))
+    print('\tdict:\t\t{:.1f} KB'.format(dict_size / 1024))
+    print('\tslots:\t\t{:.1f} KB\t减少 {:.0%}'.format(record_size / 1024, 1 - record_size / dict_size))
+    print('\t编码缓存:\t{:.1f} KB\t(一次性)'.format(cache_size / 1024))
+
+    client_ids = [gen_id(index, side) for index, side in layout_indices()]
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        for each_id in client_ids:
+            parse_id(each_id)
+    parse_cost = (time.perf_counter() - t_start) / repeat / layout_num
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        for each_id in client_ids:
+            codec.decode(each_id)
+    decode_cost = (time.perf_counter() - t_start) / repeat / layout_num
+    print('每个 id 解析耗时:')
+    print('\tparse_id:\t{:.3f} us'.format(parse_cost * 1e6))
+    print('\tdecode:\t\t{:.3f} us\t加速 {:.1f} 倍'.format(decode_cost * 1e6, parse_cost / decode_cost))
+    print('解析结果一致: {}'.format(all(parse_id(each_id) == codec.decode(each_id) for each_id in client_ids)))
+
+
+if __name__ == '__main__':
+    main()
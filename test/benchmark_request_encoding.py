@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/23 14:10
+# @Author :
+# @File : benchmark_request_encoding.py
+# @Software: PyCharm
+import json
+import time
+import asyncio
+
+from gate_api import FuturesOrder, FuturesOrderAmendment
+import gate_ws
+from gate_ws.api import AsyncOrderClient
+from gate_ws.client import WebSocketRequest
+
+from LightQuant.hands.GateOrderClient import GateOrderClient
+
+# 每种请求的发送次数，测量从调用下单方法到得到发送文本的耗时，即发送队列之前的写路径
+repeat_num = 20000
+batch_size = 10
+
+
+class EncodingConnection(gate_ws.Connection):
+    """
+    不连接服务器，按 Connection._write 的方式把请求转为文本后保存
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super(EncodingConnection, self).__init__(*args, **kwargs)
+        self.sent: list[str] = []
+
+    def send_msg(self, msg) -> None:
+        if isinstance(msg, WebSocketRequest):
+            msg = str(msg)
+        self.sent.append(msg)
+
+
+async def dummy_callback(*args) -> None:
+    pass
+
+
+def make_order(index: int) -> FuturesOrder:
+    return FuturesOrder(contract='BTC_USDT', size=1 if index % 2 else -1, price='{:.1f}'.format(42000 + index * 0.1), tif='poc',
+                        text='t-stg1_{:08d}{}'.format(index, 'BUY' if index % 2 else 'SELL'))
+
+
+def request_cases() -> dict:
+    orders = [make_order(i) for i in range(batch_size)]
+    price_amendment = FuturesOrderAmendment(price='42001.5')
+    return {
+        'order_place': lambda client, i: client.create_order(orders[i % batch_size]),
+        'batch_place': lambda client, i: client.create_batch_order(orders),
+        'order_cancel': lambda client, i: client.cancel_order(orders[i % batch_size].text),
+        'order_amend': lambda client, i: client.amend_order(orders[i % batch_size].text, price_amendment),
+    }
+
+
+def measure(client_class, case) -> tuple[float, list[str]]:
+    """
+    :return: 请求/s，发送的文本
+    """
+    conn = EncodingConnection(gate_ws.Configuration(app='futures'))
+    client = client_class(conn, dummy_callback)
+    best_cost = float('inf')
+    for _ in range(5):
+        conn.sent.clear()
+        start = time.perf_counter()
+        for i in range(repeat_num):
+            case(client, i)
+        best_cost = min(best_cost, time.perf_counter() - start)
+    return repeat_num / best_cost, conn.sent
+
+
+def without_time(message: str) -> dict:
+    request = json.loads(message)
+    request.pop('time')
+    request.pop('time_ms')
+    request['payload'].pop('req_id')
+    return request
+
+
+def main():
+    print('每种请求 {} 次，batch {} 个订单，单位: 请求/s'.format(repeat_num, batch_size))
+    print('{:<14}{:>14}{:>14}{:>8}'.format('请求', '原始编码', '预编码', '倍数'))
+    for name, case in request_cases().items():
+        original_rate, original_sent = measure(AsyncOrderClient, case)
+        encoded_rate, encoded_sent = measure(GateOrderClient, case)
+        # 除时间和请求 id 外，发送内容与原来相同
+        assert all(without_time(a) == without_time(b) for a, b in zip(original_sent[:batch_size], encoded_sent[:batch_size])), name
+        print('{:<14}{:>14.0f}{:>14.0f}{:>8.2f}'.format(name, original_rate, encoded_rate, encoded_rate / original_rate))
+
+    conn = EncodingConnection(gate_ws.Configuration(app='futures'))
+    original_client, encoded_client = AsyncOrderClient(conn, dummy_callback), GateOrderClient(conn, dummy_callback)
+    for title, client in (('原始登录签名', original_client), ('预计算登录签名', encoded_client)):
+        start = time.perf_counter()
+        for _ in range(repeat_num):
+            client.login('key', 'secret' * 8)
+        print('{}: {:.0f} 次/s'.format(title, repeat_num / (time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    main()
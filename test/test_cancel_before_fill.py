@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/4/1 10:20
+# @Author :
+# @File : test_cancel_before_fill.py
+# @Software: PyCharm
+import asyncio
+
+from gate_api import FuturesOrder
+
+from LightQuant.hands.GateFuturesExecutor import GateFuturesExecutor
+from LightQuant.tools.client_id import ClientIdCodec
+from LightQuant.tools.fixed_point import FixedPoint
+from LightQuant.tools.order_state import OrderState
+from LightQuant.strategy.GateAnalyzer.SmartGridFutures import SmartGridAnalyzerFutures
+from LightQuant.strategy.GateAnalyzer.NonlinearStairGridFuturesBeta import NonlinearStairGridAnalyzerFuturesBeta
+
+# 部分成交的买单被撤销，订单频道的撤单成功先于成交频道的最后一笔成交到达
+# executor 上报的成交带有已撤销的订单状态，策略将撤单前后的全部成交数量计入仓位偏移
+symbol_name = 'BTC_USDT'
+grid_qty = 5
+
+
+class OrderClient:
+    def create_order(self, futures_order):
+        pass
+
+    def create_batch_order(self, futures_orders):
+        pass
+
+
+def order_frame(finish_as: str, client_id: str) -> dict:
+    return {'finish_as': finish_as, 'contract': symbol_name, 'text': 't-' + client_id, 'price': '100', 'size': grid_qty, 'id': 1, 'tif': 'poc'}
+
+
+def trade_frame(trade_id: int, client_id: str, size: int) -> dict:
+    return {'id': trade_id, 'contract': symbol_name, 'text': 't-' + client_id, 'price': '100', 'size': size, 'create_time_ms': 0}
+
+
+def build_analyzer(analyzer_class: type):
+    analyzer = analyzer_class.__new__(analyzer_class)
+    analyzer.symbol_name = symbol_name
+    analyzer.stg_num = 'stg1'
+    analyzer._id_codec = ClientIdCodec(8)
+    analyzer.adjusting_index = analyzer._pre_adjusting_index = -1
+    analyzer._accumulated_pos_deviation = 0
+    analyzer._account_position_theory = 0
+    analyzer.grid_each_qty = grid_qty
+    analyzer.all_grid_quantity = [grid_qty] * 20
+    analyzer._fp = FixedPoint(0.1, 1)
+    analyzer.symbol_maker_fee = 0
+    analyzer._log_info = print
+    return analyzer
+
+
+async def run(analyzer_class: type) -> None:
+    executor = GateFuturesExecutor()
+    executor._async_client = OrderClient()
+    analyzer = build_analyzer(analyzer_class)
+    client_id = analyzer.gen_id(5, analyzer.BUY)
+
+    async def reporter(report_data: dict, token: str, appending_info: str = None) -> None:
+        report_data['status'] = token
+        await analyzer.report_receiver(report_data, appending_info)
+
+    executor.reporter = reporter
+    executor._send_place_request([FuturesOrder(contract=symbol_name, size=grid_qty, price='100', tif='poc', text='t-' + client_id)])
+    await executor._handle_user_futures_order_data(order_frame('_new', client_id))
+    await executor._handle_user_futures_trade_data(trade_frame(1, client_id, 2))
+    await executor._handle_user_futures_order_data(order_frame('cancelled', client_id))
+    assert analyzer._accumulated_pos_deviation == -2, analyzer._accumulated_pos_deviation
+    # 撤单成功之后才到达的成交
+    await executor._handle_user_futures_trade_data(trade_frame(2, client_id, 1))
+
+    assert executor._order_states.get(client_id).status == OrderState.CANCELLED
+    assert analyzer._account_position_theory == 3, analyzer._account_position_theory
+    assert analyzer._accumulated_pos_deviation == -3, analyzer._accumulated_pos_deviation
+    print('{}: 撤单前后成交 3 张全部计入仓位偏移\n'.format(analyzer_class.__name__))
+
+
+async def main():
+    for analyzer_class in (SmartGridAnalyzerFutures, NonlinearStairGridAnalyzerFuturesBeta):
+        await run(analyzer_class)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/18 15:20
+# @Author :
+# @File : test_rest_gateway.py
+# @Software: PyCharm
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import gate_api
+
+from LightQuant.tools.rest_gateway import RestGateway
+
+# 本地模拟的慢速 rest 服务器，每个请求延时返回
+response_delay = 0.5
+concurrent_num = 4
+
+
+class SlowTickerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(response_delay)
+        body = json.dumps([{'contract': 'BTC_USDT', 'last': '42000.1'}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def heartbeat(stop_event: asyncio.Event, gaps: list) -> None:
+    """
+    每 10ms 唤醒一次，记录事件循环最长的无响应时间
+    """
+    last_time = time.perf_counter()
+    while not stop_event.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        gaps.append(now - last_time)
+        last_time = now
+
+
+async def measure(coro) -> tuple[float, float]:
+    """
+    :return: 请求总耗时，事件循环最长无响应时间
+    """
+    stop_event, gaps = asyncio.Event(), []
+    beat_task = asyncio.create_task(heartbeat(stop_event, gaps))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await coro
+    cost = time.perf_counter() - start
+    stop_event.set()
+    await beat_task
+    return cost, max(gaps)
+
+
+async def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowTickerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_cfg = gate_api.Configuration(host='http://127.0.0.1:{}/api/v4'.format(server.server_port))
+    api_cfg.connection_pool_maxsize = concurrent_num
+    order_client = gate_api.FuturesApi(gate_api.ApiClient(api_cfg))
+    gateway = RestGateway(max_workers=concurrent_num, timeout=5)
+
+    async def blocking_requests():
+        for _ in range(concurrent_num):
+            order_client.list_futures_tickers(settle='usdt', contract='BTC_USDT')
+
+    async def gateway_requests():
+        results = await asyncio.gather(*[
+            gateway.call(order_client.list_futures_tickers, settle='usdt', contract='BTC_USDT') for _ in range(concurrent_num)
+        ])
+        assert all(float(each_res[0].last) == 42000.1 for each_res in results)
+
+    cost, max_gap = await measure(blocking_requests())
+    print('直接调用同步客户端:\t总耗时 {:.2f} s\t事件循环最长阻塞 {:.0f} ms'.format(cost, max_gap * 1000))
+    cost, max_gap = await measure(gateway_requests())
+    print('rest 网关:\t\t总耗时 {:.2f} s\t事件循环最长阻塞 {:.0f} ms'.format(cost, max_gap * 1000))
+    assert max_gap < response_delay / 2, '请求期间事件循环被阻塞'
+    assert cost < response_delay * 2, '请求没有并发执行'
+
+    try:
+        await gateway.call(order_client.list_futures_tickers, settle='usdt', contract='BTC_USDT', timeout=0.1)
+    except asyncio.TimeoutError:
+        print('超时请求正确返回 TimeoutError')
+    else:
+        raise AssertionError('请求没有超时')
+
+    gateway.shutdown(wait=True)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# @Time : 2024/3/25 15:20
+# @Author :
+# @File : test_split_connections.py
+# @Software: PyCharm
+import json
+import time
+import asyncio
+import threading
+import statistics
+
+import websockets
+import gate_ws
+from gate_api import FuturesOrder
+from gate_ws.futures import FuturesBookTickerChannel
+
+from LightQuant.hands.GateConnection import GateConnection
+from LightQuant.hands.GateOrderClient import GateOrderClient
+
+# 本地替身服务器: 行情服务器在收到订阅后不断推送 book ticker，下单服务器立即返回回声和下单结果
+# 比较下单返回与行情推送共用一个连接，以及分开连接时，行情洪峰期间的下单返回延时
+flood_burst = 1000
+flood_interval = 0.02
+order_num = 200
+order_interval = 0.005
+# 共用连接和分开连接交替运行的轮数，比较各自 p99 的中位数，减少机器负载对单次结果的影响
+repeat_num = 5
+# 分开连接的 p99 中位数至少比共用连接低该比例
+split_p99_margin = 0.1
+
+book_ticker_frame = '{{"time":1710996000,"time_ms":1710996000123,"channel":"futures.book_ticker","event":"update","result":{{"t":{},"u":4170863217,"s":"BTC_USDT","b":"67321.4","B":1532,"a":"67321.5","A":887}}}}'
+
+
+def api_frame(request: dict, ack: bool, result) -> str:
+    return json.dumps({
+        'request_id': request['payload']['req_id'],
+        'ack': ack,
+        'header': {'response_time': str(int(time.time() * 1000)), 'status': '200', 'channel': request['channel']},
+        'data': {'result': result},
+    })
+
+
+def stand_in_handler(market_data: bool, order_entry: bool):
+    async def handler(websocket, *args) -> None:
+        flood_task = None
+
+        async def flood() -> None:
+            while True:
+                for i in range(flood_burst):
+                    await websocket.send(book_ticker_frame.format(i))
+                await asyncio.sleep(flood_interval)
+
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                channel = request['channel']
+                if channel.endswith('.ping'):
+                    await websocket.send(json.dumps({'time': request['time'], 'channel': 'futures.pong', 'event': '', 'result': None}))
+                elif request.get('event') == 'subscribe' and market_data:
+                    await websocket.send(json.dumps({'time': request['time'], 'channel': channel, 'event': 'subscribe', 'result': {'status': 'success'}}))
+                    if flood_task is None:
+                        flood_task = asyncio.create_task(flood())
+                elif channel == 'futures.login' and order_entry:
+                    await websocket.send(api_frame(request, False, {'api_key': 'key', 'uid': '1'}))
+                elif channel == 'futures.order_place' and order_entry:
+                    await websocket.send(api_frame(request, True, {'req_id': request['payload']['req_id']}))
+                    order = dict(request['payload']['req_param'], id=1, status='open')
+                    await websocket.send(api_frame(request, False, order))
+        finally:
+            if flood_task is not None:
+                flood_task.cancel()
+
+    return handler
+
+
+def start_server(market_data: bool, order_entry: bool) -> int:
+    """
+    服务器在独立线程的事件循环中运行
+    :return: 端口
+    """
+    started = threading.Event()
+    port_box = []
+
+    async def serve_forever():
+        async with websockets.serve(stand_in_handler(market_data, order_entry), '127.0.0.1', 0, compression=None) as server:
+            port_box.append(list(server.sockets)[0].getsockname()[1])
+            started.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve_forever()), daemon=True).start()
+    started.wait()
+    return port_box[0]
+
+
+async def run_case(order_port: int, market_port: int, with_flood: bool) -> dict:
+    """
+    与 executor 相同的连接方式: 下单连接登录并使用 GateOrderClient，行情连接不登录，只订阅 book ticker
+    """
+    order_connection = GateConnection(gate_ws.Configuration(app='futures', host='ws://127.0.0.1:{}'.format(order_port), api_key='key', api_secret='secret'))
+    if market_port == order_port:
+        market_connection = order_connection
+    else:
+        market_connection = GateConnection(gate_ws.Configuration(app='futures', host='ws://127.0.0.1:{}'.format(market_port)), login_required=False)
+
+    book_ticker_count = [0]
+    submit_time: dict[str, float] = {}
+    latency: list[float] = []
+    all_received = asyncio.Event()
+
+    async def on_book_ticker(conn, response) -> None:
+        if response.event == 'update':
+            book_ticker_count[0] += 1
+
+    async def on_order(action_status: dict) -> None:
+        if action_status['channel'] != 'futures.order_place':
+            return
+        latency.append(time.perf_counter() - submit_time.pop(action_status['result']['text']))
+        if len(latency) >= order_num:
+            all_received.set()
+
+    book_ticker_channel = FuturesBookTickerChannel(market_connection, on_book_ticker)
+    order_client = GateOrderClient(order_connection, on_order)
+    order_client.login('key', 'secret')
+    if with_flood:
+        book_ticker_channel.subscribe(['BTC_USDT'])
+
+    connections = {order_connection, market_connection}
+    run_tasks = [asyncio.create_task(each.run()) for each in connections]
+    await asyncio.sleep(0.2)
+
+    for i in range(order_num):
+        order = FuturesOrder(contract='BTC_USDT', size=1, price='67000', tif='poc', text='t-stg1_{:08d}BUY'.format(i))
+        submit_time[order.text] = time.perf_counter()
+        order_client.create_order(order)
+        await asyncio.sleep(order_interval)
+    await asyncio.wait_for(all_received.wait(), 30)
+    book_ticker_stats = market_connection.dispatch_stats()['channels'].get('futures.book_ticker', {})
+
+    for each in connections:
+        each.close()
+    await asyncio.gather(*run_tasks, return_exceptions=True)
+
+    latency.sort()
+    return {
+        'p50': latency[len(latency) // 2] * 1000,
+        'p99': latency[int(len(latency) * 0.99)] * 1000,
+        'max': latency[-1] * 1000,
+        'book_ticker': book_ticker_count[0],
+        'conflated': book_ticker_stats.get('conflated', 0),
+    }
+
+
+async def main():
+    shared_port = start_server(market_data=True, order_entry=True)
+    order_port = start_server(market_data=False, order_entry=True)
+    market_port = start_server(market_data=True, order_entry=False)
+
+    print('{} 个订单，间隔 {} ms，行情每 {} ms 推送 {} 条'.format(order_num, order_interval * 1000, flood_interval * 1000, flood_burst))
+    cases = [('无行情', (shared_port, shared_port), False)]
+    cases += [('共用连接+行情洪峰', (shared_port, shared_port), True), ('分开连接+行情洪峰', (order_port, market_port), True)] * repeat_num
+    p99_results: dict[str, list[float]] = {}
+    for title, ports, with_flood in cases:
+        res = await run_case(*ports, with_flood)
+        p99_results.setdefault(title, []).append(res['p99'])
+        print('\t{:<12}下单返回 p50 {:>8.2f} ms\tp99 {:>8.2f} ms\tmax {:>8.2f} ms\t处理行情 {} 条\t合并行情 {} 条'.format(
+            title, res['p50'], res['p99'], res['max'], res['book_ticker'], res['conflated']))
+
+    # 分开连接时，下单返回不再排在同一连接的整段行情之后
+    # 单次运行的 p99 受机器负载影响较大，两种连接方式交替运行多轮，比较 p99 的中位数
+    shared_p99, split_p99 = statistics.median(p99_results['共用连接+行情洪峰']), statistics.median(p99_results['分开连接+行情洪峰'])
+    print('p99 中位数: 共用连接 {:.2f} ms\t分开连接 {:.2f} ms\t分开连接为共用连接的 {:.1%}'.format(shared_p99, split_p99, split_p99 / shared_p99))
+    assert split_p99 < shared_p99 * (1 - split_p99_margin), '行情洪峰期间，分开连接的下单返回 p99 没有明显低于共用连接'
+
+
+if __name__ == '__main__':
+    asyncio.run(main())